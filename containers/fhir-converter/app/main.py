@@ -1,3 +1,5 @@
+import asyncio
+import os
 from pathlib import Path
 from typing import Annotated
 
@@ -12,6 +14,8 @@ from lxml.etree import XMLSyntaxError
 from app.constants import FhirConverterInput
 from app.constants import sample_request
 from app.constants import sample_response
+from app.pool import ConversionPool
+from app.pool import ConversionQueueFullError
 from app.service import convert_to_fhir
 from app.service import resolve_references
 
@@ -34,6 +38,18 @@ app = FastAPI(
     description=description,
 )
 
+# Conversions run in a bounded pool of workers, so they don't block the event
+# loop, and requests beyond what the pool can hold are turned away
+CONVERSION_POOL = ConversionPool(
+    max_workers=int(os.getenv("CONVERSION_WORKERS", os.cpu_count() or 1)),
+    max_queue_size=(
+        int(os.environ["CONVERSION_QUEUE_SIZE"])
+        if "CONVERSION_QUEUE_SIZE" in os.environ
+        else None
+    ),
+)
+app.add_event_handler("shutdown", CONVERSION_POOL.shutdown)
+
 
 @app.get("/")
 @app.get("/fhir-converter")
@@ -63,7 +79,9 @@ async def convert(
     """
     Converts an HL7v2 or C-CDA message to FHIR format using the Microsoft FHIR
     Converter CLI tool. When conversion is successful, a dictionary containing the
-    response from the FHIR Converter is returned.
+    response from the FHIR Converter is returned. If the service is already
+    running and queueing as many conversions as it allows, a 503 response is
+    returned and the request should be retried later.
 
     In order to successfully call this function, the Microsoft FHIR Converter tool
     must be installed. For information on how to do this, please refer to the
@@ -94,7 +112,16 @@ async def convert(
                 "must be valid XML messages.",
             )
 
-    result = convert_to_fhir(**fhir_converter_input)
+    try:
+        result = await asyncio.wrap_future(
+            CONVERSION_POOL.submit(convert_to_fhir, **fhir_converter_input)
+        )
+    except ConversionQueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The FHIR converter is busy. Please retry the request later.",
+            headers={"Retry-After": "1"},
+        )
     if "fhir_conversion_failed" in result.get("response"):
         response.status_code = status.HTTP_400_BAD_REQUEST
 
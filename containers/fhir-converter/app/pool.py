@@ -0,0 +1,109 @@
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class ConversionQueueFullError(Exception):
+    """
+    Raised when a conversion is submitted to a `ConversionPool` that already has
+    as many conversions running and waiting as it allows.
+    """
+
+    pass
+
+
+class ConversionPool:
+    """
+    A bounded pool that runs conversions concurrently, so that one slow
+    conversion doesn't hold up every other request. The pool's threads only
+    dispatch conversions: each conversion still starts its own converter
+    process, so nothing, such as loaded templates, is kept between
+    conversions. At most `max_workers` conversions run at once, and at most
+    `max_queue_size` more wait for a free thread. Conversions submitted beyond
+    that are rejected with a `ConversionQueueFullError`, so callers can ask
+    clients to retry later rather than letting requests pile up without bound.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue_size: int = None):
+        """
+        Creates a new pool. Worker threads are started as conversions are
+        submitted, and are reused for later conversions.
+
+        :param max_workers: The maximum number of conversions to run at once.
+          Default: the number of CPUs.
+        :param max_queue_size: The maximum number of conversions waiting for a
+          free worker. Default: twice `max_workers`.
+        :raises ValueError: If `max_workers` is less than 1, or `max_queue_size`
+          is negative.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_queue_size is None:
+            max_queue_size = 2 * max_workers
+        if max_workers < 1:
+            raise ValueError("`max_workers` must be at least 1.")
+        if max_queue_size < 0:
+            raise ValueError("`max_queue_size` cannot be negative.")
+
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fhir-converter"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        The number of conversions running or waiting for a free worker.
+        """
+        return self._pending
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Submits a conversion to the pool.
+
+        :param fn: The function performing the conversion.
+        :param args: Positional arguments to call `fn` with.
+        :param kwargs: Keyword arguments to call `fn` with.
+        :raises ConversionQueueFullError: If the pool has no room for another
+          conversion.
+        :return: A future resolving to the return value of `fn`.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ConversionQueueFullError(
+                f"{self.max_workers} conversions are running and "
+                f"{self.max_queue_size} are waiting."
+            )
+        with self._lock:
+            self._pending += 1
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release_slot()
+            raise
+        future.add_done_callback(lambda _: self._release_slot())
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the pool's workers. Conversions that have already been submitted
+        are finished first.
+
+        :param wait: Whether to wait for the submitted conversions to finish.
+          Default: `True`
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _release_slot(self) -> None:
+        """
+        Frees the slot held by a finished conversion.
+        """
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
@@ -2,12 +2,20 @@ import json
 import os
 import re
 import subprocess
+import tempfile
 import uuid
 from pathlib import Path
+from typing import Any
+from typing import Union
 
 import hl7
 from lxml import etree
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 def add_data_source_to_bundle(bundle: dict, data_source: str) -> dict:
     """
@@ -20,12 +28,42 @@ def add_data_source_to_bundle(bundle: dict, data_source: str) -> dict:
     :return: The FHIR bundle with the a Meta.source entry for each
       FHIR resource in the bundle
     """
+    return rewrite_bundle(bundle, data_source)
+
+
+def rewrite_bundle(
+    bundle: dict, data_source: str, old_id: str = None, new_id: str = None
+) -> dict:
+    """
+    Given a FHIR bundle, walks it once, in place, to add a Meta.source entry
+    for every resource in the bundle and, optionally, to replace an id
+    everywhere it appears, e.g., in the Patient resource's id and in every
+    reference to the Patient. Since the bundle isn't serialized to a string
+    and parsed again, this is much cheaper than replacing the id in the
+    bundle's JSON for large bundles.
+
+    :param bundle: The FHIR bundle to rewrite.
+    :param data_source: The data source of the FHIR bundle.
+    :param old_id: The id to replace, or None to not replace any id.
+      Default: None.
+    :param new_id: The id to replace `old_id` with. Default: None.
+    :return: The FHIR bundle with the id replaced and a Meta.source entry for
+      each FHIR resource in the bundle.
+    """
     if data_source == "":
         raise ValueError(
             "The data_source parameter must be a defined, non-empty string."
         )
 
+    if old_id is not None:
+        for key, value in bundle.items():
+            if key != "entry":
+                bundle[key] = _replace_id(value, old_id, new_id)
+
     for entry in bundle.get("entry", []):
+        if old_id is not None:
+            _replace_id(entry, old_id, new_id)
+
         resource = entry.get("resource", {})
         if "meta" in resource:
             meta = resource["meta"]
@@ -41,6 +79,41 @@ def add_data_source_to_bundle(bundle: dict, data_source: str) -> dict:
     return bundle
 
 
+def _replace_id(value: Any, old_id: str, new_id: str) -> Any:
+    """
+    Replaces an id in every string within a parsed JSON value, updating
+    dictionaries and lists in place.
+
+    :param value: The parsed JSON value.
+    :param old_id: The id to replace.
+    :param new_id: The id to replace `old_id` with.
+    :return: The value with the id replaced.
+    """
+    if isinstance(value, str):
+        return value.replace(old_id, new_id) if old_id in value else value
+    if isinstance(value, dict):
+        for key, item in value.items():
+            value[key] = _replace_id(item, old_id, new_id)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            value[index] = _replace_id(item, old_id, new_id)
+    return value
+
+
+def _load_json_file(path: Union[str, Path]) -> Any:
+    """
+    Parses a JSON file, using orjson if it's installed since it's much faster
+    than the standard library for large FHIR bundles.
+
+    :param path: The path of the JSON file.
+    :return: The parsed JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(Path(path).read_bytes())
+    with open(path) as json_file:
+        return json.load(json_file)
+
+
 def resolve_references(input_data: str) -> str:
     """
     Given an HL7 XML string the function will attempt to set text
@@ -101,51 +174,51 @@ def convert_to_fhir(
         raise ValueError(
             f"Invalid input_type {input_type}. Valid values are 'hl7v2' and 'ecr'."
         )
-    output_data_file_path = "/tmp/output.json"
-
-    # Write input data to file
-    input_data_file_path = Path(f"/tmp/{input_type}-input.txt")
-    input_data_file_path.write_text(input_data)
-
-    # Formulate command for the FHIR Converter.
-    fhir_conversion_command = [
-        f"dotnet {converter_project_path} ",
-        "convert -- ",
-        f"--TemplateDirectory {template_directory_path} ",
-        f"--RootTemplate {root_template.value} ",
-        f"--InputDataFile {str(input_data_file_path)} "
-        f"--OutputDataFile {str(output_data_file_path)} ",
-    ]
-
-    fhir_conversion_command = "".join(fhir_conversion_command)
-
-    # Call the FHIR Converter.
-    converter_response = subprocess.run(
-        fhir_conversion_command, shell=True, capture_output=True, text=True
-    )
-    # Print the standard output
-    dev_mode = os.getenv("DEV_MODE", "false").lower()
-    if dev_mode == "true":
-        print(converter_response.stdout)
-    # Process the response from FHIR Converter.
-    if converter_response.returncode == 0:
-        result = json.load(open(output_data_file_path))
-        old_id = None
-        # Generate a new UUID for the patient resource.
-        for entry in result["FhirResource"]["entry"]:
-            if entry["resource"]["resourceType"] == "Patient":
-                old_id = entry["resource"]["id"]
-                break
-        new_id = str(uuid.uuid4())
-        result = json.dumps(result)
-        if old_id is not None:
-            result = result.replace(old_id, new_id)
-        result = json.loads(result)
-        add_data_source_to_bundle(result["FhirResource"], input_type)
+    # Each conversion reads and writes its own files, so that conversions
+    # running at the same time can't overwrite one another's data
+    with tempfile.TemporaryDirectory(prefix="fhir-converter-") as temp_dir:
+        output_data_file_path = Path(temp_dir) / "output.json"
+
+        # Write input data to file
+        input_data_file_path = Path(temp_dir) / f"{input_type}-input.txt"
+        input_data_file_path.write_text(input_data)
+
+        # Formulate command for the FHIR Converter.
+        fhir_conversion_command = [
+            f"dotnet {converter_project_path} ",
+            "convert -- ",
+            f"--TemplateDirectory {template_directory_path} ",
+            f"--RootTemplate {root_template.value} ",
+            f"--InputDataFile {str(input_data_file_path)} "
+            f"--OutputDataFile {str(output_data_file_path)} ",
+        ]
+
+        fhir_conversion_command = "".join(fhir_conversion_command)
+
+        # Call the FHIR Converter.
+        converter_response = subprocess.run(
+            fhir_conversion_command, shell=True, capture_output=True, text=True
+        )
+        # Print the standard output
+        dev_mode = os.getenv("DEV_MODE", "false").lower()
+        if dev_mode == "true":
+            print(converter_response.stdout)
+        # Process the response from FHIR Converter.
+        if converter_response.returncode == 0:
+            result = _load_json_file(output_data_file_path)
+            old_id = None
+            # Generate a new UUID for the patient resource.
+            for entry in result["FhirResource"]["entry"]:
+                if entry["resource"]["resourceType"] == "Patient":
+                    old_id = entry["resource"]["id"]
+                    break
+            rewrite_bundle(
+                result["FhirResource"], input_type, old_id, str(uuid.uuid4())
+            )
 
-    else:
-        result = vars(converter_response)
-        result["fhir_conversion_failed"] = "true"
+        else:
+            result = vars(converter_response)
+            result["fhir_conversion_failed"] = "true"
 
     return {"response": result}
 
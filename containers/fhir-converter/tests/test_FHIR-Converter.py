@@ -1,4 +1,5 @@
 # flake8: noqa
+import copy
 import json
 import os
 import pathlib
@@ -6,12 +7,17 @@ from unittest import mock
 
 import hl7
 import pytest
+from app.constants import RootTemplate
 from app.main import add_rr_data_to_eicr
 from app.main import app
+from app.pool import ConversionQueueFullError
+from app.service import _load_json_file
 from app.service import add_data_source_to_bundle
+from app.service import convert_to_fhir
 from app.service import normalize_hl7_datetime
 from app.service import normalize_hl7_datetime_segment
 from app.service import resolve_references
+from app.service import rewrite_bundle
 from app.service import standardize_hl7_datetimes
 from fastapi.testclient import TestClient
 from lxml import etree
@@ -209,8 +215,7 @@ invalid_rr_data_response = {
 }
 
 
-@mock.patch("app.service.json.load")
-@mock.patch("app.service.open")
+@mock.patch("app.service._load_json_file")
 @mock.patch("app.service.subprocess.run")
 @mock.patch("app.service.Path")
 @mock.patch("app.main.resolve_references")
@@ -218,12 +223,11 @@ def test_convert_valid_request(
     patched_resolve_references,
     patched_file_path,
     patched_subprocess_run,
-    patched_open,
-    patched_json_load,
+    patched_load_json_file,
 ):
     global valid_response
     patched_subprocess_run.return_value = mock.Mock(returncode=0)
-    patched_json_load.return_value = valid_response
+    patched_load_json_file.side_effect = lambda path: copy.deepcopy(valid_response)
     patched_file_path = mock.Mock()
     actual_response = client.post(
         "/convert-to-fhir",
@@ -240,8 +244,7 @@ def test_convert_valid_request(
     assert actual_response == valid_response
 
 
-@mock.patch("app.service.json.load")
-@mock.patch("app.service.open")
+@mock.patch("app.service._load_json_file")
 @mock.patch("app.service.subprocess.run")
 @mock.patch("app.service.Path")
 @mock.patch("app.main.add_rr_data_to_eicr")
@@ -251,11 +254,10 @@ def test_convert_valid_request_with_rr_data(
     patched_add_rr_data_to_eicr,
     patched_file_path,
     patched_subprocess_run,
-    patched_open,
-    patched_json_load,
+    patched_load_json_file,
 ):
     patched_subprocess_run.return_value = mock.Mock(returncode=0)
-    patched_json_load.return_value = valid_response
+    patched_load_json_file.side_effect = lambda path: copy.deepcopy(valid_response)
     patched_file_path = mock.Mock()
     patched_add_rr_data_to_eicr.return_value = "VALID_INPUT_DATA + RR"
     actual_response = client.post(
@@ -265,8 +267,7 @@ def test_convert_valid_request_with_rr_data(
     assert actual_response.status_code == 200
 
 
-@mock.patch("app.service.json.load")
-@mock.patch("app.service.open")
+@mock.patch("app.service._load_json_file")
 @mock.patch("app.service.subprocess.run")
 @mock.patch("app.service.Path")
 @mock.patch("app.main.resolve_references")
@@ -274,11 +275,10 @@ def test_convert_conversion_failure(
     patched_resolve_references,
     patched_file_path,
     patched_subprocess_run,
-    patched_open,
-    patched_json_load,
+    patched_load_json_file,
 ):
     patched_subprocess_run.return_value = mock.Mock(returncode=1)
-    patched_json_load.return_value = valid_response
+    patched_load_json_file.side_effect = lambda path: copy.deepcopy(valid_response)
     patched_file_path = mock.Mock()
 
     actual_response = client.post(
@@ -349,6 +349,61 @@ def test_add_data_source_to_bundle_missing_arg():
     assert expected_error_message in result_error_message
 
 
+def test_rewrite_bundle():
+    old_id = "02710678-32ab-4cea-b2f3-859b40a93ce3"
+    new_id = "9fc7e7e1-0b5b-4bd0-b5b4-6b0c2a2ad6f3"
+    bundle = {
+        "resourceType": "Bundle",
+        "id": "513a3d06-5e87-6fbc-ad1b-170ab430499f",
+        "entry": [
+            {
+                "fullUrl": f"urn:uuid:{old_id}",
+                "resource": {"resourceType": "Patient", "id": old_id},
+            },
+            {
+                "fullUrl": "urn:uuid:some-observation",
+                "resource": {
+                    "resourceType": "Observation",
+                    "id": "some-observation",
+                    "meta": {"source": ["elr"]},
+                    "subject": {"reference": f"Patient/{old_id}"},
+                    "performer": [{"reference": f"Patient/{old_id}"}],
+                    "valueInteger": 1,
+                },
+            },
+            {"request": {"method": "PUT", "url": f"Patient/{old_id}"}},
+        ],
+    }
+
+    # Rewriting gives the same bundle as replacing the id in the bundle's JSON
+    expected_bundle = json.loads(json.dumps(bundle).replace(old_id, new_id))
+    add_data_source_to_bundle(expected_bundle, "ecr")
+
+    assert rewrite_bundle(bundle, "ecr", old_id, new_id) == expected_bundle
+    assert bundle["entry"][1]["resource"]["meta"]["source"] == ["elr", "ecr"]
+    assert bundle["entry"][1]["resource"]["subject"]["reference"] == (
+        f"Patient/{new_id}"
+    )
+
+    # Without an id to replace, only the data source is added
+    rewrite_bundle(bundle, "elr")
+    assert bundle["entry"][0]["resource"]["id"] == new_id
+    assert bundle["entry"][0]["resource"]["meta"]["source"] == ["ecr", "elr"]
+
+    with pytest.raises(ValueError):
+        rewrite_bundle(bundle, "", old_id, new_id)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_load_json_file(use_orjson, tmp_path, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr("app.service.orjson", None)
+    json_path = tmp_path / "output.json"
+    json_path.write_text(json.dumps(valid_response))
+
+    assert _load_json_file(json_path) == valid_response
+
+
 bundle_with_references = '<ClinicalDocument xmlns="urn:hl7-org:v3" xmlns:sdtc="urn:hl7-org:sdtc" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><component><structuredBody><component><section><text><content styleCode="Bold">Additional Data</content><table><tbody><tr><th>Assigned Birth Sex</th><td ID="birthsex">Female</td></tr><tr><th>Gender Identity</th><td ID="gender-identity">unknown</td></tr><tr><th>Sexual Orientation</th><td ID="sexual-orientation">Do not know</td></tr></tbody></table><content styleCode="Bold">Travel History</content><table><thead><tr><th>Date of Travel</th><th>Location</th></tr></thead><tbody><tr><td>January 18th, 2018 - February 18th, 2018</td><td ID="trvhx-1">Traveled to Singapore, Malaysia and Bali with<br/>my family.</td></tr></tbody></table></text><entry><observation classCode="OBS" moodCode="EVN"><value code="F" codeSystem="2.16.840.1.113883.5.1" codeSystemName="AdministrativeGender" displayName="Female" xsi:type="CD"><originalText><reference value="#birthsex"/></originalText></value></observation></entry><entry><observation classCode="OBS" moodCode="EVN"><value nullFlavor="UNK" xsi:type="CD"><originalText><reference value="#gender-identity"/></originalText></value></observation></entry><entry><observation classCode="OBS" moodCode="EVN"><value nullFlavor="UNK" xsi:type="CD"><originalText><reference value="#sexual-orientation"/></originalText></value></observation></entry><entry><act classCode="ACT" moodCode="EVN"><text><reference value="#trvhx-1"/></text></act></entry></section></component></structuredBody></component></ClinicalDocument>'
 
 
@@ -517,3 +572,44 @@ def test_normalize_hl7_datetime():
     assert normalize_hl7_datetime(datetime_6) == "20200514.1234-0700"
     assert normalize_hl7_datetime(datetime_7) == "20200514010000.1234-0700"
     assert normalize_hl7_datetime(datetime_8) == "not-a-date"
+
+
+@mock.patch("app.main.CONVERSION_POOL")
+@mock.patch("app.main.resolve_references")
+def test_convert_pool_full(patched_resolve_references, patched_pool):
+    patched_resolve_references.side_effect = lambda input_data: input_data
+    patched_pool.submit.side_effect = ConversionQueueFullError("full")
+
+    actual_response = client.post(
+        "/convert-to-fhir",
+        json=valid_request,
+    )
+    assert actual_response.status_code == 503
+    assert actual_response.headers["Retry-After"] == "1"
+
+
+@mock.patch("app.service.subprocess.run")
+def test_convert_to_fhir_isolates_files(patched_subprocess_run):
+    commands = []
+
+    def run_converter(command, **kwargs):
+        commands.append(command)
+        input_path = command.split("--InputDataFile ")[1].split(" ")[0]
+        output_path = command.split("--OutputDataFile ")[1].split(" ")[0]
+        assert pathlib.Path(input_path).read_text() == "VALID_INPUT_DATA"
+        pathlib.Path(output_path).write_text(json.dumps(valid_response))
+        return mock.Mock(returncode=0)
+
+    patched_subprocess_run.side_effect = run_converter
+
+    for _ in range(2):
+        result = convert_to_fhir("VALID_INPUT_DATA", "ecr", RootTemplate.EICR)
+        assert result["response"]["Status"] == "OK"
+
+    # Each conversion uses its own directory, which is removed afterwards
+    directories = [
+        pathlib.Path(command.split("--InputDataFile ")[1].split(" ")[0]).parent
+        for command in commands
+    ]
+    assert directories[0] != directories[1]
+    assert not any(directory.exists() for directory in directories)
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+from app.pool import ConversionPool
+from app.pool import ConversionQueueFullError
+
+
+def test_conversion_pool():
+    pool = ConversionPool(max_workers=2, max_queue_size=1)
+    release = threading.Event()
+
+    def convert(message):
+        release.wait(5)
+        return message.upper()
+
+    try:
+        # Two conversions run and one waits; a fourth is turned away
+        futures = [pool.submit(convert, message) for message in ["a", "b", "c"]]
+        assert pool.pending == 3
+        with pytest.raises(ConversionQueueFullError):
+            pool.submit(convert, "d")
+
+        release.set()
+        assert [future.result(5) for future in futures] == ["A", "B", "C"]
+
+        # Finished conversions free their slots
+        _wait_for_idle(pool)
+        assert pool.submit(convert, "e").result(5) == "E"
+        _wait_for_idle(pool)
+    finally:
+        pool.shutdown()
+
+
+def test_conversion_pool_errors():
+    pool = ConversionPool(max_workers=1, max_queue_size=0)
+
+    def fail():
+        raise ValueError("Invalid input_type")
+
+    try:
+        # Errors are raised by the future, and still free the slot
+        with pytest.raises(ValueError):
+            pool.submit(fail).result(5)
+        _wait_for_idle(pool)
+        assert pool.submit(str, 1).result(5) == "1"
+    finally:
+        pool.shutdown()
+
+    with pytest.raises(ValueError):
+        ConversionPool(max_workers=0)
+    with pytest.raises(ValueError):
+        ConversionPool(max_workers=1, max_queue_size=-1)
+    assert ConversionPool(max_workers=3).max_queue_size == 6
+
+
+def _wait_for_idle(pool: ConversionPool) -> None:
+    """
+    Waits for a pool's finished conversions to free their slots, which happens
+    just after their results are set.
+    """
+    deadline = time.monotonic() + 5
+    while pool.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.pending == 0
@@ -15,6 +15,10 @@ class Settings(BaseSettings):
     cloud_provider: Optional[Literal["azure", "gcp"]]
     bucket_name: Optional[str]
     storage_account_url: Optional[str]
+    geocode_cache_size: Optional[int] = 0
+    geocode_cache_ttl_seconds: Optional[float] = 30 * 24 * 60 * 60
+    geocode_cache_negative_ttl_seconds: Optional[float] = 24 * 60 * 60
+    geocode_cache_path: Optional[str]
 
 
 @lru_cache()
@@ -1,9 +1,12 @@
 import copy
+from typing import List
 
 from smartystreets_python_sdk import us_street
 
 from app.fhir.geospatial.core import BaseFhirGeocodeClient
 from app.fhir.utils import get_one_line_address
+from app.geospatial.cache import GeocodeCache
+from app.geospatial.core import GeocodeResult
 from app.geospatial.smarty import SmartyGeocodeClient
 
 
@@ -20,8 +23,21 @@ class SmartyFhirGeocodeClient(BaseFhirGeocodeClient):
         smarty_auth_id: str,
         smarty_auth_token: str,
         licenses: list[str] = ["us-standard-cloud"],
+        cache: GeocodeCache = None,
     ):
-        self.__client = SmartyGeocodeClient(smarty_auth_id, smarty_auth_token, licenses)
+        """
+        Creates a new FHIR Smarty geocoding client.
+
+        :param smarty_auth_id: The Smarty authorization ID.
+        :param smarty_auth_token: The Smarty authentication token.
+        :param licenses: The Smarty licenses to geocode with.
+          Default: `["us-standard-cloud"]`.
+        :param cache: Optionally, a cache of geocoding results to check before
+          calling the Smarty API. Default: None.
+        """
+        self.__client = SmartyGeocodeClient(
+            smarty_auth_id, smarty_auth_token, licenses, cache=cache
+        )
 
     @property
     def geocode_client(self) -> us_street.Client:
@@ -68,16 +84,28 @@ class SmartyFhirGeocodeClient(BaseFhirGeocodeClient):
 
             # Update fields with new, standardized information
             if standardized_address:
-                address["line"] = standardized_address.line
-                address["city"] = standardized_address.city
-                address["state"] = standardized_address.state
-                address["county"] = standardized_address.county_name
-                address["postalCode"] = standardized_address.postal_code
-                self._store_lat_long_extension(
-                    address, standardized_address.lat, standardized_address.lng
-                )
-
-    def geocode_bundle(self, bundle: dict, overwrite=True) -> dict:
+                self._update_address(address, standardized_address)
+
+    def _update_address(
+        self, address: dict, standardized_address: GeocodeResult
+    ) -> None:
+        """
+        Updates a FHIR-formatted address in-place with the standardized
+        information from geocoding it.
+
+        :param address: A FHIR-formatted address.
+        :param standardized_address: The result of geocoding the address.
+        """
+        address["line"] = standardized_address.line
+        address["city"] = standardized_address.city
+        address["state"] = standardized_address.state
+        address["county"] = standardized_address.county_name
+        address["postalCode"] = standardized_address.postal_code
+        self._store_lat_long_extension(
+            address, standardized_address.lat, standardized_address.lng
+        )
+
+    def geocode_bundle(self, bundle: dict, overwrite=True, batch=False) -> dict:
         """
         Geocodes on all resources in a given FHIR bundle whose
         resource type is among those supported by the PHDI SDK. Currently,
@@ -88,8 +116,13 @@ class SmartyFhirGeocodeClient(BaseFhirGeocodeClient):
         :param bundle: A bundle of FHIR resources.
         :param overwrite: If true, `bundle` is modified in-place;
           if false, a copy of `bundle` modified and returned.  Default: `True`
+        :param batch: If true, the addresses in the bundle are geocoded together,
+          as by `geocode_bundles`, rather than one at a time.  Default: `False`
         :return: The FHIR bundle with geocoded address(es).
         """
+        if batch:
+            return self.geocode_bundles([bundle], overwrite=overwrite)[0]
+
         if not overwrite:
             bundle = copy.deepcopy(bundle)
 
@@ -97,3 +130,30 @@ class SmartyFhirGeocodeClient(BaseFhirGeocodeClient):
             _ = self.geocode_resource(entry.get("resource", {}), overwrite=True)
 
         return bundle
+
+    def geocode_bundles(self, bundles: List[dict], overwrite=True) -> List[dict]:
+        """
+        Geocodes all supported resources in the given FHIR bundles together.
+        The addresses with a street line in all the bundles are collected, and
+        each distinct address is looked up once, in batches of up to 100 lookups.
+        Currently supported resource types are:
+
+        * Patient
+
+        :param bundles: A list of bundles of FHIR resources.
+        :param overwrite: If true, `bundles` are modified in-place;
+          if false, copies of `bundles` are modified and returned.  Default: `True`
+        :return: The FHIR bundles with geocoded address(es).
+        """
+        if not overwrite:
+            bundles = copy.deepcopy(bundles)
+
+        addresses = self._get_geocodable_addresses(bundles)
+        standardized_addresses = self.__client.geocode_batch(
+            [get_one_line_address(address) for address in addresses]
+        )
+        for address, standardized_address in zip(addresses, standardized_addresses):
+            if standardized_address:
+                self._update_address(address, standardized_address)
+
+        return bundles
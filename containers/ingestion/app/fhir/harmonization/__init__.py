@@ -1,5 +1,6 @@
 from app.fhir.harmonization.standardization import double_metaphone_bundle
 from app.fhir.harmonization.standardization import double_metaphone_patient
+from app.fhir.harmonization.standardization import standardize_bundle
 from app.fhir.harmonization.standardization import standardize_dob
 from app.fhir.harmonization.standardization import standardize_names
 from app.fhir.harmonization.standardization import standardize_phones
@@ -7,6 +8,7 @@ from app.fhir.harmonization.standardization import standardize_phones
 __all__ = (
     "double_metaphone_bundle",
     "double_metaphone_patient",
+    "standardize_bundle",
     "standardize_names",
     "standardize_phones",
     "standardize_dob",
@@ -1,3 +1,4 @@
+from app.geospatial.cache import GeocodeCache
 from app.geospatial.census import CensusGeocodeClient
 from app.geospatial.core import BaseGeocodeClient
 from app.geospatial.core import GeocodeResult
@@ -8,4 +9,5 @@ __all__ = (
     "BaseGeocodeClient",
     "SmartyGeocodeClient",
     "CensusGeocodeClient",
+    "GeocodeCache",
 )
@@ -1,20 +1,35 @@
+import csv
+import io
+from typing import List
 from typing import Literal
 from typing import Union
 
 import requests
 
+from app.geospatial.cache import GeocodeCache
+from app.geospatial.cache import normalize_address_key
 from app.geospatial.core import BaseGeocodeClient
 from app.geospatial.core import GeocodeResult
 from app.transport import http_request_with_retry
 
+# The most addresses the Census batch geocoder accepts in a single file
+CENSUS_BATCH_SIZE = 10000
+
 
 class CensusGeocodeClient(BaseGeocodeClient):
     """
     Implementation of a geocoding client using the Census API.
     """
 
-    def __init__(self):
+    def __init__(self, cache: GeocodeCache = None):
+        """
+        Creates a new Census geocoding client.
+
+        :param cache: Optionally, a cache of geocoding results to check before
+          calling the Census API. Default: None.
+        """
         self.__client = ()
+        self.cache = cache
 
     def geocode_from_str(self, address: str) -> Union[GeocodeResult, None]:
         """
@@ -33,10 +48,7 @@ class CensusGeocodeClient(BaseGeocodeClient):
             raise ValueError("Address must include street number and name at a minimum")
 
         formatted_address = self._format_address(address, searchtype="onelineaddress")
-        url = self._get_url(formatted_address)
-        response = self._call_census_api(url)
-
-        return self._parse_census_result(response)
+        return self._geocode_formatted_address(formatted_address)
 
     def geocode_from_dict(self, address: dict) -> Union[GeocodeResult, None]:
         """
@@ -72,10 +84,95 @@ class CensusGeocodeClient(BaseGeocodeClient):
         # Configure the lookup with whatever provided address values
         # were in the user-given dictionary
         formatted_address = self._format_address(address, searchtype="address")
-        url = self._get_url(formatted_address)
-        response = self._call_census_api(url)
+        return self._geocode_formatted_address(formatted_address)
+
+    def geocode_batch(
+        self, addresses: List[Union[str, dict]]
+    ) -> List[Union[GeocodeResult, None]]:
+        """
+        Geocodes many addresses, each formatted as either a string or a
+        dictionary (as accepted by `geocode_from_str` and `geocode_from_dict`),
+        uploading them to the Census batch geocoder as CSV files of up to 10,000
+        addresses. Duplicate addresses are only geocoded once. String addresses
+        are sent whole as the street, for the geocoder to parse.
 
-        return self._parse_census_result(response)
+        The batch geocoder doesn't return county names, so `county_name` is
+        empty in the results. For that reason, batch results are cached apart
+        from the results of single lookups.
+
+        :param addresses: A list of addresses, as strings or dictionaries.
+        :raises ValueError: If an address does not include street number and name.
+        :raises requests.HTTPError: If an unexpected status code is returned.
+        :return: A list of standardized addresses enriched with lat, lon, census
+          tract, and more (if valid result) or None (if no valid result), in the
+          same order as `addresses`.
+        """
+        address_keys = []
+        for address in addresses:
+            if isinstance(address, str):
+                street = address
+                searchtype = "onelineaddress"
+            else:
+                street = address.get("street", "")
+                searchtype = "address"
+            if street == "":
+                raise ValueError(
+                    "Address must include street number and name at a minimum"
+                )
+            address_keys.append(
+                self._get_address_key(
+                    self._format_address(address, searchtype=searchtype),
+                    namespace="census-batch",
+                )
+            )
+
+        def geocode(indices: List[int]) -> List[Union[GeocodeResult, None]]:
+            results = []
+            for start in range(0, len(indices), CENSUS_BATCH_SIZE):
+                batch = [
+                    addresses[i] for i in indices[start : start + CENSUS_BATCH_SIZE]
+                ]
+                response = self._call_census_batch_api(
+                    self._format_address_batch(batch)
+                )
+                results.extend(self._parse_census_batch_result(response, len(batch)))
+            return results
+
+        return self._geocode_batch_with_cache(address_keys, geocode)
+
+    def _geocode_formatted_address(
+        self, formatted_address: str
+    ) -> Union[GeocodeResult, None]:
+        """
+        Geocodes an address formatted by `_format_address`, using the cache if
+        the client has one.
+
+        :param formatted_address: The formatted address to geocode.
+        :return: A standardized address enriched with lat, lon, census tract, and more.
+            Returns None if no valid result.
+        """
+
+        def geocode() -> Union[GeocodeResult, None]:
+            url = self._get_url(formatted_address)
+            response = self._call_census_api(url)
+            return self._parse_census_result(response)
+
+        return self._geocode_with_cache(
+            self._get_address_key(formatted_address), geocode
+        )
+
+    @staticmethod
+    def _get_address_key(formatted_address: str, namespace: str = "census") -> str:
+        """
+        Builds the cache key for an address formatted by `_format_address`,
+        treating the "+" that spaces are replaced with as whitespace.
+
+        :param formatted_address: The formatted address.
+        :param namespace: The namespace of the key, which keeps the results of
+          single and batch lookups apart. Default: "census".
+        :return: The address's cache key.
+        """
+        return normalize_address_key(namespace, formatted_address.replace("+", " "))
 
     @staticmethod
     def _format_address(
@@ -168,6 +265,112 @@ class CensusGeocodeClient(BaseGeocodeClient):
         else:
             return response.json()["result"]
 
+    @staticmethod
+    def _format_address_batch(addresses: List[Union[str, dict]]) -> str:
+        """
+        Formats addresses as a CSV file for the Census batch geocoder, with the
+        index of each address as its unique ID.
+
+        :param addresses: A list of addresses, as strings or dictionaries.
+        :return: The CSV file, as a string.
+        """
+        address_file = io.StringIO()
+        writer = csv.writer(address_file)
+        for i, address in enumerate(addresses):
+            if isinstance(address, str):
+                writer.writerow([i, address, "", "", ""])
+            else:
+                writer.writerow(
+                    [
+                        i,
+                        address.get("street", ""),
+                        address.get("city", ""),
+                        address.get("state", ""),
+                        address.get("zip", ""),
+                    ]
+                )
+        return address_file.getvalue()
+
+    @staticmethod
+    def _get_batch_url() -> str:
+        """
+        Gets URL for the Census batch geocoder.
+
+        :return: A URL for the Census API request, as a string.
+        """
+        return "https://geocoding.geo.census.gov/geocoder/geographies/addressbatch"
+
+    @classmethod
+    def _call_census_batch_api(cls, address_file: str) -> str:
+        """
+        Uploads a CSV file of addresses to the Census batch geocoder using the
+        http_request_with_retry method.
+
+        :param address_file: The CSV file of addresses, as formatted by
+          `_format_address_batch`.
+        :raises requests.HTTPError: If an unexpected status code is returned.
+        :return: The CSV file of results returned, as a string.
+        """
+        response = http_request_with_retry(
+            cls._get_batch_url(),
+            5,
+            "POST",
+            ["POST"],
+            {},
+            files={
+                "addressFile": ("addresses.csv", address_file, "text/csv"),
+                "benchmark": (None, "Public_AR_Census2020"),
+                "vintage": (None, "Census2020_Census2020"),
+            },
+        )
+
+        if response.status_code != 200:
+            raise requests.HTTPError(response=response)
+        return response.text
+
+    @staticmethod
+    def _parse_census_batch_result(
+        response: str, num_addresses: int
+    ) -> List[Union[GeocodeResult, None]]:
+        """
+        Parses the CSV file of results returned by the Census batch geocoder
+        into our standardized GeocodeResult class. Addresses without a match,
+        or with more than one, have no result.
+
+        :param response: The CSV file of results, as a string.
+        :param num_addresses: The number of addresses that were geocoded.
+        :return: A list of parsed and standardized addresses enriched with lat,
+          lon, census tract, and more (if valid result) or None (if no valid
+          result), in the order the addresses were sent.
+        """
+        results = [None] * num_addresses
+        for row in csv.reader(io.StringIO(response)):
+            if len(row) < 12 or row[2] != "Match":
+                continue
+            street, city, state, postal_code = [
+                part.strip() for part in row[4].rsplit(",", 3)
+            ]
+            lng, lat = row[5].split(",")
+            state_fips, county_fips, tract, block = row[8:12]
+            census_tract = str(int(tract[:4])) if tract else ""
+            if tract[4:] not in ("", "00"):
+                census_tract += f".{tract[4:]}"
+
+            results[int(row[0])] = GeocodeResult(
+                line=[street],
+                city=city,
+                state=state,
+                postal_code=postal_code,
+                county_fips=state_fips + county_fips,
+                county_name="",
+                lat=float(lat),
+                lng=float(lng),
+                geoid=state_fips + county_fips + tract + block,
+                census_tract=census_tract,
+                census_block=block,
+            )
+        return results
+
     @staticmethod
     def _parse_census_result(lookup) -> Union[GeocodeResult, None]:
         """
@@ -1,6 +1,8 @@
+import copy
 from abc import ABC
 from abc import abstractmethod
 from dataclasses import dataclass
+from typing import Callable
 from typing import List
 from typing import Optional
 from typing import Union
@@ -36,8 +38,14 @@ class BaseGeocodeClient(ABC):
     classes to define methods to geocode from both strings and dictionaries.
     Callers should use the provided interface functions (e.g., geocode_from_str)
     to interact with the underlying vendor-specific client property.
+
+    Implementing classes may also accept a `GeocodeCache`, stored as `cache`,
+    and look up addresses through `_geocode_with_cache` so that addresses
+    already geocoded aren't sent to the vendor again.
     """
 
+    cache = None
+
     @abstractmethod
     def geocode_from_str(self, address: str) -> Union[GeocodeResult, None]:
         """
@@ -75,3 +83,114 @@ class BaseGeocodeClient(ABC):
         :return: A geocoded address (if valid result) or None (if no valid result).
         """
         pass  # pragma: no cover
+
+    def geocode_batch(
+        self, addresses: List[Union[str, dict]]
+    ) -> List[Union[GeocodeResult, None]]:
+        """
+        Geocodes many addresses, each formatted as either a string or a
+        dictionary (as accepted by `geocode_from_str` and `geocode_from_dict`).
+        Duplicate addresses are only geocoded once. Implementing classes should
+        override this to send the addresses to the vendor in as few requests as
+        it allows; by default, they're geocoded one at a time.
+
+        :param addresses: A list of addresses, as strings or dictionaries.
+        :return: A list of the geocoded addresses (if valid result) or None (if
+          no valid result), in the same order as `addresses`.
+        """
+        address_keys = [
+            address if isinstance(address, str) else tuple(sorted(address.items()))
+            for address in addresses
+        ]
+
+        def geocode_addresses(indices: List[int]) -> List[Union[GeocodeResult, None]]:
+            return [
+                self.geocode_from_str(addresses[i])
+                if isinstance(addresses[i], str)
+                else self.geocode_from_dict(addresses[i])
+                for i in indices
+            ]
+
+        return self._geocode_batch_with_cache(
+            address_keys, geocode_addresses, use_cache=False
+        )
+
+    def _geocode_with_cache(
+        self,
+        address_key: str,
+        geocode: Callable[[], Union[GeocodeResult, None]],
+    ) -> Union[GeocodeResult, None]:
+        """
+        Gets the result of geocoding an address from the client's cache, if
+        it has one and the address is cached, or otherwise geocodes the
+        address and caches the result. Errors raised while geocoding aren't
+        cached.
+
+        :param address_key: The address's key, as built by
+          `normalize_address_key`.
+        :param geocode: A function that geocodes the address with the vendor.
+        :return: A geocoded address (if valid result) or None (if no valid result).
+        """
+        if self.cache is None:
+            return geocode()
+        result = self.cache.get(address_key, _NOT_CACHED)
+        if result is _NOT_CACHED:
+            result = geocode()
+            self.cache.put(address_key, result)
+        return result
+
+    def _geocode_batch_with_cache(
+        self,
+        address_keys: List[str],
+        geocode: Callable[[List[int]], List[Union[GeocodeResult, None]]],
+        use_cache: bool = True,
+    ) -> List[Union[GeocodeResult, None]]:
+        """
+        Geocodes many addresses, so that each distinct address is only
+        geocoded once, and addresses in the client's cache, if it has one,
+        aren't geocoded at all. The results of geocoding the rest are cached.
+
+        :param address_keys: The key of each address, as built by
+          `normalize_address_key`.
+        :param geocode: A function that geocodes the addresses at the given
+          indices with the vendor, returning the results in the same order.
+        :param use_cache: Whether to use the client's cache, e.g. False if the
+          addresses are geocoded through `_geocode_with_cache`. Default: True.
+        :return: A list of the geocoded addresses (if valid result) or None (if
+          no valid result), in the same order as `address_keys`.
+        """
+        cache = self.cache if use_cache else None
+        results = {}
+        uncached = {}
+        for i, address_key in enumerate(address_keys):
+            if address_key in results or address_key in uncached:
+                continue
+            if cache is not None:
+                result = cache.get(address_key, _NOT_CACHED)
+                if result is not _NOT_CACHED:
+                    results[address_key] = result
+                    continue
+            uncached[address_key] = i
+
+        if uncached:
+            for address_key, result in zip(uncached, geocode(list(uncached.values()))):
+                results[address_key] = result
+                if cache is not None:
+                    cache.put(address_key, result)
+
+        # Duplicate addresses each get their own copy of the result, so that
+        # changing one doesn't change the others
+        geocoded = []
+        seen = set()
+        for address_key in address_keys:
+            result = results[address_key]
+            if address_key in seen:
+                result = copy.deepcopy(result)
+            seen.add(address_key)
+            geocoded.append(result)
+        return geocoded
+
+
+# Returned by the cache for addresses that aren't cached, since addresses that
+# couldn't be geocoded are cached as None
+_NOT_CACHED = object()
@@ -1,4 +1,8 @@
 import unicodedata
+from functools import lru_cache
+from typing import Iterable
+from typing import List
+from typing import Union
 
 """
 The Double Metaphone phonetic encoding algorithm is an improvement to the
@@ -18,6 +22,11 @@ and more.
 VOWELS = ["A", "E", "I", "O", "U", "Y"]
 SILENT_STARTERS = ["GN", "KN", "PN", "WR", "PS"]
 
+# The maximum number of distinct normalized strings whose encodings are memoized
+# across the process; most names are drawn from a small set of common given
+# names and surnames
+ENCODING_CACHE_SIZE = 65536
+
 
 class DoubleMetaphone(object):
     """
@@ -43,7 +52,63 @@ class DoubleMetaphone(object):
         :param string: The string to be parsed.
         :return: The parsed result.
         """
-        return self.parse(string)
+        return self.encode(string)
+
+    def encode(self, string: Union[str, bytes]) -> List[str]:
+        """
+        Encodes a string, memoizing the encoding of its normalized form across
+        the process so that names seen before are encoded without being
+        parsed again. Unlike `parse`, this is safe to call from several
+        threads at once.
+
+        :param string: The string to encode.
+        :return: A list of the primary and secondary encodings of the string.
+        """
+        return list(_encode_normalized(normalize_word(string)))
+
+    def encode_many(self, strings: Iterable[Union[str, bytes]]) -> List[List[str]]:
+        """
+        Encodes many strings, such as every name in a batch of patients,
+        encoding each distinct string only once.
+
+        :param strings: The strings to encode.
+        :return: A list of the primary and secondary encodings of each string,
+          in the order the strings were given.
+        """
+        strings = list(strings)
+        encodings = {
+            string: _encode_normalized(normalize_word(string))
+            for string in dict.fromkeys(strings)
+        }
+        return [list(encodings[string]) for string in strings]
+
+    @staticmethod
+    def cache_stats() -> dict:
+        """
+        Summarizes how the process-wide cache of encodings has been used since
+        it was created or last cleared.
+
+        :return: A dictionary of the number of cache hits and misses, the
+          proportion of lookups that were hits (or None if there were none),
+          and the current and maximum number of encodings cached.
+        """
+        info = _encode_normalized.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / lookups if lookups else None,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+        }
+
+    @staticmethod
+    def clear_cache() -> None:
+        """
+        Removes every encoding from the process-wide cache, and resets its
+        stats.
+        """
+        _encode_normalized.cache_clear()
 
     def check_word_start(self):
         """
@@ -764,7 +829,17 @@ class DoubleMetaphone(object):
         :return: A list containing the primary and secondary phonetic
           representations.
         """
-        self.word = Word(input)
+        return self._parse_word(Word(input))
+
+    def _parse_word(self, word: "Word") -> List[str]:
+        """
+        Parses a word into its phonetic representation.
+
+        :param word: The word to be parsed.
+        :return: A list containing the primary and secondary phonetic
+          representations.
+        """
+        self.word = word
         self.position = self.word.start_index
         self.primary_phone = ""
         self.secondary_phone = ""
@@ -855,24 +930,12 @@ class Word(object):
     parsing.
     """
 
-    def __init__(self, input):
+    def __init__(self, input, normalized: bool = False):
         self.original = input
-        if isinstance(input, bytes):
-            self.decoded = input.decode("utf-8", "ignore")
+        if normalized:
+            self.upper = input
         else:
-            self.decoded = input
-
-        # Handle accented characters
-        self.decoded = self.decoded.replace("\xc7", "s")
-        self.decoded = self.decoded.replace("\xe7", "s")
-        self.normalized = "".join(
-            (
-                c
-                for c in unicodedata.normalize("NFD", self.decoded)
-                if unicodedata.category(c) != "Mn"
-            )
-        )
-        self.upper = self.normalized.upper()
+            self.upper = normalize_word(input)
         self.length = len(self.upper)
         self.prepad = "  "
         self.start_index = len(self.prepad)
@@ -903,3 +966,41 @@ class Word(object):
         start = self.start_index + start
         end = self.start_index + end
         return self.buffer[start:end]
+
+
+def normalize_word(input: Union[str, bytes]) -> str:
+    """
+    Normalizes a word for encoding by decoding it, stripping accents from its
+    letters and converting it to upper case. ASCII words, the vast majority of
+    names, have no accents to strip, so skip Unicode normalization.
+
+    :param input: The word to normalize.
+    :return: The normalized word.
+    """
+    if isinstance(input, bytes):
+        input = input.decode("utf-8", "ignore")
+    if input.isascii():
+        return input.upper()
+
+    # Handle accented characters
+    input = input.replace("\xc7", "s")
+    input = input.replace("\xe7", "s")
+    return "".join(
+        (
+            c
+            for c in unicodedata.normalize("NFD", input)
+            if unicodedata.category(c) != "Mn"
+        )
+    ).upper()
+
+
+@lru_cache(maxsize=ENCODING_CACHE_SIZE)
+def _encode_normalized(normalized: str) -> tuple:
+    """
+    Encodes a word normalized by `normalize_word`, memoizing the result. A new
+    `DoubleMetaphone` is used for each word, since parsing isn't thread-safe.
+
+    :param normalized: The normalized word.
+    :return: A tuple of the primary and secondary encodings of the word.
+    """
+    return tuple(DoubleMetaphone()._parse_word(Word(normalized, normalized=True)))
@@ -8,6 +8,7 @@ from app.routers import fhir_geospatial
 from app.routers import fhir_harmonization_standardization
 from app.routers import fhir_linkage_link
 from app.routers import fhir_transport_http
+from app.transport import close_http_sessions
 
 # Read settings immediately to fail fast in case there are invalid values.
 get_settings()
@@ -24,3 +25,6 @@ app.include_router(fhir_geospatial.router)
 app.include_router(fhir_linkage_link.router)
 app.include_router(fhir_transport_http.router)
 app.include_router(cloud_storage.router)
+
+# Close pooled connections to FHIR servers and other services on shutdown
+app.add_event_handler("shutdown", close_http_sessions)
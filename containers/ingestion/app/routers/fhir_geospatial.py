@@ -1,6 +1,8 @@
+from functools import lru_cache
 from typing import Annotated
 from typing import Literal
 from typing import Optional
+from typing import Union
 
 from fastapi import APIRouter
 from fastapi import Body
@@ -13,6 +15,7 @@ from pydantic import validator
 from app.config import get_settings
 from app.fhir.geospatial import CensusFhirGeocodeClient
 from app.fhir.geospatial import SmartyFhirGeocodeClient
+from app.geospatial import GeocodeCache
 from app.utils import check_for_fhir_bundle
 from app.utils import read_json_from_assets
 from app.utils import search_for_required_values
@@ -71,10 +74,42 @@ class GeocodeAddressInBundleInput(BaseModel):
         "modified and returned.",
         default=True,
     )
+    use_cache: Optional[bool] = Field(
+        description="If true, and the service is configured with a geocode cache, "
+        "addresses that have already been geocoded are taken from the cache rather "
+        "than sent to the geocoding service again.",
+        default=True,
+    )
+    batch: Optional[bool] = Field(
+        description="If true, all addresses in the bundle are collected and geocoded "
+        "together, in as few requests to the geocoding service as it allows, rather "
+        "than one at a time.",
+        default=False,
+    )
 
     _check_for_fhir = validator("bundle", allow_reuse=True)(check_for_fhir_bundle)
 
 
+@lru_cache()
+def get_geocode_cache() -> Union[GeocodeCache, None]:
+    """
+    Create the cache of geocoding results shared by all requests, if the service is
+    configured with a `geocode_cache_size`. Results are also cached on disk if a
+    `geocode_cache_path` is set, so that they're shared across workers and restarts.
+
+    :return: The geocode cache, or None if the service isn't configured with one.
+    """
+    settings = get_settings()
+    if not settings.get("geocode_cache_size"):
+        return None
+    return GeocodeCache(
+        max_size=settings["geocode_cache_size"],
+        ttl=settings["geocode_cache_ttl_seconds"],
+        negative_ttl=settings["geocode_cache_negative_ttl_seconds"],
+        path=settings.get("geocode_cache_path"),
+    )
+
+
 @router.post("/geocode_bundle", status_code=200, responses=sample_geocode_response)
 def geocode_bundle_endpoint(
     input: Annotated[
@@ -93,8 +128,17 @@ def geocode_bundle_endpoint(
     will attempt to obtain them through environment variables. If they cannot be found
     in either the request parameters or environment variables, an HTTP 400 status will
     be returned.
+
+    If `batch` is true, the addresses in the bundle are geocoded together, in batches
+    of up to 100 lookups for Smarty, or a single CSV upload to the Census batch
+    geocoder.
+
+    If the service is configured with a `geocode_cache_size`, addresses that have
+    already been geocoded, or couldn't be, are taken from the cache unless `use_cache`
+    is false.
     """
     input = dict(input)
+    cache = get_geocode_cache() if input.get("use_cache") else None
 
     if input.get("geocode_method") == "smarty":
         required_values = ["smarty_auth_id", "smarty_auth_token"]
@@ -108,15 +152,17 @@ def geocode_bundle_endpoint(
                 smarty_auth_id=input.get("smarty_auth_id"),
                 smarty_auth_token=input.get("smarty_auth_token"),
                 licenses=[license_type],
+                cache=cache,
             )
         else:
             geocode_client = SmartyFhirGeocodeClient(
                 smarty_auth_id=input.get("smarty_auth_id"),
                 smarty_auth_token=input.get("smarty_auth_token"),
+                cache=cache,
             )
 
     elif input.get("geocode_method") == "census":
-        geocode_client = CensusFhirGeocodeClient()
+        geocode_client = CensusFhirGeocodeClient(cache=cache)
 
     # Here we need to remove the parameters that are used here
     #   but are not required in the PHDI function in the SDK
@@ -124,6 +170,7 @@ def geocode_bundle_endpoint(
     input.pop("smarty_auth_id", None)
     input.pop("smarty_auth_token", None)
     input.pop("license_type", None)
+    input.pop("use_cache", None)
     result = {}
     try:
         geocoder_result = geocode_client.geocode_bundle(**input)
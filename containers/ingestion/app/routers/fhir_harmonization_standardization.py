@@ -1,3 +1,4 @@
+from typing import List
 from typing import Literal
 from typing import Optional
 
@@ -6,6 +7,7 @@ from pydantic import BaseModel
 from pydantic import Field
 from pydantic import validator
 
+from app.fhir.harmonization.standardization import standardize_bundle
 from app.fhir.harmonization.standardization import standardize_dob
 from app.fhir.harmonization.standardization import standardize_names
 from app.fhir.harmonization.standardization import standardize_phones
@@ -166,3 +168,79 @@ async def standardize_dob_endpoint(
         result["bundle"] = input["data"]
         result["message"] = error.__str__()
     return result
+
+
+# Sample request/response for the combined standardization endpoint
+sample_bundle_request_data = read_json_from_assets(
+    "sample_standardize_bundle_request_data.json"
+)
+
+raw_sample_bundle_response = read_json_from_assets(
+    "sample_standardize_bundle_response.json"
+)
+
+sample_bundle_response = {200: raw_sample_bundle_response}
+
+
+class StandardizeBundleInput(BaseModel):
+    data: dict = Field(
+        description="A FHIR resource or bundle in JSON format.",
+        example=sample_bundle_request_data,
+    )
+    standardizers: Optional[
+        List[Literal["names", "phones", "dob", "double_metaphone"]]
+    ] = Field(
+        description="The standardizations to apply. Names, phones, dates of birth "
+        "and the double metaphone encodings of names are standardized in that order.",
+        default=["names", "phones", "dob"],
+    )
+    overwrite: Optional[bool] = Field(
+        description="If true, `data` is modified in-place; if false, a copy of `data` "
+        "is modified and returned.",
+        default=True,
+    )
+    trim: Optional[bool] = Field(
+        description="When true, leading and trailing spaces are removed from names.",
+        default=True,
+    )
+    case: Optional[Literal["upper", "lower", "title"]] = Field(
+        description="The type of casing that should be used for names.",
+        default="upper",
+    )
+    remove_numbers: Optional[bool] = Field(
+        description="If true, delete numeric characters from names; if false leave "
+        "numbers in place.",
+        default=True,
+    )
+    dob_format: Optional[str] = Field(
+        description="The date format that the input DOB is supplied in.",
+        default="%Y-%m-%d",
+        example="%m/%d/%Y",
+    )
+
+    _check_for_fhir = validator("data", allow_reuse=True)(check_for_fhir)
+
+
+@router.post("/standardize_bundle", responses=sample_bundle_response)
+async def standardize_bundle_endpoint(
+    input: StandardizeBundleInput,
+) -> StandardResponse:
+    """
+    Apply several standardizations to the provided FHIR bundle or resource in a
+    single pass, rather than calling each standardization endpoint in turn.
+
+    :param input: A dictionary with the schema specified by the
+        StandardizeBundleInput model.
+
+    :return: A FHIR bundle or resource with the requested standardizations applied.
+    """
+    input = dict(input)
+    result = {}
+    try:
+        result["status_code"] = "200"
+        result["bundle"] = standardize_bundle(**input)
+    except Exception as error:
+        result["status_code"] = "400"
+        result["bundle"] = input["data"]
+        result["message"] = error.__str__()
+    return result
@@ -26,6 +26,10 @@ def test_get_settings_success():
         "cloud_provider": "azure",
         "bucket_name": "my_bucket",
         "storage_account_url": "storage_url",
+        "geocode_cache_size": 0,
+        "geocode_cache_ttl_seconds": 30 * 24 * 60 * 60,
+        "geocode_cache_negative_ttl_seconds": 24 * 60 * 60,
+        "geocode_cache_path": None,
     }
     os.environ.pop("CRED_MANAGER", None)
     os.environ.pop("CLOUD_PROVIDER", None)
@@ -4,6 +4,7 @@ import pathlib
 from unittest import mock
 
 from app.config import get_settings
+from app.geospatial import GeocodeCache
 from app.main import app
 from fastapi import Response
 from fastapi import status
@@ -49,7 +50,7 @@ def test_geocode_bundle_success_census(patched_client):
     client.post("/fhir/geospatial/geocode/geocode_bundle", json=test_request)
 
     patched_client.return_value.geocode_bundle.assert_called_with(
-        bundle=test_bundle, overwrite=True
+        bundle=test_bundle, overwrite=True, batch=False
     )
 
 
@@ -65,10 +66,63 @@ def test_geocode_bundle_success_smarty(patched_client):
     client.post("/fhir/geospatial/geocode/geocode_bundle", json=test_request)
 
     patched_client.return_value.geocode_bundle.assert_called_with(
-        bundle=test_bundle, overwrite=True
+        bundle=test_bundle, overwrite=True, batch=False
     )
 
 
+@mock.patch("app.routers.fhir_geospatial.get_geocode_cache")
+@mock.patch("app.routers.fhir_geospatial.CensusFhirGeocodeClient")
+def test_geocode_bundle_with_cache(patched_client, patched_get_geocode_cache):
+    cache = GeocodeCache()
+    patched_get_geocode_cache.return_value = cache
+    test_request = {"bundle": test_bundle, "geocode_method": "census"}
+
+    client.post("/fhir/geospatial/geocode/geocode_bundle", json=test_request)
+    patched_client.assert_called_with(cache=cache)
+    patched_client.return_value.geocode_bundle.assert_called_with(
+        bundle=test_bundle, overwrite=True, batch=False
+    )
+
+    test_request["use_cache"] = False
+    client.post("/fhir/geospatial/geocode/geocode_bundle", json=test_request)
+    patched_client.assert_called_with(cache=None)
+
+
+@mock.patch("app.routers.fhir_geospatial.CensusFhirGeocodeClient")
+def test_geocode_bundle_batch(patched_client):
+    test_request = {"bundle": test_bundle, "geocode_method": "census", "batch": True}
+
+    client.post("/fhir/geospatial/geocode/geocode_bundle", json=test_request)
+
+    patched_client.return_value.geocode_bundle.assert_called_with(
+        bundle=test_bundle, overwrite=True, batch=True
+    )
+
+
+def test_get_geocode_cache(tmp_path):
+    from app.routers.fhir_geospatial import get_geocode_cache
+
+    get_settings.cache_clear()
+    get_geocode_cache.cache_clear()
+    assert get_geocode_cache() is None
+
+    os.environ["GEOCODE_CACHE_SIZE"] = "10"
+    os.environ["GEOCODE_CACHE_PATH"] = str(tmp_path / "geocode_cache.db")
+    get_settings.cache_clear()
+    get_geocode_cache.cache_clear()
+    try:
+        cache = get_geocode_cache()
+        assert cache.max_size == 10
+        assert cache.negative_ttl == 24 * 60 * 60
+        assert get_geocode_cache() is cache
+        cache.close()
+    finally:
+        os.environ.pop("GEOCODE_CACHE_SIZE", None)
+        os.environ.pop("GEOCODE_CACHE_PATH", None)
+        get_settings.cache_clear()
+        get_geocode_cache.cache_clear()
+
+
 def test_geocode_bundle_no_method():
     test_request = {"bundle": test_bundle, "geocode_method": ""}
     expected_response = 422
@@ -215,3 +215,56 @@ def test_standardize_dob_failures():
     )
 
     assert actual_response.json() == expected_response
+
+
+def test_standardize_bundle_success():
+    expected_response = {
+        "status_code": "200",
+        "message": None,
+        "bundle": copy.deepcopy(test_bundle),
+    }
+    patient = expected_response["bundle"]["entry"][0]["resource"]
+    patient["name"][0]["family"] = "SMITH"
+    patient["name"][0]["given"][0] = "DEEDEE"
+    patient["telecom"][0]["value"] = "+18015557777"
+    patient["birthDate"] = "1955-11-05"
+
+    actual_response = client.post(
+        "/fhir/harmonization/standardization/standardize_bundle",
+        json={"data": test_bundle},
+    )
+    assert actual_response.json() == expected_response
+
+    # Double metaphone encodings are computed from the standardized names
+    actual_response = client.post(
+        "/fhir/harmonization/standardization/standardize_bundle",
+        json={"data": test_bundle, "standardizers": ["names", "double_metaphone"]},
+    )
+    extensions = actual_response.json()["bundle"]["entry"][0]["resource"]["name"][0][
+        "extension"
+    ]
+    assert extensions[-1]["extension"] == [
+        {"url": "familyName", "valueString": ["SM0", "XMT"]},
+        {"url": "givenName", "valueString": [["TT", ""]]},
+    ]
+
+
+def test_standardize_bundle_failures():
+    updated_bundle = copy.deepcopy(test_bundle)
+    updated_bundle["entry"][0]["resource"]["birthDate"] = ""
+
+    actual_response = client.post(
+        "/fhir/harmonization/standardization/standardize_bundle",
+        json={"data": updated_bundle, "standardizers": ["dob"]},
+    )
+    assert actual_response.json() == {
+        "status_code": "400",
+        "message": "Date of Birth must be supplied!",
+        "bundle": updated_bundle,
+    }
+
+    actual_response = client.post(
+        "/fhir/harmonization/standardization/standardize_bundle",
+        json={"data": test_bundle, "standardizers": ["addresses"]},
+    )
+    assert actual_response.status_code == 422
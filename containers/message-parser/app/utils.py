@@ -5,6 +5,7 @@ import pathlib
 import re
 import uuid
 from functools import cache
+from functools import lru_cache
 from pathlib import Path
 from typing import Literal
 from typing import Union
@@ -31,6 +32,16 @@ from app.transport.http import http_request_with_retry
 
 DIBBS_REFERENCE_SIGNIFIER = "#REF#"
 
+# Matches reference paths of the form
+# "Bundle.entry.resource.where(resourceType = 'X').where(id = '#REF#')<path>",
+# capturing the resource type and the path within the referenced resource
+REFERENCED_RESOURCE_PATTERN = re.compile(
+    r"^Bundle\.entry\.resource"
+    r"\.where\(\s*resourceType\s*=\s*'(\w+)'\s*\)"
+    r"\.where\(\s*id\s*=\s*'" + re.escape(DIBBS_REFERENCE_SIGNIFIER) + r"'\s*\)"
+    r"((?:\..*)?)$"
+)
+
 
 @cache
 def load_parsing_schema(schema_name: str) -> dict:
@@ -151,6 +162,22 @@ def get_parsers(extraction_schema: frozendict) -> frozendict:
                             secondary_field_definition["reference_lookup"]
                         ),
                     }
+                    # Most reference paths select the referenced resource by type
+                    # and id; those can be compiled once against the resource
+                    # itself and applied to resources looked up by reference
+                    reference_match = REFERENCED_RESOURCE_PATTERN.match(
+                        secondary_field_definition["fhir_path"]
+                    )
+                    if reference_match is not None:
+                        resource_type, resource_path = reference_match.groups()
+                        secondary_parsers[secondary_field].update(
+                            {
+                                "referenced_resource_type": resource_type,
+                                "referenced_resource_parser": fhirpathpy.compile(
+                                    resource_type + resource_path
+                                ),
+                            }
+                        )
             parser["secondary_parsers"] = secondary_parsers
         parsers[field] = parser
     return frozendict(parsers)
@@ -398,6 +425,8 @@ def extract_and_apply_parsers(parsing_schema, message, response):
     """
     parsers = get_parsers(parsing_schema)
     parsed_values = {}
+    # Built the first time a referenced resource is looked up
+    resource_index = None
 
     # Iterate over each parser and make the appropriate path call
     for field, parser in parsers.items():
@@ -445,12 +474,7 @@ def extract_and_apply_parsers(parsing_schema, message, response):
                                     tv_parser = tertiary_path_struct[
                                         "secondary_fhir_path"
                                     ]
-                                    if len(tv_parser(v)) == 0:
-                                        tv[tertiary_field] = None
-                                    else:
-                                        tv[tertiary_field] = ",".join(
-                                            map(str, tv_parser(v))
-                                        )
+                                    tv[tertiary_field] = _join_values(tv_parser(v))
                                 tertiary_values.append(tv)
                             value[secondary_field] = tertiary_values
                         else:
@@ -458,12 +482,9 @@ def extract_and_apply_parsers(parsing_schema, message, response):
                                 secondary_parser = secondary_path_struct[
                                     "secondary_fhir_path"
                                 ]
-                                if len(secondary_parser(initial_value)) == 0:
-                                    value[secondary_field] = None
-                                else:
-                                    value[secondary_field] = ",".join(
-                                        map(str, secondary_parser(initial_value))
-                                    )
+                                value[secondary_field] = _join_values(
+                                    secondary_parser(initial_value)
+                                )
                             # By default, fhirpathpy will compile such that *only*
                             # actual resources can be accessed, rather than data types.
                             # This is fine for most cases, but sometimes the actual data
@@ -495,7 +516,8 @@ def extract_and_apply_parsers(parsing_schema, message, response):
                     # resource that we have to look up
                     else:
                         reference_parser = secondary_path_struct["reference_path"]
-                        if len(reference_parser(initial_value)) == 0:
+                        references = reference_parser(initial_value)
+                        if len(references) == 0:
                             response.status_code = status.HTTP_400_BAD_REQUEST
                             return {
                                 "message": "Provided `reference_lookup` location does "
@@ -503,31 +525,84 @@ def extract_and_apply_parsers(parsing_schema, message, response):
                                 "parsed_values": {},
                             }
                         else:
-                            reference_to_find = ",".join(
-                                map(str, reference_parser(initial_value))
-                            )
+                            reference_to_find = ",".join(map(str, references))
 
                             # FHIR references are prefixed with resource type
                             reference_to_find = reference_to_find.split("/")[-1]
 
-                            # Build the resultant concatenated reference path
-                            reference_path = secondary_path_struct[
-                                "secondary_fhir_path"
-                            ].replace(DIBBS_REFERENCE_SIGNIFIER, reference_to_find)
-                            reference_path = fhirpathpy.compile(reference_path)
-                            referenced_value = reference_path(message)
-                            if len(referenced_value) == 0:
-                                value[secondary_field] = None
-                            else:
-                                value[secondary_field] = ",".join(
-                                    map(str, referenced_value)
+                            if "referenced_resource_parser" in secondary_path_struct:
+                                if resource_index is None:
+                                    resource_index = build_resource_index(message)
+                                referenced_resources = resource_index.get(
+                                    (
+                                        secondary_path_struct[
+                                            "referenced_resource_type"
+                                        ],
+                                        reference_to_find,
+                                    ),
+                                    [],
                                 )
+                                referenced_value = secondary_path_struct[
+                                    "referenced_resource_parser"
+                                ](referenced_resources)
+                            else:
+                                # Build the resultant concatenated reference path
+                                reference_path = secondary_path_struct[
+                                    "secondary_fhir_path"
+                                ].replace(DIBBS_REFERENCE_SIGNIFIER, reference_to_find)
+                                referenced_value = _compile_reference_path(
+                                    reference_path
+                                )(message)
+                            value[secondary_field] = _join_values(referenced_value)
 
                 values.append(value)
             parsed_values[field] = values
     return parsed_values
 
 
+def build_resource_index(message: dict) -> dict:
+    """
+    Index the resources in a FHIR bundle by resource type and id, so that
+    referenced resources can be looked up directly rather than by searching
+    the whole bundle for every reference.
+
+    :param message: The FHIR bundle to index.
+    :return: A dictionary mapping (resource type, id) tuples to lists of the
+      resources in the bundle with that type and id.
+    """
+    resource_index = {}
+    for entry in message.get("entry", []):
+        resource = entry.get("resource")
+        if isinstance(resource, dict) and "id" in resource:
+            key = (resource.get("resourceType"), str(resource["id"]))
+            resource_index.setdefault(key, []).append(resource)
+    return resource_index
+
+
+@lru_cache(maxsize=1024)
+def _compile_reference_path(reference_path: str):
+    """
+    Compile a reference path once the referenced id has been substituted into
+    it, for reference paths that can't be applied to an indexed resource.
+
+    :param reference_path: The FHIRpath to compile.
+    :return: The compiled FHIRpath.
+    """
+    return fhirpathpy.compile(reference_path)
+
+
+def _join_values(values: list) -> Union[str, None]:
+    """
+    Join the values found by a FHIRpath into a single comma-separated string.
+
+    :param values: The values found by a FHIRpath.
+    :return: The joined values, or None if no values were found.
+    """
+    if len(values) == 0:
+        return None
+    return ",".join(map(str, values))
+
+
 def transform_to_phdc_input_data(parsed_values: dict) -> PHDCInputData:
     """
     Transform the parsed values into a PHDCInputData object.
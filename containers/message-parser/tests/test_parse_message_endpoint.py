@@ -239,6 +239,28 @@ def test_parse_message_success_referenced_resources(
     assert actual_response.json() == expected_reference_response
 
 
+def test_parse_message_success_unindexed_referenced_resources(
+    test_reference_schema, reference_bundle
+):
+    # Reference paths that don't select the resource by type and then id
+    # can't use the resource index, but give the same values
+    unindexed_schema = deepcopy(test_reference_schema)
+    for field in ["ordering_provider", "requesting_organization_contact_person"]:
+        secondary_field = unindexed_schema["labs"]["secondary_schema"][field]
+        secondary_field["fhir_path"] = secondary_field["fhir_path"].replace(
+            "where(resourceType='Organization').where(id='#REF#')",
+            "where(id='#REF#').where(resourceType='Organization')",
+        )
+    request = {
+        "message_format": "fhir",
+        "parsing_schema": unindexed_schema,
+        "message": reference_bundle,
+    }
+    actual_response = client.post("/parse_message", json=request)
+    assert actual_response.status_code == 200
+    assert actual_response.json() == expected_reference_response
+
+
 @mock.patch("app.main.convert_to_fhir")
 @mock.patch("app.main.get_credential_manager")
 def test_parse_message_success_non_fhir(
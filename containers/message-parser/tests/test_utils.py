@@ -5,6 +5,7 @@ from unittest import mock
 
 import pytest
 from app.config import get_settings
+from app.utils import build_resource_index
 from app.utils import convert_to_fhir
 from app.utils import field_metadata
 from app.utils import freeze_parsing_schema
@@ -48,8 +49,39 @@ def test_get_parsers(patched_fhirpathpy):
         expected_number_of_calls += 1
         if "secondary_schema" in field_definition:
             expected_number_of_calls += len(field_definition["secondary_schema"])
+            # Reference fields also compile the path within the referenced resource
+            expected_number_of_calls += sum(
+                "reference_lookup" in secondary_field_definition
+                for secondary_field_definition in field_definition[
+                    "secondary_schema"
+                ].values()
+            )
 
     assert len(patched_fhirpathpy.compile.call_args_list) == expected_number_of_calls
+    patched_fhirpathpy.compile.assert_any_call("Organization.contact.name.text")
+    get_parsers.cache_clear()
+
+
+def test_build_resource_index():
+    organization = {"resourceType": "Organization", "id": "some-id"}
+    duplicate_organization = {"resourceType": "Organization", "id": "some-id"}
+    practitioner = {"resourceType": "Practitioner", "id": "some-id"}
+    message = {
+        "resourceType": "Bundle",
+        "entry": [
+            {"resource": organization},
+            {"resource": practitioner},
+            {"resource": duplicate_organization},
+            {"resource": {"resourceType": "Patient"}},
+            {"request": {"method": "GET"}},
+        ],
+    }
+
+    assert build_resource_index(message) == {
+        ("Organization", "some-id"): [organization, duplicate_organization],
+        ("Practitioner", "some-id"): [practitioner],
+    }
+    assert build_resource_index({"resourceType": "Bundle"}) == {}
 
 
 def test_search_for_required_values_success():
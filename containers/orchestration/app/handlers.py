@@ -1,8 +1,8 @@
 import os
 
+from httpx import Response
 from opentelemetry import trace
 from opentelemetry.trace.status import StatusCode
-from requests import Response
 
 from app.models import OrchestrationRequest
 
@@ -410,6 +410,70 @@ def build_ingestion_dob_request(
         }
 
 
+def build_ingestion_bundle_request(
+    input_msg: str,
+    orchestration_request: OrchestrationRequest,
+    workflow_params: dict | None = None,
+) -> dict:
+    """
+    Helper function for constructing the output payload for an API call to
+    the DIBBs ingestion for the combined standardization service, which
+    applies several standardizations in a single request.
+
+    :param input_msg: The data the user sent for workflow processing, as
+      a string.
+    :param orchestration_request: The request the client initially sent
+      to the orchestration service. This request bundles a number of
+      parameter settings into one dictionary that each handler can
+      accept for consistency.
+    :param workflow_params: Optionally, a set of configuration parameters
+      included in the workflow config for the converter step of a workflow.
+    :return: A dictionary ready to JSON-serialize as a payload to the
+      message parser.
+    """
+    with tracer.start_as_current_span(
+        "build_ingestion_bundle_standardization_request",
+        kind=trace.SpanKind(0),
+        attributes={
+            "message_type": orchestration_request.get("message_type"),
+            "data_type": orchestration_request.get("data_type"),
+            "workflow_params": workflow_params,
+        },
+    ) as handler_span:
+        # Default parameter values
+        default_params = {
+            "standardizers": ["names", "phones", "dob"],
+            "trim": "true",
+            "overwrite": "true",
+            "case": "upper",
+            "remove_numbers": "true",
+            "dob_format": "%Y-%m-%d",
+        }
+
+        # Initialize workflow_params as an empty dictionary if it's None
+        workflow_params = workflow_params or {}
+
+        for key, value in default_params.items():
+            workflow_params.setdefault(key, value)
+
+        handler_span.add_event(
+            "updating standardization options",
+            attributes={
+                "standardizers": workflow_params.get("standardizers"),
+                "trim": workflow_params.get("trim"),
+                "overwrite": workflow_params.get("overwrite"),
+                "case": workflow_params.get("case"),
+                "remove_numbers": workflow_params.get("remove_numbers"),
+                "dob_format": workflow_params.get("dob_format"),
+            },
+        )
+
+        return {
+            "data": input_msg,
+            **{key: workflow_params.get(key) for key in default_params},
+        }
+
+
 def build_geocoding_request(
     input_msg: str,
     orchestration_request: OrchestrationRequest,
@@ -29,6 +29,7 @@ from app.models import OrchestrationResponse
 from app.models import ProcessingConfigModel
 from app.models import PutConfigResponse
 from app.services import call_apis
+from app.services import close_service_clients
 from app.utils import _socket_response_is_valid
 from app.utils import load_config_assets
 from app.utils import load_json_from_binary
@@ -63,6 +64,7 @@ app = BaseService(
     service_path="/orchestration",
     description_path=Path(__file__).parent.parent / "description.md",
 ).start()
+app.add_event_handler("shutdown", close_service_clients)
 
 
 upload_config_response = load_config_assets(
@@ -1,15 +1,17 @@
+import asyncio
 import json
 import os
+from urllib.parse import urlsplit
 
-import requests
+import httpx
 from fastapi import HTTPException
-from fastapi import Response
 from fastapi import WebSocket
 from opentelemetry import trace
 from opentelemetry.trace.status import StatusCode
 
 from app.handlers import build_fhir_converter_request
 from app.handlers import build_geocoding_request
+from app.handlers import build_ingestion_bundle_request
 from app.handlers import build_ingestion_dob_request
 from app.handlers import build_ingestion_name_request
 from app.handlers import build_ingestion_phone_request
@@ -39,6 +41,21 @@ SERVICE_URLS = {
     "save_bundle": os.environ.get("ECR_VIEWER_URL"),
 }
 
+# Each service gets its own pool of connections, which can each carry one call
+# at a time. SERVICE_TIMEOUT is the number of seconds to wait on a call, and
+# SERVICE_RETRIES the number of times to retry a call that couldn't connect.
+# Calls that connected aren't retried, since they may have had side effects.
+SERVICE_MAX_CONNECTIONS = int(os.environ.get("SERVICE_MAX_CONNECTIONS", 100))
+SERVICE_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("SERVICE_MAX_KEEPALIVE_CONNECTIONS", 20)
+)
+SERVICE_TIMEOUT = float(os.environ.get("SERVICE_TIMEOUT", 300))
+SERVICE_RETRIES = int(os.environ.get("SERVICE_RETRIES", 3))
+
+# The clients holding the connection pools, keyed by the scheme and host of the
+# services they call, along with the event loops they were created in
+_SERVICE_CLIENTS = {}
+
 # Mappings of endpoint names to the service input and output building
 # functions--lets the workflow config drive the API loop with no need
 # to change function signatures
@@ -49,6 +66,7 @@ ENDPOINT_TO_REQUEST_BODY = {
     "standardize_names": build_ingestion_name_request,
     "standardize_dob": build_ingestion_dob_request,
     "standardize_phones": build_ingestion_phone_request,
+    "standardize_bundle": build_ingestion_bundle_request,
     "parse_message": build_message_parser_message_request,
     "fhir_to_phdc": build_message_parser_phdc_request,
     "save-fhir-data": build_save_fhir_data_body,
@@ -60,27 +78,70 @@ ENDPOINT_TO_RESPONSE = {
     "standardize_names": unpack_ingestion_standardization,
     "standardize_dob": unpack_ingestion_standardization,
     "standardize_phones": unpack_ingestion_standardization,
+    "standardize_bundle": unpack_ingestion_standardization,
     "parse_message": unpack_parsed_message_response,
     "fhir_to_phdc": unpack_fhir_to_phdc_response,
     "save-fhir-data": unpack_save_fhir_data_response,
 }
 
 
-def post_request(url: str, payload: dict) -> Response:
+def get_service_client(url: str) -> httpx.AsyncClient:
+    """
+    Gets the client to use to call a service, creating it if it doesn't yet
+    exist. Each service, identified by the scheme and host of its URL, gets
+    its own client, and so its own pool of connections, which is shared by
+    every call to it made in the current event loop.
+
+    :param url: The full URL of an endpoint of the service.
+    :return: The client for the service.
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    loop = asyncio.get_running_loop()
+    client_loop, client = _SERVICE_CLIENTS.get(key, (None, None))
+    if client is None or client_loop is not loop or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(SERVICE_TIMEOUT),
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=SERVICE_MAX_CONNECTIONS,
+                    max_keepalive_connections=SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                retries=SERVICE_RETRIES,
+            ),
+        )
+        _SERVICE_CLIENTS[key] = (loop, client)
+    return client
+
+
+async def close_service_clients() -> None:
+    """
+    Closes the clients created by `get_service_client` in the current event
+    loop, along with their connections, and forgets every client.
+    """
+    loop = asyncio.get_running_loop()
+    clients = list(_SERVICE_CLIENTS.values())
+    _SERVICE_CLIENTS.clear()
+    for client_loop, client in clients:
+        if client_loop is loop:
+            await client.aclose()
+
+
+async def post_request(url: str, payload: dict) -> httpx.Response:
     """
     Helper function to post an API request to a particular endpoint using
-    the `requests` module.
+    the service's pooled `httpx` client, without blocking the event loop.
 
     :param url: The full URL of the endpoint to-hit.
     :param payload: The body of the Request object, as a dictionary.
     :return: A Response object from the posted endpoint.
     """
-    return requests.post(url, json=payload)
+    return await get_service_client(url).post(url, json=payload)
 
 
 async def _send_websocket_dump(
     endpoint_name: str,
-    base_response: Response,
+    base_response: httpx.Response,
     service_response: ServiceHandlerResponse,
     progress_dict: dict,
     websocket: WebSocket,
@@ -196,7 +257,7 @@ async def call_apis(
             )
             request_body = request_body_func(current_message, input, params)
             call_span.add_event("posting to `service_url` " + service_url)
-            response = post_request(service_url, request_body)
+            response = await post_request(service_url, request_body)
             call_span.add_event("response received from building block")
             service_response = response_func(response)
 
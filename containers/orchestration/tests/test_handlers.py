@@ -6,6 +6,7 @@ from unittest.mock import Mock
 
 from app.handlers import build_fhir_converter_request
 from app.handlers import build_geocoding_request
+from app.handlers import build_ingestion_bundle_request
 from app.handlers import build_ingestion_dob_request
 from app.handlers import build_ingestion_name_request
 from app.handlers import build_ingestion_phone_request
@@ -351,6 +352,44 @@ def test_build_ingestion_dob_request():
     }
 
 
+def test_build_ingestion_bundle_request():
+    input_msg = json.load(
+        open(Path(__file__).parent / "assets" / "patient_bundle.json")
+    )
+    orchestration_request = input_msg
+
+    # Test with no workflow_params
+    result = build_ingestion_bundle_request(input_msg, orchestration_request)
+    assert result == {
+        "data": input_msg,
+        "standardizers": ["names", "phones", "dob"],
+        "trim": "true",
+        "overwrite": "true",
+        "case": "upper",
+        "remove_numbers": "true",
+        "dob_format": "%Y-%m-%d",
+    }
+
+    # Test with changed workflow_params
+    workflow_params = {
+        "standardizers": ["names", "double_metaphone"],
+        "case": "title",
+        "dob_format": "%m/%d/%Y",
+    }
+    result = build_ingestion_bundle_request(
+        input_msg, orchestration_request, workflow_params
+    )
+    assert result == {
+        "data": input_msg,
+        "standardizers": ["names", "double_metaphone"],
+        "trim": "true",
+        "overwrite": "true",
+        "case": "title",
+        "remove_numbers": "true",
+        "dob_format": "%m/%d/%Y",
+    }
+
+
 def test_build_geocoding_request():
     input_msg = json.load(
         open(Path(__file__).parent / "assets" / "patient_bundle.json")
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from unittest import mock
+
+import httpx
+from app.services import close_service_clients
+from app.services import get_service_client
+from app.services import post_request
+
+
+def test_get_service_client():
+    async def get_clients():
+        validation = get_service_client("http://validation:8080/validate")
+        clients = {
+            "validation": validation,
+            "validation_again": get_service_client("http://validation:8080/other"),
+            "ingestion": get_service_client("http://ingestion:8080/geocode"),
+        }
+        await close_service_clients()
+        clients["after_close"] = get_service_client("http://validation:8080/validate")
+        await close_service_clients()
+        return clients
+
+    clients = asyncio.run(get_clients())
+
+    # Calls to the same service share a client, but other services don't
+    assert clients["validation"] is clients["validation_again"]
+    assert clients["validation"] is not clients["ingestion"]
+
+    # Closed clients are replaced
+    assert clients["validation"].is_closed
+    assert clients["after_close"] is not clients["validation"]
+
+
+def test_get_service_client_per_event_loop():
+    async def get_client():
+        return get_service_client("http://validation:8080/validate")
+
+    # Connections can't be shared across event loops, so neither are clients
+    first_client = asyncio.run(get_client())
+    second_client = asyncio.run(get_client())
+    assert first_client is not second_client
+    asyncio.run(close_service_clients())
+
+
+def test_post_request():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"message_valid": True})
+
+    async def post():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            with mock.patch("app.services.get_service_client", return_value=client):
+                return await post_request(
+                    "http://validation:8080/validate", {"message": "foo"}
+                )
+
+    response = asyncio.run(post())
+
+    assert response.status_code == 200
+    assert response.json() == {"message_valid": True}
+    assert len(requests) == 1
+    assert requests[0].method == "POST"
+    assert str(requests[0].url) == "http://validation:8080/validate"
+    assert json.loads(requests[0].content) == {"message": "foo"}
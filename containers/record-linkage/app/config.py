@@ -31,6 +31,26 @@ class Settings(BaseSettings):
         "above the connection pool size",
         default=10,
     )
+    mpi_use_blocking_table: Optional[bool] = Field(
+        description="Whether to fetch blocks from the MPI's flat blocking table, "
+        "created by the V01_05 migration, instead of joining the other MPI tables",
+        default=False,
+    )
+    mpi_block_cache_size: Optional[int] = Field(
+        description="The maximum number of blocks of MPI data to cache in each worker "
+        "process, or 0 to disable the cache",
+        default=0,
+    )
+    mpi_block_cache_ttl_seconds: Optional[float] = Field(
+        description="The number of seconds a block of MPI data stays cached, which "
+        "bounds how long patients inserted by other worker processes can be missed",
+        default=60,
+    )
+    linkage_timing_enabled: Optional[bool] = Field(
+        description="Whether to time each stage of record linkage, with the results "
+        "available from the /linkage-timings endpoint",
+        default=False,
+    )
 
 
 @lru_cache()
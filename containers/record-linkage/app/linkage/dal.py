@@ -1,16 +1,37 @@
-import datetime
-import logging
+import uuid
+from contextlib import asynccontextmanager
 from contextlib import contextmanager
+from datetime import date
+from datetime import datetime
+from typing import AsyncIterator
 from typing import List
+from typing import Union
 
+from sqlalchemy import Connection
 from sqlalchemy import create_engine
+from sqlalchemy import Engine
+from sqlalchemy import event
+from sqlalchemy import inspect
 from sqlalchemy import MetaData
 from sqlalchemy import select
 from sqlalchemy import Table
-from sqlalchemy import text
+from sqlalchemy import Uuid
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm import sessionmaker
 
+# Maximum number of records written by a single multi-row INSERT ... RETURNING
+INSERT_BATCH_SIZE = 1000
+
+# Postgres types that asyncpg connections send and receive as text, so that,
+# as with psycopg2, values of these types can be given as ISO 8601 strings
+ASYNCPG_TEXT_TYPES = {
+    "date": date.fromisoformat,
+    "timestamp": datetime.fromisoformat,
+}
+
 
 class DataAccessLayer(object):
     """
@@ -37,6 +58,7 @@ class DataAccessLayer(object):
         self.ADDRESS_TABLE = None
         self.EXTERNAL_PERSON_TABLE = None
         self.EXTERNAL_SOURCE_TABLE = None
+        self.BLOCKING_TABLE = None
         self.TABLE_LIST = []
 
     def get_connection(
@@ -80,21 +102,36 @@ class DataAccessLayer(object):
         :return: None
         """
 
-        self.PATIENT_TABLE = Table("patient", self.Meta, autoload_with=self.engine)
-        self.PERSON_TABLE = Table("person", self.Meta, autoload_with=self.engine)
-        self.NAME_TABLE = Table("name", self.Meta, autoload_with=self.engine)
-        self.GIVEN_NAME_TABLE = Table(
-            "given_name", self.Meta, autoload_with=self.engine
-        )
-        self.ID_TABLE = Table("identifier", self.Meta, autoload_with=self.engine)
-        self.PHONE_TABLE = Table("phone_number", self.Meta, autoload_with=self.engine)
-        self.ADDRESS_TABLE = Table("address", self.Meta, autoload_with=self.engine)
+        self._load_tables(self.engine)
+
+    def _load_tables(self, bind: Union[Engine, Connection]) -> None:
+        """
+        Loads all the MPI Database tables using SQLAlchemy's Table object,
+        reflecting their definitions through the given engine or connection.
+
+        :param bind: The engine or connection to reflect the tables with.
+        :return: None
+        """
+
+        self.PATIENT_TABLE = Table("patient", self.Meta, autoload_with=bind)
+        self.PERSON_TABLE = Table("person", self.Meta, autoload_with=bind)
+        self.NAME_TABLE = Table("name", self.Meta, autoload_with=bind)
+        self.GIVEN_NAME_TABLE = Table("given_name", self.Meta, autoload_with=bind)
+        self.ID_TABLE = Table("identifier", self.Meta, autoload_with=bind)
+        self.PHONE_TABLE = Table("phone_number", self.Meta, autoload_with=bind)
+        self.ADDRESS_TABLE = Table("address", self.Meta, autoload_with=bind)
         self.EXTERNAL_PERSON_TABLE = Table(
-            "external_person", self.Meta, autoload_with=self.engine
+            "external_person", self.Meta, autoload_with=bind
         )
         self.EXTERNAL_SOURCE_TABLE = Table(
-            "external_source", self.Meta, autoload_with=self.engine
+            "external_source", self.Meta, autoload_with=bind
         )
+        # The blocking table is optional, since it only duplicates data
+        # from the other tables to speed up fetching blocks
+        if inspect(bind).has_table("patient_blocking"):
+            self.BLOCKING_TABLE = Table(
+                "patient_blocking", self.Meta, autoload_with=bind
+            )
 
         # order of the list determines the order of
         # inserts due to FK constraints
@@ -108,6 +145,8 @@ class DataAccessLayer(object):
         self.TABLE_LIST.append(self.ID_TABLE)
         self.TABLE_LIST.append(self.PHONE_TABLE)
         self.TABLE_LIST.append(self.ADDRESS_TABLE)
+        if self.BLOCKING_TABLE is not None:
+            self.TABLE_LIST.append(self.BLOCKING_TABLE)
 
     @contextmanager
     def transaction(self) -> None:
@@ -150,48 +189,10 @@ class DataAccessLayer(object):
         """
         new_primary_keys = []
         if len(records) > 0 and table is not None:
-            logging.info(
-                f"Getting primary_key_column at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
-            primary_key_column = table.primary_key.c[0]
             with self.transaction() as session:
-                logging.info(
-                    f"Starting session at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
+                new_primary_keys = self._insert_records(
+                    session, table, records, return_primary_keys
                 )
-                n_records = 0
-                for record in records:
-                    n_records += 1
-                    if return_primary_keys:
-                        logging.info("Returned primary keys")
-                        statement = (
-                            table.insert().values(record).returning(primary_key_column)
-                        )
-                        logging.info(
-                            f"""Starting statement execution getting
-                              new_primary_key for record #{n_records}at:
-                                {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                        )
-                        new_primary_key = session.execute(statement)
-                        # TODO: I don't like this, but seems to
-                        # be one of the only ways to get this to work
-                        #  I have tried using the column name from the
-                        # PK defined in the table and that doesn't work
-                        logging.info(
-                            f""" Done with statement execution getting new_primary_key
-                              for record #{n_records} at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                        )
-                        new_primary_keys.append(new_primary_key.first()[0])
-                    else:
-                        logging.info("Did not return primary keys")
-                        statement = table.insert().values(record)
-                        logging.info(
-                            f"Starting statement execution for record #{n_records} at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                        )
-                        session.execute(statement)
-                        logging.info(
-                            f"""Done with statement execution
-                              for record #{n_records} at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                        )
         return new_primary_keys
 
     def bulk_insert_dict(
@@ -203,6 +204,8 @@ class DataAccessLayer(object):
         record(s), a list of record(s) as dictionaries.  This
         allows for several inserts to occur for different tables
         along with a single or multiple records for each table.
+        All inserts happen in a single transaction, using multi-row
+        INSERT statements rather than one statement per record.
 
         :param records_with_table: a dictionary that defines the
             the SQLAlchemy table name to insert into
@@ -218,88 +221,107 @@ class DataAccessLayer(object):
             along with a list of the primary keys, if requested.
         """
         return_results = {}
-        statements = []
         with self.transaction() as session:
-            logging.info(
-                f"Starting session at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
-            n_records = 0
             for table in self.TABLE_LIST:
                 records = records_with_table.get(table.name)
                 if records is not None:
                     new_primary_keys = []
-
                     if len(records) > 0 and table is not None:
-                        logging.info(
-                            f"Getting primary_key_column at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
+                        new_primary_keys = self._insert_records(
+                            session, table, records, return_primary_keys
                         )
-                        primary_key_column = table.primary_key.c[0]
-
-                        for record in records:
-                            n_records += 1
-                            if return_primary_keys:
-                                logging.info("Returned primary keys")
-                                statement = (
-                                    table.insert()
-                                    .values(record)
-                                    .returning(primary_key_column)
-                                )
-                                logging.info(
-                                    f"""Starting statement execution getting
-                                    new_primary_key for record #{n_records}at:
-                                        {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                                )
-                                new_primary_key = session.execute(statement)
-                                # TODO: I don't like this, but seems to
-                                # be one of the only ways to get this to work
-                                #  I have tried using the column name from the
-                                # PK defined in the table and that doesn't work
-                                logging.info(
-                                    f""" Done with statement execution getting new_primary_key
-                                    for record #{n_records} at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                                )
-                                new_primary_keys.append(new_primary_key.first()[0])
-                            else:
-                                logging.info("Did not return primary keys")
-                                logging.info(
-                                    f"""Starting statement creation for record #{n_records} at:
-                                        {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                                )
-
-                                if "dob" in record:
-                                    if record["dob"] is not None:
-                                        record["dob"] = datetime.datetime.strptime(
-                                            record["dob"], "%Y-%m-%d"
-                                        )
-
-                                statement = table.insert().values(**record)
-
-                                statement = statement.compile(
-                                    self.engine,
-                                    compile_kwargs={
-                                        "literal_binds": True,
-                                        "render_postprocess": str,
-                                    },
-                                )
-                                statement = str(statement)
-                                statements.append(statement)
-                                logging.info(
-                                    f"""Done with statement creation for record #{n_records} at:
-                                        {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                                )
-
                     return_results[table.name] = {"primary_keys": new_primary_keys}
+        return return_results
 
-            if not return_primary_keys:
-                statements = ";".join(statements)
-                logging.info(
-                    f"Starting INSERT statement execution at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
+    def _insert_records(
+        self,
+        session: scoped_session,
+        table: Table,
+        records: List[dict],
+        return_primary_keys: bool,
+    ) -> list:
+        """
+        Inserts records into a table within an open session. Records are
+        grouped by the columns they set, and each group is written with
+        parameterized multi-row INSERT statements of up to
+        `INSERT_BATCH_SIZE` records each. Records that don't set a UUID primary
+        key are given one before they are inserted, so that the keys returned
+        can be matched to their records. Without a RETURNING clause, each group is
+        sent as a single executemany, which the database driver batches
+        itself.
+
+        :param session: the session to insert the records in
+        :param table: the SQLAlchemy table object to insert into
+        :param records: a list of records as dictionaries
+        :param return_primary_keys: boolean indicating if you want the inserted
+            primary keys for the table returned or not
+        :return: the primary keys of the inserted records, in the same order as
+            the records, or an empty list if they weren't requested
+        """
+        # Statements need every record to set the same columns, so
+        # group records that set different columns separately
+        groups = {}
+        for position, record in enumerate(records):
+            groups.setdefault(tuple(record), []).append(position)
+        for columns in groups:
+            unknown_columns = [c for c in columns if c not in table.c]
+            if len(unknown_columns) > 0:
+                raise ValueError(
+                    f"Unconsumed column names: {', '.join(unknown_columns)}"
                 )
-                session.execute(text(statements))
-                logging.info(
-                    f"Done with INSERT statement execution at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
+
+        if not return_primary_keys:
+            for positions in groups.values():
+                session.execute(table.insert(), [records[p] for p in positions])
+            return []
+
+        primary_key_column = table.primary_key.c[0]
+        new_primary_keys = [None] * len(records)
+        if not isinstance(primary_key_column.type, Uuid):
+            # Without keys known in advance, rows can only be matched to
+            # records by order, which only an executemany sorted by parameter
+            # order guarantees
+            statement = table.insert().returning(
+                primary_key_column, sort_by_parameter_order=True
+            )
+            for positions in groups.values():
+                results = session.execute(
+                    statement.execution_options(
+                        insertmanyvalues_page_size=INSERT_BATCH_SIZE
+                    ),
+                    [records[p] for p in positions],
                 )
-        return return_results
+                for position, primary_key in zip(positions, results.scalars()):
+                    new_primary_keys[position] = primary_key
+            return new_primary_keys
+
+        # A multi-row INSERT doesn't return its rows in any guaranteed order,
+        # so records are given their UUID keys up front, and the returned keys
+        # are matched to records by value rather than by position
+        key_name = primary_key_column.name
+        for positions in groups.values():
+            keyed_records = {}
+            for position in positions:
+                record = records[position]
+                if record.get(key_name) is None:
+                    record = {**record, key_name: uuid.uuid4()}
+                keyed_records[position] = record
+            for start in range(0, len(positions), INSERT_BATCH_SIZE):
+                batch = positions[start : start + INSERT_BATCH_SIZE]
+                statement = (
+                    table.insert()
+                    .values([keyed_records[p] for p in batch])
+                    .returning(primary_key_column)
+                )
+                returned_keys = {
+                    str(primary_key): primary_key
+                    for primary_key in session.execute(statement).scalars()
+                }
+                for position in batch:
+                    new_primary_keys[position] = returned_keys[
+                        str(keyed_records[position][key_name])
+                    ]
+        return new_primary_keys
 
     def select_results(
         self, select_statement: select, include_col_header: bool = True
@@ -317,17 +339,8 @@ class DataAccessLayer(object):
         :return: List of lists of select results
         """
         list_results = [[]]
-        logging.info(
-            f"In select_results, starting new session at {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
         with self.transaction() as session:
-            logging.info(
-                f"Starting to execute statement to return results at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
             results = session.execute(select_statement)
-            logging.info(
-                f"Done executing statement to return results at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
             list_results = [list(row) for row in results]
             if include_col_header:
                 list_results.insert(0, list(results.keys()))
@@ -377,6 +390,9 @@ class DataAccessLayer(object):
         if column_name is not None and column_name != "":
             # TODO: I am sure there is an easier way to do this
             for table in self.TABLE_LIST:
+                # The blocking table only holds copies of other tables' columns
+                if table is self.BLOCKING_TABLE:
+                    continue
                 if column_name in table.c:
                     return table
         return None
@@ -394,3 +410,219 @@ class DataAccessLayer(object):
             return False
         else:
             return column_name in table.c
+
+
+class AsyncDataAccessLayer(DataAccessLayer):
+    """
+    Data Access Layer for use with asyncio, built on SQLAlchemy's async
+    engine (e.g. with the asyncpg driver) - manages transactions, sessions
+    and holds a reference to the engine, just like `DataAccessLayer`, except
+    that every method that talks to the database is a coroutine, so waiting
+    on the database never blocks the event loop.
+    Example:
+        dal = AsyncDataAccessLayer()
+        dal.get_connection(engine_url="postgresql+asyncpg://...")
+        await dal.initialize_schema()
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.session_factory = None
+
+    def get_connection(
+        self,
+        engine_url: str,
+        engine_echo: bool = False,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+    ) -> None:
+        """
+        Establish a connection to the database
+
+        this method creates an async engine for the database, and the
+        factory used to create sessions on it. No connection is opened
+        until the database is first used.
+
+        :param engine_url: The URL of the database engine, using an async
+          driver, e.g. postgresql+asyncpg://...
+        :param engine_echo: If True, print SQL statements to stdout
+        :param pool_size: The number of connections to keep open in the connection pool
+        :param max_overflow: The number of connections to allow in the connection pool
+          “overflow”
+        :return: None
+        """
+        self.engine = create_async_engine(
+            engine_url,
+            echo=engine_echo,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+        )
+        self.session_factory = async_sessionmaker(
+            bind=self.engine, expire_on_commit=False
+        )
+        if self.engine.dialect.driver == "asyncpg":
+            event.listen(self.engine.sync_engine, "connect", _set_asyncpg_text_codecs)
+
+    async def initialize_schema(self) -> None:
+        """
+        Initialize the database schema
+
+        This method initializes all the MPI Database tables using SQLAlchemy's
+        Table object
+
+        :return: None
+        """
+        async with self.engine.connect() as connection:
+            await connection.run_sync(self._load_tables)
+
+    async def dispose(self) -> None:
+        """
+        Closes all of the engine's pooled connections. Connections are tied
+        to the event loop they were opened in, so the engine must be disposed
+        of before it is used from another event loop.
+
+        :return: None
+        """
+        await self.engine.dispose()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncSession]:
+        """
+        Execute a database transaction
+
+        this method safely wraps an async session object in a transactional
+        scope used for basic create, select, update and delete procedures
+
+        :yield: SQLAlchemy async session object
+        :raises ValueError: if an error occurs during the transaction
+        """
+        session = self.get_session()
+
+        try:
+            yield session
+            await session.commit()
+
+        except Exception as error:
+            await session.rollback()
+            raise ValueError(f"{error}")
+
+        finally:
+            await session.close()
+
+    async def bulk_insert_list(
+        self, table: Table, records: list[dict], return_primary_keys: bool = True
+    ) -> list:
+        """
+        Perform a bulk insert operation on a table, as with
+        `DataAccessLayer.bulk_insert_list`.
+
+        :param table_object: the SQLAlchemy table object to insert into
+        :param records: a list of records as a dictionaries
+        :param return_primary_key: boolean indicating if you want the inserted
+            primary keys for the table returned or not, defaults to False
+        :return: a list of primary keys or an empty list
+        """
+        new_primary_keys = []
+        if len(records) > 0 and table is not None:
+            async with self.transaction() as session:
+                new_primary_keys = await session.run_sync(
+                    self._insert_records, table, records, return_primary_keys
+                )
+        return new_primary_keys
+
+    async def bulk_insert_dict(
+        self, records_with_table: dict, return_primary_keys: bool = False
+    ) -> dict:
+        """
+        Perform a bulk insert operation on several tables in a single
+        transaction, as with `DataAccessLayer.bulk_insert_dict`.
+
+        :param records_with_table: a dictionary that defines the
+            the SQLAlchemy table name to insert into
+            along with a list of dictionaries as records to
+            insert into the specified table
+        :param return_primary_keys: boolean indicating if you want the inserted
+            primary keys for the table returned or not, defaults to False
+        :return: a dictionary that contains table names as keys
+            along with a list of the primary keys, if requested.
+        """
+        return_results = {}
+        async with self.transaction() as session:
+            for table in self.TABLE_LIST:
+                records = records_with_table.get(table.name)
+                if records is not None:
+                    new_primary_keys = []
+                    if len(records) > 0 and table is not None:
+                        new_primary_keys = await session.run_sync(
+                            self._insert_records, table, records, return_primary_keys
+                        )
+                    return_results[table.name] = {"primary_keys": new_primary_keys}
+        return return_results
+
+    async def select_results(
+        self, select_statement: select, include_col_header: bool = True
+    ) -> List[list]:
+        """
+        Perform a select query and add the results to a
+        list of lists.  Then add the column header as the
+        first row, in the list of lists if the
+        'include_col_header' parameter is True.
+
+        :param select_statement: the select statment to execute
+        :param include_col_header: boolean value to indicate if
+            one wants to include a top row of the column headers
+            or not, defaults to True
+        :return: List of lists of select results
+        """
+        list_results = [[]]
+        async with self.transaction() as session:
+            results = await session.execute(select_statement)
+
+            list_results = [list(row) for row in results]
+            if include_col_header:
+                list_results.insert(0, list(results.keys()))
+        return list_results
+
+    def get_session(self) -> AsyncSession:
+        """
+        Get an async session object
+
+        this method returns a new async session object to the caller
+
+        :return: SQLAlchemy async session
+        """
+        return self.session_factory()
+
+
+def _set_asyncpg_text_codecs(dbapi_connection, connection_record) -> None:
+    """
+    Sets up a new asyncpg connection to send and receive the values of each
+    of the `ASYNCPG_TEXT_TYPES` as text.
+
+    :param dbapi_connection: SQLAlchemy's adapted asyncpg connection.
+    :param connection_record: The connection's record in the connection pool.
+    """
+
+    async def set_type_codecs(connection) -> None:
+        for type_name, decoder in ASYNCPG_TEXT_TYPES.items():
+            await connection.set_type_codec(
+                type_name,
+                schema="pg_catalog",
+                encoder=_encode_as_text,
+                decoder=decoder,
+                format="text",
+            )
+
+    dbapi_connection.run_async(set_type_codecs)
+
+
+def _encode_as_text(value: Union[str, date, datetime]) -> str:
+    """
+    Encodes a date or time, or an ISO 8601 string of one, as text.
+
+    :param value: The value to encode.
+    :return: The value as an ISO 8601 string.
+    """
+    if isinstance(value, str):
+        return value
+    return value.isoformat()
@@ -1,18 +1,28 @@
+import asyncio
 import copy
+import dataclasses
 import datetime
 import hashlib
 import json
 import logging
 import pathlib
+import uuid
+from itertools import combinations
+from itertools import product
 from typing import Callable
 from typing import List
 from typing import Union
 
+import numpy as np
 from pydantic import Field
 
+from app.linkage.cache import blocking_criteria_to_key
+from app.linkage.mpi import AsyncDIBBsMPIConnectorClient
 from app.linkage.mpi import BaseMPIConnectorClient
 from app.linkage.mpi import DIBBsMPIConnectorClient
+from app.linkage.timing import LINKAGE_TIMER
 from app.linkage.utils import compare_strings
+from app.linkage.utils import compare_strings_pairwise
 from app.linkage.utils import datetime_to_str
 from app.linkage.utils import extract_value_with_resource_path
 
@@ -28,6 +38,115 @@ LINKING_FIELDS_TO_FHIRPATHS = {
     "mrn": "Patient.identifier.where(type.coding.code='MR').value",
 }
 
+BLOCKING_TRANSFORMATIONS = {
+    "first4": lambda x: x[:4] if len(x) >= 4 else x,
+    "last4": lambda x: x[-4:] if len(x) >= 4 else x,
+}
+
+# Number of records scored against a block at once by the vectorized
+# comparisons, which bounds the size of the comparison matrices held in memory
+COMPARISON_CHUNK_SIZE = 512
+
+
+@dataclasses.dataclass
+class CompiledLinkagePass:
+    """
+    A single pass of a linkage algorithm whose feature functions and matching
+    rule have been resolved to callables. The column indices and per-field
+    comparators a pass uses depend only on the columns of the data it is run
+    against, so they are built the first time they're needed for a given set
+    of column headers and reused after that.
+    """
+
+    blocks: List[dict]
+    funcs: dict[str, Callable]
+    matching_rule: Callable
+    cluster_ratio: float = 0
+    kwargs: dict = dataclasses.field(default_factory=dict)
+    _col_to_idx: dict = dataclasses.field(default_factory=dict, init=False, repr=False)
+    _field_comparators: dict = dataclasses.field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def col_to_idx(self, header: List[str]) -> dict[str, int]:
+        """
+        Maps the names of the columns in a block of MPI data to their indices,
+        not including the patient and person ID columns.
+
+        :param header: The column headers of the block (i.e. its first row).
+        :return: A dictionary mapping column names to indices.
+        """
+        key = tuple(header)
+        if key not in self._col_to_idx:
+            self._col_to_idx[key] = {v: k for k, v in enumerate(header[2:])}
+        return self._col_to_idx[key]
+
+    def field_comparators(self, header: List[str]) -> List[Callable]:
+        """
+        Gets a comparator for each field this pass compares on, in the order of
+        `funcs`, for a block of MPI data with the given column headers. Each
+        comparator accepts the flattened form of an incoming record and of an
+        MPI record, both without their ID columns, and returns the result of the
+        field's feature function.
+
+        :param header: The column headers of the block (i.e. its first row).
+        :return: A list of comparators, one per field in `funcs`.
+        """
+        key = tuple(header)
+        if key not in self._field_comparators:
+            col_to_idx = self.col_to_idx(header)
+            self._field_comparators[key] = [
+                _build_field_comparator(
+                    feature_col, feature_func, col_to_idx, self.kwargs
+                )
+                for feature_col, feature_func in self.funcs.items()
+            ]
+        return self._field_comparators[key]
+
+
+class CompiledLinkagePlan:
+    """
+    A linkage algorithm configuration that has been prepared for repeated use.
+    Compiling a plan copies the configuration and binds the names of its feature
+    functions and matching rules to their callables once, so a plan can be built
+    when a service starts and shared by every request it handles, rather than
+    re-doing that work each time a record is linked. Plans can be passed in
+    place of an algorithm configuration to `link_record_against_mpi` and
+    `link_records_against_mpi`.
+    """
+
+    def __init__(self, algo_config: List[dict]):
+        """
+        Compiles a linkage algorithm configuration into a plan.
+
+        :param algo_config: An algorithm configuration consisting of a list
+          of dictionaries describing the algorithm to run. See
+          `read_linkage_config` and `write_linkage_config` for more details.
+        """
+        bound_config = _bind_func_names_to_invocations(copy.deepcopy(algo_config))
+        self.passes = [
+            CompiledLinkagePass(
+                blocks=linkage_pass["blocks"],
+                funcs=linkage_pass["funcs"],
+                matching_rule=linkage_pass["matching_rule"],
+                cluster_ratio=linkage_pass.get("cluster_ratio", 0),
+                kwargs=linkage_pass.get("kwargs", {}),
+            )
+            for linkage_pass in bound_config
+        ]
+
+    @classmethod
+    def from_config_file(cls, config_file: pathlib.Path) -> "CompiledLinkagePlan":
+        """
+        Compiles the linkage algorithm configuration stored in a JSON file into
+        a plan.
+
+        :param config_file: A `pathlib.Path` string pointing to a JSON file
+          that describes the algorithm to compile. See `read_linkage_config`.
+        :return: The compiled plan.
+        """
+        return cls(read_linkage_config(config_file))
+
 
 def compile_match_lists(match_lists: List[dict], cluster_mode: bool = False):
     """
@@ -128,11 +247,6 @@ def extract_blocking_values_from_record(
       "transformation" key whose value is one of our supported transforms.
     """
 
-    transform_funcs = {
-        "first4": lambda x: x[:4] if len(x) >= 4 else x,
-        "last4": lambda x: x[-4:] if len(x) >= 4 else x,
-    }
-
     for block_dict in blocking_fields:
         if "value" not in block_dict:
             raise KeyError(
@@ -159,7 +273,7 @@ def extract_blocking_values_from_record(
             if value:
                 if block in transformations:
                     try:
-                        value = transform_funcs[transformations[block]](value)
+                        value = BLOCKING_TRANSFORMATIONS[transformations[block]](value)
                     except KeyError:
                         raise ValueError(
                             f"Transformation {transformations[block]} is not valid."
@@ -370,7 +484,7 @@ def generate_hash_str(linking_identifier: str, salt_str: str) -> str:
 
 def link_record_against_mpi(
     record: dict,
-    algo_config: List[dict],
+    algo_config: Union[List[dict], CompiledLinkagePlan],
     external_person_id: str = None,
     mpi_client: BaseMPIConnectorClient = None,
 ) -> tuple[bool, str]:
@@ -387,8 +501,9 @@ def link_record_against_mpi(
     :param record: The FHIR-formatted patient resource to try to match to
       other records in the MPI.
     :param algo_config: An algorithm configuration consisting of a list
-      of dictionaries describing the algorithm to run. See
-      `read_linkage_config` and `write_linkage_config` for more details.
+      of dictionaries describing the algorithm to run, or a
+      `CompiledLinkagePlan` compiled from one. See `read_linkage_config`
+      and `write_linkage_config` for more details.
     :returns: A tuple consisting of a boolean indicating whether a match
       was found for the new record in the MPI, followed by the ID of the
       Person entity now associated with the incoming patient (either a
@@ -401,33 +516,21 @@ def link_record_against_mpi(
 
     # Need to bind function names back to their symbolic invocations
     # in context of the module--i.e. turn the string of a function
-    # name back into the callable defined in link.py
-
-    algo_config = copy.deepcopy(algo_config)
-    logging.info(
-        f"Starting _bind_func_names_to_invocations at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
-    algo_config = _bind_func_names_to_invocations(algo_config)
-    logging.info(
-        f"Done with _bind_func_names_to_invocations at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
+    # name back into the callable defined in link.py; a compiled plan has
+    # already done this, so only compile one if we weren't given one
+    if not isinstance(algo_config, CompiledLinkagePlan):
+        algo_config = CompiledLinkagePlan(algo_config)
 
     # Membership ratios need to persist across linkage passes so that we can
     # find the highest scoring match across all trials
     linkage_scores = {}
-    for linkage_pass in algo_config:
-        blocking_fields = linkage_pass["blocks"]
+    for linkage_pass in algo_config.passes:
+        blocking_fields = linkage_pass.blocks
 
         # MPI will be able to find patients if *any* of their names or addresses
         # contains extracted values, so minimally block on the first line
         # if applicable
-        logging.info(
-            f"Starting extract_blocking_values_from_record at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
         blocking_criteria = extract_blocking_values_from_record(record, blocking_fields)
-        logging.info(
-            f"Done with extract_blocking_values_from_record at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
 
         # We don't enforce blocking if an extracted value is empty, so if all
         # values come back blank, skip the pass because the only alt is comparing
@@ -435,105 +538,228 @@ def link_record_against_mpi(
         if len(blocking_criteria) == 0:
             logging.info("No blocking criteria extracted from incoming record.")
             continue
-        logging.info(
-            f"Starting get_block_data at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
-        raw_data_block = mpi_client.get_block_data(blocking_criteria)
-        logging.info(
-            f"Done with get_block_data at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
+        with LINKAGE_TIMER.time("block_fetch"):
+            raw_data_block = mpi_client.get_block_data(blocking_criteria)
 
         data_block = _convert_given_name_to_first_name(raw_data_block)
+        _score_record_against_block(record, data_block, linkage_pass, linkage_scores)
+    person_id = None
+    matched = False
 
-        # First row of returned block is column headers
-        # Map column name to idx, not including patient/person IDs
-        col_to_idx = {v: k for k, v in enumerate(data_block[0][2:])}
-        if len(data_block[1:]) > 0:  # Check if data_block is empty
-            data_block = data_block[1:]
-            logging.info(
-                f"Starting _flatten_patient_resource at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
-            flattened_record = _flatten_patient_resource(record, col_to_idx)
-            logging.info(
-                f"Done with _flatten_patient_resource at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
+    # If we found any matches, find the strongest one
+    if len(linkage_scores) != 0:
+        person_id = _find_strongest_link(linkage_scores)
+        matched = True
+    with LINKAGE_TIMER.time("insert"):
+        person_id = mpi_client.insert_matched_patient(
+            record, person_id=person_id, external_person_id=external_person_id
+        )
 
-            logging.info(
-                f"Starting _group_patient_block_by_person at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
-            clusters = _group_patient_block_by_person(data_block)
-            logging.info(
-                f"Done with _group_patient_block_by_person at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
+    return (matched, person_id)
 
-            # Check if incoming record should belong to one of the person clusters
-            kwargs = linkage_pass.get("kwargs", {})
-            for person in clusters:
-                num_matched_in_cluster = 0.0
-                for linked_patient in clusters[person]:
-                    logging.info(
-                        f"Starting _compare_records at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                    )
-                    is_match = _compare_records(
-                        flattened_record,
-                        linked_patient,
-                        linkage_pass["funcs"],
-                        col_to_idx,
-                        linkage_pass["matching_rule"],
-                        **kwargs,
-                    )
-                    logging.info(
-                        f"Done with _compare_records at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                    )
 
-                    if is_match:
-                        num_matched_in_cluster += 1.0
+async def link_record_against_mpi_async(
+    record: dict,
+    algo_config: Union[List[dict], CompiledLinkagePlan],
+    external_person_id: str = None,
+    mpi_client: AsyncDIBBsMPIConnectorClient = None,
+) -> tuple[bool, str]:
+    """
+    Runs record linkage on a single incoming record (extracted from a FHIR
+    bundle) using an existing database as an MPI, exactly as
+    `link_record_against_mpi` does, but with an async MPI client so that
+    waiting on the MPI doesn't block the event loop. Since the blocks of
+    every linkage pass only depend on the incoming record, they are all
+    fetched from the MPI at once before any of them are scored.
 
-                # Update membership score for this person cluster so that we can
-                # track best possible link across multiple passes
-                logging.info(
-                    f"Starting to update membership score at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                )
-                belongingness_ratio = num_matched_in_cluster / len(clusters[person])
-                if belongingness_ratio >= linkage_pass.get("cluster_ratio", 0):
-                    logging.info(
-                        f"belongingness_ratio >= linkage_pass.get('cluster_ratio', 0): {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                    )
-                    if person in linkage_scores:
-                        linkage_scores[person] = max(
-                            [linkage_scores[person], belongingness_ratio]
-                        )
-                    else:
-                        linkage_scores[person] = belongingness_ratio
-                logging.info(
-                    f"Done with updating membership score at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                )
+    :param record: The FHIR-formatted patient resource to try to match to
+      other records in the MPI.
+    :param algo_config: An algorithm configuration consisting of a list
+      of dictionaries describing the algorithm to run, or a
+      `CompiledLinkagePlan` compiled from one. See `read_linkage_config`
+      and `write_linkage_config` for more details.
+    :param external_person_id: Optionally, the external person ID of the
+      incoming record. Default is None.
+    :param mpi_client: Optionally, an async connector client for the MPI.
+      Default is a new `AsyncDIBBsMPIConnectorClient`.
+    :returns: A tuple consisting of a boolean indicating whether a match
+      was found for the new record in the MPI, followed by the ID of the
+      Person entity now associated with the incoming patient (either a
+      new Person ID or the ID of an existing matched Person).
+    """
+    if mpi_client is None:
+        logging.info("MPI client was None, instatiating new client.")
+        mpi_client = AsyncDIBBsMPIConnectorClient()
+
+    if not isinstance(algo_config, CompiledLinkagePlan):
+        algo_config = CompiledLinkagePlan(algo_config)
+
+    # Passes that extract no blocking values are skipped, as they are when
+    # linking synchronously
+    linkage_passes = []
+    blocking_criteria = []
+    for linkage_pass in algo_config.passes:
+        pass_criteria = extract_blocking_values_from_record(record, linkage_pass.blocks)
+        if len(pass_criteria) == 0:
+            logging.info("No blocking criteria extracted from incoming record.")
+            continue
+        linkage_passes.append(linkage_pass)
+        blocking_criteria.append(pass_criteria)
+
+    async def get_block_data(pass_criteria: dict) -> List[list]:
+        with LINKAGE_TIMER.time("block_fetch"):
+            return await mpi_client.get_block_data(pass_criteria)
+
+    raw_data_blocks = await asyncio.gather(
+        *[get_block_data(pass_criteria) for pass_criteria in blocking_criteria]
+    )
+
+    linkage_scores = {}
+    for linkage_pass, raw_data_block in zip(linkage_passes, raw_data_blocks):
+        data_block = _convert_given_name_to_first_name(raw_data_block)
+        _score_record_against_block(record, data_block, linkage_pass, linkage_scores)
     person_id = None
     matched = False
 
     # If we found any matches, find the strongest one
     if len(linkage_scores) != 0:
-        logging.info(
-            f"Starting _find_strongest_link at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
         person_id = _find_strongest_link(linkage_scores)
         matched = True
-        logging.info(
-            f"Done with _find_strongest_link at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
+    with LINKAGE_TIMER.time("insert"):
+        person_id = await mpi_client.insert_matched_patient(
+            record, person_id=person_id, external_person_id=external_person_id
         )
-    logging.info(
-        f"Starting mpi_client.insert_matched_patient at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
-    person_id = mpi_client.insert_matched_patient(
-        record, person_id=person_id, external_person_id=external_person_id
-    )
-    logging.info(
-        f"Done with mpi_client.insert_matched_patient at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
 
     return (matched, person_id)
 
 
+def link_records_against_mpi(
+    records: List[dict],
+    algo_config: Union[List[dict], CompiledLinkagePlan],
+    external_person_ids: Union[List[str], None] = None,
+    mpi_client: BaseMPIConnectorClient = None,
+) -> List[tuple[bool, str]]:
+    """
+    Runs record linkage on a batch of incoming records (each extracted from
+    a FHIR bundle) using an existing database as an MPI. The linkage logic
+    for each record is identical to that of `link_record_against_mpi`, but
+    the work is shared across the batch: records are grouped by the blocking
+    values they extract in each pass, a single block query is issued to the
+    MPI per distinct set of blocking values, all scoring is done in memory,
+    and every resulting insert is committed to the MPI in one transaction.
+
+    Records are linked in the order they are supplied, and each record is
+    compared against both the MPI and any earlier record in the same batch
+    that falls into its block, so records within a batch can link to one
+    another just as they would if they had been linked one at a time.
+
+    :param records: A list of FHIR-formatted patient resources to try to
+      match to other records in the MPI.
+    :param algo_config: An algorithm configuration consisting of a list
+      of dictionaries describing the algorithm to run, or a
+      `CompiledLinkagePlan` compiled from one. See `read_linkage_config`
+      and `write_linkage_config` for more details.
+    :param external_person_ids: Optionally, a list of external person IDs,
+      one for each record in `records` (using `None` where a record has no
+      external ID). Default is None.
+    :param mpi_client: Optionally, a connector client for the MPI. Must
+      provide an `insert_matched_patients` method for committing a batch
+      of inserts. Default is a new `DIBBsMPIConnectorClient`.
+    :raises ValueError: If `external_person_ids` is supplied but is not the
+      same length as `records`.
+    :returns: A list of tuples, one per incoming record and in the same
+      order, each consisting of a boolean indicating whether a match was
+      found for the record, followed by the ID of the Person entity now
+      associated with it.
+    """
+    if external_person_ids is None:
+        external_person_ids = [None] * len(records)
+    if len(external_person_ids) != len(records):
+        raise ValueError(
+            "`external_person_ids` must contain one entry for each record to link."
+        )
+    if len(records) == 0:
+        return []
+
+    if mpi_client is None:
+        logging.info("MPI client was None, instatiating new client.")
+        mpi_client = DIBBsMPIConnectorClient()
+
+    if not isinstance(algo_config, CompiledLinkagePlan):
+        algo_config = CompiledLinkagePlan(algo_config)
+    linkage_passes = algo_config.passes
+
+    # Work out every record's blocking criteria up front so that each
+    # distinct block only needs to be fetched from the MPI once
+    criteria_by_record = [
+        [
+            extract_blocking_values_from_record(record, linkage_pass.blocks)
+            for linkage_pass in linkage_passes
+        ]
+        for record in records
+    ]
+    blocks_by_key = {}
+    for record_criteria in criteria_by_record:
+        for blocking_criteria in record_criteria:
+            if len(blocking_criteria) == 0:
+                continue
+            block_key = blocking_criteria_to_key(blocking_criteria)
+            if block_key not in blocks_by_key:
+                with LINKAGE_TIMER.time("block_fetch"):
+                    raw_data_block = mpi_client.get_block_data(blocking_criteria)
+                blocks_by_key[block_key] = _convert_given_name_to_first_name(
+                    raw_data_block
+                )
+
+    # Records already linked in this batch, indexed by every blocking key
+    # they would satisfy in each pass, so later records can find them
+    linked_in_batch = [{} for _ in linkage_passes]
+    results = []
+    person_ids = []
+    for record, record_criteria in zip(records, criteria_by_record):
+        linkage_scores = {}
+        for pass_idx, linkage_pass in enumerate(linkage_passes):
+            blocking_criteria = record_criteria[pass_idx]
+            if len(blocking_criteria) == 0:
+                continue
+            block_key = blocking_criteria_to_key(blocking_criteria)
+            data_block = list(blocks_by_key[block_key])
+            for batch_record, batch_person_id in linked_in_batch[pass_idx].get(
+                block_key, []
+            ):
+                data_block.extend(
+                    _build_block_rows_from_record(
+                        batch_record, batch_person_id, data_block[0]
+                    )
+                )
+            _score_record_against_block(
+                record, data_block, linkage_pass, linkage_scores
+            )
+
+        if len(linkage_scores) != 0:
+            person_id = _find_strongest_link(linkage_scores)
+            matched = True
+        else:
+            person_id = uuid.uuid4()
+            matched = False
+        results.append((matched, person_id))
+        person_ids.append(person_id)
+
+        for pass_idx, linkage_pass in enumerate(linkage_passes):
+            for block_key in _extract_blocking_keys_from_record(
+                record, linkage_pass.blocks
+            ):
+                linked_in_batch[pass_idx].setdefault(block_key, []).append(
+                    (record, person_id)
+                )
+
+    with LINKAGE_TIMER.time("insert"):
+        mpi_client.insert_matched_patients(
+            records, person_ids=person_ids, external_person_ids=external_person_ids
+        )
+    return results
+
+
 def load_json_probs(path: pathlib.Path):
     """
     Load a dictionary of probabilities from a JSON-formatted file.
@@ -601,23 +827,45 @@ def match_within_block(
       in the block of data of records deemed to match.
     """
     match_pairs = []
+    if len(block) < 2:
+        return match_pairs
+
+    # Score each chunk of records against every record from the start of the
+    # chunk onwards in one go; order doesn't matter, so only the pairs above
+    # the diagonal need to be kept
+    for start in range(0, len(block), COMPARISON_CHUNK_SIZE):
+        end = min(start + COMPARISON_CHUNK_SIZE, len(block))
+        matches = _match_matrix(
+            block[start:end],
+            block[start:],
+            feature_funcs,
+            col_to_idx,
+            match_eval,
+            kwargs,
+            **kwargs,
+        )
+        if matches is not None:
+            for i, j in zip(*np.nonzero(np.triu(matches, k=1))):
+                match_pairs.append((start + int(i), start + int(j)))
+            continue
 
-    # Dynamic programming table: order doesn't matter, so only need to
-    # check each combo of i,j once
-    for i, record_i in enumerate(block):
-        for j in range(i + 1, len(block)):
-            record_j = block[j]
-            feature_comps = [
-                feature_funcs[feature_col](
-                    record_i, record_j, feature_col, col_to_idx, **kwargs
-                )
-                for feature_col in feature_funcs
-            ]
+        # Custom feature functions or matching rules are evaluated one
+        # pair of records at a time
+        for i in range(start, end):
+            record_i = block[i]
+            for j in range(i + 1, len(block)):
+                record_j = block[j]
+                feature_comps = [
+                    feature_funcs[feature_col](
+                        record_i, record_j, feature_col, col_to_idx, **kwargs
+                    )
+                    for feature_col in feature_funcs
+                ]
 
-            # If it's a match, store the result
-            is_match = match_eval(feature_comps, **kwargs)
-            if is_match:
-                match_pairs.append((i, j))
+                # If it's a match, store the result
+                is_match = match_eval(feature_comps, **kwargs)
+                if is_match:
+                    match_pairs.append((i, j))
 
     return match_pairs
 
@@ -789,6 +1037,135 @@ def _bind_func_names_to_invocations(algo_config: List[dict]):
     return algo_config
 
 
+def _build_field_comparator(
+    feature_col: str,
+    feature_func: Callable,
+    col_to_idx: dict[str, int],
+    kwargs: dict,
+) -> Callable:
+    """
+    Helper method that builds a closure comparing one field of the flattened
+    form of an incoming record to the same field of a flattened MPI record,
+    in the same way `_compare_records_field_helper` would, but with the
+    choice of comparison and the field's index resolved up front.
+    """
+    idx = col_to_idx[feature_col]
+    single_col_to_idx = {feature_col: 0}
+    if feature_col == "first_name":
+
+        def compare(record: List, mpi_patient: List):
+            return feature_func(
+                [" ".join(record[idx])],
+                [mpi_patient[idx]],
+                feature_col,
+                single_col_to_idx,
+                **kwargs,
+            )
+
+    elif feature_col in ["address", "city", "state", "zip"]:
+
+        def compare(record: List, mpi_patient: List):
+            feature_comp = False
+            for element in record[idx]:
+                feature_comp = feature_func(
+                    [element],
+                    [mpi_patient[idx]],
+                    feature_col,
+                    single_col_to_idx,
+                    **kwargs,
+                )
+                if feature_comp:
+                    break
+            return feature_comp
+
+    else:
+
+        def compare(record: List, mpi_patient: List):
+            return feature_func(record, mpi_patient, feature_col, col_to_idx, **kwargs)
+
+    return compare
+
+
+def _build_block_rows_from_record(
+    record: dict, person_id: str, header: List[str]
+) -> List[list]:
+    """
+    Helper method that converts a FHIR patient resource into the rows the MPI
+    would return for it in a block of data, i.e. one row per combination of
+    name and address, with columns ordered according to the supplied header
+    of a block returned by `get_block_data`. Birthdates are parsed into dates,
+    as they would be when read back from the MPI.
+    """
+    mrn = extract_value_with_resource_path(
+        record, LINKING_FIELDS_TO_FHIRPATHS["mrn"], selection_criteria="first"
+    )
+    birthdate = record.get("birthDate")
+    try:
+        birthdate = datetime.date.fromisoformat(birthdate)
+    except (TypeError, ValueError):
+        pass
+    rows = []
+    for name in record.get("name") or [{}]:
+        for address in record.get("address") or [{}]:
+            row = {
+                "patient_id": record.get("id"),
+                "person_id": person_id,
+                "birthdate": birthdate,
+                "sex": record.get("gender"),
+                "mrn": mrn,
+                "last_name": name.get("family"),
+                "first_name": " ".join(name.get("given") or []),
+                "address": (address.get("line") or [None])[0],
+                "zip": address.get("postalCode"),
+                "city": address.get("city"),
+                "state": address.get("state"),
+            }
+            rows.append([row.get(col) for col in header])
+    return rows
+
+
+def _extract_blocking_keys_from_record(
+    record: dict, blocking_fields: List[dict]
+) -> set:
+    """
+    Helper method that determines every block a record would be returned in
+    by the MPI for a given linkage pass. Since the MPI finds a patient if
+    *any* of their names, addresses or identifiers satisfy the blocking
+    criteria, and an incoming record only blocks on the fields it has values
+    for, this is every combination of the record's (transformed) values over
+    every non-empty subset of the blocking fields.
+    """
+    values_by_field = {}
+    for block_dict in blocking_fields:
+        field = block_dict.get("value")
+        transformation = block_dict.get("transformation")
+        if field == "address":
+            values = [
+                (address.get("line") or [None])[0]
+                for address in record.get("address") or []
+            ]
+        else:
+            values = (
+                extract_value_with_resource_path(
+                    record, LINKING_FIELDS_TO_FHIRPATHS[field], selection_criteria="all"
+                )
+                or []
+            )
+        values = {v for v in values if v is not None and v != ""}
+        if transformation is not None:
+            values = {BLOCKING_TRANSFORMATIONS[transformation](v) for v in values}
+        if values:
+            values_by_field[field] = [(field, v, transformation) for v in values]
+
+    keys = set()
+    fields = list(values_by_field)
+    for n_fields in range(1, len(fields) + 1):
+        for subset in combinations(fields, n_fields):
+            for criteria in product(*[values_by_field[f] for f in subset]):
+                keys.add(tuple(sorted(criteria)))
+    return keys
+
+
 def _eval_record_in_cluster(
     block: List[List],
     i: int,
@@ -923,6 +1300,279 @@ def _compare_name_elements(
     return feature_comp
 
 
+def _compare_feature_columns(
+    feature_func: Callable,
+    feature_col: str,
+    values_i: List,
+    values_j: List,
+    **kwargs,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that computes, as a single matrix operation, the comparison
+    one of the built-in feature functions would make between every value in
+    `values_i` and every value in `values_j`. Returns None if the feature
+    function has no vectorized form, or the values aren't of a type the
+    vectorized form handles, in which case callers should fall back to
+    comparing one pair of records at a time.
+    """
+    if feature_func in (feature_match_exact, feature_match_log_odds_exact):
+        if feature_func is feature_match_log_odds_exact and "log_odds" not in kwargs:
+            raise KeyError("Mapping of columns to m/u log-odds must be provided.")
+        codes = _encode_for_equality(values_i, values_j)
+        if codes is None:
+            return None
+        comps = codes[0][:, None] == codes[1][None, :]
+        if feature_func is feature_match_log_odds_exact:
+            return np.where(comps, kwargs["log_odds"][feature_col], 0.0)
+        return comps
+
+    if feature_func is feature_match_four_char:
+        try:
+            first_four_i = [v[: min(4, len(v))] for v in values_i]
+            first_four_j = [v[: min(4, len(v))] for v in values_j]
+        except TypeError:
+            return None
+        return _compare_feature_columns(
+            feature_match_exact, feature_col, first_four_i, first_four_j
+        )
+
+    if feature_func in (
+        feature_match_fuzzy_string,
+        feature_match_log_odds_fuzzy_compare,
+    ):
+        log_odds_compare = feature_func is feature_match_log_odds_fuzzy_compare
+        if log_odds_compare and "log_odds" not in kwargs:
+            raise KeyError("Mapping of columns to m/u log-odds must be provided.")
+
+        # Convert datetime obj to str using helper function
+        if feature_col == "birthdate":
+            values_i = [datetime_to_str(v) for v in values_i]
+            values_j = [datetime_to_str(v) for v in values_j]
+        if not all(v is None or isinstance(v, str) for v in values_i + values_j):
+            return None
+
+        similarity_measure = "JaroWinkler"
+        if "similarity_measure" in kwargs and not log_odds_compare:
+            similarity_measure = kwargs["similarity_measure"]
+        threshold = kwargs.get("threshold", 0.7)
+        scores = _similarity_matrix(values_i, values_j, similarity_measure, threshold)
+        if scores is None:
+            return None
+
+        if log_odds_compare:
+            scores[scores < threshold] = 0.0
+            return scores * kwargs["log_odds"][feature_col]
+
+        # Special case for two empty strings, since we don't want vacuous
+        # equality (or in-) to penalize the score
+        empty_i = np.array([v == "" for v in values_i], dtype=bool)
+        empty_j = np.array([v == "" for v in values_j], dtype=bool)
+        none_i = np.array([v is None for v in values_i], dtype=bool)
+        none_j = np.array([v is None for v in values_j], dtype=bool)
+        return (
+            (scores >= threshold)
+            | np.outer(empty_i, empty_j)
+            | np.outer(none_i, none_j)
+        )
+
+    return None
+
+
+def _compare_record_to_block(
+    record: List,
+    mpi_patients: List[List],
+    feature_funcs: dict,
+    col_to_idx: dict[str, int],
+    matching_rule: callable,
+    field_comparators: Union[List[Callable], None] = None,
+    **kwargs,
+) -> List[bool]:
+    """
+    Helper method that compares the flattened form of an incoming new patient
+    record to every flattened patient record in a block pulled from the MPI,
+    giving the same result as calling `_compare_records` on each in turn.
+    Whenever the feature functions and matching rule are all built-ins, each
+    feature is scored against the whole block at once. Otherwise, records
+    are compared one at a time, using the given per-field comparators (see
+    `CompiledLinkagePass.field_comparators`) if there are any.
+    """
+    if matching_rule in (eval_perfect_match, eval_log_odds_cutoff):
+        # Format is patient_id, person_id, alphabetical list of FHIR keys
+        # Don't use the first two ID cols when linking
+        record_features = record[2:]
+        feature_comps = []
+        for feature_col, feature_func in feature_funcs.items():
+            idx = col_to_idx[feature_col]
+            mpi_values = [mpi_patient[2 + idx] for mpi_patient in mpi_patients]
+            if feature_col == "first_name":
+                comps = _compare_feature_columns(
+                    feature_func,
+                    feature_col,
+                    [" ".join(record_features[idx])],
+                    mpi_values,
+                    **kwargs,
+                )
+            elif feature_col in ["address", "city", "state", "zip"]:
+                # Any one of the record's elements matching is enough, and
+                # the comparison from the first one that does is kept
+                comps = np.zeros((1, len(mpi_patients)), dtype=bool)
+                found = np.zeros((1, len(mpi_patients)), dtype=bool)
+                for element in record_features[idx]:
+                    element_comps = _compare_feature_columns(
+                        feature_func, feature_col, [element], mpi_values, **kwargs
+                    )
+                    if element_comps is None:
+                        comps = None
+                        break
+                    comps = np.where(found, comps, element_comps)
+                    found |= element_comps.astype(bool)
+            else:
+                comps = _compare_feature_columns(
+                    feature_func,
+                    feature_col,
+                    [record_features[idx]],
+                    mpi_values,
+                    **kwargs,
+                )
+            if comps is None:
+                break
+            feature_comps.append(comps)
+        else:
+            return _evaluate_match_matrix(
+                matching_rule, feature_comps, (1, len(mpi_patients)), **kwargs
+            )[0].tolist()
+
+    if field_comparators is None:
+        return [
+            _compare_records(
+                record, mpi_patient, feature_funcs, col_to_idx, matching_rule, **kwargs
+            )
+            for mpi_patient in mpi_patients
+        ]
+
+    # Format is patient_id, person_id, alphabetical list of FHIR keys
+    # Don't use the first two ID cols when linking
+    record_features = record[2:]
+    return [
+        matching_rule(
+            [
+                compare(record_features, mpi_patient[2:])
+                for compare in field_comparators
+            ],
+            **kwargs,
+        )
+        for mpi_patient in mpi_patients
+    ]
+
+
+def _encode_for_equality(
+    values_i: List, values_j: List
+) -> Union[tuple[np.ndarray, np.ndarray], None]:
+    """
+    Helper method that maps two lists of values onto integer codes, such that
+    two values share a code exactly when they compare equal. Returns None if
+    any value can't be encoded this way (e.g. it's unhashable).
+    """
+    codes = {}
+    encoded = []
+    try:
+        for offset, values in [(0, values_i), (len(values_i), values_j)]:
+            column = np.empty(len(values), dtype=np.int64)
+            for k, value in enumerate(values):
+                if value == value:
+                    column[k] = codes.setdefault(value, len(codes))
+                else:
+                    # Values that aren't equal to themselves (e.g. NaN) never
+                    # match anything, so each gets a code of its own
+                    column[k] = -1 - offset - k
+            encoded.append(column)
+    except (TypeError, ValueError):
+        return None
+    return encoded[0], encoded[1]
+
+
+def _evaluate_match_matrix(
+    match_eval: Callable,
+    feature_comparisons: List[np.ndarray],
+    shape: tuple[int, int],
+    **kwargs,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that applies one of the built-in match evaluation rules to
+    matrices of feature comparisons, giving a boolean matrix of which pairs
+    of records match. Returns None if the rule has no vectorized form.
+    """
+    if match_eval not in (eval_perfect_match, eval_log_odds_cutoff):
+        return None
+    if match_eval is eval_log_odds_cutoff and "true_match_threshold" not in kwargs:
+        raise KeyError("Cutoff threshold for true matches must be passed.")
+
+    # Accumulate in feature order so totals are summed exactly as `sum` would
+    total = np.zeros(shape, dtype=np.int64)
+    for comps in feature_comparisons:
+        total = total + comps
+    if match_eval is eval_perfect_match:
+        return total == len(feature_comparisons)
+    return total >= kwargs["true_match_threshold"]
+
+
+def _match_matrix(
+    records_i: List[List],
+    records_j: List[List],
+    feature_funcs: dict[str, Callable],
+    col_to_idx: dict[str, int],
+    match_eval: Callable,
+    eval_kwargs: dict,
+    **kwargs,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that determines whether each record in `records_i` matches
+    each record in `records_j`, scoring every feature column for all pairs at
+    once. Returns None if any of the feature functions or the match evaluation
+    rule has no vectorized form, in which case callers should fall back to
+    comparing one pair of records at a time.
+    """
+    if match_eval not in (eval_perfect_match, eval_log_odds_cutoff):
+        return None
+    feature_comps = []
+    for feature_col, feature_func in feature_funcs.items():
+        idx = col_to_idx[feature_col]
+        comps = _compare_feature_columns(
+            feature_func,
+            feature_col,
+            [record[idx] for record in records_i],
+            [record[idx] for record in records_j],
+            **kwargs,
+        )
+        if comps is None:
+            return None
+        feature_comps.append(comps)
+    return _evaluate_match_matrix(
+        match_eval, feature_comps, (len(records_i), len(records_j)), **eval_kwargs
+    )
+
+
+def _similarity_matrix(
+    values_i: List[Union[str, None]],
+    values_j: List[Union[str, None]],
+    similarity_measure: str,
+    threshold: float,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that computes the string similarity between every pair of
+    values drawn from two lists. The batched scorers can differ from the
+    single-pair ones used by `compare_strings` in the last bit of precision,
+    so any score close enough to the threshold to be affected is recomputed
+    with `compare_strings`.
+    """
+    scores = compare_strings_pairwise(values_i, values_j, similarity_measure)
+    if scores is None:
+        return None
+    for i, j in np.argwhere(np.abs(scores - threshold) < 1e-9):
+        scores[i, j] = compare_strings(values_i[i], values_j[j], similarity_measure)
+    return scores
+
+
 def _condense_extract_address_from_resource(resource: dict, field: str):
     """
     Formatting function to account for patient resources that have multiple
@@ -1081,6 +1731,8 @@ def _match_within_block_cluster_ratio(
       in the block of data of records deemed to match.
     """
     clusters = []
+    chunk_start = 0
+    matches = None
     for i in range(len(block)):
         # Base case
         if len(clusters) == 0:
@@ -1088,18 +1740,38 @@ def _match_within_block_cluster_ratio(
             continue
         found_master_cluster = False
 
-        # Iterate through clusters to find one that we match with
-        for cluster in clusters:
-            belongs = _eval_record_in_cluster(
-                block,
-                i,
-                cluster,
-                cluster_ratio,
+        # Score the next chunk of records against every record before them
+        # in one go, since any of those may be in a cluster by then
+        if (i - 1) % COMPARISON_CHUNK_SIZE == 0:
+            chunk_start = i
+            matches = _match_matrix(
+                block[i : i + COMPARISON_CHUNK_SIZE],
+                block[: i + COMPARISON_CHUNK_SIZE],
                 feature_funcs,
                 col_to_idx,
                 match_eval,
+                {},
                 **kwargs,
             )
+
+        # Iterate through clusters to find one that we match with
+        for cluster in clusters:
+            if matches is not None:
+                num_matched = float(
+                    np.count_nonzero(matches[i - chunk_start][list(cluster)])
+                )
+                belongs = (num_matched / len(cluster)) >= cluster_ratio
+            else:
+                belongs = _eval_record_in_cluster(
+                    block,
+                    i,
+                    cluster,
+                    cluster_ratio,
+                    feature_funcs,
+                    col_to_idx,
+                    match_eval,
+                    **kwargs,
+                )
             if belongs:
                 found_master_cluster = True
                 cluster.add(i)
@@ -1111,6 +1783,68 @@ def _match_within_block_cluster_ratio(
     return clusters
 
 
+def _score_record_against_block(
+    record: dict,
+    data_block: List[list],
+    linkage_pass: CompiledLinkagePass,
+    linkage_scores: dict,
+) -> None:
+    """
+    Helper method that scores an incoming record against each of the person
+    clusters found in a block of MPI data during a single linkage pass. Any
+    cluster the record qualifies to join has its belongingness ratio stored
+    in `linkage_scores`, keeping the strongest score seen across passes.
+
+    :param record: The FHIR-formatted patient resource being linked.
+    :param data_block: The block of MPI data to compare against, whose first
+      row holds the column headers.
+    :param linkage_pass: The compiled linkage pass being run.
+    :param linkage_scores: A dictionary mapping person IDs to the best
+      belongingness ratio found so far; updated in place.
+    """
+    # First row of returned block is column headers
+    # Map column name to idx, not including patient/person IDs
+    header = data_block[0]
+    col_to_idx = linkage_pass.col_to_idx(header)
+    if len(data_block[1:]) > 0:  # Check if data_block is empty
+        data_block = data_block[1:]
+        with LINKAGE_TIMER.time("flatten"):
+            flattened_record = _flatten_patient_resource(record, col_to_idx)
+
+        clusters = _group_patient_block_by_person(data_block)
+
+        # Compare the incoming record to every record in the block at once
+        with LINKAGE_TIMER.time("compare"):
+            matches = _compare_record_to_block(
+                flattened_record,
+                data_block,
+                linkage_pass.funcs,
+                col_to_idx,
+                linkage_pass.matching_rule,
+                field_comparators=linkage_pass.field_comparators(header),
+                **linkage_pass.kwargs,
+            )
+        num_matched_by_person = dict.fromkeys(clusters, 0.0)
+        for linked_patient, is_match in zip(data_block, matches):
+            if is_match:
+                num_matched_by_person[linked_patient[1]] += 1.0
+
+        # Check if incoming record should belong to one of the person clusters
+        for person in clusters:
+            num_matched_in_cluster = num_matched_by_person[person]
+
+            # Update membership score for this person cluster so that we can
+            # track best possible link across multiple passes
+            belongingness_ratio = num_matched_in_cluster / len(clusters[person])
+            if belongingness_ratio >= linkage_pass.cluster_ratio:
+                if person in linkage_scores:
+                    linkage_scores[person] = max(
+                        [linkage_scores[person], belongingness_ratio]
+                    )
+                else:
+                    linkage_scores[person] = belongingness_ratio
+
+
 def _is_empty_extraction_field(block_vals: dict, field: str):
     """
     Helper method that determines when a field extracted from an incoming
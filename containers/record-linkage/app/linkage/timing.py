@@ -0,0 +1,203 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable
+from typing import Tuple
+
+# Stages of linking a record against the MPI that are timed by default
+LINKAGE_STAGES = ("block_fetch", "flatten", "compare", "insert")
+
+# Upper bounds, in seconds, of the buckets of each stage's histogram; the last
+# bucket collects everything slower than the largest bound
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Returned in place of a timing context whenever timing is disabled, so that a
+# disabled timer allocates nothing and never reads the clock
+_DISABLED_TIMING = nullcontext()
+
+
+class _StageHistogram:
+    """
+    Running count, total, minimum, maximum and bucketed counts of the durations
+    recorded for a single stage.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total", "min", "max")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def summary(self) -> dict:
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else None,
+            "min_seconds": self.min,
+            "max_seconds": self.max,
+            "buckets": dict(zip(bounds, self.counts)),
+        }
+
+
+class _StageTiming:
+    """
+    Context manager that records the time spent inside it to one stage of a
+    `StageTimer`.
+    """
+
+    __slots__ = ("timer", "stage", "start")
+
+    def __init__(self, timer: "StageTimer", stage: str):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class StageTimer:
+    """
+    Records how long each stage of a process takes into a histogram per stage,
+    using a monotonic clock. A timer is disabled until `enable` is called, and
+    while disabled, timing a block of code or a function call costs no more
+    than checking a flag.
+    """
+
+    def __init__(
+        self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        """
+        Creates a new timer.
+
+        :param enabled: Whether the timer should start recording immediately.
+          Default: `False`.
+        :param buckets: The upper bounds, in seconds, of the buckets of each
+          stage's histogram, in increasing order. Default: `DEFAULT_BUCKETS`.
+        """
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        """
+        Starts recording durations.
+        """
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Stops recording durations. Durations recorded so far are kept until
+        `reset` is called.
+        """
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Discards all durations recorded so far.
+        """
+        with self._lock:
+            self._histograms = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Adds a duration to a stage's histogram.
+
+        :param stage: The name of the stage.
+        :param seconds: How long the stage took, in seconds.
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _StageHistogram(self.buckets)
+            histogram.add(seconds)
+
+    def time(self, stage: str):
+        """
+        Returns a context manager that records the time spent inside it to the
+        given stage, if the timer is enabled.
+
+        :param stage: The name of the stage.
+        :return: A context manager timing the stage.
+        """
+        if not self.enabled:
+            return _DISABLED_TIMING
+        return _StageTiming(self, stage)
+
+    def timed(self, stage: str) -> Callable:
+        """
+        Returns a decorator that records the duration of each call to the
+        decorated function to the given stage, if the timer is enabled.
+
+        :param stage: The name of the stage.
+        :return: A decorator timing the stage.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def summary(self) -> dict:
+        """
+        Summarizes the durations recorded for each stage.
+
+        :return: A dictionary mapping each stage with recorded durations to its
+          count, total, mean, minimum and maximum duration in seconds, and the
+          number of durations in each bucket of its histogram, keyed by the
+          bucket's upper bound.
+        """
+        with self._lock:
+            return {
+                stage: histogram.summary()
+                for stage, histogram in self._histograms.items()
+            }
+
+
+# Times the stages of linking records against the MPI (see `LINKAGE_STAGES`);
+# disabled until `LINKAGE_TIMER.enable()` is called
+LINKAGE_TIMER = StageTimer()
@@ -1,8 +1,10 @@
 import json
 import random
+import re
 from datetime import date
 from datetime import datetime
-from functools import cache
+from decimal import Decimal
+from functools import lru_cache
 from typing import Any
 from typing import Callable
 from typing import List
@@ -10,10 +12,39 @@ from typing import Literal
 from typing import Union
 
 import fhirpathpy
+import numpy as np
 import rapidfuzz
 
 from app.config import get_settings
 
+# The maximum number of compiled FHIRPath expressions to cache
+FHIRPATH_CACHE_SIZE = 1024
+
+# Matches plain dotted paths whose elements may each be followed by an index,
+# e.g., `Patient.name[0].given`, which are evaluated without fhirpathpy
+SIMPLE_FHIRPATH_PATTERN = re.compile(
+    r"[A-Za-z][A-Za-z0-9_]*(\[\d+\])?(\.[A-Za-z][A-Za-z0-9_]*(\[\d+\])?)*"
+)
+SIMPLE_FHIRPATH_ELEMENT_PATTERN = re.compile(r"([A-Za-z][A-Za-z0-9_]*)(?:\[(\d+)\])?")
+
+# FHIRPath keywords, and element names fhirpathpy treats specially, which
+# simple paths can't contain
+FHIRPATH_KEYWORDS = {
+    "and",
+    "as",
+    "contains",
+    "div",
+    "false",
+    "implies",
+    "in",
+    "is",
+    "length",
+    "mod",
+    "or",
+    "true",
+    "xor",
+}
+
 
 def load_mpi_env_vars_os():
     """
@@ -142,6 +173,58 @@ def compare_strings(
         )
 
 
+# Originally from phdi/harmonization/utils.py
+def compare_strings_pairwise(
+    strings1: List[Union[str, None]],
+    strings2: List[Union[str, None]],
+    similarity_measure: Literal[
+        "JaroWinkler", "Levenshtein", "DamerauLevenshtein"
+    ] = "JaroWinkler",
+) -> Union[np.ndarray, None]:
+    """
+    Returns the matrix of normalized similarity measures between every string in
+    strings1 and every string in strings2, such that entry [i, j] is equal to
+    `compare_strings(strings1[i], strings2[j], similarity_measure)`. The matrix is
+    computed in a single call into rapidfuzz, which is substantially faster than
+    comparing each pair of strings individually. As with `compare_strings`, a
+    comparison involving `None` has a similarity of 0.0.
+
+    :param strings1: First list of strings for comparison.
+    :param strings2: Second list of strings for comparison.
+    :param similarity_measure: The method used to measure the similarity between
+        strings, defaults to "JaroWinkler". See `compare_strings` for the supported
+        measures.
+    :return: A float matrix with one row per string in strings1 and one column per
+        string in strings2, or None if the similarity measure is not supported.
+    """
+    if similarity_measure == "JaroWinkler":
+        scorer = rapidfuzz.distance.JaroWinkler.normalized_similarity
+    elif similarity_measure == "Levenshtein":
+        scorer = rapidfuzz.distance.Levenshtein.normalized_similarity
+    elif similarity_measure == "DamerauLevenshtein":
+        scorer = rapidfuzz.distance.DamerauLevenshtein.normalized_similarity
+    else:
+        return None
+
+    if len(strings1) == 0 or len(strings2) == 0:
+        return np.zeros((len(strings1), len(strings2)))
+
+    scores = rapidfuzz.process.cdist(
+        ["" if s is None else s for s in strings1],
+        ["" if s is None else s for s in strings2],
+        scorer=scorer,
+        dtype=np.float64,
+    )
+    # cdist doesn't score a pair of empty strings the same way the scorer does,
+    # so set those pairs explicitly before zeroing out comparisons against None
+    empty1 = np.array([s == "" for s in strings1], dtype=bool)
+    empty2 = np.array([s == "" for s in strings2], dtype=bool)
+    scores[np.outer(empty1, empty2)] = scorer("", "")
+    scores[np.array([s is None for s in strings1], dtype=bool), :] = 0.0
+    scores[:, np.array([s is None for s in strings2], dtype=bool)] = 0.0
+    return scores
+
+
 selection_criteria_types = Literal["first", "last", "random", "all"]
 
 
@@ -209,14 +292,136 @@ def extract_value_with_resource_path(
         return value
 
 
-@cache
+@lru_cache(maxsize=FHIRPATH_CACHE_SIZE)
 def get_fhirpathpy_parser(fhirpath_expression: str) -> Callable:
     """
     Accepts a FHIRPath expression, and returns a callable function
     which returns the evaluated value at fhirpath_expression for
-    a specified FHIR resource.
+    a specified FHIR resource. Plain dotted paths, optionally with indexes,
+    e.g., `Patient.name[0].given`, are evaluated by walking the resource
+    directly; all other expressions are evaluated by fhirpathpy. Functions
+    are cached, so each expression is only compiled once.
     :param fhirpath_expression: The FHIRPath expression to evaluate.
     :return: A function that, when called passing in a FHIR resource,
       will return value at `fhirpath_expression`.
     """
+    simple_parser = _compile_simple_fhirpath(fhirpath_expression)
+    if simple_parser is not None:
+        return simple_parser
+    return _compile_fhirpath(fhirpath_expression)
+
+
+@lru_cache(maxsize=FHIRPATH_CACHE_SIZE)
+def _compile_fhirpath(fhirpath_expression: str) -> Callable:
+    """
+    Compiles a FHIRPath expression with fhirpathpy.
+
+    :param fhirpath_expression: The FHIRPath expression to compile.
+    :return: The compiled expression.
+    """
     return fhirpathpy.compile(fhirpath_expression)
+
+
+def _compile_simple_fhirpath(fhirpath_expression: str) -> Union[Callable, None]:
+    """
+    Compiles a plain dotted FHIRPath expression, optionally with indexes, into
+    a function that walks a resource directly, giving the same results as
+    fhirpathpy. Resources the function can't evaluate exactly as fhirpathpy
+    would, e.g., those with extensions on primitive elements, are evaluated
+    by fhirpathpy instead.
+
+    :param fhirpath_expression: The FHIRPath expression to compile.
+    :return: The compiled expression, or None if it isn't a simple path.
+    """
+    if not SIMPLE_FHIRPATH_PATTERN.fullmatch(fhirpath_expression):
+        return None
+    elements = []
+    for element in fhirpath_expression.split("."):
+        name, index = SIMPLE_FHIRPATH_ELEMENT_PATTERN.fullmatch(element).groups()
+        elements.append((name, None if index is None else int(index)))
+    if any(name in FHIRPATH_KEYWORDS for name, _ in elements):
+        return None
+
+    # A path starting with a capitalized name, e.g., `Patient`, selects the
+    # resources of that type
+    resource_type = elements[0][0] if elements[0][0][0].isupper() else None
+    if resource_type is not None:
+        root_index = elements[0][1]
+        elements = elements[1:]
+
+    def parse_function(resource: Any, context: dict = None) -> list:
+        if context:
+            return _compile_fhirpath(fhirpath_expression)(resource, context)
+
+        if isinstance(resource, list):
+            nodes = resource
+        elif resource is None:
+            nodes = []
+        else:
+            nodes = [resource]
+
+        if resource_type is not None:
+            if not all(
+                isinstance(node, dict) and "resourceType" in node for node in nodes
+            ):
+                return _compile_fhirpath(fhirpath_expression)(resource)
+            nodes = [node for node in nodes if node["resourceType"] == resource_type]
+            nodes = _select_index(nodes, root_index)
+
+        for name, index in elements:
+            children = []
+            for node in nodes:
+                if not isinstance(node, dict):
+                    continue
+                # fhirpathpy merges extensions on primitive elements, which
+                # are stored under the element's name prefixed by "_"
+                if "_" + name in node:
+                    return _compile_fhirpath(fhirpath_expression)(resource)
+                child = node.get(name)
+                if isinstance(child, list):
+                    children.extend(child)
+                elif child is not None:
+                    children.append(child)
+            nodes = _select_index(children, index)
+
+        return _to_fhirpath_data(nodes)
+
+    return parse_function
+
+
+def _select_index(nodes: list, index: Union[int, None]) -> list:
+    """
+    Applies a FHIRPath indexer to a collection.
+
+    :param nodes: The collection.
+    :param index: The index of the element to select, or None to select every
+      element.
+    :return: The selected elements.
+    """
+    if index is None:
+        return nodes
+    return nodes[index : index + 1]
+
+
+def _to_fhirpath_data(value: Any) -> Any:
+    """
+    Converts values extracted from a resource into the forms fhirpathpy would
+    return: floats become Decimals, elements holding nothing but extensions
+    are dropped from lists, and dictionaries and lists are copied.
+
+    :param value: The extracted value.
+    :return: The value as fhirpathpy would return it.
+    """
+    if isinstance(value, list):
+        converted = []
+        for item in value:
+            item = _to_fhirpath_data(item)
+            if isinstance(item, dict) and list(item.keys()) == ["extension"]:
+                continue
+            converted.append(item)
+        return converted
+    if isinstance(value, dict):
+        return {key: _to_fhirpath_data(item) for key, item in value.items()}
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return value
@@ -1,6 +1,9 @@
 import copy
+import json
+from functools import lru_cache
 from pathlib import Path
 from typing import Annotated
+from typing import List
 from typing import Optional
 
 from dibbs.base_service import BaseService
@@ -12,9 +15,14 @@ from pydantic import Field
 
 from app.linkage.algorithms import DIBBS_BASIC
 from app.linkage.algorithms import DIBBS_ENHANCED
+from app.linkage.cache import BlockCache
 from app.linkage.link import add_person_resource
-from app.linkage.link import link_record_against_mpi
+from app.linkage.link import CompiledLinkagePlan
+from app.linkage.link import link_record_against_mpi_async
+from app.linkage.link import link_records_against_mpi
+from app.linkage.mpi import AsyncDIBBsMPIConnectorClient
 from app.linkage.mpi import DIBBsMPIConnectorClient
+from app.linkage.timing import LINKAGE_TIMER
 from app.utils import get_settings
 from app.utils import read_json_from_assets
 from app.utils import run_migrations
@@ -22,10 +30,33 @@ from app.utils import run_migrations
 # Ensure MPI is configured as expected.
 run_migrations()
 settings = get_settings()
+# Shared by both MPI clients, so that patients inserted by either one
+# invalidate the blocks cached by both
+BLOCK_CACHE = None
+if settings["mpi_block_cache_size"] > 0:
+    BLOCK_CACHE = BlockCache(
+        max_size=settings["mpi_block_cache_size"],
+        ttl=settings["mpi_block_cache_ttl_seconds"],
+    )
 MPI_CLIENT = DIBBsMPIConnectorClient(
     pool_size=settings["connection_pool_size"],
     max_overflow=settings["connection_pool_max_overflow"],
+    use_blocking_table=settings["mpi_use_blocking_table"],
+    block_cache=BLOCK_CACHE,
+)
+# Links single records without blocking the event loop, so that many requests
+# can be in flight at once
+ASYNC_MPI_CLIENT = AsyncDIBBsMPIConnectorClient(
+    pool_size=settings["connection_pool_size"],
+    max_overflow=settings["connection_pool_max_overflow"],
+    use_blocking_table=settings["mpi_use_blocking_table"],
+    block_cache=BLOCK_CACHE,
 )
+# Compile the built-in algorithms once, so every request can reuse them
+DIBBS_BASIC_PLAN = CompiledLinkagePlan(DIBBS_BASIC)
+DIBBS_ENHANCED_PLAN = CompiledLinkagePlan(DIBBS_ENHANCED)
+if settings["linkage_timing_enabled"]:
+    LINKAGE_TIMER.enable()
 # Instantiate FastAPI via DIBBs' BaseService class
 app = BaseService(
     service_name="DIBBs Record Linkage Service",
@@ -90,6 +121,57 @@ class LinkRecordResponse(BaseModel):
     )
 
 
+class LinkRecordsInput(BaseModel):
+    """
+    Schema for requests to the /link-record-batch endpoint.
+    """
+
+    bundles: List[dict] = Field(
+        description="A list of FHIR bundles, each containing a patient resource "
+        "to be checked for links to existing patient records. Bundles are linked "
+        "in the order supplied, so a bundle may be linked to an earlier bundle "
+        "in the same batch."
+    )
+    use_enhanced: Optional[bool] = Field(
+        description="Optionally, a boolean flag indicating whether to use the "
+        "DIBBs enhanced algorithm (with statistical correction) for record linkage. "
+        "If `False` and no optional `algo_config` is provided, the service will use "
+        "the DIBBs basic algorithm. If this parameter is set to `True`, the enhanced "
+        "algorithm will be used in place of any configuration supplied in "
+        "`algo_config`.",
+        default=False,
+    )
+    algo_config: Optional[dict] = Field(
+        description="A JSON dictionary containing the specification for a "
+        "linkage algorithm, as defined in the SDK functions `read_algo_config` "
+        "and `write_algo_config`. Default value uses the DIBBS in-house basic "
+        "algorithm.",
+        default={},
+    )
+    external_person_ids: Optional[List[Optional[str]]] = Field(
+        description="Optionally, a list of External Identifiers, provided by the "
+        "client, one for each bundle in `bundles` (using `null` for any bundle "
+        "without one).",
+        default=None,
+    )
+
+
+class LinkRecordsResponse(BaseModel):
+    """
+    The schema for responses from the /link-record-batch endpoint.
+    """
+
+    results: List[LinkRecordResponse] = Field(
+        description="The linkage result for each supplied bundle, in the same "
+        "order as the bundles were supplied."
+    )
+    message: Optional[str] = Field(
+        description="An optional message in the case that the linkage endpoint did "
+        "not run successfully containing a description of the error that happened.",
+        default="",
+    )
+
+
 class HealthCheckResponse(BaseModel):
     """
     The schema for response from the record linkage health check endpoint.
@@ -102,6 +184,36 @@ class HealthCheckResponse(BaseModel):
     )
 
 
+class LinkageTimingsResponse(BaseModel):
+    """
+    The schema for responses from the /linkage-timings endpoint.
+    """
+
+    enabled: bool = Field(
+        description="Whether the service is currently timing record linkage."
+    )
+    stages: dict = Field(
+        description="For each stage of record linkage (`block_fetch`, `flatten`, "
+        "`compare` and `insert`) timed so far, the number of times it ran, its total, "
+        "mean, minimum and maximum duration in seconds, and a histogram of its "
+        "durations keyed by each bucket's upper bound in seconds."
+    )
+
+
+class BlockCacheStatsResponse(BaseModel):
+    """
+    The schema for responses from the /block-cache-stats endpoint.
+    """
+
+    enabled: bool = Field(description="Whether the service caches blocks of MPI data.")
+    stats: dict = Field(
+        description="The number of cache hits and misses, the proportion of lookups "
+        "that were hits, the number of blocks evicted to make room, expired and "
+        "invalidated by new patients, and the current and maximum number of blocks "
+        "cached."
+    )
+
+
 @app.get("/")
 async def health_check() -> HealthCheckResponse:
     """
@@ -150,28 +262,14 @@ async def link_record(
         return {
             "found_match": False,
             "updated_bundle": input_bundle,
-            "message": f"Unsupported database type {db_type} supplied. "
-            + "Make sure your environment variables include an entry "
-            + "for `mpi_db_type` and that it is set to 'postgres'.",
+            "message": _unsupported_db_type_message(db_type),
         }
 
-    # Determine which algorithm to use; default is DIBBS basic
-    # Check for enhanced algo before checking custom algo
-    use_enhanced = input.get("use_enhanced", False)
-    if use_enhanced:
-        algo_config = DIBBS_ENHANCED
-    else:
-        algo_config = input.get("algo_config", {}).get("algorithm", [])
-        if algo_config == []:
-            algo_config = DIBBS_BASIC
+    linkage_plan = _get_linkage_plan(input)
 
     # Now extract the patient record we want to link
     try:
-        record_to_link = [
-            entry.get("resource")
-            for entry in input_bundle.get("entry", [])
-            if entry.get("resource", {}).get("resourceType", "") == "Patient"
-        ][0]
+        record_to_link = _get_patient_from_bundle(input_bundle)
     except IndexError:
         response.status_code = status.HTTP_400_BAD_REQUEST
         return {
@@ -184,11 +282,11 @@ async def link_record(
     try:
         # Make a copy of record_to_link so we don't modify the original
         record = copy.deepcopy(record_to_link)
-        (found_match, new_person_id) = link_record_against_mpi(
+        (found_match, new_person_id) = await link_record_against_mpi_async(
             record=record,
-            algo_config=algo_config,
+            algo_config=linkage_plan,
             external_person_id=external_id,
-            mpi_client=MPI_CLIENT,
+            mpi_client=ASYNC_MPI_CLIENT,
         )
         updated_bundle = add_person_resource(
             new_person_id, record_to_link.get("id", ""), input_bundle
@@ -202,3 +300,153 @@ async def link_record(
             "updated_bundle": input_bundle,
             "message": f"Could not connect to database: {err}",
         }
+
+
+@app.post("/link-record-batch", status_code=200)
+def link_record_batch(
+    input: LinkRecordsInput, response: Response
+) -> LinkRecordsResponse:
+    """
+    Compare a batch of FHIR bundles with records in the Master Patient Index
+    (MPI) to check for matches with existing patient records, as well as with
+    the records of earlier bundles in the batch. Blocks of MPI data are fetched
+    once per distinct set of blocking values and all new records are written
+    to the MPI in a single transaction. Returns each bundle with updated
+    references to the person it was linked to. Linking a batch blocks on the
+    MPI database, so this endpoint is synchronous and FastAPI runs it in its
+    threadpool rather than on the event loop.
+    """
+
+    input = dict(input)
+    input_bundles = input.get("bundles", [])
+    external_ids = input.get("external_person_ids", None)
+
+    def _error_results(bundles: List[dict]) -> List[dict]:
+        return [{"found_match": False, "updated_bundle": b} for b in bundles]
+
+    # Check that DB type is appropriately set up as Postgres so
+    # we can fail fast if it's not
+    db_type = get_settings().get("mpi_db_type", "")
+    if db_type != "postgres":
+        response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+        return {
+            "results": _error_results(input_bundles),
+            "message": _unsupported_db_type_message(db_type),
+        }
+
+    linkage_plan = _get_linkage_plan(input)
+
+    # Now extract the patient records we want to link
+    try:
+        records_to_link = [_get_patient_from_bundle(b) for b in input_bundles]
+    except IndexError:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return {
+            "results": _error_results(input_bundles),
+            "message": "One or more supplied bundles contain no Patient resource "
+            "to link on.",
+        }
+
+    # Now link the records
+    try:
+        # Make a copy of records_to_link so we don't modify the originals
+        records = copy.deepcopy(records_to_link)
+        linkage_results = link_records_against_mpi(
+            records=records,
+            algo_config=linkage_plan,
+            external_person_ids=external_ids,
+            mpi_client=MPI_CLIENT,
+        )
+        results = []
+        for (found_match, new_person_id), record, bundle in zip(
+            linkage_results, records_to_link, input_bundles
+        ):
+            updated_bundle = add_person_resource(
+                new_person_id, record.get("id", ""), bundle
+            )
+            results.append(
+                {"found_match": found_match, "updated_bundle": updated_bundle}
+            )
+        return {"results": results}
+
+    except ValueError as err:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return {
+            "results": _error_results(input_bundles),
+            "message": f"Could not link records: {err}",
+        }
+
+
+@app.get("/linkage-timings")
+async def linkage_timings(reset: bool = False) -> LinkageTimingsResponse:
+    """
+    Report how long each stage of record linkage has taken since the service
+    started, or since timings were last reset. Timing is only done when the
+    service is started with `linkage_timing_enabled` set. If `reset` is `True`,
+    the timings recorded so far are discarded after being returned.
+    """
+    stages = LINKAGE_TIMER.summary()
+    if reset:
+        LINKAGE_TIMER.reset()
+    return {"enabled": LINKAGE_TIMER.enabled, "stages": stages}
+
+
+@app.get("/block-cache-stats")
+async def block_cache_stats(reset: bool = False) -> BlockCacheStatsResponse:
+    """
+    Report how the cache of blocks of MPI data has been used since the service
+    started, or since the stats were last reset. Blocks are only cached when
+    the service is started with `mpi_block_cache_size` set. If `reset` is
+    `True`, the counts are reset to zero after being returned.
+    """
+    if BLOCK_CACHE is None:
+        return {"enabled": False, "stats": {}}
+    stats = BLOCK_CACHE.stats()
+    if reset:
+        BLOCK_CACHE.reset_stats()
+    return {"enabled": True, "stats": stats}
+
+
+def _unsupported_db_type_message(db_type: str) -> str:
+    """
+    Builds the error message returned when the MPI is not configured as Postgres.
+    """
+    return (
+        f"Unsupported database type {db_type} supplied. "
+        + "Make sure your environment variables include an entry "
+        + "for `mpi_db_type` and that it is set to 'postgres'."
+    )
+
+
+def _get_linkage_plan(input: dict) -> CompiledLinkagePlan:
+    """
+    Determines which algorithm to use for a linkage request; default is DIBBS
+    basic. Checks for the enhanced algorithm before checking for a custom one.
+    """
+    if input.get("use_enhanced", False):
+        return DIBBS_ENHANCED_PLAN
+    algo_config = (input.get("algo_config") or {}).get("algorithm", [])
+    if algo_config == []:
+        return DIBBS_BASIC_PLAN
+    return _compile_linkage_plan(json.dumps(algo_config, sort_keys=True))
+
+
+@lru_cache(maxsize=32)
+def _compile_linkage_plan(algo_config: str) -> CompiledLinkagePlan:
+    """
+    Compiles a custom algorithm supplied with a linkage request, serialized as
+    JSON, so that requests repeating the same algorithm can reuse its plan.
+    """
+    return CompiledLinkagePlan(json.loads(algo_config))
+
+
+def _get_patient_from_bundle(bundle: dict) -> dict:
+    """
+    Extracts the first Patient resource from a FHIR bundle, raising an
+    IndexError if the bundle contains none.
+    """
+    return [
+        entry.get("resource")
+        for entry in bundle.get("entry", [])
+        if entry.get("resource", {}).get("resourceType", "") == "Patient"
+    ][0]
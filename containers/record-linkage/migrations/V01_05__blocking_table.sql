@@ -0,0 +1,99 @@
+BEGIN;
+
+/*
+
+BLOCKING TABLE
+
+A denormalized copy of the columns used for linkage, with one row per
+combination of each patient's names, MRNs and addresses, and the first and
+last 4 characters of the fields usually blocked on stored in their own indexed
+columns. When the record linkage service is configured to use it, blocks are
+fetched from this table with a single indexed lookup instead of by joining and
+aggregating the tables above.
+
+*/
+CREATE TABLE IF NOT EXISTS patient_blocking (
+    patient_blocking_id UUID DEFAULT uuid_generate_v4 (),
+    patient_id UUID,
+    person_id UUID,
+    birthdate DATE,
+    sex VARCHAR(7),
+    mrn VARCHAR(255),
+    last_name VARCHAR(255),
+    given_name VARCHAR(255)[],
+    address VARCHAR(100),
+    zip VARCHAR(10),
+    city VARCHAR(255),
+    state VARCHAR(100),
+    mrn_first4 VARCHAR(4),
+    mrn_last4 VARCHAR(4),
+    last_name_first4 VARCHAR(4),
+    last_name_last4 VARCHAR(4),
+    given_name_first4 VARCHAR(4)[],
+    given_name_last4 VARCHAR(4)[],
+    address_first4 VARCHAR(4),
+    address_last4 VARCHAR(4),
+    PRIMARY KEY (patient_blocking_id)
+);
+
+CREATE INDEX IF NOT EXISTS patient_blocking_patient_id_index ON patient_blocking (patient_id);
+
+CREATE INDEX IF NOT EXISTS patient_blocking_mrn_last4_index ON patient_blocking (mrn_last4);
+
+CREATE INDEX IF NOT EXISTS patient_blocking_address_first4_index ON patient_blocking (address_first4);
+
+CREATE INDEX IF NOT EXISTS patient_blocking_last_name_first4_index ON patient_blocking (last_name_first4);
+
+CREATE INDEX IF NOT EXISTS patient_blocking_given_name_first4_index ON patient_blocking USING GIN (given_name_first4);
+
+CREATE INDEX IF NOT EXISTS patient_blocking_birthdate_index ON patient_blocking (birthdate);
+
+-- Fill in the blocking table for patients already in the MPI
+INSERT INTO patient_blocking (
+    patient_id, person_id, birthdate, sex, mrn, last_name, given_name, address, zip,
+    city, state, mrn_first4, mrn_last4, last_name_first4, last_name_last4,
+    given_name_first4, given_name_last4, address_first4, address_last4
+)
+SELECT
+    patient.patient_id,
+    patient.person_id,
+    patient.dob,
+    patient.sex,
+    ident_subq.mrn,
+    name.last_name,
+    array_agg(given_name.given_name ORDER BY given_name.given_name_index),
+    address.line_1,
+    address.zip_code,
+    address.city,
+    address.state,
+    left(ident_subq.mrn, 4),
+    right(ident_subq.mrn, 4),
+    left(name.last_name, 4),
+    right(name.last_name, 4),
+    array_agg(left(given_name.given_name, 4) ORDER BY given_name.given_name_index),
+    array_agg(right(given_name.given_name, 4) ORDER BY given_name.given_name_index),
+    left(address.line_1, 4),
+    right(address.line_1, 4)
+FROM patient
+LEFT OUTER JOIN (
+    SELECT patient_identifier AS mrn, patient_id
+    FROM identifier
+    WHERE type_code = 'MR'
+) AS ident_subq ON ident_subq.patient_id = patient.patient_id
+LEFT OUTER JOIN name ON name.patient_id = patient.patient_id
+LEFT OUTER JOIN given_name ON given_name.name_id = name.name_id
+LEFT OUTER JOIN address ON address.patient_id = patient.patient_id
+GROUP BY
+    patient.patient_id,
+    patient.person_id,
+    patient.dob,
+    patient.sex,
+    ident_subq.mrn,
+    name.last_name,
+    name.name_id,
+    address.line_1,
+    address.zip_code,
+    address.city,
+    address.state;
+
+COMMIT;
@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import json
 import os
@@ -18,6 +19,7 @@ from app.linkage.link import _convert_given_name_to_first_name
 from app.linkage.link import _flatten_patient_resource
 from app.linkage.link import _match_within_block_cluster_ratio
 from app.linkage.link import add_person_resource
+from app.linkage.link import CompiledLinkagePlan
 from app.linkage.link import eval_log_odds_cutoff
 from app.linkage.link import eval_perfect_match
 from app.linkage.link import extract_blocking_values_from_record
@@ -28,12 +30,15 @@ from app.linkage.link import feature_match_log_odds_exact
 from app.linkage.link import feature_match_log_odds_fuzzy_compare
 from app.linkage.link import generate_hash_str
 from app.linkage.link import link_record_against_mpi
+from app.linkage.link import link_record_against_mpi_async
 from app.linkage.link import load_json_probs
 from app.linkage.link import match_within_block
 from app.linkage.link import read_linkage_config
 from app.linkage.link import score_linkage_vs_truth
 from app.linkage.link import write_linkage_config
+from app.linkage.mpi import AsyncDIBBsMPIConnectorClient
 from app.linkage.mpi import DIBBsMPIConnectorClient
+from app.linkage.timing import LINKAGE_TIMER
 from app.utils import _clean_up
 from sqlalchemy import select
 from sqlalchemy import text
@@ -777,6 +782,114 @@ def test_link_record_against_mpi():
     _clean_up(MPI.dal)
 
 
+def test_link_record_against_mpi_async():
+    algorithm = CompiledLinkagePlan(DIBBS_BASIC)
+    MPI = _init_db()
+    patients = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "linkage"
+            / "patient_bundle_to_link_with_mpi.json"
+        )
+    )
+    patients = [
+        p["resource"]
+        for p in patients["entry"]
+        if p.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+
+    async def link_patients():
+        async_MPI = AsyncDIBBsMPIConnectorClient()
+        try:
+            results = []
+            for patient in patients:
+                results.append(
+                    await link_record_against_mpi_async(
+                        patient, algorithm, "EXT-1", mpi_client=async_MPI
+                    )
+                )
+            return results
+        finally:
+            await async_MPI.dispose()
+
+    # Linking asynchronously gives the same results as linking synchronously
+    LINKAGE_TIMER.enable()
+    try:
+        results = asyncio.run(link_patients())
+        timings = LINKAGE_TIMER.summary()
+    finally:
+        LINKAGE_TIMER.disable()
+        LINKAGE_TIMER.reset()
+    assert timings["block_fetch"]["count"] == len(patients) * len(DIBBS_BASIC)
+    assert timings["insert"]["count"] == len(patients)
+    matches = [matched for matched, _ in results]
+    mapped_patients = {}
+    for _, pid in results:
+        mapped_patients[str(pid)] = mapped_patients.get(str(pid), 0) + 1
+
+    assert matches == [False, True, False, False, False, False]
+    assert sorted(list(mapped_patients.values())) == [1, 1, 1, 1, 2]
+
+    patient_records = MPI.dal.select_results(select(MPI.dal.PATIENT_TABLE))
+    person_id_count = {}
+    for patient in patient_records[1:]:
+        person_id_count[str(patient[1])] = person_id_count.get(str(patient[1]), 0) + 1
+    assert person_id_count == mapped_patients
+
+    # Each person is linked to the external ID once
+    external_person_records = MPI.dal.select_results(
+        select(MPI.dal.EXTERNAL_PERSON_TABLE)
+    )
+    assert sorted(str(record[1]) for record in external_person_records[1:]) == (
+        sorted(mapped_patients)
+    )
+
+    _clean_up(MPI.dal)
+
+
+def test_link_record_against_mpi_compiled_plan():
+    original = copy.deepcopy(DIBBS_BASIC)
+    plan = CompiledLinkagePlan(DIBBS_BASIC)
+
+    # Compiling binds names to callables without touching the config itself
+    assert DIBBS_BASIC == original
+    for linkage_pass, config_pass in zip(plan.passes, DIBBS_BASIC):
+        assert linkage_pass.matching_rule == eval_perfect_match
+        assert linkage_pass.funcs.keys() == config_pass["funcs"].keys()
+        assert all(callable(func) for func in linkage_pass.funcs.values())
+
+    plan_from_file = CompiledLinkagePlan.from_config_file(
+        pathlib.Path(__file__).parent.parent
+        / "assets"
+        / "linkage"
+        / "dibbs_basic_algorithm.json"
+    )
+    assert len(plan_from_file.passes) == len(plan.passes)
+
+    MPI = _init_db()
+    patients = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "linkage"
+            / "patient_bundle_to_link_with_mpi.json"
+        )
+    )
+    patients = [
+        p.get("resource")
+        for p in patients["entry"]
+        if p.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+
+    # One plan can be reused to link every record, with the same results as
+    # linking each one with the algorithm itself
+    matches = [link_record_against_mpi(patient, plan)[0] for patient in patients]
+    assert matches == [False, True, False, False, False, False]
+
+    _clean_up(MPI.dal)
+
+
 def test_link_record_against_mpi_enhanced_algo():
     algorithm = DIBBS_ENHANCED
     MPI = _init_db()
@@ -1,8 +1,12 @@
 from datetime import date
 from datetime import datetime
 
+import fhirpathpy
 import pytest
 from app.linkage.link import datetime_to_str
+from app.linkage.utils import compare_strings
+from app.linkage.utils import compare_strings_pairwise
+from app.linkage.utils import get_fhirpathpy_parser
 
 
 @pytest.mark.parametrize(
@@ -41,3 +45,41 @@ def test_valid_datetime_to_str_with_time(input_value, expected_output):
 )
 def test_bad_input_datetime_to_str(input_value, expected_output):
     assert datetime_to_str(input_value) == expected_output
+
+
+def test_compare_strings_pairwise():
+    strings1 = ["Jose", "Jsoe", "", None]
+    strings2 = ["Jose", "abcd", "", None, "Josie"]
+
+    for similarity_measure in ["JaroWinkler", "Levenshtein", "DamerauLevenshtein"]:
+        scores = compare_strings_pairwise(strings1, strings2, similarity_measure)
+        assert scores.shape == (4, 5)
+        for i, string1 in enumerate(strings1):
+            for j, string2 in enumerate(strings2):
+                assert scores[i, j] == pytest.approx(
+                    compare_strings(string1, string2, similarity_measure)
+                )
+
+    assert compare_strings_pairwise(strings1, strings2, "Hamming") is None
+
+
+def test_get_fhirpathpy_parser():
+    patient = {
+        "resourceType": "Patient",
+        "name": [
+            {"use": "official", "family": "Doe", "given": ["John", "Danger"]},
+            {"given": ["Johnny"]},
+        ],
+        "address": [{"line": ["1234 Silversun Strip"], "postalCode": "99999"}],
+    }
+    for path in [
+        "Patient.name.given",
+        "Patient.name[0].given[1]",
+        "Patient.address.postalCode",
+        "Observation.code",
+        "Patient.name.where(use='official').family",
+    ]:
+        assert get_fhirpathpy_parser(path)(patient) == fhirpathpy.evaluate(
+            patient, path
+        )
+    assert get_fhirpathpy_parser("name.given") is get_fhirpathpy_parser("name.given")
@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import datetime
 import json
 import os
@@ -6,7 +8,11 @@ import re
 import uuid
 
 import pytest
+from app.linkage.algorithms import DIBBS_BASIC
+from app.linkage.cache import BlockCache
 from app.linkage.dal import DataAccessLayer
+from app.linkage.link import extract_blocking_values_from_record
+from app.linkage.mpi import AsyncDIBBsMPIConnectorClient
 from app.linkage.mpi import DIBBsMPIConnectorClient
 from app.utils import _clean_up
 from sqlalchemy import Select
@@ -417,6 +423,195 @@ def test_insert_matched_patient():
     _clean_up(MPI.dal)
 
 
+def test_block_cache():
+    MPI = _init_db()
+    patients = [
+        entry["resource"]
+        for entry in json.load(
+            open(
+                pathlib.Path(__file__).parent.parent
+                / "assets"
+                / "linkage"
+                / "patient_bundle_to_link_with_mpi.json"
+            )
+        )["entry"]
+        if entry.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+    MPI.insert_matched_patients(
+        copy.deepcopy(patients[1:]), [str(uuid.uuid4()) for _ in patients[1:]]
+    )
+    block_cache = BlockCache()
+    cached_MPI = DIBBsMPIConnectorClient(block_cache=block_cache)
+    criteria = [
+        extract_blocking_values_from_record(patients[0], linkage_pass["blocks"])
+        for linkage_pass in DIBBS_BASIC
+    ]
+    other_criteria = {"birthdate": {"value": "1900-01-01"}}
+
+    # Cached blocks are the same as those fetched from the MPI
+    for block_criteria in criteria + [other_criteria]:
+        block = cached_MPI.get_block_data(block_criteria)
+        assert block == MPI.get_block_data(block_criteria)
+        assert cached_MPI.get_block_data(block_criteria) == block
+    assert block_cache.stats()["hits"] == len(criteria) + 1
+    assert block_cache.stats()["misses"] == len(criteria) + 1
+
+    # Inserting a patient invalidates only the blocks it belongs in
+    cached_MPI.insert_matched_patient(copy.deepcopy(patients[0]))
+    assert len(block_cache) == 1
+    assert block_cache.get(other_criteria) is not None
+    for block_criteria in criteria:
+        block = cached_MPI.get_block_data(block_criteria)
+        assert block == MPI.get_block_data(block_criteria)
+        assert patients[0]["id"] in [str(row[0]) for row in block[1:]]
+
+    # A new patient in no cached block leaves the cache alone
+    new_patient = copy.deepcopy(patient_resource)
+    new_patient["id"] = str(uuid.uuid4())
+    cached_MPI.insert_matched_patients([new_patient], [str(uuid.uuid4())])
+    assert len(block_cache) == len(criteria) + 1
+    assert block_cache.stats()["invalidations"] == len(criteria)
+
+    # The asynchronous client shares the cache
+    async def use_async_client():
+        async_MPI = AsyncDIBBsMPIConnectorClient(block_cache=block_cache)
+        try:
+            hits = block_cache.stats()["hits"]
+            assert await async_MPI.get_block_data(criteria[0]) == (
+                MPI.get_block_data(criteria[0])
+            )
+            assert block_cache.stats()["hits"] == hits + 1
+            sparse_patient = copy.deepcopy(patients[0])
+            sparse_patient["id"] = str(uuid.uuid4())
+            del sparse_patient["name"]
+            await async_MPI.insert_matched_patient(sparse_patient)
+        finally:
+            await async_MPI.dispose()
+
+    asyncio.run(use_async_client())
+    assert block_cache.get(criteria[0]) is None
+
+    _clean_up(MPI.dal)
+
+
+def test_async_mpi_client():
+    MPI = _init_db()
+    blocking_ddl = open(
+        pathlib.Path(__file__).parent.parent
+        / "migrations"
+        / "V01_05__blocking_table.sql"
+    ).read()
+    with MPI.dal.engine.connect() as db_conn:
+        db_conn.execute(text(blocking_ddl))
+        db_conn.commit()
+    patients = [
+        entry["resource"]
+        for entry in json.load(
+            open(
+                pathlib.Path(__file__).parent.parent
+                / "assets"
+                / "linkage"
+                / "patient_bundle_to_link_with_mpi.json"
+            )
+        )["entry"]
+        if entry.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+    criteria = [
+        extract_blocking_values_from_record(patient, linkage_pass["blocks"])
+        for patient in patients
+        for linkage_pass in DIBBS_BASIC
+    ]
+    criteria = [block_criteria for block_criteria in criteria if block_criteria]
+
+    async def use_async_clients():
+        async_MPI = AsyncDIBBsMPIConnectorClient()
+        blocking_MPI = AsyncDIBBsMPIConnectorClient(use_blocking_table=True)
+        try:
+            # Dates and coordinates are stored from the resource as they are
+            # by the synchronous client
+            person_id = await async_MPI.insert_matched_patient(
+                copy.deepcopy(patient_resource), external_person_id="EXT-1"
+            )
+            new_person_id = str(uuid.uuid4())
+            person_ids = await async_MPI.insert_matched_patients(
+                copy.deepcopy(patients),
+                [person_id] + [new_person_id] * (len(patients) - 1),
+                ["EXT-1"] + [None] * (len(patients) - 1),
+            )
+            assert person_ids[0] == person_id
+            assert list(async_MPI._external_source_ids) == ["IRIS"]
+
+            # Many blocks can be fetched at once
+            blocks = await asyncio.gather(
+                *[async_MPI.get_block_data(c) for c in criteria]
+            )
+            blocking_table_blocks = await asyncio.gather(
+                *[blocking_MPI.get_block_data(c) for c in criteria]
+            )
+            await blocking_MPI.refresh_blocking_table()
+            return person_id, new_person_id, blocks, blocking_table_blocks
+        finally:
+            await async_MPI.dispose()
+            await blocking_MPI.dispose()
+
+    person_id, new_person_id, blocks, blocking_table_blocks = asyncio.run(
+        use_async_clients()
+    )
+
+    def sorted_block(block):
+        return [block[0]] + sorted(block[1:], key=str)
+
+    # Blocks are the same as those fetched by the synchronous client
+    for block_criteria, block, blocking_table_block in zip(
+        criteria, blocks, blocking_table_blocks
+    ):
+        sync_block = sorted_block(MPI.get_block_data(block_criteria))
+        assert len(sync_block) > 1
+        assert sorted_block(block) == sync_block
+        assert sorted_block(blocking_table_block) == sync_block
+
+    patient_records = MPI.dal.select_results(
+        select(MPI.dal.PATIENT_TABLE.c.person_id, MPI.dal.PATIENT_TABLE.c.dob)
+    )
+    assert len(patient_records) == len(patients) + 2
+    assert [person_id, datetime.date(1983, 2, 1)] in patient_records
+    assert sorted(map(str, {row[0] for row in patient_records[1:]})) == sorted(
+        [str(person_id), new_person_id]
+    )
+    address_records = MPI.dal.select_results(
+        select(MPI.dal.ADDRESS_TABLE.c.latitude).where(
+            MPI.dal.ADDRESS_TABLE.c.latitude.is_not(None)
+        ),
+        include_col_header=False,
+    )
+    assert len(address_records) == 1
+    external_person_records = MPI.dal.select_results(
+        select(
+            MPI.dal.EXTERNAL_PERSON_TABLE.c.person_id,
+            MPI.dal.EXTERNAL_PERSON_TABLE.c.external_person_id,
+        ),
+        include_col_header=False,
+    )
+    assert external_person_records == [[person_id, "EXT-1"]]
+
+    # The blocking table is checked for when the client is first used
+    with MPI.dal.engine.connect() as pg_connection:
+        pg_connection.execute(text("""DROP TABLE patient_blocking;"""))
+        pg_connection.commit()
+
+    async def use_missing_blocking_table():
+        blocking_MPI = AsyncDIBBsMPIConnectorClient(use_blocking_table=True)
+        try:
+            with pytest.raises(ValueError):
+                await blocking_MPI.get_block_data(criteria[0])
+        finally:
+            await blocking_MPI.dispose()
+
+    asyncio.run(use_missing_blocking_table())
+
+    _clean_up(MPI.dal)
+
+
 def test_block_data_with_transform():
     MPI = _init_db()
     data_requested = {
@@ -675,3 +870,53 @@ def test_get_external_source_id():
     MPI._get_external_source_id("IRIS")
     assert MPI._get_external_source_id.cache_info().hits == 1
     _clean_up(MPI.dal)
+
+
+def test_blocking_table_migration():
+    MPI = _init_db()
+    patients = [
+        entry["resource"]
+        for entry in json.load(
+            open(
+                pathlib.Path(__file__).parent
+                / "assets"
+                / "patient_bundle_to_link_with_mpi.json"
+            )
+        )["entry"]
+        if entry.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+    MPI.insert_matched_patients(
+        copy.deepcopy(patients[:-1]), [str(uuid.uuid4()) for _ in patients[:-1]]
+    )
+
+    # The migration creates the blocking table and fills it from the other tables
+    blocking_ddl = open(
+        pathlib.Path(__file__).parent.parent
+        / "migrations"
+        / "V01_05__blocking_table.sql"
+    ).read()
+    with MPI.dal.engine.connect() as db_conn:
+        db_conn.execute(text(blocking_ddl))
+        db_conn.commit()
+    MPI.dal.initialize_schema()
+    MPI.insert_matched_patient(copy.deepcopy(patients[-1]))
+    blocking_MPI = DIBBsMPIConnectorClient(use_blocking_table=True)
+
+    def sorted_block(block):
+        return [block[0]] + sorted(block[1:], key=str)
+
+    for patient in patients:
+        block_criteria = {
+            "birthdate": {"value": patient["birthDate"]},
+            "last_name": {
+                "value": patient["name"][0]["family"][:4],
+                "transformation": "first4",
+            },
+        }
+        block = MPI.get_block_data(block_criteria)
+        assert len(block) > 1
+        assert sorted_block(blocking_MPI.get_block_data(block_criteria)) == (
+            sorted_block(block)
+        )
+
+    _clean_up(MPI.dal)
@@ -1,9 +1,12 @@
+import asyncio
+
 # flake8: noqa
 # fmt: off
 import copy
 import json
 import os
 import pathlib
+from unittest import mock
 
 import pytest
 from app.config import get_settings
@@ -15,6 +18,11 @@ set_mpi_env_vars()
 from fastapi import status
 from fastapi.testclient import TestClient
 from app.main import app, run_migrations
+from app.main import _get_linkage_plan, DIBBS_BASIC_PLAN, DIBBS_ENHANCED_PLAN
+from app.main import LINKAGE_TIMER
+from app.main import ASYNC_MPI_CLIENT
+from app.linkage.cache import BlockCache
+from app.linkage.algorithms import DIBBS_BASIC
 from app.utils import _clean_up
 import copy
 import json
@@ -222,3 +230,145 @@ def test_use_enhanced_algo():
         if r.get("resource").get("resourceType") == "Person"
     ][0]
     assert not resp_6.json()["found_match"]
+
+
+def test_linkage_plans_are_reused():
+    assert _get_linkage_plan({}) is DIBBS_BASIC_PLAN
+    assert _get_linkage_plan({"algo_config": {"algorithm": []}}) is DIBBS_BASIC_PLAN
+    assert _get_linkage_plan({"use_enhanced": True}) is DIBBS_ENHANCED_PLAN
+
+    algo_config = {"algorithm": copy.deepcopy(DIBBS_BASIC)}
+    plan = _get_linkage_plan({"algo_config": algo_config})
+    assert plan is not DIBBS_BASIC_PLAN
+    assert _get_linkage_plan({"algo_config": copy.deepcopy(algo_config)}) is plan
+
+
+def test_linkage_batch_bundle_with_no_patient():
+    test_bundle = load_test_bundle()
+    bad_bundle = {"entry": []}
+    actual_response = client.post(
+        "/link-record-batch",
+        json={"bundles": [test_bundle, bad_bundle]},
+    )
+    assert actual_response.status_code == status.HTTP_400_BAD_REQUEST
+    assert actual_response.json() == {
+        "message": "One or more supplied bundles contain no Patient resource "
+        "to link on.",
+        "results": [
+            {"found_match": False, "updated_bundle": test_bundle, "message": ""},
+            {"found_match": False, "updated_bundle": bad_bundle, "message": ""},
+        ],
+    }
+
+
+def test_linkage_batch_success():
+    test_bundle = load_test_bundle()
+    entry_list = copy.deepcopy(test_bundle["entry"])[:6]
+    bundles = []
+    for entry in entry_list:
+        bundle = copy.deepcopy(test_bundle)
+        bundle["entry"] = [entry]
+        bundles.append(bundle)
+
+    # The batch should link exactly as the bundles would one at a time
+    resp = client.post("/link-record-batch", json={"bundles": bundles})
+    assert resp.status_code == status.HTTP_200_OK
+    results = resp.json()["results"]
+    assert [r["found_match"] for r in results] == [
+        False,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+    persons = [
+        [
+            r.get("resource")
+            for r in result["updated_bundle"]["entry"]
+            if r.get("resource").get("resourceType") == "Person"
+        ][0]
+        for result in results
+    ]
+    assert persons[1].get("id") == persons[0].get("id")
+    assert len({p.get("id") for p in persons}) == 5
+
+    # Mismatched external IDs are rejected
+    resp = client.post(
+        "/link-record-batch",
+        json={"bundles": bundles, "external_person_ids": ["EXT-1"]},
+    )
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_linkage_batch_runs_off_the_event_loop():
+    test_bundle = load_test_bundle()
+    bundle = copy.deepcopy(test_bundle)
+    bundle["entry"] = copy.deepcopy(test_bundle["entry"])[:1]
+    event_loop_running = []
+
+    def link_records(records, **kwargs):
+        # Linking blocks on the database, so it mustn't run on the event loop
+        try:
+            asyncio.get_running_loop()
+            event_loop_running.append(True)
+        except RuntimeError:
+            event_loop_running.append(False)
+        return [(False, "person-id")] * len(records)
+
+    with mock.patch("app.main.link_records_against_mpi", side_effect=link_records):
+        resp = client.post("/link-record-batch", json={"bundles": [bundle]})
+    assert resp.status_code == status.HTTP_200_OK
+    assert event_loop_running == [False]
+
+
+def test_linkage_timings():
+    # Timing is disabled unless the service is configured to enable it
+    actual_response = client.get("/linkage-timings")
+    assert actual_response.status_code == 200
+    assert actual_response.json() == {"enabled": False, "stages": {}}
+
+    LINKAGE_TIMER.enable()
+    try:
+        test_bundle = load_test_bundle()
+        entry_list = copy.deepcopy(test_bundle["entry"])
+        bundle = test_bundle
+        bundle["entry"] = [entry_list[0]]
+        client.post("/link-record", json={"bundle": bundle})
+
+        actual_response = client.get("/linkage-timings", params={"reset": True})
+        timings = actual_response.json()
+        assert timings["enabled"]
+        assert timings["stages"]["insert"]["count"] == 1
+        assert set(timings["stages"]) <= {"block_fetch", "flatten", "compare", "insert"}
+        assert client.get("/linkage-timings").json()["stages"] == {}
+    finally:
+        LINKAGE_TIMER.disable()
+        LINKAGE_TIMER.reset()
+
+
+def test_block_cache_stats(monkeypatch):
+    # Blocks aren't cached unless the service is configured with a cache size
+    actual_response = client.get("/block-cache-stats")
+    assert actual_response.status_code == 200
+    assert actual_response.json() == {"enabled": False, "stats": {}}
+
+    block_cache = BlockCache()
+    monkeypatch.setattr("app.main.BLOCK_CACHE", block_cache)
+    monkeypatch.setattr(ASYNC_MPI_CLIENT, "block_cache", block_cache)
+    test_bundle = load_test_bundle()
+    entry_list = copy.deepcopy(test_bundle["entry"])
+    bundle = test_bundle
+    bundle["entry"] = [entry_list[0]]
+    client.post("/link-record", json={"bundle": bundle})
+
+    actual_response = client.get("/block-cache-stats", params={"reset": True})
+    stats = actual_response.json()
+    assert stats["enabled"]
+    assert stats["stats"]["hits"] == 0
+    assert stats["stats"]["misses"] > 0
+    assert stats["stats"]["max_size"] == 1024
+    # The new patient's blocks are invalidated when it's inserted
+    assert stats["stats"]["invalidations"] == stats["stats"]["misses"]
+    assert stats["stats"]["size"] == 0
+    assert client.get("/block-cache-stats").json()["stats"]["misses"] == 0
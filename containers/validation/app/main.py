@@ -10,12 +10,14 @@ from app.utils import check_for_and_extract_rr_data
 from app.utils import load_ecr_config
 from app.utils import read_json_from_assets
 from app.utils import validate_error_types
-from app.validation.validation import validate_ecr
+from app.validation.validation import EcrValidator
 
 # TODO: Remove hard coded location for config path
 # and/or provide a mechanism to pass in configuration
 #  via endpoint
 ecr_config = load_ecr_config()
+# Compile the configuration once, for every eCR to be validated against
+ecr_validator = EcrValidator(ecr_config)
 
 # Instantiate FastAPI via DIBBs' BaseService class
 app = BaseService(
@@ -34,8 +36,8 @@ def validate_ecr_msg(message: str, include_error_types: list) -> ValidateRespons
     :return: A dictionary with keys and values described by the ValidateResponse class.
     """
 
-    response_dict = validate_ecr(
-        ecr_message=message, config=ecr_config, include_error_types=include_error_types
+    response_dict = ecr_validator.validate(
+        ecr_message=message, include_error_types=include_error_types
     )
     return ValidateResponse(
         message_valid=response_dict.get("message_valid"),
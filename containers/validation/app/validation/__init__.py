@@ -3,6 +3,7 @@ from app.validation.validation import _append_error_message
 from app.validation.validation import _clear_all_errors_and_ids
 from app.validation.validation import _organize_error_messages
 from app.validation.validation import _response_builder
+from app.validation.validation import EcrValidator
 from app.validation.validation import validate_ecr
 from app.validation.xml_utils import _check_xml_names_and_attribs_exist
 from app.validation.xml_utils import _get_ecr_custom_message
@@ -12,6 +13,7 @@ from app.validation.xml_utils import _get_xml_relative_iterator
 from app.validation.xml_utils import _get_xml_relatives_details
 from app.validation.xml_utils import _validate_xml_related_element
 from app.validation.xml_utils import _validate_xml_relatives
+from app.validation.xml_utils import CompiledField
 from app.validation.xml_utils import ECR_NAMESPACES
 from app.validation.xml_utils import get_ecr_message_ids
 from app.validation.xml_utils import get_xml_element_details
@@ -21,6 +23,8 @@ from app.validation.xml_utils import validate_xml_value
 
 __all__ = [
     "validate_ecr",
+    "EcrValidator",
+    "CompiledField",
     "_organize_error_messages",
     "_response_builder",
     "_append_error_message",
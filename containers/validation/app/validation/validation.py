@@ -1,6 +1,6 @@
 from lxml import etree
 
-from app.validation.xml_utils import ECR_NAMESPACES
+from app.validation.xml_utils import CompiledField
 from app.validation.xml_utils import get_ecr_message_ids
 from app.validation.xml_utils import get_xml_element_details
 from app.validation.xml_utils import validate_xml_attributes
@@ -23,7 +23,8 @@ def validate_ecr(ecr_message: str, config: dict, include_error_types: list) -> d
     well as a list of error message types to include (default is all fatal
     errors, basic errors, warnings, and information).  The result of
     validation is returned in a dictionary that also contains a boolean
-    if the ecr message is valid or not.
+    if the ecr message is valid or not. To validate many messages against
+    the same configuration, create an `EcrValidator` once and reuse it.
 
     :param ecr_message: A eCR message that contains both eICR and RR fields.
     :param config: A dictionary of the requirements for validation of the
@@ -34,127 +35,185 @@ def validate_ecr(ecr_message: str, config: dict, include_error_types: list) -> d
     :return: A dictionary containing bool message_valid as well as a
         dictionary containing the validation results/errors.
     """
-    _clear_all_errors_and_ids()
-    # encoding ecr_message to allow it to be
-    #  parsed and organized as an lxml Element Tree Object
-    xml = ecr_message.encode("utf-8")
-    parser = etree.XMLParser(ns_clean=True, recover=True, encoding="utf-8")
-
-    # we need a try-catch around this to ensure that the ecr message
-    # passed in is proper XML - also ensure it's a clinical document
-    try:
-        parsed_ecr = etree.fromstring(xml, parser=parser)
-        parsed_ecr.xpath("//hl7:ClinicalDocument", namespaces=ECR_NAMESPACES)
+    return EcrValidator(config).validate(
+        ecr_message=ecr_message, include_error_types=include_error_types
+    )
 
-    except AttributeError:
-        _append_error_message(
-            error_message_type="fatal", message="eCR Message is not valid XML!"
-        )
-        return _response_builder(include_error_types=include_error_types)
 
-    _add_message_ids(get_ecr_message_ids(parsed_ecr=parsed_ecr))
-
-    for field in config.get("fields"):
-        # extract the specific information from the configuration
-        # for the different fields
-        cda_path = field.get("cdaPath")
+class EcrValidator:
+    """
+    Validates eCR messages against a validation configuration that is compiled
+    once, when the validator is created, with each field compiled to a
+    `CompiledField` that the xml_utils validation helpers check messages
+    against. The results of each validation are kept separately, so a single
+    validator can validate many messages at once from different threads.
+    """
 
-        # get a list of XML elements that match the field configuration
-        matched_xml_elements = validate_xml_elements(
-            xml_elements=parsed_ecr.xpath(cda_path, namespaces=ECR_NAMESPACES),
-            config_field=field,
-        )
-        error_message_type = (
-            field.get("errorType")
-            if field.get("errorType") in ERROR_MESSAGES.keys()
-            else "errors"
-        )
-        # if there are no xml elements that were valid for
-        # the configuration then store an error for that based
-        # upon the configured error message type
-        if not matched_xml_elements:
-            error_message = "Could not find field. " + get_xml_element_details(
-                None, field
+    def __init__(self, config: dict):
+        """
+        Creates a new EcrValidator, compiling the given configuration.
+
+        :param config: A dictionary of the requirements for validation of eCR
+          messages.
+        """
+        self.config = config
+        self._fields = [
+            (
+                CompiledField(field),
+                field.get("errorType")
+                if field.get("errorType") in ERROR_MESSAGES.keys()
+                else "errors",
+                "Could not find field. " + get_xml_element_details(None, field),
             )
+            for field in config.get("fields")
+        ]
+
+    def validate(self, ecr_message: str, include_error_types: list) -> dict:
+        """
+        Validates an ecr message (a combined RR and eICR), returning the result
+        of validation in a dictionary that also contains a boolean if the ecr
+        message is valid or not.
+
+        :param ecr_message: A eCR message that contains both eICR and RR fields.
+        :param include_error_types: A list of error message types to include
+            in the final validation response.
+        :return: A dictionary containing bool message_valid as well as a
+            dictionary containing the validation results/errors.
+        """
+        error_messages = _new_error_messages()
+        # encoding ecr_message to allow it to be
+        #  parsed and organized as an lxml Element Tree Object
+        xml = ecr_message.encode("utf-8")
+        parser = etree.XMLParser(ns_clean=True, recover=True, encoding="utf-8")
+
+        # ensure that the ecr message passed in is proper XML
+        parsed_ecr = etree.fromstring(xml, parser=parser)
+        if parsed_ecr is None:
             _append_error_message(
-                error_message_type=error_message_type, message=error_message
+                error_message_type="fatal",
+                message="eCR Message is not valid XML!",
+                error_messages=error_messages,
             )
-            continue
-        # continue the validation steps for xml attributes and values
-        attribute_errors = []
-        value_errors = []
-        for xml_element in matched_xml_elements:
-            attribute_errors += validate_xml_attributes(xml_element, field)
-            value_errors += validate_xml_value(xml_element, field)
-        # this handles a specific case where just ONE xml element
-        # must meet the attribute or xml value criteria - otherwise
-        # you wil want to include an error.
-        if not (
-            field.get("validateOne")
-            and len(attribute_errors) < len(matched_xml_elements)
-            and len(value_errors) < len(matched_xml_elements)
-        ):
-            for attribute_error in attribute_errors:
+            return _response_builder(
+                include_error_types=include_error_types, error_messages=error_messages
+            )
+
+        _add_message_ids(
+            get_ecr_message_ids(parsed_ecr=parsed_ecr), error_messages=error_messages
+        )
+
+        for field, error_message_type, missing_message in self._fields:
+            # get a list of XML elements that match the field configuration
+            matched_xml_elements = validate_xml_elements(
+                xml_elements=field.xpath(parsed_ecr), config_field=field
+            )
+            # if there are no xml elements that were valid for
+            # the configuration then store an error for that based
+            # upon the configured error message type
+            if not matched_xml_elements:
                 _append_error_message(
-                    error_message_type=error_message_type, message=attribute_error
+                    error_message_type=error_message_type,
+                    message=missing_message,
+                    error_messages=error_messages,
                 )
-            for value_error in value_errors:
+                continue
+            # continue the validation steps for xml attributes and values
+            attribute_errors = []
+            value_errors = []
+            for xml_element in matched_xml_elements:
+                attribute_errors += validate_xml_attributes(xml_element, field)
+                value_errors += validate_xml_value(xml_element, field)
+            # this handles a specific case where just ONE xml element
+            # must meet the attribute or xml value criteria - otherwise
+            # you wil want to include an error.
+            if not (
+                field.config.get("validateOne")
+                and len(attribute_errors) < len(matched_xml_elements)
+                and len(value_errors) < len(matched_xml_elements)
+            ):
                 _append_error_message(
-                    error_message_type=error_message_type, message=value_error
+                    error_message_type=error_message_type,
+                    message=attribute_errors + value_errors,
+                    error_messages=error_messages,
                 )
-    response = _response_builder(include_error_types=include_error_types)
-    return response
+        return _response_builder(
+            include_error_types=include_error_types, error_messages=error_messages
+        )
 
 
-def _organize_error_messages(include_error_types: list) -> None:
+def _new_error_messages() -> dict:
+    """
+    Returns an empty set of validation results.
+    """
+    return {
+        "fatal": [],
+        "errors": [],
+        "warnings": [],
+        "information": [],
+        "message_ids": {},
+    }
+
+
+def _organize_error_messages(
+    include_error_types: list, error_messages: dict = None
+) -> None:
     # utilize the error_types to filter out the different error message
     # types as well as specify the difference between the different error types
     # during the validation process
+    if error_messages is None:
+        error_messages = ERROR_MESSAGES
 
     # fatal warnings cannot be filtered and will be automatically included!
     # also, let's not wipe out the message_ids dictionary
-    for error_type in ERROR_MESSAGES.keys():
+    for error_type in error_messages.keys():
         if (
             error_type not in ("fatal", "message_ids")
             and error_type not in include_error_types
         ):
-            ERROR_MESSAGES[error_type] = []
+            error_messages[error_type] = []
 
 
-def _response_builder(include_error_types: list) -> dict:
-    if ERROR_MESSAGES.get("fatal") != []:
+def _response_builder(include_error_types: list, error_messages: dict = None) -> dict:
+    if error_messages is None:
+        error_messages = ERROR_MESSAGES
+    if error_messages.get("fatal") != []:
         valid = False
     else:
         valid = True
         _append_error_message(
             error_message_type="information",
             message="Validation completed with no fatal errors!",
+            error_messages=error_messages,
         )
-    _organize_error_messages(include_error_types=include_error_types)
+    _organize_error_messages(
+        include_error_types=include_error_types, error_messages=error_messages
+    )
 
-    return {"message_valid": valid, "validation_results": ERROR_MESSAGES}
+    return {"message_valid": valid, "validation_results": error_messages}
 
 
-def _append_error_message(error_message_type: str, message: str) -> None:
-    if error_message_type in ERROR_MESSAGES.keys():
+def _append_error_message(
+    error_message_type: str, message: str, error_messages: dict = None
+) -> None:
+    if error_messages is None:
+        error_messages = ERROR_MESSAGES
+    if error_message_type in error_messages.keys():
         if isinstance(message, list):
             for msg in message:
                 if msg is not None and msg.strip() != "":
-                    ERROR_MESSAGES[error_message_type].append(msg.strip())
+                    error_messages[error_message_type].append(msg.strip())
         elif message is not None and message.strip() != "":
-            ERROR_MESSAGES[error_message_type].append(message.strip())
+            error_messages[error_message_type].append(message.strip())
 
 
-def _add_message_ids(ids: dict) -> None:
+def _add_message_ids(ids: dict, error_messages: dict = None) -> None:
+    if error_messages is None:
+        error_messages = ERROR_MESSAGES
     if ids:
-        ERROR_MESSAGES["message_ids"] = ids
+        error_messages["message_ids"] = ids
     else:
-        ERROR_MESSAGES["message_ids"] = {}
+        error_messages["message_ids"] = {}
 
 
 def _clear_all_errors_and_ids() -> None:
-    ERROR_MESSAGES["fatal"] = []
-    ERROR_MESSAGES["errors"] = []
-    ERROR_MESSAGES["information"] = []
-    ERROR_MESSAGES["warnings"] = []
-    ERROR_MESSAGES["message_ids"] = {}
+    ERROR_MESSAGES.update(_new_error_messages())
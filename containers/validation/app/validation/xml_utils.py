@@ -1,3 +1,4 @@
+import itertools
 import re
 
 from lxml import etree
@@ -7,6 +8,9 @@ RR_MSG_ID_XPATH = "//hl7:ClinicalDocument/hl7:section/hl7:id"
 
 XML_PATH_DELIMITER = "/"
 
+# Matches the name of the last element in a cdaPath
+XML_TAG_NAME_PATTERN = re.compile(r"(?!\:)[a-zA-z]+\w$")
+
 ECR_NAMESPACES = {
     "hl7": "urn:hl7-org:v3",
     "xsi": "http://www.w3.org/2005/Atom",
@@ -15,6 +19,9 @@ ECR_NAMESPACES = {
     "voc": "http://www.lantanagroup.com/voc",
 }
 
+_EICR_MSG_ID_XPATH = etree.XPath(EICR_MSG_ID_XPATH, namespaces=ECR_NAMESPACES)
+_RR_MSG_ID_XPATH = etree.XPath(RR_MSG_ID_XPATH, namespaces=ECR_NAMESPACES)
+
 
 def _get_xml_message_id(id_xml_tag: etree.Element) -> dict:
     # extracts the message id from the root and extension
@@ -33,16 +40,86 @@ def get_ecr_message_ids(parsed_ecr) -> dict:
     """
     Get the message ids for the eICR and the RR
     """
-    xml_eicr_id = _get_xml_message_id(
-        parsed_ecr.xpath(EICR_MSG_ID_XPATH, namespaces=ECR_NAMESPACES)
-    )
-    xml_rr_id = _get_xml_message_id(
-        parsed_ecr.xpath(RR_MSG_ID_XPATH, namespaces=ECR_NAMESPACES)
-    )
+    xml_eicr_id = _get_xml_message_id(_EICR_MSG_ID_XPATH(parsed_ecr))
+    xml_rr_id = _get_xml_message_id(_RR_MSG_ID_XPATH(parsed_ecr))
 
     return {"eicr": xml_eicr_id, "rr": xml_rr_id}
 
 
+class CompiledField:
+    """
+    A field, or a relative of a field, in a validation configuration, compiled
+    so that it can be checked against many xml elements: its cdaPath is compiled
+    to an XPath, its value and attribute patterns are compiled to regular
+    expressions and, for a relative, the number of levels between it and its
+    field is worked out. The validation helpers in this module accept either a
+    compiled field or the configuration of the field.
+    """
+
+    def __init__(self, config_field: dict, base_cda_path: str = None):
+        """
+        Compiles a field in a validation configuration.
+
+        :param config_field: A dictionary of the requirements of the field.
+        :param base_cda_path: The cdaPath of the field this field is a relative
+          of, if it is one. Default: `None`.
+        """
+        self.config = config_field
+        self.cda_path = config_field.get("cdaPath")
+        self.tag_name = (
+            XML_TAG_NAME_PATTERN.search(self.cda_path).group(0)
+            if self.cda_path
+            else None
+        )
+        self.lower_tag_name = self.tag_name.lower() if self.tag_name else None
+        self.match_attributes = config_field.get("validateAll") != "True"
+        self.attributes = [
+            (
+                attribute.get("attributeName"),
+                re.compile(attribute.get("regEx")) if "regEx" in attribute else None,
+            )
+            for attribute in config_field.get("attributes") or []
+        ]
+        self.text_required = config_field.get("textRequired")
+        self.value_regex = config_field.get("regEx")
+        self.value_pattern = (
+            re.compile(self.value_regex) if self.value_regex is not None else None
+        )
+
+        if base_cda_path is not None:
+            self.depth_difference = _get_xml_depth_difference(
+                base_cda_path, self.cda_path
+            )
+            self.xpath = None
+            self.relatives = []
+            return
+
+        self.depth_difference = None
+        self.xpath = (
+            etree.XPath(self.cda_path, namespaces=ECR_NAMESPACES)
+            if self.cda_path
+            else None
+        )
+        self.relatives = [
+            CompiledField(relative, base_cda_path=self.cda_path)
+            for relative in config_field.get("relatives") or []
+        ]
+
+
+def _compile_field(config_field) -> CompiledField:
+    """
+    Returns the compiled field for a field's configuration, or the field itself
+    if it has already been compiled.
+
+    :param config_field: A dictionary of the requirements of the field, or a
+        `CompiledField`.
+    :return: The compiled field.
+    """
+    if isinstance(config_field, CompiledField):
+        return config_field
+    return CompiledField(config_field)
+
+
 def validate_xml_elements(xml_elements, config_field) -> list:
     """
     Matches the xml_elements to the config field requirements for
@@ -50,16 +127,18 @@ def validate_xml_elements(xml_elements, config_field) -> list:
     values, and attributes. Returns list of matching fields.
 
     :param xml_elements: A list of xml elements
-    :param config_field: A dictionary of the requirements of the field.
+    :param config_field: A dictionary of the requirements of the field,
+        or a `CompiledField`.
     :return: A list of matched xml elemnts
     """
     if not xml_elements:
         return []
+    field = _compile_field(config_field)
     validated_elements = []
     for xml_element in xml_elements:
-        if not _validate_xml_relatives(xml_element, config_field):
+        if not _validate_xml_relatives(xml_element, field):
             continue
-        found = _check_xml_names_and_attribs_exist(xml_element, config_field)
+        found = _check_xml_names_and_attribs_exist(xml_element, field)
         if found:
             validated_elements.append(xml_element)
     return validated_elements
@@ -74,26 +153,20 @@ def _validate_xml_relatives(xml_element, config_field) -> bool:
     :param xml_element: The key xml element that is being evaluated as
         well as its relative xml elements.
     :param config_field: A dictionary of the requirements for validating
-        the key xml elements relative xml elements.
+        the key xml elements relative xml elements, or a `CompiledField`.
     :return: Bool - True if all relative xml elements match the criteria
         specified in the configuration, otherwise false.
     """
-    relatives_valid = True
-    relatives = config_field.get("relatives")
-    if relatives is None:
-        return relatives_valid
-    for relative_config in relatives:
-        base_cda_path = config_field.get("cdaPath")
-        if (
-            _validate_xml_related_element(
-                xml_element=xml_element,
-                cda_path=base_cda_path,
-                relative_config=relative_config,
-            )
-            is None
-        ):
-            relatives_valid = False
-    return relatives_valid
+    field = _compile_field(config_field)
+    return all(
+        _validate_xml_related_element(
+            xml_element=xml_element,
+            cda_path=field.cda_path,
+            relative_config=relative,
+        )
+        is not None
+        for relative in field.relatives
+    )
 
 
 def _check_xml_names_and_attribs_exist(xml_element, config_field) -> bool:
@@ -103,43 +176,33 @@ def _check_xml_names_and_attribs_exist(xml_element, config_field) -> bool:
 
     :param xml_element: The key xml element that is being evaluated.
     :param config_field: A dictionary of the requirements for validating
-        the key xml elements name and attributes
+        the key xml elements name and attributes, or a `CompiledField`.
     :return: Bool - True if the name and attributes exist in the passed in
         xml element, otherwise false.
     """
+    field = _compile_field(config_field)
     # If the configuration specified field name doesn't match the xml elements
     # tag name, then return false to go to the next xml element
-    field_name = re.search(r"(?!\:)[a-zA-z]+\w$", config_field.get("cdaPath")).group(0)
-
-    if field_name.lower() not in xml_element.tag.lower():
+    if field.lower_tag_name not in xml_element.tag.lower():
         return False
 
     # Don't try to evaluate matches for the xml element's attributes
     # if we are validating all fields as indicated in the configuration
     # for the field/xml element
-    match_attributes = False if config_field.get("validateAll") == "True" else True
-    if not match_attributes:
+    if not field.match_attributes:
         return True
 
     # Check if the xml element passed in has the right attributes
-    #  and if the values of the attribute correspond to the
-    #  requirements in the configuration
-    field_attributes = config_field.get("attributes")
-    if field_attributes:
-        for attribute in field_attributes:
-            # If field is supposed to have an attribute and doesn't,
-            # return that the field has failed validation for that
-            # attribute.
-            if not xml_element.get(attribute.get("attributeName")):
-                return False
-    else:
-        # If there are not specified attributes to validate within the
-        # configuration, but there are attributes in the xml element
-        # then return a False/Fail
-        # TODO: is this how this should be working??
-        if xml_element.attrib:
-            return False
-    return True
+    if field.attributes:
+        # If field is supposed to have an attribute and doesn't,
+        # return that the field has failed validation for that
+        # attribute.
+        return all(xml_element.get(name) for name, _ in field.attributes)
+    # If there are not specified attributes to validate within the
+    # configuration, but there are attributes in the xml element
+    # then return a False/Fail
+    # TODO: is this how this should be working??
+    return not xml_element.attrib
 
 
 def _validate_xml_related_element(xml_element, cda_path, relative_config) -> str:
@@ -153,62 +216,45 @@ def _validate_xml_related_element(xml_element, cda_path, relative_config) -> str
 
     :param xml_element: The key xml element.
     :param cda_path: A string representing the location of the key xml element.
-    :param config_field: A dictionary of the requirements for the related xml element.
+    :param relative_config: A dictionary of the requirements for the related xml
+        element, or a `CompiledField` compiled as a relative of the key xml element.
     :return: A related xml element if the related xml element meets the configured
         criteria, otherwise return None.
     """
     if xml_element is None:
         return None
-    relative_cda_path = relative_config.get("cdaPath")
-    relative_tag_name = re.search(
-        r"(?!\:)[a-zA-z]+\w$", relative_config.get("cdaPath")
-    ).group(0)
+    relative = (
+        relative_config
+        if isinstance(relative_config, CompiledField)
+        else CompiledField(relative_config, base_cda_path=cda_path)
+    )
 
-    xml_iterator = _get_xml_relative_iterator(cda_path, relative_cda_path, xml_element)
+    related_xml_elements = _get_xml_relatives_at_depth(
+        xml_element, relative.depth_difference
+    )
+    if relative.depth_difference > 0:
+        # An ancestor is only considered if it has children, and is
+        # followed by all but its first child
+        related_xml_elements = (
+            [related_xml_elements] + list(related_xml_elements)[1:]
+            if related_xml_elements is not None and len(related_xml_elements)
+            else []
+        )
 
-    # if there are no related xml elements based upon the
-    # specified cda paths then just return None
-    if xml_iterator is None or len(xml_iterator) == 0:
+    # The first related xml element with the relative's tag name
+    # must meet the relative's criteria
+    for related_xml_element in related_xml_elements:
+        if (
+            not isinstance(related_xml_element.tag, str)
+            or relative.tag_name not in related_xml_element.tag
+        ):
+            continue
+        if _check_xml_names_and_attribs_exist(
+            related_xml_element, relative
+        ) and not validate_xml_attributes(related_xml_element, relative):
+            return related_xml_element
         return None
-
-    # sibling, descendant, child iterators
-    # are of different type than ancestors
-    # It's not clear why, but this prevents errors
-    # and ensures that we have the correct element tag
-    # and related element
-    try:
-        related_xml_element_tag = xml_iterator.tag
-        related_xml_element = xml_iterator
-    except Exception as e:
-        print(e)
-        related_xml_element = None
-        related_xml_element_tag = None
-
-    for xi in xml_iterator:
-        # loop through iterator - unless it's
-        # a ancestor - if that is the case then
-        # the iterator itself IS the proper related
-        # element and we want to use that - otherwise
-        # loop through the list of elements in the list
-        if related_xml_element_tag is None:
-            related_xml_element = xi
-            related_xml_element_tag = related_xml_element.tag
-
-        if relative_tag_name in related_xml_element_tag:
-            relative_validated = _check_xml_names_and_attribs_exist(
-                xml_element=related_xml_element, config_field=relative_config
-            )
-            relative_attributes_validated = validate_xml_attributes(
-                related_xml_element, relative_config
-            )
-
-            if not relative_validated or len(relative_attributes_validated) != 0:
-                return None
-            else:
-                return related_xml_element
-        else:
-            related_xml_element = None
-            related_xml_element_tag = None
+    return None
 
 
 def _get_xml_relative_iterator(cda_path, relative_cda_path, xml_element) -> list:
@@ -226,39 +272,60 @@ def _get_xml_relative_iterator(cda_path, relative_cda_path, xml_element) -> list
     """
     if xml_element is None:
         return None
-    # get the difference of the number of '/' between the key cda_path and the
-    # relative_cda_path
-    diff = len(cda_path.split(XML_PATH_DELIMITER)) - len(
+    return _get_xml_relatives_at_depth(
+        xml_element, _get_xml_depth_difference(cda_path, relative_cda_path)
+    )
+
+
+def _get_xml_depth_difference(cda_path, relative_cda_path) -> int:
+    """
+    Gets the number of levels a relative xml element is above (positive)
+    or below (negative) the key xml element, from the difference of the
+    number of '/' between the key cda_path and the relative_cda_path.
+
+    :param cda_path: A string representing the location of the key xml element.
+    :param relative_cda_path: A string representing the path of the relative
+        xml element.
+    :return: The difference in depth of the two paths.
+    """
+    return len(cda_path.split(XML_PATH_DELIMITER)) - len(
         relative_cda_path.split(XML_PATH_DELIMITER)
     )
+
+
+def _get_xml_relatives_at_depth(xml_element, depth_difference):
+    """
+    Gets the xml elements related to the key xml element at a difference in
+    depth worked out by `_get_xml_depth_difference`.
+
+    :param xml_element: The key xml element.
+    :param depth_difference: The number of levels the relative xml elements
+        are above (positive) or below (negative) the key xml element.
+    :return: The ancestor at that level, if it's an ancestor, otherwise an
+        lxml defined iterator of the relative xml elements.
+    """
     # element is on the same level of the main element
-    if diff == 0:
-        iter = []
-        iter_forward = xml_element.itersiblings()
-        iter_reverse = xml_element.itersiblings(preceding=True)
-        for e in iter_forward:
-            iter.append(e)
-        for e in iter_reverse:
-            iter.append(e)
-        return iter
+    if depth_difference == 0:
+        return itertools.chain(
+            xml_element.itersiblings(), xml_element.itersiblings(preceding=True)
+        )
     # element is an acestor to the main element
-    elif diff > 0:
+    elif depth_difference > 0:
         # get all the ancestors and put them into a list
         # and then get the one that is at the level
         # equal to the diff -1 (to account for array numbering)
-
-        if len(list(xml_element.iterancestors())) < diff - 1:
+        ancestors = list(xml_element.iterancestors())
+        if len(ancestors) < depth_difference:
             return None
-        xml_relative_element = list(xml_element.iterancestors())[diff - 1]
-        return xml_relative_element
+        return ancestors[depth_difference - 1]
     # element is a child of the main element
-    elif diff == -1:
-        return list(xml_element.iterchildren())
+    elif depth_difference == -1:
+        return xml_element.iterchildren()
     # if diff is < -1 then it's a descendant and it's
     # going to have to return all tags under the base
     # xml element
     else:
-        return list(xml_element.iterdescendants())
+        return xml_element.iterdescendants()
 
 
 def validate_xml_attributes(xml_element, config_field) -> list:
@@ -272,34 +339,35 @@ def validate_xml_attributes(xml_element, config_field) -> list:
     :param xml_element: The xml element that will have its attributes validated.
     :param config_field: A dictionary that contains the configuration that
         specifies what the attribute(s) for the xml element should be named
-        and how the values should be patterned.
+        and how the values should be patterned, or a `CompiledField`.
     :return: A list of errors or an empty list.  If the list is empty then
         the validation was successful.
     """
-    config_attribs = config_field.get("attributes")
-    if not config_attribs:
+    field = _compile_field(config_field)
+    if not field.attributes:
         return []
 
     error_messages = []
-    for attribute in config_attribs:
-        if "attributeName" in attribute:
-            attribute_name = attribute.get("attributeName")
+    attribute_name = None
+    attribute_value = None
+    for name, pattern in field.attributes:
+        if name is not None:
+            attribute_name = name
             attribute_value = xml_element.get(attribute_name)
             if not attribute_value:
                 message = _get_ecr_custom_message(
-                    config_field,
+                    field.config,
                     f"Could not find attribute '{attribute_name}'. "
-                    + f"{get_xml_element_details(xml_element, config_field)}",
+                    + f"{get_xml_element_details(xml_element, field.config)}",
                 )
                 error_messages.append(message)
-        if "regEx" in attribute:
-            pattern = re.compile(attribute.get("regEx"))
+        if pattern is not None:
             if (not attribute_value) or (not pattern.match(attribute_value)):
                 message = _get_ecr_custom_message(
-                    config_field,
+                    field.config,
                     f"Attribute: '{attribute_name}'"
                     + " not in expected format. "
-                    + f"{get_xml_element_details(xml_element, config_field)}",
+                    + f"{get_xml_element_details(xml_element, field.config)}",
                 )
                 error_messages.append(message)
     return error_messages
@@ -425,26 +493,26 @@ def validate_xml_value(xml_element, config_field) -> list:
 
     :param xml_element: The key xml element being evaluated.
     :param config_field: A dictionary that contains the configuration information
-        necessary to validate the location and value of the key xml element
+        necessary to validate the location and value of the key xml element, or
+        a `CompiledField`.
     :return: A list of error messages if validation fails, otherwise an
         empty list.
     """
+    field = _compile_field(config_field)
     # If value for xml element is not required return empty list
-    if not config_field.get("textRequired"):
+    if not field.text_required:
         return []
 
     value = "".join(xml_element.itertext())
-    config_regex = config_field.get("regEx")
     # first check if the value matches the regex from the config
-    if config_regex is not None:
-        pattern = re.compile(config_regex)
-        if pattern.match(value) is None:
+    if field.value_pattern is not None:
+        if field.value_pattern.match(value) is None:
             message = _get_ecr_custom_message(
-                config_field,
+                field.config,
                 "The field value does not exist or "
                 + "doesn't match the following pattern: '"
-                + config_regex
-                + f"'. For the {get_xml_element_details(xml_element, config_field)}",
+                + field.value_regex
+                + f"'. For the {get_xml_element_details(xml_element, field.config)}",
             )
             return [message]
         else:
@@ -455,8 +523,8 @@ def validate_xml_value(xml_element, config_field) -> list:
             return []
         else:
             message = _get_ecr_custom_message(
-                config_field,
+                field.config,
                 "Field does not have a value. "
-                + f"{get_xml_element_details(xml_element, config_field)}",
+                + f"{get_xml_element_details(xml_element, field.config)}",
             )
             return [message]
@@ -1,4 +1,5 @@
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
 from app.main import app
 from app.main import validate_ecr_msg
@@ -106,6 +107,25 @@ def test_validate_ecr_invalid():
     assert actual_result3 == expected_result3
 
 
+def test_validate_ecr_msg_in_parallel():
+    messages = [sample_file_good_with_RR, sample_file_bad] * 20
+    expected_results = [
+        validate_ecr_msg(message=message, include_error_types=test_error_types)
+        for message in messages
+    ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(
+                lambda message: validate_ecr_msg(
+                    message=message, include_error_types=test_error_types
+                ),
+                messages,
+            )
+        )
+    assert results == expected_results
+    assert [result.message_valid for result in results[:2]] == [True, False]
+
+
 def test_validate_elr():
     result = validate_elr_msg("my elr contents", test_error_types)
     assert result == {
@@ -1,7 +1,10 @@
 import copy
+from typing import List
 
 from phdi.fhir.geospatial.core import BaseFhirGeocodeClient
+from phdi.geospatial.cache import GeocodeCache
 from phdi.geospatial.census import CensusGeocodeClient
+from phdi.geospatial.core import GeocodeResult
 
 
 class CensusFhirGeocodeClient(BaseFhirGeocodeClient):
@@ -10,8 +13,14 @@ class CensusFhirGeocodeClient(BaseFhirGeocodeClient):
     formatted data using the Census API.
     """
 
-    def __init__(self):
-        self.__client = CensusGeocodeClient()
+    def __init__(self, cache: GeocodeCache = None):
+        """
+        Creates a new FHIR Census geocoding client.
+
+        :param cache: Optionally, a cache of geocoding results to check before
+          calling the Census API. Default: None.
+        """
+        self.__client = CensusGeocodeClient(cache=cache)
 
     def geocode_resource(self, resource: dict, overwrite=True) -> dict:
         """
@@ -51,20 +60,30 @@ class CensusFhirGeocodeClient(BaseFhirGeocodeClient):
 
             # Update fields with new, standardized information
             if standardized_address:
-                address["city"] = standardized_address.city
-                address["state"] = standardized_address.state
-                address["postalCode"] = standardized_address.postal_code
-                self._store_lat_long_extension(
-                    address, standardized_address.lat, standardized_address.lng
-                )
-                self._store_census_tract_extension(
-                    address, standardized_address.census_tract
-                )
+                self._update_address(address, standardized_address)
 
                 # Remove dict entry needed only for geocode_from_dict()
                 del address["street"]
 
-    def geocode_bundle(self, bundle: dict, overwrite=True) -> dict:
+    def _update_address(
+        self, address: dict, standardized_address: GeocodeResult
+    ) -> None:
+        """
+        Updates a FHIR-formatted address in-place with the standardized
+        information from geocoding it.
+
+        :param address: A FHIR-formatted address.
+        :param standardized_address: The result of geocoding the address.
+        """
+        address["city"] = standardized_address.city
+        address["state"] = standardized_address.state
+        address["postalCode"] = standardized_address.postal_code
+        self._store_lat_long_extension(
+            address, standardized_address.lat, standardized_address.lng
+        )
+        self._store_census_tract_extension(address, standardized_address.census_tract)
+
+    def geocode_bundle(self, bundle: dict, overwrite=True, batch=False) -> dict:
         """
         Performs geocoding on all resources in a given FHIR bundle whose
         resource type is among those supported by the PHDI SDK. Currently,
@@ -76,8 +95,13 @@ class CensusFhirGeocodeClient(BaseFhirGeocodeClient):
         :param overwrite: Whether to overwrite the address data in the given
           bundle's resources (True), or whether to create a copy of the bundle
           and overwrite that instead (False). Defaults to True.
+        :param batch: Whether to geocode the addresses in the bundle together, as
+          by `geocode_bundles` (True), or one at a time (False). Defaults to False.
         :return: A FHIR bundle with geocoded address(es).
         """
+        if batch:
+            return self.geocode_bundles([bundle], overwrite=overwrite)[0]
+
         if not overwrite:
             bundle = copy.deepcopy(bundle)
 
@@ -85,3 +109,38 @@ class CensusFhirGeocodeClient(BaseFhirGeocodeClient):
             self.geocode_resource(entry.get("resource", {}), overwrite=True)
 
         return bundle
+
+    def geocode_bundles(self, bundles: List[dict], overwrite=True) -> List[dict]:
+        """
+        Geocodes all supported resources in the given FHIR bundles together.
+        The addresses with a street line in all the bundles are collected, and
+        each distinct address is uploaded once to the Census batch geocoder.
+        Currently, this includes:
+
+            - Patient
+
+        :param bundles: A list of bundles of FHIR resources.
+        :param overwrite: Whether to overwrite the address data in the given
+          bundles' resources (True), or whether to create copies of the bundles
+          and overwrite those instead (False). Defaults to True.
+        :return: The FHIR bundles with geocoded address(es).
+        """
+        if not overwrite:
+            bundles = copy.deepcopy(bundles)
+
+        addresses = self._get_geocodable_addresses(bundles)
+        standardized_addresses = self.__client.geocode_batch(
+            [
+                {
+                    "street": " ".join(address["line"]),
+                    "city": address.get("city", ""),
+                    "state": address.get("state", ""),
+                }
+                for address in addresses
+            ]
+        )
+        for address, standardized_address in zip(addresses, standardized_addresses):
+            if standardized_address:
+                self._update_address(address, standardized_address)
+
+        return bundles
@@ -1,5 +1,6 @@
 from abc import ABC
 from abc import abstractmethod
+from typing import List
 
 
 class BaseFhirGeocodeClient(ABC):
@@ -37,6 +38,42 @@ class BaseFhirGeocodeClient(ABC):
         """
         pass  # pragma: no cover
 
+    def geocode_bundles(self, bundles: List[dict], overwrite=True) -> List[dict]:
+        """
+        Performs geocoding, using the implementing client, on all supported resources in
+        the provided FHIR bundles. Implementing classes should override this to
+        geocode the addresses of all the bundles together, in as few requests as the
+        vendor allows; by default, each bundle is geocoded in turn.
+
+        :param bundles: A list of bundles of FHIR resources.
+        :param overwrite: If true, `bundles` are modified in-place;
+          if false, copies of `bundles` are modified and returned.  Default: `True`
+        :return: The geocoded FHIR bundles, as a list of dicts.
+        """
+        return [self.geocode_bundle(bundle, overwrite=overwrite) for bundle in bundles]
+
+    @staticmethod
+    def _get_geocodable_addresses(bundles: List[dict]) -> List[dict]:
+        """
+        Collects the addresses of every supported resource in the provided FHIR
+        bundles that have a street line, and so can be geocoded. Currently
+        supported resource types are:
+
+        * Patient
+
+        :param bundles: A list of bundles of FHIR resources.
+        :return: A list of the FHIR-formatted addresses, which can be modified
+          in-place to update the bundles.
+        """
+        return [
+            address
+            for bundle in bundles
+            for entry in bundle.get("entry", [])
+            if entry.get("resource", {}).get("resourceType", "") == "Patient"
+            for address in entry["resource"].get("address", [])
+            if any(address.get("line", []))
+        ]
+
     @staticmethod
     def _store_lat_long_extension(address: dict, lat: float, long: float) -> None:
         """
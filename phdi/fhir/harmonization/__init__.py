@@ -1,5 +1,6 @@
 from phdi.fhir.harmonization.standardization import double_metaphone_bundle
 from phdi.fhir.harmonization.standardization import double_metaphone_patient
+from phdi.fhir.harmonization.standardization import standardize_bundle
 from phdi.fhir.harmonization.standardization import standardize_dob
 from phdi.fhir.harmonization.standardization import standardize_names
 from phdi.fhir.harmonization.standardization import standardize_phones
@@ -7,6 +8,7 @@ from phdi.fhir.harmonization.standardization import standardize_phones
 __all__ = (
     "double_metaphone_bundle",
     "double_metaphone_patient",
+    "standardize_bundle",
     "standardize_names",
     "standardize_phones",
     "standardize_dob",
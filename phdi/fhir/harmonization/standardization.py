@@ -10,6 +10,10 @@ from phdi.harmonization import standardize_country_code
 from phdi.harmonization import standardize_name
 from phdi.harmonization import standardize_phone
 
+# The standardizers `standardize_bundle` can apply, in the order they're applied
+STANDARDIZERS = ("names", "phones", "dob", "double_metaphone")
+DEFAULT_STANDARDIZERS = ("names", "phones", "dob")
+
 
 def double_metaphone_bundle(bundle: dict, overwrite=True) -> dict:
     """
@@ -91,6 +95,75 @@ def double_metaphone_patient(patient: dict, dmeta=None, overwrite=True) -> dict:
     return patient
 
 
+def standardize_bundle(
+    data: dict,
+    standardizers: List[str] = DEFAULT_STANDARDIZERS,
+    trim: bool = True,
+    case: Literal["upper", "lower", "title"] = "upper",
+    remove_numbers: bool = True,
+    dob_format: str = "%Y-%m-%d",
+    overwrite: bool = True,
+) -> dict:
+    """
+    Applies several standardizations to a given FHIR bundle or a FHIR resource
+    in a single pass over its resources, rather than one pass (and, for
+    services, one request) per standardization. Standardizers are applied to
+    each resource in the order names, phones, date of birth, then double
+    metaphone, so that phonetic encodings are computed from standardized names.
+
+    :param data: A FHIR bundle or FHIR-formatted JSON dict.
+    :param standardizers: The standardizations to apply, any of "names",
+      "phones", "dob" and "double_metaphone". Default: names, phones and dob.
+    :param trim: Whether leading/trailing whitespace should be removed from
+      names. Default: `True`
+    :param case: The type of casing that should be used for names.
+      Default: `upper`
+    :param remove_numbers: If true, delete numeric characters from names; if
+      false leave numbers in place. Default: `True`
+    :param dob_format: A python DateTime format used to parse the birthDate
+      within the Patient resource.  Default: `%Y-%m-%d` (also known as YYYY-MM-DD)
+    :param overwrite: If true, `data` is modified in-place;
+      if false, a copy of `data` modified and returned.  Default: `True`
+    :raises ValueError: If an unknown standardizer is requested, or a Patient
+      has no birth date to standardize.
+    :return: The bundle or resource with the requested standardizations applied.
+    """
+    unknown_standardizers = set(standardizers) - set(STANDARDIZERS)
+    if unknown_standardizers:
+        raise ValueError(
+            f"Unknown standardizers: {sorted(unknown_standardizers)}. "
+            f"Valid values are {list(STANDARDIZERS)}."
+        )
+
+    # Copy the data once, up front, so each standardizer can work in place
+    if not overwrite:
+        data = copy.deepcopy(data)
+
+    # Allow users to pass in either a resource or a bundle
+    bundle = data
+    if "entry" not in data:
+        bundle = {"entry": [{"resource": data}]}
+
+    dmeta = DoubleMetaphone() if "double_metaphone" in standardizers else None
+    for entry in bundle.get("entry"):
+        resource = entry.get("resource", {})
+        if "names" in standardizers:
+            _standardize_names_in_resource(resource, trim, case, remove_numbers)
+        if "phones" in standardizers:
+            _standardize_phones_in_resource(resource)
+        if "dob" in standardizers:
+            _standardize_dob_in_resource(resource, dob_format)
+        if (
+            "double_metaphone" in standardizers
+            and resource.get("resourceType", "") == "Patient"
+        ):
+            double_metaphone_patient(resource, dmeta)
+
+    if "entry" not in data:
+        return bundle.get("entry", [{}])[0].get("resource", {})
+    return bundle
+
+
 def standardize_names(
     data: dict,
     trim: bool = True,
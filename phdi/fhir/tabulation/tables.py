@@ -1,8 +1,12 @@
 import json
 import pathlib
+import queue
+import threading
 import urllib.parse
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Tuple
 from typing import Union
@@ -604,11 +608,21 @@ def generate_tables(
     output_params: dict,
     fhir_url: str,
     cred_manager: BaseCredentialManager = None,
+    prefetch_pages: int = 0,
+    max_concurrent_tables: int = 1,
+    max_requests: int = None,
 ) -> None:
     """
     Queries a FHIR server for information, and generates and stores the tables in the
     desired location, according to the supplied schema.
 
+    By default, each page of search results is fetched, tabulated and written before
+    the next page is requested, one table at a time. Setting `prefetch_pages` or
+    `max_concurrent_tables` instead pipelines the export: upcoming pages of each
+    table are fetched while earlier pages are tabulated, several tables can be
+    exported at once, and a single writer writes every table's pages, in order, as
+    they're tabulated.
+
     :param schema_path: A path to the location of a schema config file.
     :param output_params: A dictionary of dictionaries containing the parameters for
         writing each table specified in the schema. For each table in the schema, the
@@ -616,7 +630,23 @@ def generate_tables(
         minimum. See `write_data` function for full writing specifications.
     :param fhir_url: A URL to a FHIR server.
     :param cred_manager: The credential manager used to authenticate to the FHIR server.
+    :param prefetch_pages: The maximum number of pages of each table to fetch ahead
+        of the page being tabulated. Default: 0.
+    :param max_concurrent_tables: The maximum number of tables to export at once.
+        Default: 1.
+    :param max_requests: The maximum number of requests to have in flight to the FHIR
+        server at once. Default: `max_concurrent_tables`.
+    :raises ValueError: If `prefetch_pages` is negative, or `max_concurrent_tables` or
+        `max_requests` is less than 1.
     """
+    if prefetch_pages < 0:
+        raise ValueError("`prefetch_pages` cannot be negative.")
+    if max_concurrent_tables < 1:
+        raise ValueError("`max_concurrent_tables` must be at least 1.")
+    if max_requests is None:
+        max_requests = max_concurrent_tables
+    if max_requests < 1:
+        raise ValueError("`max_requests` must be at least 1.")
 
     # Load schema
     schema = load_schema(schema_path)
@@ -624,8 +654,21 @@ def generate_tables(
     # Load search_urls to query FHIR server
     search_urls = _generate_search_urls(schema=schema)
 
+    if prefetch_pages > 0 or max_concurrent_tables > 1:
+        _generate_tables_pipelined(
+            schema,
+            search_urls,
+            output_params,
+            fhir_url,
+            cred_manager,
+            prefetch_pages,
+            max_concurrent_tables,
+            max_requests,
+        )
+        return
+
     for table_name, search_url in search_urls.items():
-        pq_writer = None
+        writer = None
         next = search_url
         while next is not None:
             # Return set of incremental results and next URL to query
@@ -639,14 +682,265 @@ def generate_tables(
             )
 
             # Write set of tabulated incremental data
-            pq_writer = write_data(
-                tabulated_data=tabulated_incremental_data,
-                directory=output_params[table_name].get("directory"),
-                filename=output_params[table_name].get("filename"),
-                output_type=output_params[table_name].get("output_type"),
-                db_file=output_params[table_name].get("db_file", None),
-                db_tablename=output_params[table_name].get("db_tablename", None),
-                pq_writer=pq_writer,
+            writer = _write_table_page(
+                tabulated_incremental_data,
+                schema,
+                table_name,
+                output_params[table_name],
+                writer,
             )
-        if pq_writer is not None:
-            pq_writer.close()  # pragma: no cover
+        if writer is not None:
+            writer.close()  # pragma: no cover
+
+
+def _write_table_page(
+    tabulated_data: List[list],
+    schema: dict,
+    table_name: str,
+    table_output_params: dict,
+    writer=None,
+):
+    """
+    Writes a page of tabulated data for a table, as specified by the table's output
+    parameters, with the column types given by the schema.
+
+    :param tabulated_data: The tabulated page of data, headers first.
+    :param schema: The loaded schema.
+    :param table_name: The name of the table in the schema.
+    :param table_output_params: The parameters for writing the table, as passed to
+        `generate_tables`.
+    :param writer: The `ParquetWriter` or `SQLWriter` returned by writing the table's
+        previous page, if there was one. Default: `None`.
+    :return: The `ParquetWriter` or `SQLWriter` to use to write the table's next
+        page, if the table is written to Parquet or SQL.
+    """
+    output_type = table_output_params.get("output_type")
+    return write_data(
+        tabulated_data=tabulated_data,
+        directory=table_output_params.get("directory"),
+        filename=table_output_params.get("filename"),
+        output_type=output_type,
+        db_file=table_output_params.get("db_file", None),
+        db_tablename=table_output_params.get("db_tablename", None),
+        pq_writer=writer if output_type == "parquet" else None,
+        schema=schema,
+        table_name=table_name,
+        row_group_size=table_output_params.get("row_group_size", None),
+        dictionary_columns=table_output_params.get("dictionary_columns", None),
+        sql_writer=writer if output_type == "sql" else None,
+        index_columns=table_output_params.get("index_columns", None),
+    )
+
+
+# Marks the end of a queue of pages
+_DONE = object()
+
+
+def _generate_tables_pipelined(
+    schema: dict,
+    search_urls: dict,
+    output_params: dict,
+    fhir_url: str,
+    cred_manager: BaseCredentialManager,
+    prefetch_pages: int,
+    max_concurrent_tables: int,
+    max_requests: int,
+) -> None:
+    """
+    Generates and stores tables as `generate_tables` does, fetching and tabulating
+    the pages of up to `max_concurrent_tables` tables at once while a separate
+    thread writes the tabulated pages. If any table fails, the tables still being
+    exported are stopped, and the first error is raised.
+
+    :param schema: The loaded schema.
+    :param search_urls: The search URL of each table in the schema.
+    :param output_params: The parameters for writing each table.
+    :param fhir_url: A URL to a FHIR server.
+    :param cred_manager: The credential manager used to authenticate to the FHIR server.
+    :param prefetch_pages: The maximum number of pages of each table to fetch ahead.
+    :param max_concurrent_tables: The maximum number of tables to export at once.
+    :param max_requests: The maximum number of requests in flight at once.
+    """
+    stop = threading.Event()
+    request_slots = threading.BoundedSemaphore(max_requests)
+    write_queue = queue.Queue(maxsize=max_concurrent_tables * max(prefetch_pages, 1))
+
+    def export_table(table_name: str, search_url: str) -> None:
+        if prefetch_pages > 0:
+            pages = _prefetch_pages(
+                search_url, fhir_url, cred_manager, prefetch_pages, request_slots, stop
+            )
+        else:
+            pages = _fetch_pages(
+                search_url, fhir_url, cred_manager, request_slots, stop
+            )
+        try:
+            for page in pages:
+                tabulated_data = tabulate_data(page, schema, table_name)
+                _put_until_stopped(write_queue, (table_name, tabulated_data), stop)
+        finally:
+            pages.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        writer = executor.submit(_write_pages, write_queue, schema, output_params, stop)
+        with ThreadPoolExecutor(max_workers=max_concurrent_tables) as table_executor:
+            tables = [
+                table_executor.submit(export_table, table_name, search_url)
+                for table_name, search_url in search_urls.items()
+            ]
+            for table in tables:
+                try:
+                    table.result()
+                except BaseException:
+                    stop.set()
+                    raise
+        _put_until_stopped(write_queue, _DONE, stop)
+        writer.result()
+
+
+def _fetch_pages(
+    search_url: str,
+    fhir_url: str,
+    cred_manager: BaseCredentialManager,
+    request_slots: threading.BoundedSemaphore,
+    stop: threading.Event,
+) -> Iterator[List[dict]]:
+    """
+    Fetches the pages of results of a FHIR search one after another.
+
+    :param search_url: The search URL, relative to `fhir_url`.
+    :param fhir_url: A URL to a FHIR server.
+    :param cred_manager: The credential manager used to authenticate to the FHIR server.
+    :param request_slots: A semaphore held while each page is requested.
+    :param stop: An event which, once set, stops fetching.
+    :return: An iterator over the pages of results.
+    """
+    next = search_url
+    while next is not None and not stop.is_set():
+        with request_slots:
+            page, next = extract_data_from_fhir_search_incremental(
+                search_url=urllib.parse.urljoin(fhir_url, next),
+                cred_manager=cred_manager,
+            )
+        yield page
+
+
+def _prefetch_pages(
+    search_url: str,
+    fhir_url: str,
+    cred_manager: BaseCredentialManager,
+    prefetch_pages: int,
+    request_slots: threading.BoundedSemaphore,
+    stop: threading.Event,
+) -> Iterator[List[dict]]:
+    """
+    Fetches the pages of results of a FHIR search in a background thread, holding up
+    to `prefetch_pages` pages until they're needed.
+
+    :param search_url: The search URL, relative to `fhir_url`.
+    :param fhir_url: A URL to a FHIR server.
+    :param cred_manager: The credential manager used to authenticate to the FHIR server.
+    :param prefetch_pages: The maximum number of pages to fetch ahead.
+    :param request_slots: A semaphore held while each page is requested.
+    :param stop: An event which, once set, stops fetching.
+    :raises Exception: Any error raised while fetching a page.
+    :return: An iterator over the pages of results.
+    """
+    pages = queue.Queue(maxsize=prefetch_pages)
+    finished = threading.Event()
+
+    def fetch() -> None:
+        try:
+            for page in _fetch_pages(
+                search_url, fhir_url, cred_manager, request_slots, stop
+            ):
+                if not _put_until_stopped(pages, page, finished):
+                    return
+            _put_until_stopped(pages, _DONE, finished)
+        except Exception as error:
+            _put_until_stopped(pages, error, finished)
+
+    fetcher = threading.Thread(target=fetch, daemon=True)
+    fetcher.start()
+    try:
+        while True:
+            page = _get_until_stopped(pages, stop)
+            if page is _DONE:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        finished.set()
+        fetcher.join()
+
+
+def _write_pages(
+    write_queue: queue.Queue, schema: dict, output_params: dict, stop: threading.Event
+) -> None:
+    """
+    Writes tabulated pages from a queue, in the order they were queued, until the
+    end of the queue is reached or writing is stopped. The Parquet or SQL writer for
+    each table is closed once every page has been written.
+
+    :param write_queue: A queue of tuples of table names and tabulated pages, ended
+        by `_DONE`.
+    :param schema: The loaded schema.
+    :param output_params: The parameters for writing each table.
+    :param stop: An event which, once set, stops writing.
+    """
+    writers = {}
+    try:
+        while True:
+            item = _get_until_stopped(write_queue, stop)
+            if item is _DONE:
+                return
+            table_name, tabulated_data = item
+            writers[table_name] = _write_table_page(
+                tabulated_data,
+                schema,
+                table_name,
+                output_params[table_name],
+                writers.get(table_name),
+            )
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for writer in writers.values():
+            if writer is not None:
+                writer.close()
+
+
+def _put_until_stopped(items: queue.Queue, item, stop: threading.Event) -> bool:
+    """
+    Puts an item in a bounded queue, waiting for room unless `stop` is set.
+
+    :param items: The queue.
+    :param item: The item.
+    :param stop: An event which, once set, stops waiting.
+    :return: Whether the item was put in the queue.
+    """
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get_until_stopped(items: queue.Queue, stop: threading.Event):
+    """
+    Gets the next item from a queue, waiting for one unless `stop` is set.
+
+    :param items: The queue.
+    :param stop: An event which, once set, stops waiting.
+    :return: The item, or `_DONE` if `stop` was set first.
+    """
+    while not stop.is_set():
+        try:
+            return items.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
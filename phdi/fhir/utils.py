@@ -1,6 +1,8 @@
 import json
 import random
-from functools import cache
+import re
+from decimal import Decimal
+from functools import lru_cache
 from typing import Any
 from typing import Callable
 from typing import List
@@ -11,6 +13,34 @@ import fhirpathpy
 
 selection_criteria_types = Literal["first", "last", "random", "all"]
 
+# The maximum number of compiled FHIRPath expressions to cache
+FHIRPATH_CACHE_SIZE = 1024
+
+# Matches plain dotted paths whose elements may each be followed by an index,
+# e.g., `Patient.name[0].given`, which are evaluated without fhirpathpy
+SIMPLE_FHIRPATH_PATTERN = re.compile(
+    r"[A-Za-z][A-Za-z0-9_]*(\[\d+\])?(\.[A-Za-z][A-Za-z0-9_]*(\[\d+\])?)*"
+)
+SIMPLE_FHIRPATH_ELEMENT_PATTERN = re.compile(r"([A-Za-z][A-Za-z0-9_]*)(?:\[(\d+)\])?")
+
+# FHIRPath keywords, and element names fhirpathpy treats specially, which
+# simple paths can't contain
+FHIRPATH_KEYWORDS = {
+    "and",
+    "as",
+    "contains",
+    "div",
+    "false",
+    "implies",
+    "in",
+    "is",
+    "length",
+    "mod",
+    "or",
+    "true",
+    "xor",
+}
+
 
 def apply_selection_criteria(
     value: List[Any],
@@ -147,19 +177,141 @@ def get_field(
     return elements[index] if len(elements) > 0 else None
 
 
-@cache
+@lru_cache(maxsize=FHIRPATH_CACHE_SIZE)
 def get_fhirpathpy_parser(fhirpath_expression: str) -> Callable:
     """
     Accepts a FHIRPath expression, and returns a callable function
     which returns the evaluated value at fhirpath_expression for
-    a specified FHIR resource.
+    a specified FHIR resource. Plain dotted paths, optionally with indexes,
+    e.g., `Patient.name[0].given`, are evaluated by walking the resource
+    directly; all other expressions are evaluated by fhirpathpy. Functions
+    are cached, so each expression is only compiled once.
     :param fhirpath_expression: The FHIRPath expression to evaluate.
     :return: A function that, when called passing in a FHIR resource,
       will return value at `fhirpath_expression`.
     """
+    simple_parser = _compile_simple_fhirpath(fhirpath_expression)
+    if simple_parser is not None:
+        return simple_parser
+    return _compile_fhirpath(fhirpath_expression)
+
+
+@lru_cache(maxsize=FHIRPATH_CACHE_SIZE)
+def _compile_fhirpath(fhirpath_expression: str) -> Callable:
+    """
+    Compiles a FHIRPath expression with fhirpathpy.
+
+    :param fhirpath_expression: The FHIRPath expression to compile.
+    :return: The compiled expression.
+    """
     return fhirpathpy.compile(fhirpath_expression)
 
 
+def _compile_simple_fhirpath(fhirpath_expression: str) -> Union[Callable, None]:
+    """
+    Compiles a plain dotted FHIRPath expression, optionally with indexes, into
+    a function that walks a resource directly, giving the same results as
+    fhirpathpy. Resources the function can't evaluate exactly as fhirpathpy
+    would, e.g., those with extensions on primitive elements, are evaluated
+    by fhirpathpy instead.
+
+    :param fhirpath_expression: The FHIRPath expression to compile.
+    :return: The compiled expression, or None if it isn't a simple path.
+    """
+    if not SIMPLE_FHIRPATH_PATTERN.fullmatch(fhirpath_expression):
+        return None
+    elements = []
+    for element in fhirpath_expression.split("."):
+        name, index = SIMPLE_FHIRPATH_ELEMENT_PATTERN.fullmatch(element).groups()
+        elements.append((name, None if index is None else int(index)))
+    if any(name in FHIRPATH_KEYWORDS for name, _ in elements):
+        return None
+
+    # A path starting with a capitalized name, e.g., `Patient`, selects the
+    # resources of that type
+    resource_type = elements[0][0] if elements[0][0][0].isupper() else None
+    if resource_type is not None:
+        root_index = elements[0][1]
+        elements = elements[1:]
+
+    def parse_function(resource: Any, context: dict = None) -> list:
+        if context:
+            return _compile_fhirpath(fhirpath_expression)(resource, context)
+
+        if isinstance(resource, list):
+            nodes = resource
+        elif resource is None:
+            nodes = []
+        else:
+            nodes = [resource]
+
+        if resource_type is not None:
+            if not all(
+                isinstance(node, dict) and "resourceType" in node for node in nodes
+            ):
+                return _compile_fhirpath(fhirpath_expression)(resource)
+            nodes = [node for node in nodes if node["resourceType"] == resource_type]
+            nodes = _select_index(nodes, root_index)
+
+        for name, index in elements:
+            children = []
+            for node in nodes:
+                if not isinstance(node, dict):
+                    continue
+                # fhirpathpy merges extensions on primitive elements, which
+                # are stored under the element's name prefixed by "_"
+                if "_" + name in node:
+                    return _compile_fhirpath(fhirpath_expression)(resource)
+                child = node.get(name)
+                if isinstance(child, list):
+                    children.extend(child)
+                elif child is not None:
+                    children.append(child)
+            nodes = _select_index(children, index)
+
+        return _to_fhirpath_data(nodes)
+
+    return parse_function
+
+
+def _select_index(nodes: list, index: Union[int, None]) -> list:
+    """
+    Applies a FHIRPath indexer to a collection.
+
+    :param nodes: The collection.
+    :param index: The index of the element to select, or None to select every
+      element.
+    :return: The selected elements.
+    """
+    if index is None:
+        return nodes
+    return nodes[index : index + 1]
+
+
+def _to_fhirpath_data(value: Any) -> Any:
+    """
+    Converts values extracted from a resource into the forms fhirpathpy would
+    return: floats become Decimals, elements holding nothing but extensions
+    are dropped from lists, and dictionaries and lists are copied.
+
+    :param value: The extracted value.
+    :return: The value as fhirpathpy would return it.
+    """
+    if isinstance(value, list):
+        converted = []
+        for item in value:
+            item = _to_fhirpath_data(item)
+            if isinstance(item, dict) and list(item.keys()) == ["extension"]:
+                continue
+            converted.append(item)
+        return converted
+    if isinstance(value, dict):
+        return {key: _to_fhirpath_data(item) for key, item in value.items()}
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return value
+
+
 def get_one_line_address(address: dict) -> str:
     """
     Extracts a one-line string representation of an address from a
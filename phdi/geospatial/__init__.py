@@ -1,3 +1,4 @@
+from phdi.geospatial.cache import GeocodeCache
 from phdi.geospatial.census import CensusGeocodeClient
 from phdi.geospatial.core import BaseGeocodeClient
 from phdi.geospatial.core import GeocodeResult
@@ -8,4 +9,5 @@ __all__ = (
     "BaseGeocodeClient",
     "SmartyGeocodeClient",
     "CensusGeocodeClient",
+    "GeocodeCache",
 )
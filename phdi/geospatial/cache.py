@@ -0,0 +1,254 @@
+import dataclasses
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Union
+
+from phdi.geospatial.core import GeocodeResult
+
+
+def normalize_address_key(*parts: Union[str, None]) -> str:
+    """
+    Builds a cache key from the parts of an address, so that addresses
+    differing only in case or whitespace share a key. Vendors should prefix
+    the parts with their name and anything else that changes their results,
+    such as license types.
+
+    :param parts: The parts of the address, e.g., the fields of a lookup.
+      None is treated as an empty string.
+    :return: The normalized parts joined by "|".
+    """
+    return "|".join(" ".join((part or "").split()).lower() for part in parts)
+
+
+class GeocodeCache:
+    """
+    A thread-safe cache of geocoding results, keyed by normalized address.
+    Results are held in an in-memory LRU tier and, if a path is given, an
+    on-disk SQLite tier shared across processes and restarts. Addresses that
+    couldn't be geocoded are cached too, for a separate, usually shorter,
+    time, so that they aren't sent to the vendor again on every request.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: Union[float, None] = 30 * 24 * 60 * 60,
+        negative_ttl: Union[float, None] = 24 * 60 * 60,
+        path: Union[str, pathlib.Path, None] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Creates a new cache, opening or creating the SQLite database at
+        `path` if one is given.
+
+        :param max_size: The maximum number of results to hold in memory.
+          Default: 10000.
+        :param ttl: The number of seconds a result stays cached, or None if
+          results should never expire. Default: 30 days.
+        :param negative_ttl: The number of seconds an address that couldn't
+          be geocoded stays cached, 0 to not cache such addresses, or None if
+          they should never expire. Default: 1 day.
+        :param path: Optionally, the path of a SQLite database in which to
+          also cache results on disk. Default: None.
+        :param clock: A function returning the current time in seconds since
+          the epoch, used to expire results. Default: `time.time`.
+        :raises ValueError: If `max_size` isn't positive, or `ttl` or
+          `negative_ttl` is negative.
+        """
+        if max_size < 1:
+            raise ValueError("`max_size` must be at least 1.")
+        if (ttl is not None and ttl < 0) or (
+            negative_ttl is not None and negative_ttl < 0
+        ):
+            raise ValueError("`ttl` and `negative_ttl` cannot be negative.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self.clock = clock
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode_cache "
+                "(address_key TEXT PRIMARY KEY, result TEXT, expires REAL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of results held in memory.
+        """
+        return len(self._results)
+
+    def get(self, address_key: str, default: Any = None) -> Any:
+        """
+        Gets the cached result for an address. Since addresses that couldn't
+        be geocoded are cached as None, pass a `default` other than None to
+        tell them apart from addresses that aren't cached.
+
+        :param address_key: The address's key, as built by
+          `normalize_address_key`.
+        :param default: The value to return if the address isn't cached.
+          Default: None.
+        :return: A copy of the cached GeocodeResult, None if the address
+          couldn't be geocoded, or `default` if it isn't cached.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._results.get(address_key)
+            if entry is not None and _is_expired(entry[1], now):
+                del self._results[address_key]
+                entry = None
+            if entry is not None:
+                self._results.move_to_end(address_key)
+            elif self._db is not None:
+                entry = self._get_from_db(address_key, now)
+                if entry is not None:
+                    self._put_in_memory(address_key, entry)
+
+            if entry is None:
+                self._misses += 1
+                return default
+            self._hits += 1
+        return _deserialize_result(entry[0])
+
+    def put(self, address_key: str, result: Union[GeocodeResult, None]) -> None:
+        """
+        Caches the result of geocoding an address.
+
+        :param address_key: The address's key, as built by
+          `normalize_address_key`.
+        :param result: The GeocodeResult, or None if the address couldn't be
+          geocoded.
+        """
+        ttl = self.ttl if result is not None else self.negative_ttl
+        if ttl == 0:
+            return
+        expires = None if ttl is None else self.clock() + ttl
+        entry = (_serialize_result(result), expires)
+        with self._lock:
+            self._put_in_memory(address_key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?)",
+                    (address_key, *entry),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        """
+        Removes every cached result, from both memory and disk.
+        """
+        with self._lock:
+            self._results.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM geocode_cache")
+                self._db.commit()
+
+    def close(self) -> None:
+        """
+        Closes the SQLite database, if there is one. Results cached in memory
+        can still be used.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        """
+        Summarizes how the cache has been used since it was created.
+
+        :return: A dictionary of the number of cache hits and misses, the
+          proportion of lookups that were hits (or None if there were none),
+          and the current and maximum number of results held in memory.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else None,
+                "size": len(self._results),
+                "max_size": self.max_size,
+            }
+
+    def _get_from_db(self, address_key: str, now: float) -> Union[tuple, None]:
+        """
+        Gets the cached result for an address from the SQLite database,
+        deleting it if it has expired.
+
+        :param address_key: The address's key.
+        :param now: The current time.
+        :return: A tuple of the serialized result and when it expires, or
+          None if the address isn't cached.
+        """
+        entry = self._db.execute(
+            "SELECT result, expires FROM geocode_cache WHERE address_key = ?",
+            (address_key,),
+        ).fetchone()
+        if entry is not None and _is_expired(entry[1], now):
+            self._db.execute(
+                "DELETE FROM geocode_cache WHERE address_key = ?", (address_key,)
+            )
+            self._db.commit()
+            entry = None
+        return entry
+
+    def _put_in_memory(self, address_key: str, entry: tuple) -> None:
+        """
+        Holds a result in memory, evicting the least recently used results if
+        the cache is full.
+
+        :param address_key: The address's key.
+        :param entry: A tuple of the serialized result and when it expires.
+        """
+        self._results[address_key] = entry
+        self._results.move_to_end(address_key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+
+def _is_expired(expires: Union[float, None], now: float) -> bool:
+    """
+    Checks whether a cached result has expired.
+
+    :param expires: When the result expires, or None if it never does.
+    :param now: The current time.
+    :return: Whether the result has expired.
+    """
+    return expires is not None and expires <= now
+
+
+def _serialize_result(result: Union[GeocodeResult, None]) -> str:
+    """
+    Serializes a geocoding result as JSON, so that it can be stored on disk
+    and copied cheaply.
+
+    :param result: The GeocodeResult, or None.
+    :return: The result as a JSON string.
+    """
+    return json.dumps(None if result is None else dataclasses.asdict(result))
+
+
+def _deserialize_result(result: str) -> Union[GeocodeResult, None]:
+    """
+    Deserializes a geocoding result serialized by `_serialize_result`.
+
+    :param result: The result as a JSON string.
+    :return: The GeocodeResult, or None.
+    """
+    result = json.loads(result)
+    return None if result is None else GeocodeResult(**result)
@@ -1,10 +1,14 @@
+from typing import List
 from typing import Union
 
+from smartystreets_python_sdk import Batch
 from smartystreets_python_sdk import ClientBuilder
 from smartystreets_python_sdk import StaticCredentials
 from smartystreets_python_sdk import us_street
 from smartystreets_python_sdk.us_street.lookup import Lookup
 
+from phdi.geospatial.cache import GeocodeCache
+from phdi.geospatial.cache import normalize_address_key
 from phdi.geospatial.core import BaseGeocodeClient
 from phdi.geospatial.core import GeocodeResult
 
@@ -21,13 +25,30 @@ class SmartyGeocodeClient(BaseGeocodeClient):
         smarty_auth_id: str,
         smarty_auth_token: str,
         licenses: list[str] = ["us-standard-cloud"],
+        cache: GeocodeCache = None,
+        base_url: str = None,
     ):
+        """
+        Creates a new Smarty geocoding client.
+
+        :param smarty_auth_id: The Smarty authorization ID.
+        :param smarty_auth_token: The Smarty authentication token.
+        :param licenses: The Smarty licenses to geocode with.
+          Default: `["us-standard-cloud"]`.
+        :param cache: Optionally, a cache of geocoding results to check before
+          calling the Smarty API. Default: None.
+        :param base_url: Optionally, the URL of the US Street API to send
+          lookups to, e.g., a proxy. Default: None (Smarty's own API).
+        """
         self.smarty_auth_id = smarty_auth_id
         self.smarty_auth_token = smarty_auth_token
+        self.licenses = licenses
+        self.cache = cache
         creds = StaticCredentials(smarty_auth_id, smarty_auth_token)
-        self.__client = (
-            ClientBuilder(creds).with_licenses(licenses).build_us_street_api_client()
-        )
+        client_builder = ClientBuilder(creds).with_licenses(licenses)
+        if base_url is not None:
+            client_builder = client_builder.with_base_url(base_url)
+        self.__client = client_builder.build_us_street_api_client()
 
     @property
     def client(self) -> us_street.Client:
@@ -54,14 +75,7 @@ class SmartyGeocodeClient(BaseGeocodeClient):
         :return: A geocoded address (if valid result) or None (if no valid result).
         """
 
-        # The smarty Lookup class will parse a BadRequestError but retry
-        # 5 times if the lookup address is blank, so catch that here
-        if address == "":
-            raise ValueError("Address must include street number and name at a minimum")
-
-        lookup = Lookup(street=address)
-        self.__client.send_lookup(lookup)
-        return self._parse_smarty_result(lookup)
+        return self._send_lookup(self._build_lookup(address))
 
     def geocode_from_dict(self, address: dict) -> Union[GeocodeResult, None]:
         """
@@ -87,6 +101,57 @@ class SmartyGeocodeClient(BaseGeocodeClient):
         :raises Exception: When the address street is an empty string.
         :return: A geocoded address (if valid result) or None (if no valid result).
         """
+        return self._send_lookup(self._build_lookup(address))
+
+    def geocode_batch(
+        self, addresses: List[Union[str, dict]]
+    ) -> List[Union[GeocodeResult, None]]:
+        """
+        Geocodes many addresses, each formatted as either a string or a
+        dictionary (as accepted by `geocode_from_str` and `geocode_from_dict`),
+        sending them to Smarty in batches of up to 100 lookups. Duplicate
+        addresses are only looked up once.
+
+        :param addresses: A list of addresses, as strings or dictionaries.
+        :raises ValueError: When an address does not include street number and
+          name.
+        :return: A list of the geocoded addresses (if valid result) or None (if
+          no valid result), in the same order as `addresses`.
+        """
+        lookups = [self._build_lookup(address) for address in addresses]
+
+        def geocode(indices: List[int]) -> List[Union[GeocodeResult, None]]:
+            batch_lookups = [lookups[i] for i in indices]
+            for start in range(0, len(batch_lookups), Batch.MAX_BATCH_SIZE):
+                batch = Batch()
+                for lookup in batch_lookups[start : start + Batch.MAX_BATCH_SIZE]:
+                    batch.add(lookup)
+                self.__client.send_batch(batch)
+            return [self._parse_smarty_result(lookup) for lookup in batch_lookups]
+
+        return self._geocode_batch_with_cache(
+            [self._get_lookup_key(lookup) for lookup in lookups], geocode
+        )
+
+    @staticmethod
+    def _build_lookup(address: Union[str, dict]) -> Lookup:
+        """
+        Builds a Smarty lookup for an address formatted as either a string or
+        a dictionary.
+
+        :param address: The address, as a string or dictionary.
+        :raises ValueError: When the address does not include street number and
+          name.
+        :return: The us_street.lookup for the address.
+        """
+        if isinstance(address, str):
+            # The smarty Lookup class will parse a BadRequestError but retry
+            # 5 times if the lookup address is blank, so catch that here
+            if address == "":
+                raise ValueError(
+                    "Address must include street number and name at a minimum"
+                )
+            return Lookup(street=address)
 
         # Smarty geocode requests must include a street level
         # field in the payload, otherwise generates BadRequestError
@@ -104,9 +169,44 @@ class SmartyGeocodeClient(BaseGeocodeClient):
         lookup.zipcode = address.get("postal_code", "")
         lookup.urbanization = address.get("urbanization", "")
         lookup.match = "strict"
+        return lookup
+
+    def _get_lookup_key(self, lookup: Lookup) -> str:
+        """
+        Builds the cache key for a lookup from the address fields and match
+        strategy it's sent with, and the licenses used, since those change the
+        results.
+
+        :param lookup: The us_street.lookup.
+        :return: The lookup's cache key.
+        """
+        return normalize_address_key(
+            "smarty",
+            ",".join(self.licenses),
+            lookup.street,
+            lookup.street2,
+            lookup.secondary,
+            lookup.city,
+            lookup.state,
+            lookup.zipcode,
+            lookup.urbanization,
+            lookup.match,
+        )
+
+    def _send_lookup(self, lookup: Lookup) -> Union[GeocodeResult, None]:
+        """
+        Sends a lookup to Smarty and parses the result, using the cache if the
+        client has one.
+
+        :param lookup: The us_street.lookup to send.
+        :return: A geocoded address (if valid result) or None (if no valid result).
+        """
+
+        def geocode() -> Union[GeocodeResult, None]:
+            self.__client.send_lookup(lookup)
+            return self._parse_smarty_result(lookup)
 
-        self.__client.send_lookup(lookup)
-        return self._parse_smarty_result(lookup)
+        return self._geocode_with_cache(self._get_lookup_key(lookup), geocode)
 
     @staticmethod
     def _parse_smarty_result(lookup) -> Union[GeocodeResult, None]:
@@ -10,6 +10,7 @@ from phdi.harmonization.standardization import standardize_country_code
 from phdi.harmonization.standardization import standardize_name
 from phdi.harmonization.standardization import standardize_phone
 from phdi.harmonization.utils import compare_strings
+from phdi.harmonization.utils import compare_strings_pairwise
 
 __all__ = (
     "standardize_hl7_datetimes",
@@ -22,6 +23,7 @@ __all__ = (
     "standardize_name",
     "double_metaphone_string",
     "compare_strings",
+    "compare_strings_pairwise",
     "DoubleMetaphone",
     "standardize_birth_date",
 )
@@ -1,5 +1,6 @@
 import datetime
 import pathlib
+from functools import lru_cache
 from typing import List
 from typing import Literal
 from typing import Union
@@ -13,6 +14,19 @@ from phdi.harmonization.double_metaphone import DoubleMetaphone
 FHIR_DATE_FORMAT = "%Y-%m-%d"
 FHIR_DATE_DELIM = "-"
 
+# The maximum number of distinct values, with their options, whose standardized
+# forms are memoized; names, phone numbers and dates repeat heavily across the
+# patients in a jurisdiction's messages
+STANDARDIZATION_CACHE_SIZE = 65536
+
+# Tables deleting the ASCII characters a name can't contain: every punctuation
+# and control character, and optionally every digit
+_NAME_PUNCTUATION = "".join(
+    chr(code) for code in range(128) if not (chr(code).isalnum() or chr(code) == " ")
+)
+_NAME_DELETIONS = str.maketrans("", "", _NAME_PUNCTUATION)
+_NAME_AND_NUMBER_DELETIONS = str.maketrans("", "", _NAME_PUNCTUATION + "0123456789")
+
 
 def double_metaphone_string(string: str, dmeta=None) -> List[Union[str, None]]:
     """
@@ -120,36 +134,46 @@ def standardize_phone(
     phones_to_clean = raw_phone
     if isinstance(raw_phone, str):
         phones_to_clean = [raw_phone]
-    outputs = []
-
-    for phone in phones_to_clean:
-        standardized = ""
-        for country in countries:
-            # We were able to pull the phone # and corresponding country
-            try:
-                standardized = phonenumbers.parse(phone, country)
-                break
-
-            # This combo of given phone # and country isn't valid
-            except phonenumbers.phonenumberutil.NumberParseException:
-                continue
-
-        # If we got a match, format it according to ISO standards
-        if standardized != "" and phonenumbers.is_possible_number(standardized):
-            standardized = str(
-                phonenumbers.format_number(
-                    standardized, phonenumbers.PhoneNumberFormat.E164
-                )
-            )
-            outputs.append(standardized)
-        else:
-            outputs.append("")
+    countries = tuple(countries)
+    outputs = [_standardize_phone(phone, countries) for phone in phones_to_clean]
 
     if isinstance(raw_phone, str):
         return outputs[0]
     return outputs
 
 
+@lru_cache(maxsize=STANDARDIZATION_CACHE_SIZE)
+def _standardize_phone(phone: str, countries: tuple) -> str:
+    """
+    Standardizes a single phone number, trying each of the given countries in
+    turn. Results are memoized, since parsing a phone number is expensive.
+
+    :param phone: The raw phone number to standardize.
+    :param countries: The 2 letter ISO codes of the countries to try, in order.
+    :return: The phone number in ISO E.164 format, or the empty string if it
+      couldn't be parsed.
+    """
+    standardized = ""
+    for country in countries:
+        # We were able to pull the phone # and corresponding country
+        try:
+            standardized = phonenumbers.parse(phone, country)
+            break
+
+        # This combo of given phone # and country isn't valid
+        except phonenumbers.phonenumberutil.NumberParseException:
+            continue
+
+    # If we got a match, format it according to ISO standards
+    if standardized != "" and phonenumbers.is_possible_number(standardized):
+        return str(
+            phonenumbers.format_number(
+                standardized, phonenumbers.PhoneNumberFormat.E164
+            )
+        )
+    return ""
+
+
 def standardize_name(
     raw_name: Union[str, List[str]],
     trim: bool = True,
@@ -183,28 +207,58 @@ def standardize_name(
     names_to_clean = raw_name
     if isinstance(raw_name, str):
         names_to_clean = [raw_name]
-    outputs = []
-
-    for name in names_to_clean:
-        # Remove all punctuation
-        cleaned_name = "".join([ltr for ltr in name if ltr.isalnum() or ltr == " "])
-        if remove_numbers:
-            cleaned_name = "".join([ltr for ltr in cleaned_name if not ltr.isnumeric()])
-        if trim:
-            cleaned_name = cleaned_name.strip()
-        if case == "upper":
-            cleaned_name = cleaned_name.upper()
-        if case == "lower":
-            cleaned_name = cleaned_name.lower()
-        if case == "title":
-            cleaned_name = cleaned_name.title()
-        outputs.append(cleaned_name)
+    outputs = [
+        _standardize_name(name, trim, case, remove_numbers) for name in names_to_clean
+    ]
 
     if isinstance(raw_name, str):
         return outputs[0]
     return outputs
 
 
+@lru_cache(maxsize=STANDARDIZATION_CACHE_SIZE)
+def _standardize_name(
+    name: str,
+    trim: bool,
+    case: Literal["upper", "lower", "title"],
+    remove_numbers: bool,
+) -> str:
+    """
+    Standardizes a single name. Results are memoized, and ASCII names, by far
+    the most common, are cleaned with a single `str.translate` call rather
+    than by inspecting each character in Python.
+
+    :param name: The name to standardize.
+    :param trim: Whether to strip leading/trailing whitespace.
+    :param case: What case to enforce on the name.
+    :param remove_numbers: Whether to remove numeric characters.
+    :return: The cleaned name.
+    """
+    # Remove all punctuation, and numbers if requested
+    if name.isascii():
+        cleaned_name = name.translate(
+            _NAME_AND_NUMBER_DELETIONS if remove_numbers else _NAME_DELETIONS
+        )
+    else:
+        cleaned_name = "".join(
+            [
+                ltr
+                for ltr in name
+                if (ltr.isalnum() or ltr == " ")
+                and not (remove_numbers and ltr.isnumeric())
+            ]
+        )
+    if trim:
+        cleaned_name = cleaned_name.strip()
+    if case == "upper":
+        cleaned_name = cleaned_name.upper()
+    if case == "lower":
+        cleaned_name = cleaned_name.lower()
+    if case == "title":
+        cleaned_name = cleaned_name.title()
+    return cleaned_name
+
+
 def _build_nicknames_db():
     nicknames_to_names = {}
     with open(pathlib.Path(__file__).parent / "phdi_nicknames.csv", "r") as fp:
@@ -260,12 +314,11 @@ def _standardize_date(
     # this is easier than regexp as we won't have to maintain a list
     # of potential delimiters and just look at what the delim is
     # for the date string supplied
-    delim = detect(raw_date)
-    format_delim = detect(date_format.replace("%", ""))
+    delim = _detect_delimiter(raw_date)
 
     # parse out the different date components (year, month, day)
     date_values = raw_date.split(delim)
-    format_values = date_format.replace("%", "").lower().split(format_delim)
+    format_values = _parse_date_format(date_format)
     date_dict = {}
 
     # loop through date values and the format values
@@ -291,6 +344,33 @@ def _standardize_date(
     )
 
 
+@lru_cache(maxsize=STANDARDIZATION_CACHE_SIZE)
+def _detect_delimiter(text: str) -> Union[str, None]:
+    """
+    Detects the delimiter used in a string, such as a date. Results are
+    memoized, since detection inspects the whole string for each candidate
+    delimiter.
+
+    :param text: The string to find the delimiter of.
+    :return: The delimiter, or None if there doesn't seem to be one.
+    """
+    return detect(text)
+
+
+@lru_cache(maxsize=256)
+def _parse_date_format(date_format: str) -> List[str]:
+    """
+    Splits a python Date format into its components, e.g., `%m/%d/%Y` into
+    `["m", "d", "y"]`. Results are memoized, since the same few formats are
+    used for every date.
+
+    :param date_format: A python Date format.
+    :return: The lower case components of the format, in order.
+    """
+    format_delim = _detect_delimiter(date_format.replace("%", ""))
+    return date_format.replace("%", "").lower().split(format_delim)
+
+
 def standardize_birth_date(
     raw_dob: str, existing_format: str = FHIR_DATE_FORMAT
 ) -> str:
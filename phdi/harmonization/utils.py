@@ -1,5 +1,8 @@
+from typing import List
 from typing import Literal
+from typing import Union
 
+import numpy as np
 import rapidfuzz
 
 
@@ -40,3 +43,54 @@ def compare_strings(
         return rapidfuzz.distance.DamerauLevenshtein.normalized_similarity(
             string1, string2
         )
+
+
+def compare_strings_pairwise(
+    strings1: List[Union[str, None]],
+    strings2: List[Union[str, None]],
+    similarity_measure: Literal[
+        "JaroWinkler", "Levenshtein", "DamerauLevenshtein"
+    ] = "JaroWinkler",
+) -> Union[np.ndarray, None]:
+    """
+    Returns the matrix of normalized similarity measures between every string in
+    strings1 and every string in strings2, such that entry [i, j] is equal to
+    `compare_strings(strings1[i], strings2[j], similarity_measure)`. The matrix is
+    computed in a single call into rapidfuzz, which is substantially faster than
+    comparing each pair of strings individually. As with `compare_strings`, a
+    comparison involving `None` has a similarity of 0.0.
+
+    :param strings1: First list of strings for comparison.
+    :param strings2: Second list of strings for comparison.
+    :param similarity_measure: The method used to measure the similarity between
+        strings, defaults to "JaroWinkler". See `compare_strings` for the supported
+        measures.
+    :return: A float matrix with one row per string in strings1 and one column per
+        string in strings2, or None if the similarity measure is not supported.
+    """
+    if similarity_measure == "JaroWinkler":
+        scorer = rapidfuzz.distance.JaroWinkler.normalized_similarity
+    elif similarity_measure == "Levenshtein":
+        scorer = rapidfuzz.distance.Levenshtein.normalized_similarity
+    elif similarity_measure == "DamerauLevenshtein":
+        scorer = rapidfuzz.distance.DamerauLevenshtein.normalized_similarity
+    else:
+        return None
+
+    if len(strings1) == 0 or len(strings2) == 0:
+        return np.zeros((len(strings1), len(strings2)))
+
+    scores = rapidfuzz.process.cdist(
+        ["" if s is None else s for s in strings1],
+        ["" if s is None else s for s in strings2],
+        scorer=scorer,
+        dtype=np.float64,
+    )
+    # cdist doesn't score a pair of empty strings the same way the scorer does,
+    # so set those pairs explicitly before zeroing out comparisons against None
+    empty1 = np.array([s == "" for s in strings1], dtype=bool)
+    empty2 = np.array([s == "" for s in strings2], dtype=bool)
+    scores[np.outer(empty1, empty2)] = scorer("", "")
+    scores[np.array([s is None for s in strings1], dtype=bool), :] = 0.0
+    scores[:, np.array([s is None for s in strings2], dtype=bool)] = 0.0
+    return scores
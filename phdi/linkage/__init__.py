@@ -1,12 +1,15 @@
 from phdi.linkage.algorithms import DIBBS_BASIC
 from phdi.linkage.algorithms import DIBBS_ENHANCED
+from phdi.linkage.cache import BlockCache
 from phdi.linkage.core import BaseMPIConnectorClient
 from phdi.linkage.link import add_person_resource
 from phdi.linkage.link import block_data
+from phdi.linkage.link import calculate_em_probs
 from phdi.linkage.link import calculate_log_odds
 from phdi.linkage.link import calculate_m_probs
 from phdi.linkage.link import calculate_u_probs
 from phdi.linkage.link import compile_match_lists
+from phdi.linkage.link import CompiledLinkagePlan
 from phdi.linkage.link import eval_log_odds_cutoff
 from phdi.linkage.link import eval_perfect_match
 from phdi.linkage.link import extract_blocking_values_from_record
@@ -17,6 +20,8 @@ from phdi.linkage.link import feature_match_log_odds_exact
 from phdi.linkage.link import feature_match_log_odds_fuzzy_compare
 from phdi.linkage.link import generate_hash_str
 from phdi.linkage.link import link_record_against_mpi
+from phdi.linkage.link import link_record_against_mpi_async
+from phdi.linkage.link import link_records_against_mpi
 from phdi.linkage.link import load_json_probs
 from phdi.linkage.link import match_within_block
 from phdi.linkage.link import perform_linkage_pass
@@ -24,8 +29,11 @@ from phdi.linkage.link import profile_log_odds
 from phdi.linkage.link import read_linkage_config
 from phdi.linkage.link import score_linkage_vs_truth
 from phdi.linkage.link import write_linkage_config
+from phdi.linkage.mpi import AsyncDIBBsMPIConnectorClient
 from phdi.linkage.mpi import DIBBsMPIConnectorClient
 from phdi.linkage.seed import convert_to_patient_fhir_resources
+from phdi.linkage.timing import LINKAGE_TIMER
+from phdi.linkage.timing import StageTimer
 from phdi.linkage.utils import datetime_to_str
 
 __all__ = [
@@ -45,6 +53,7 @@ __all__ = [
     "calculate_u_probs",
     "load_json_probs",
     "calculate_log_odds",
+    "calculate_em_probs",
     "feature_match_log_odds_exact",
     "feature_match_log_odds_fuzzy_compare",
     "profile_log_odds",
@@ -54,10 +63,17 @@ __all__ = [
     "write_linkage_config",
     "read_linkage_config",
     "link_record_against_mpi",
+    "link_record_against_mpi_async",
+    "link_records_against_mpi",
+    "CompiledLinkagePlan",
     "add_person_resource",
     "_compare_address_elements",
     "_compare_name_elements",
     "convert_to_patient_fhir_resources",
     "DIBBsMPIConnectorClient",
+    "AsyncDIBBsMPIConnectorClient",
     "datetime_to_str",
+    "StageTimer",
+    "LINKAGE_TIMER",
+    "BlockCache",
 ]
@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+from typing import List
+from typing import Union
+
+
+def blocking_criteria_to_key(blocking_criteria: dict) -> tuple:
+    """
+    Converts a dictionary of blocking criteria (as returned by
+    `extract_blocking_values_from_record`) into a hashable key, so that the
+    same criteria always give the same key whatever order they're in.
+
+    :param blocking_criteria: A dictionary of blocking criteria, e.g.,
+      {"zip": {"value": "90210", "transformation": "first4"}}.
+    :return: A tuple of (field, value, transformation) tuples, sorted by field.
+    """
+    return tuple(
+        sorted(
+            (field, criterion.get("value"), criterion.get("transformation"))
+            for field, criterion in blocking_criteria.items()
+        )
+    )
+
+
+class BlockCache:
+    """
+    A bounded, thread-safe cache of blocks of MPI data, keyed by the
+    blocking criteria used to fetch them. Blocks are evicted when the cache
+    is full, least recently used first, and expire a fixed time after they
+    were fetched. Since patients inserted by other processes can't
+    invalidate the cache, the time to live bounds how stale a block can be.
+    Counts of hits, misses, evictions, expirations and invalidations are
+    kept so the cache can be sized against real traffic.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Union[float, None] = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Creates a new, empty cache.
+
+        :param max_size: The maximum number of blocks to cache. Default: 1024.
+        :param ttl: The number of seconds a block stays in the cache after
+          it's fetched, or None if blocks should never expire. Default: 60.
+        :param clock: A function returning the current time in seconds, used
+          to expire blocks. Default: `time.monotonic`.
+        :raises ValueError: If `max_size` isn't positive, or `ttl` is negative.
+        """
+        if max_size < 1:
+            raise ValueError("`max_size` must be at least 1.")
+        if ttl is not None and ttl < 0:
+            raise ValueError("`ttl` cannot be negative.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.generation = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of blocks cached, including any that have expired
+        but haven't been looked up since.
+        """
+        return len(self._blocks)
+
+    def get(self, blocking_criteria: dict) -> Union[List[list], None]:
+        """
+        Gets the cached block for the blocking criteria, if there is one that
+        hasn't expired.
+
+        :param blocking_criteria: A dictionary of blocking criteria.
+        :return: A copy of the cached block, or None if it isn't cached.
+        """
+        key = blocking_criteria_to_key(blocking_criteria)
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= self.clock():
+                del self._blocks[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._blocks.move_to_end(key)
+            self._hits += 1
+            return list(entry[0])
+
+    def put(
+        self, blocking_criteria: dict, block: List[list], generation: int = None
+    ) -> None:
+        """
+        Caches the block fetched for the blocking criteria. A block fetched
+        while the cache was being invalidated may already be out of date, so
+        it is only cached if the cache's generation is still the one read
+        before the block was fetched.
+
+        :param blocking_criteria: A dictionary of blocking criteria.
+        :param block: The block of data fetched for the criteria.
+        :param generation: The cache's `generation` before the block was
+          fetched, or None to cache the block regardless. Default: None.
+        """
+        key = blocking_criteria_to_key(blocking_criteria)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            expires = None if self.ttl is None else self.clock() + self.ttl
+            self._blocks[key] = (list(block), expires)
+            self._blocks.move_to_end(key)
+            while len(self._blocks) > self.max_size:
+                self._blocks.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, predicate: Callable[[tuple], bool] = None) -> int:
+        """
+        Removes the cached blocks that may have changed, e.g. because a
+        patient that belongs in them was inserted into the MPI.
+
+        :param predicate: A function taking the key of a cached block (as
+          returned by `blocking_criteria_to_key`) and returning whether the
+          block should be removed, or None to remove every block.
+          Default: None.
+        :return: The number of blocks removed.
+        """
+        with self._lock:
+            self.generation += 1
+            if predicate is None:
+                keys = list(self._blocks)
+            else:
+                keys = [key for key in self._blocks if predicate(key)]
+            for key in keys:
+                del self._blocks[key]
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        """
+        Removes every cached block, without counting them as invalidated.
+        """
+        with self._lock:
+            self.generation += 1
+            self._blocks.clear()
+
+    def reset_stats(self) -> None:
+        """
+        Resets the counts of hits, misses, evictions, expirations and
+        invalidations to zero.
+        """
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._expirations = 0
+            self._invalidations = 0
+
+    def stats(self) -> dict:
+        """
+        Summarizes how the cache has been used since it was created or its
+        stats were last reset.
+
+        :return: A dictionary of the number of cache hits and misses, the
+          proportion of lookups that were hits (or None if there were none),
+          the number of blocks evicted to make room, expired, and invalidated,
+          and the current and maximum number of blocks cached.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else None,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "size": len(self._blocks),
+                "max_size": self.max_size,
+            }
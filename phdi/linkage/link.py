@@ -1,24 +1,36 @@
+import asyncio
 import copy
+import dataclasses
 import datetime
 import hashlib
 import json
 import logging
 import pathlib
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations
+from itertools import product
 from math import log
 from random import sample
 from typing import Callable
+from typing import Iterator
 from typing import List
 from typing import Union
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from pydantic import Field
 
 from phdi.fhir.utils import extract_value_with_resource_path
 from phdi.harmonization.utils import compare_strings
+from phdi.harmonization.utils import compare_strings_pairwise
+from phdi.linkage.cache import blocking_criteria_to_key
+from phdi.linkage.mpi import AsyncDIBBsMPIConnectorClient
 from phdi.linkage.mpi import BaseMPIConnectorClient
 from phdi.linkage.mpi import DIBBsMPIConnectorClient
+from phdi.linkage.timing import LINKAGE_TIMER
 from phdi.linkage.utils import datetime_to_str
 
 LINKING_FIELDS_TO_FHIRPATHS = {
@@ -33,6 +45,119 @@ LINKING_FIELDS_TO_FHIRPATHS = {
     "mrn": "Patient.identifier.where(type.coding.code='MR').value",
 }
 
+BLOCKING_TRANSFORMATIONS = {
+    "first4": lambda x: x[:4] if len(x) >= 4 else x,
+    "last4": lambda x: x[-4:] if len(x) >= 4 else x,
+}
+
+# Number of records scored against a block at once by the vectorized
+# comparisons, which bounds the size of the comparison matrices held in memory
+COMPARISON_CHUNK_SIZE = 512
+
+# Number of records sent to a worker process at once when a linkage pass is
+# run in parallel, so that small blocks don't each pay the cost of a round trip
+PARALLEL_SHARD_SIZE = 10000
+
+
+@dataclasses.dataclass
+class CompiledLinkagePass:
+    """
+    A single pass of a linkage algorithm whose feature functions and matching
+    rule have been resolved to callables. The column indices and per-field
+    comparators a pass uses depend only on the columns of the data it is run
+    against, so they are built the first time they're needed for a given set
+    of column headers and reused after that.
+    """
+
+    blocks: List[dict]
+    funcs: dict[str, Callable]
+    matching_rule: Callable
+    cluster_ratio: float = 0
+    kwargs: dict = dataclasses.field(default_factory=dict)
+    _col_to_idx: dict = dataclasses.field(default_factory=dict, init=False, repr=False)
+    _field_comparators: dict = dataclasses.field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def col_to_idx(self, header: List[str]) -> dict[str, int]:
+        """
+        Maps the names of the columns in a block of MPI data to their indices,
+        not including the patient and person ID columns.
+
+        :param header: The column headers of the block (i.e. its first row).
+        :return: A dictionary mapping column names to indices.
+        """
+        key = tuple(header)
+        if key not in self._col_to_idx:
+            self._col_to_idx[key] = {v: k for k, v in enumerate(header[2:])}
+        return self._col_to_idx[key]
+
+    def field_comparators(self, header: List[str]) -> List[Callable]:
+        """
+        Gets a comparator for each field this pass compares on, in the order of
+        `funcs`, for a block of MPI data with the given column headers. Each
+        comparator accepts the flattened form of an incoming record and of an
+        MPI record, both without their ID columns, and returns the result of the
+        field's feature function.
+
+        :param header: The column headers of the block (i.e. its first row).
+        :return: A list of comparators, one per field in `funcs`.
+        """
+        key = tuple(header)
+        if key not in self._field_comparators:
+            col_to_idx = self.col_to_idx(header)
+            self._field_comparators[key] = [
+                _build_field_comparator(
+                    feature_col, feature_func, col_to_idx, self.kwargs
+                )
+                for feature_col, feature_func in self.funcs.items()
+            ]
+        return self._field_comparators[key]
+
+
+class CompiledLinkagePlan:
+    """
+    A linkage algorithm configuration that has been prepared for repeated use.
+    Compiling a plan copies the configuration and binds the names of its feature
+    functions and matching rules to their callables once, so a plan can be built
+    when a service starts and shared by every request it handles, rather than
+    re-doing that work each time a record is linked. Plans can be passed in
+    place of an algorithm configuration to `link_record_against_mpi` and
+    `link_records_against_mpi`.
+    """
+
+    def __init__(self, algo_config: List[dict]):
+        """
+        Compiles a linkage algorithm configuration into a plan.
+
+        :param algo_config: An algorithm configuration consisting of a list
+          of dictionaries describing the algorithm to run. See
+          `read_linkage_config` and `write_linkage_config` for more details.
+        """
+        bound_config = _bind_func_names_to_invocations(copy.deepcopy(algo_config))
+        self.passes = [
+            CompiledLinkagePass(
+                blocks=linkage_pass["blocks"],
+                funcs=linkage_pass["funcs"],
+                matching_rule=linkage_pass["matching_rule"],
+                cluster_ratio=linkage_pass.get("cluster_ratio", 0),
+                kwargs=linkage_pass.get("kwargs", {}),
+            )
+            for linkage_pass in bound_config
+        ]
+
+    @classmethod
+    def from_config_file(cls, config_file: pathlib.Path) -> "CompiledLinkagePlan":
+        """
+        Compiles the linkage algorithm configuration stored in a JSON file into
+        a plan.
+
+        :param config_file: A `pathlib.Path` string pointing to a JSON file
+          that describes the algorithm to compile. See `read_linkage_config`.
+        :return: The compiled plan.
+        """
+        return cls(read_linkage_config(config_file))
+
 
 def block_data(data: pd.DataFrame, blocks: List) -> dict:
     """
@@ -46,14 +171,116 @@ def block_data(data: pd.DataFrame, blocks: List) -> dict:
       values as the data within each block, stored as a list of
       lists.
     """
-    blocked_data_tuples = tuple(data.groupby(blocks))
+    return dict(_iter_blocked_data(data, blocks))
 
-    # Convert data to list of lists within dict
-    blocked_data = dict()
-    for block, df in blocked_data_tuples:
-        blocked_data[block] = df.values.tolist()
 
-    return blocked_data
+def calculate_em_probs(
+    data: pd.DataFrame,
+    cols: Union[List[str], None] = None,
+    blocking_passes: Union[List[List[str]], None] = None,
+    n_samples: int = 100000,
+    max_iterations: int = 100,
+    tolerance: float = 1e-6,
+    seed: Union[int, None] = None,
+    m_file_to_write: Union[pathlib.Path, None] = None,
+    u_file_to_write: Union[pathlib.Path, None] = None,
+) -> tuple[dict, dict]:
+    """
+    For a given set of patient records, estimate the per-field m- and
+    u-probabilities without knowing which records are true matches, using
+    the expectation-maximization (EM) algorithm of the Fellegi-Sunter model.
+    Unlike `calculate_m_probs` and `calculate_u_probs`, which compare every
+    pair of records one field at a time, this compares a bounded random
+    sample of record pairs all at once, so that it scales to large data sets.
+
+    Almost all pairs of records chosen at random are not matches, so the
+    u-probabilities are estimated from how often a random sample of pairs
+    agree in each field. Matches are then found by EM among pairs sampled
+    from within the blocks of each blocking pass, holding the u-probabilities
+    fixed. Since pairs in the same block always agree in the blocking fields,
+    each field's m-probability is estimated from the passes that don't block
+    on it, and averaged across them. Both are smoothed in the same way as by
+    `calculate_m_probs` and `calculate_u_probs`, so the results can be passed
+    straight to `calculate_log_odds`.
+
+    :param data: A pandas dataframe of patient records to compute
+      probabilities for.
+    :param cols: Optionally, a list of columns to compute probabilities
+      for. If not supplied, computes probabilities across all fields.
+      Default is None.
+    :param blocking_passes: Optionally, a list of blocking passes, each a
+      list of the columns records must share to be in the same block. If
+      not supplied, matches are found among pairs of records sampled from
+      the whole data set, which only works well if it's small or has many
+      duplicates. Default is None.
+    :param n_samples: The number of pairs of records to sample to estimate
+      the u-probabilities, and from within the blocks of each blocking pass.
+      Default: 100000.
+    :param max_iterations: The maximum number of EM iterations to run for
+      each blocking pass. Default: 100.
+    :param tolerance: The largest change in any probability between
+      iterations at which EM is deemed to have converged. Default: 1e-6.
+    :param seed: Optionally, a seed for sampling pairs of records, so that
+      the estimates can be reproduced. Default is None.
+    :param m_file_to_write: Optionally, a destination filepath at which to
+      write the m-probabilities in JSON format. Default is None.
+    :param u_file_to_write: Optionally, a destination filepath at which to
+      write the u-probabilities in JSON format. Default is None.
+    :raises ValueError: If there are fewer than two records, no blocking
+      pass has two records in the same block, or a column is in every
+      blocking pass with two records in the same block.
+    :return: A tuple of the dictionaries of m- and u-probabilities computed
+      per field.
+    """
+    if cols is None:
+        cols = list(data.columns)
+    if len(data) < 2:
+        raise ValueError("At least two records are needed to estimate probabilities.")
+    if blocking_passes is None:
+        blocking_passes = [[]]
+
+    rng = np.random.default_rng(seed)
+    codes = np.column_stack([pd.factorize(data[c])[0] for c in cols])
+
+    pairs = _sample_pairs_within_blocks(np.zeros(len(data), dtype=int), n_samples, rng)
+    agreements = _compare_pairs(codes, pairs)
+    u = (agreements.sum(axis=0) + 1.0) / (len(pairs) + 1.0)
+
+    m_estimates = []
+    for blocks in blocking_passes:
+        if blocks:
+            block_ids = data.groupby(blocks, sort=False).ngroup().to_numpy()
+        else:
+            block_ids = np.zeros(len(data), dtype=int)
+        pairs = _sample_pairs_within_blocks(block_ids, n_samples, rng)
+        if len(pairs) == 0:
+            continue
+        estimated = np.array([c not in blocks for c in cols])
+        m = np.full(len(cols), np.nan)
+        m[estimated] = _fit_m_probs_em(
+            _compare_pairs(codes[:, estimated], pairs),
+            u[estimated],
+            max_iterations,
+            tolerance,
+        )
+        m_estimates.append(m)
+    if not m_estimates:
+        raise ValueError("No blocking pass has two records in the same block.")
+
+    # Fields used in every blocking pass never disagree within a block
+    unestimated = np.isnan(m_estimates).all(axis=0)
+    if unestimated.any():
+        raise ValueError(
+            "m-probabilities can't be estimated for columns used in every "
+            f"blocking pass: {[c for c, u_c in zip(cols, unestimated) if u_c]}"
+        )
+    m = np.nanmean(m_estimates, axis=0)
+
+    m_probs = {c: float(m_c) for c, m_c in zip(cols, m)}
+    u_probs = {c: float(u_c) for c, u_c in zip(cols, u)}
+    _write_prob_file(m_probs, m_file_to_write)
+    _write_prob_file(u_probs, u_file_to_write)
+    return m_probs, u_probs
 
 
 def calculate_log_odds(
@@ -302,11 +529,6 @@ def extract_blocking_values_from_record(
       "transformation" key whose value is one of our supported transforms.
     """
 
-    transform_funcs = {
-        "first4": lambda x: x[:4] if len(x) >= 4 else x,
-        "last4": lambda x: x[-4:] if len(x) >= 4 else x,
-    }
-
     for block_dict in blocking_fields:
         if "value" not in block_dict:
             raise KeyError(
@@ -333,7 +555,7 @@ def extract_blocking_values_from_record(
             if value:
                 if block in transformations:
                     try:
-                        value = transform_funcs[transformations[block]](value)
+                        value = BLOCKING_TRANSFORMATIONS[transformations[block]](value)
                     except KeyError:
                         raise ValueError(
                             f"Transformation {transformations[block]} is not valid."
@@ -544,7 +766,7 @@ def generate_hash_str(linking_identifier: str, salt_str: str) -> str:
 
 def link_record_against_mpi(
     record: dict,
-    algo_config: List[dict],
+    algo_config: Union[List[dict], CompiledLinkagePlan],
     external_person_id: str = None,
     mpi_client: BaseMPIConnectorClient = None,
 ) -> tuple[bool, str]:
@@ -561,8 +783,9 @@ def link_record_against_mpi(
     :param record: The FHIR-formatted patient resource to try to match to
       other records in the MPI.
     :param algo_config: An algorithm configuration consisting of a list
-      of dictionaries describing the algorithm to run. See
-      `read_linkage_config` and `write_linkage_config` for more details.
+      of dictionaries describing the algorithm to run, or a
+      `CompiledLinkagePlan` compiled from one. See `read_linkage_config`
+      and `write_linkage_config` for more details.
     :returns: A tuple consisting of a boolean indicating whether a match
       was found for the new record in the MPI, followed by the ID of the
       Person entity now associated with the incoming patient (either a
@@ -575,33 +798,21 @@ def link_record_against_mpi(
 
     # Need to bind function names back to their symbolic invocations
     # in context of the module--i.e. turn the string of a function
-    # name back into the callable defined in link.py
-
-    algo_config = copy.deepcopy(algo_config)
-    logging.info(
-        f"Starting _bind_func_names_to_invocations at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
-    algo_config = _bind_func_names_to_invocations(algo_config)
-    logging.info(
-        f"Done with _bind_func_names_to_invocations at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
+    # name back into the callable defined in link.py; a compiled plan has
+    # already done this, so only compile one if we weren't given one
+    if not isinstance(algo_config, CompiledLinkagePlan):
+        algo_config = CompiledLinkagePlan(algo_config)
 
     # Membership ratios need to persist across linkage passes so that we can
     # find the highest scoring match across all trials
     linkage_scores = {}
-    for linkage_pass in algo_config:
-        blocking_fields = linkage_pass["blocks"]
+    for linkage_pass in algo_config.passes:
+        blocking_fields = linkage_pass.blocks
 
         # MPI will be able to find patients if *any* of their names or addresses
         # contains extracted values, so minimally block on the first line
         # if applicable
-        logging.info(
-            f"Starting extract_blocking_values_from_record at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
         blocking_criteria = extract_blocking_values_from_record(record, blocking_fields)
-        logging.info(
-            f"Done with extract_blocking_values_from_record at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
 
         # We don't enforce blocking if an extracted value is empty, so if all
         # values come back blank, skip the pass because the only alt is comparing
@@ -609,105 +820,228 @@ def link_record_against_mpi(
         if len(blocking_criteria) == 0:
             logging.info("No blocking criteria extracted from incoming record.")
             continue
-        logging.info(
-            f"Starting get_block_data at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
-        raw_data_block = mpi_client.get_block_data(blocking_criteria)
-        logging.info(
-            f"Done with get_block_data at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
+        with LINKAGE_TIMER.time("block_fetch"):
+            raw_data_block = mpi_client.get_block_data(blocking_criteria)
 
         data_block = _convert_given_name_to_first_name(raw_data_block)
+        _score_record_against_block(record, data_block, linkage_pass, linkage_scores)
+    person_id = None
+    matched = False
 
-        # First row of returned block is column headers
-        # Map column name to idx, not including patient/person IDs
-        col_to_idx = {v: k for k, v in enumerate(data_block[0][2:])}
-        if len(data_block[1:]) > 0:  # Check if data_block is empty
-            data_block = data_block[1:]
-            logging.info(
-                f"Starting _flatten_patient_resource at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
-            flattened_record = _flatten_patient_resource(record, col_to_idx)
-            logging.info(
-                f"Done with _flatten_patient_resource at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
+    # If we found any matches, find the strongest one
+    if len(linkage_scores) != 0:
+        person_id = _find_strongest_link(linkage_scores)
+        matched = True
+    with LINKAGE_TIMER.time("insert"):
+        person_id = mpi_client.insert_matched_patient(
+            record, person_id=person_id, external_person_id=external_person_id
+        )
 
-            logging.info(
-                f"Starting _group_patient_block_by_person at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
-            clusters = _group_patient_block_by_person(data_block)
-            logging.info(
-                f"Done with _group_patient_block_by_person at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
+    return (matched, person_id)
 
-            # Check if incoming record should belong to one of the person clusters
-            kwargs = linkage_pass.get("kwargs", {})
-            for person in clusters:
-                num_matched_in_cluster = 0.0
-                for linked_patient in clusters[person]:
-                    logging.info(
-                        f"Starting _compare_records at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                    )
-                    is_match = _compare_records(
-                        flattened_record,
-                        linked_patient,
-                        linkage_pass["funcs"],
-                        col_to_idx,
-                        linkage_pass["matching_rule"],
-                        **kwargs,
-                    )
-                    logging.info(
-                        f"Done with _compare_records at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                    )
 
-                    if is_match:
-                        num_matched_in_cluster += 1.0
+async def link_record_against_mpi_async(
+    record: dict,
+    algo_config: Union[List[dict], CompiledLinkagePlan],
+    external_person_id: str = None,
+    mpi_client: AsyncDIBBsMPIConnectorClient = None,
+) -> tuple[bool, str]:
+    """
+    Runs record linkage on a single incoming record (extracted from a FHIR
+    bundle) using an existing database as an MPI, exactly as
+    `link_record_against_mpi` does, but with an async MPI client so that
+    waiting on the MPI doesn't block the event loop. Since the blocks of
+    every linkage pass only depend on the incoming record, they are all
+    fetched from the MPI at once before any of them are scored.
+
+    :param record: The FHIR-formatted patient resource to try to match to
+      other records in the MPI.
+    :param algo_config: An algorithm configuration consisting of a list
+      of dictionaries describing the algorithm to run, or a
+      `CompiledLinkagePlan` compiled from one. See `read_linkage_config`
+      and `write_linkage_config` for more details.
+    :param external_person_id: Optionally, the external person ID of the
+      incoming record. Default is None.
+    :param mpi_client: Optionally, an async connector client for the MPI.
+      Default is a new `AsyncDIBBsMPIConnectorClient`.
+    :returns: A tuple consisting of a boolean indicating whether a match
+      was found for the new record in the MPI, followed by the ID of the
+      Person entity now associated with the incoming patient (either a
+      new Person ID or the ID of an existing matched Person).
+    """
+    if mpi_client is None:
+        logging.info("MPI client was None, instatiating new client.")
+        mpi_client = AsyncDIBBsMPIConnectorClient()
+
+    if not isinstance(algo_config, CompiledLinkagePlan):
+        algo_config = CompiledLinkagePlan(algo_config)
+
+    # Passes that extract no blocking values are skipped, as they are when
+    # linking synchronously
+    linkage_passes = []
+    blocking_criteria = []
+    for linkage_pass in algo_config.passes:
+        pass_criteria = extract_blocking_values_from_record(record, linkage_pass.blocks)
+        if len(pass_criteria) == 0:
+            logging.info("No blocking criteria extracted from incoming record.")
+            continue
+        linkage_passes.append(linkage_pass)
+        blocking_criteria.append(pass_criteria)
 
-                # Update membership score for this person cluster so that we can
-                # track best possible link across multiple passes
-                logging.info(
-                    f"Starting to update membership score at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                )
-                belongingness_ratio = num_matched_in_cluster / len(clusters[person])
-                if belongingness_ratio >= linkage_pass.get("cluster_ratio", 0):
-                    logging.info(
-                        f"belongingness_ratio >= linkage_pass.get('cluster_ratio', 0): {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                    )
-                    if person in linkage_scores:
-                        linkage_scores[person] = max(
-                            [linkage_scores[person], belongingness_ratio]
-                        )
-                    else:
-                        linkage_scores[person] = belongingness_ratio
-                logging.info(
-                    f"Done with updating membership score at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                )
+    async def get_block_data(pass_criteria: dict) -> List[list]:
+        with LINKAGE_TIMER.time("block_fetch"):
+            return await mpi_client.get_block_data(pass_criteria)
+
+    raw_data_blocks = await asyncio.gather(
+        *[get_block_data(pass_criteria) for pass_criteria in blocking_criteria]
+    )
+
+    linkage_scores = {}
+    for linkage_pass, raw_data_block in zip(linkage_passes, raw_data_blocks):
+        data_block = _convert_given_name_to_first_name(raw_data_block)
+        _score_record_against_block(record, data_block, linkage_pass, linkage_scores)
     person_id = None
     matched = False
 
     # If we found any matches, find the strongest one
     if len(linkage_scores) != 0:
-        logging.info(
-            f"Starting _find_strongest_link at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
         person_id = _find_strongest_link(linkage_scores)
         matched = True
-        logging.info(
-            f"Done with _find_strongest_link at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
+    with LINKAGE_TIMER.time("insert"):
+        person_id = await mpi_client.insert_matched_patient(
+            record, person_id=person_id, external_person_id=external_person_id
         )
-    logging.info(
-        f"Starting mpi_client.insert_matched_patient at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
-    person_id = mpi_client.insert_matched_patient(
-        record, person_id=person_id, external_person_id=external_person_id
-    )
-    logging.info(
-        f"Done with mpi_client.insert_matched_patient at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-    )
 
     return (matched, person_id)
 
 
+def link_records_against_mpi(
+    records: List[dict],
+    algo_config: Union[List[dict], CompiledLinkagePlan],
+    external_person_ids: Union[List[str], None] = None,
+    mpi_client: BaseMPIConnectorClient = None,
+) -> List[tuple[bool, str]]:
+    """
+    Runs record linkage on a batch of incoming records (each extracted from
+    a FHIR bundle) using an existing database as an MPI. The linkage logic
+    for each record is identical to that of `link_record_against_mpi`, but
+    the work is shared across the batch: records are grouped by the blocking
+    values they extract in each pass, a single block query is issued to the
+    MPI per distinct set of blocking values, all scoring is done in memory,
+    and every resulting insert is committed to the MPI in one transaction.
+
+    Records are linked in the order they are supplied, and each record is
+    compared against both the MPI and any earlier record in the same batch
+    that falls into its block, so records within a batch can link to one
+    another just as they would if they had been linked one at a time.
+
+    :param records: A list of FHIR-formatted patient resources to try to
+      match to other records in the MPI.
+    :param algo_config: An algorithm configuration consisting of a list
+      of dictionaries describing the algorithm to run, or a
+      `CompiledLinkagePlan` compiled from one. See `read_linkage_config`
+      and `write_linkage_config` for more details.
+    :param external_person_ids: Optionally, a list of external person IDs,
+      one for each record in `records` (using `None` where a record has no
+      external ID). Default is None.
+    :param mpi_client: Optionally, a connector client for the MPI. Must
+      provide an `insert_matched_patients` method for committing a batch
+      of inserts. Default is a new `DIBBsMPIConnectorClient`.
+    :raises ValueError: If `external_person_ids` is supplied but is not the
+      same length as `records`.
+    :returns: A list of tuples, one per incoming record and in the same
+      order, each consisting of a boolean indicating whether a match was
+      found for the record, followed by the ID of the Person entity now
+      associated with it.
+    """
+    if external_person_ids is None:
+        external_person_ids = [None] * len(records)
+    if len(external_person_ids) != len(records):
+        raise ValueError(
+            "`external_person_ids` must contain one entry for each record to link."
+        )
+    if len(records) == 0:
+        return []
+
+    if mpi_client is None:
+        logging.info("MPI client was None, instatiating new client.")
+        mpi_client = DIBBsMPIConnectorClient()
+
+    if not isinstance(algo_config, CompiledLinkagePlan):
+        algo_config = CompiledLinkagePlan(algo_config)
+    linkage_passes = algo_config.passes
+
+    # Work out every record's blocking criteria up front so that each
+    # distinct block only needs to be fetched from the MPI once
+    criteria_by_record = [
+        [
+            extract_blocking_values_from_record(record, linkage_pass.blocks)
+            for linkage_pass in linkage_passes
+        ]
+        for record in records
+    ]
+    blocks_by_key = {}
+    for record_criteria in criteria_by_record:
+        for blocking_criteria in record_criteria:
+            if len(blocking_criteria) == 0:
+                continue
+            block_key = blocking_criteria_to_key(blocking_criteria)
+            if block_key not in blocks_by_key:
+                with LINKAGE_TIMER.time("block_fetch"):
+                    raw_data_block = mpi_client.get_block_data(blocking_criteria)
+                blocks_by_key[block_key] = _convert_given_name_to_first_name(
+                    raw_data_block
+                )
+
+    # Records already linked in this batch, indexed by every blocking key
+    # they would satisfy in each pass, so later records can find them
+    linked_in_batch = [{} for _ in linkage_passes]
+    results = []
+    person_ids = []
+    for record, record_criteria in zip(records, criteria_by_record):
+        linkage_scores = {}
+        for pass_idx, linkage_pass in enumerate(linkage_passes):
+            blocking_criteria = record_criteria[pass_idx]
+            if len(blocking_criteria) == 0:
+                continue
+            block_key = blocking_criteria_to_key(blocking_criteria)
+            data_block = list(blocks_by_key[block_key])
+            for batch_record, batch_person_id in linked_in_batch[pass_idx].get(
+                block_key, []
+            ):
+                data_block.extend(
+                    _build_block_rows_from_record(
+                        batch_record, batch_person_id, data_block[0]
+                    )
+                )
+            _score_record_against_block(
+                record, data_block, linkage_pass, linkage_scores
+            )
+
+        if len(linkage_scores) != 0:
+            person_id = _find_strongest_link(linkage_scores)
+            matched = True
+        else:
+            person_id = uuid.uuid4()
+            matched = False
+        results.append((matched, person_id))
+        person_ids.append(person_id)
+
+        for pass_idx, linkage_pass in enumerate(linkage_passes):
+            for block_key in _extract_blocking_keys_from_record(
+                record, linkage_pass.blocks
+            ):
+                linked_in_batch[pass_idx].setdefault(block_key, []).append(
+                    (record, person_id)
+                )
+
+    with LINKAGE_TIMER.time("insert"):
+        mpi_client.insert_matched_patients(
+            records, person_ids=person_ids, external_person_ids=external_person_ids
+        )
+    return results
+
+
 def load_json_probs(path: pathlib.Path):
     """
     Load a dictionary of probabilities from a JSON-formatted file.
@@ -775,23 +1109,45 @@ def match_within_block(
       in the block of data of records deemed to match.
     """
     match_pairs = []
+    if len(block) < 2:
+        return match_pairs
+
+    # Score each chunk of records against every record from the start of the
+    # chunk onwards in one go; order doesn't matter, so only the pairs above
+    # the diagonal need to be kept
+    for start in range(0, len(block), COMPARISON_CHUNK_SIZE):
+        end = min(start + COMPARISON_CHUNK_SIZE, len(block))
+        matches = _match_matrix(
+            block[start:end],
+            block[start:],
+            feature_funcs,
+            col_to_idx,
+            match_eval,
+            kwargs,
+            **kwargs,
+        )
+        if matches is not None:
+            for i, j in zip(*np.nonzero(np.triu(matches, k=1))):
+                match_pairs.append((start + int(i), start + int(j)))
+            continue
 
-    # Dynamic programming table: order doesn't matter, so only need to
-    # check each combo of i,j once
-    for i, record_i in enumerate(block):
-        for j in range(i + 1, len(block)):
-            record_j = block[j]
-            feature_comps = [
-                feature_funcs[feature_col](
-                    record_i, record_j, feature_col, col_to_idx, **kwargs
-                )
-                for feature_col in feature_funcs
-            ]
+        # Custom feature functions or matching rules are evaluated one
+        # pair of records at a time
+        for i in range(start, end):
+            record_i = block[i]
+            for j in range(i + 1, len(block)):
+                record_j = block[j]
+                feature_comps = [
+                    feature_funcs[feature_col](
+                        record_i, record_j, feature_col, col_to_idx, **kwargs
+                    )
+                    for feature_col in feature_funcs
+                ]
 
-            # If it's a match, store the result
-            is_match = match_eval(feature_comps, **kwargs)
-            if is_match:
-                match_pairs.append((i, j))
+                # If it's a match, store the result
+                is_match = match_eval(feature_comps, **kwargs)
+                if is_match:
+                    match_pairs.append((i, j))
 
     return match_pairs
 
@@ -806,6 +1162,8 @@ def perform_linkage_pass(
     feature_funcs: dict[str, Callable],
     matching_rule: Callable,
     cluster_ratio: Union[float, None] = None,
+    n_workers: int = 1,
+    shard_size: int = PARALLEL_SHARD_SIZE,
     **kwargs,
 ) -> dict:
     """
@@ -813,6 +1171,13 @@ def perform_linkage_pass(
     Each rule in an algorithm is associated with its own pass through the
     data.
 
+    Blocks are matched one at a time as they're split from the data, or, if
+    `n_workers` is more than 1, are grouped into shards of about `shard_size`
+    records and matched in parallel by a pool of worker processes. To be sent
+    to the workers, the feature functions, matching rule and any keyword
+    arguments must be picklable, e.g. functions defined at the top level of a
+    module rather than lambdas.
+
     :param data: Currently, a pandas dataframe of records to link. When we
       move out of testing, this should become a LoL.
     :param blocks: A list of column headers to use as blocking assignments
@@ -824,33 +1189,39 @@ def perform_linkage_pass(
     :param cluster_ratio: An optional parameter indicating, if using the
       algorithm in cluster mode, the required membership percentage a record
       must score with an existing cluster in order to join.
+    :param n_workers: The number of worker processes to match blocks in, or 1
+      to match them in this process. Default: 1.
+    :param shard_size: The number of records to send to a worker process at
+      once when matching blocks in parallel. Blocks are never split between
+      shards, so a shard holding a large block may be bigger than this.
+      Default: 10000.
+    :raises ValueError: If `n_workers` or `shard_size` is less than 1.
     :return: A dictionary mapping each block found in the pass to the matches
       discovered within that block.
     """
+    if n_workers < 1:
+        raise ValueError("`n_workers` must be at least 1.")
+    if shard_size < 1:
+        raise ValueError("`shard_size` must be at least 1.")
+
     # Retrieve indices of columns
     cols = list(data.columns.values)
     col_to_idx = dict(zip(cols, range(len(cols))))
 
-    blocked_data = block_data(data, blocks)
-    matches = {}
-    for block in blocked_data:
-        if cluster_ratio:
-            matches_in_block = _match_within_block_cluster_ratio(
-                blocked_data[block],
-                cluster_ratio,
-                feature_funcs,
-                col_to_idx,
-                matching_rule,
-                **kwargs,
-            )
-        else:
-            matches_in_block = match_within_block(
-                blocked_data[block], feature_funcs, col_to_idx, matching_rule, **kwargs
-            )
-        matches_in_block = _map_matches_to_record_ids(
-            matches_in_block, blocked_data[block], cluster_ratio is not None
+    blocked_data = _iter_blocked_data(data, blocks)
+    match_args = (cluster_ratio, feature_funcs, col_to_idx, matching_rule, kwargs)
+    if n_workers == 1:
+        shard_matches = (
+            _match_within_shard([block], *match_args) for block in blocked_data
         )
-        matches[block] = matches_in_block
+    else:
+        shard_matches = _match_shards_in_processes(
+            _shard_blocked_data(blocked_data, shard_size), n_workers, match_args
+        )
+
+    matches = {}
+    for matches_in_shard in shard_matches:
+        matches.update(matches_in_shard)
     return matches
 
 
@@ -1151,6 +1522,135 @@ def _bind_func_names_to_invocations(algo_config: List[dict]):
     return algo_config
 
 
+def _build_field_comparator(
+    feature_col: str,
+    feature_func: Callable,
+    col_to_idx: dict[str, int],
+    kwargs: dict,
+) -> Callable:
+    """
+    Helper method that builds a closure comparing one field of the flattened
+    form of an incoming record to the same field of a flattened MPI record,
+    in the same way `_compare_records_field_helper` would, but with the
+    choice of comparison and the field's index resolved up front.
+    """
+    idx = col_to_idx[feature_col]
+    single_col_to_idx = {feature_col: 0}
+    if feature_col == "first_name":
+
+        def compare(record: List, mpi_patient: List):
+            return feature_func(
+                [" ".join(record[idx])],
+                [mpi_patient[idx]],
+                feature_col,
+                single_col_to_idx,
+                **kwargs,
+            )
+
+    elif feature_col in ["address", "city", "state", "zip"]:
+
+        def compare(record: List, mpi_patient: List):
+            feature_comp = False
+            for element in record[idx]:
+                feature_comp = feature_func(
+                    [element],
+                    [mpi_patient[idx]],
+                    feature_col,
+                    single_col_to_idx,
+                    **kwargs,
+                )
+                if feature_comp:
+                    break
+            return feature_comp
+
+    else:
+
+        def compare(record: List, mpi_patient: List):
+            return feature_func(record, mpi_patient, feature_col, col_to_idx, **kwargs)
+
+    return compare
+
+
+def _build_block_rows_from_record(
+    record: dict, person_id: str, header: List[str]
+) -> List[list]:
+    """
+    Helper method that converts a FHIR patient resource into the rows the MPI
+    would return for it in a block of data, i.e. one row per combination of
+    name and address, with columns ordered according to the supplied header
+    of a block returned by `get_block_data`. Birthdates are parsed into dates,
+    as they would be when read back from the MPI.
+    """
+    mrn = extract_value_with_resource_path(
+        record, LINKING_FIELDS_TO_FHIRPATHS["mrn"], selection_criteria="first"
+    )
+    birthdate = record.get("birthDate")
+    try:
+        birthdate = datetime.date.fromisoformat(birthdate)
+    except (TypeError, ValueError):
+        pass
+    rows = []
+    for name in record.get("name") or [{}]:
+        for address in record.get("address") or [{}]:
+            row = {
+                "patient_id": record.get("id"),
+                "person_id": person_id,
+                "birthdate": birthdate,
+                "sex": record.get("gender"),
+                "mrn": mrn,
+                "last_name": name.get("family"),
+                "first_name": " ".join(name.get("given") or []),
+                "address": (address.get("line") or [None])[0],
+                "zip": address.get("postalCode"),
+                "city": address.get("city"),
+                "state": address.get("state"),
+            }
+            rows.append([row.get(col) for col in header])
+    return rows
+
+
+def _extract_blocking_keys_from_record(
+    record: dict, blocking_fields: List[dict]
+) -> set:
+    """
+    Helper method that determines every block a record would be returned in
+    by the MPI for a given linkage pass. Since the MPI finds a patient if
+    *any* of their names, addresses or identifiers satisfy the blocking
+    criteria, and an incoming record only blocks on the fields it has values
+    for, this is every combination of the record's (transformed) values over
+    every non-empty subset of the blocking fields.
+    """
+    values_by_field = {}
+    for block_dict in blocking_fields:
+        field = block_dict.get("value")
+        transformation = block_dict.get("transformation")
+        if field == "address":
+            values = [
+                (address.get("line") or [None])[0]
+                for address in record.get("address") or []
+            ]
+        else:
+            values = (
+                extract_value_with_resource_path(
+                    record, LINKING_FIELDS_TO_FHIRPATHS[field], selection_criteria="all"
+                )
+                or []
+            )
+        values = {v for v in values if v is not None and v != ""}
+        if transformation is not None:
+            values = {BLOCKING_TRANSFORMATIONS[transformation](v) for v in values}
+        if values:
+            values_by_field[field] = [(field, v, transformation) for v in values]
+
+    keys = set()
+    fields = list(values_by_field)
+    for n_fields in range(1, len(fields) + 1):
+        for subset in combinations(fields, n_fields):
+            for criteria in product(*[values_by_field[f] for f in subset]):
+                keys.add(tuple(sorted(criteria)))
+    return keys
+
+
 def _eval_record_in_cluster(
     block: List[List],
     i: int,
@@ -1285,6 +1785,279 @@ def _compare_name_elements(
     return feature_comp
 
 
+def _compare_feature_columns(
+    feature_func: Callable,
+    feature_col: str,
+    values_i: List,
+    values_j: List,
+    **kwargs,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that computes, as a single matrix operation, the comparison
+    one of the built-in feature functions would make between every value in
+    `values_i` and every value in `values_j`. Returns None if the feature
+    function has no vectorized form, or the values aren't of a type the
+    vectorized form handles, in which case callers should fall back to
+    comparing one pair of records at a time.
+    """
+    if feature_func in (feature_match_exact, feature_match_log_odds_exact):
+        if feature_func is feature_match_log_odds_exact and "log_odds" not in kwargs:
+            raise KeyError("Mapping of columns to m/u log-odds must be provided.")
+        codes = _encode_for_equality(values_i, values_j)
+        if codes is None:
+            return None
+        comps = codes[0][:, None] == codes[1][None, :]
+        if feature_func is feature_match_log_odds_exact:
+            return np.where(comps, kwargs["log_odds"][feature_col], 0.0)
+        return comps
+
+    if feature_func is feature_match_four_char:
+        try:
+            first_four_i = [v[: min(4, len(v))] for v in values_i]
+            first_four_j = [v[: min(4, len(v))] for v in values_j]
+        except TypeError:
+            return None
+        return _compare_feature_columns(
+            feature_match_exact, feature_col, first_four_i, first_four_j
+        )
+
+    if feature_func in (
+        feature_match_fuzzy_string,
+        feature_match_log_odds_fuzzy_compare,
+    ):
+        log_odds_compare = feature_func is feature_match_log_odds_fuzzy_compare
+        if log_odds_compare and "log_odds" not in kwargs:
+            raise KeyError("Mapping of columns to m/u log-odds must be provided.")
+
+        # Convert datetime obj to str using helper function
+        if feature_col == "birthdate":
+            values_i = [datetime_to_str(v) for v in values_i]
+            values_j = [datetime_to_str(v) for v in values_j]
+        if not all(v is None or isinstance(v, str) for v in values_i + values_j):
+            return None
+
+        similarity_measure = "JaroWinkler"
+        if "similarity_measure" in kwargs and not log_odds_compare:
+            similarity_measure = kwargs["similarity_measure"]
+        threshold = kwargs.get("threshold", 0.7)
+        scores = _similarity_matrix(values_i, values_j, similarity_measure, threshold)
+        if scores is None:
+            return None
+
+        if log_odds_compare:
+            scores[scores < threshold] = 0.0
+            return scores * kwargs["log_odds"][feature_col]
+
+        # Special case for two empty strings, since we don't want vacuous
+        # equality (or in-) to penalize the score
+        empty_i = np.array([v == "" for v in values_i], dtype=bool)
+        empty_j = np.array([v == "" for v in values_j], dtype=bool)
+        none_i = np.array([v is None for v in values_i], dtype=bool)
+        none_j = np.array([v is None for v in values_j], dtype=bool)
+        return (
+            (scores >= threshold)
+            | np.outer(empty_i, empty_j)
+            | np.outer(none_i, none_j)
+        )
+
+    return None
+
+
+def _compare_record_to_block(
+    record: List,
+    mpi_patients: List[List],
+    feature_funcs: dict,
+    col_to_idx: dict[str, int],
+    matching_rule: callable,
+    field_comparators: Union[List[Callable], None] = None,
+    **kwargs,
+) -> List[bool]:
+    """
+    Helper method that compares the flattened form of an incoming new patient
+    record to every flattened patient record in a block pulled from the MPI,
+    giving the same result as calling `_compare_records` on each in turn.
+    Whenever the feature functions and matching rule are all built-ins, each
+    feature is scored against the whole block at once. Otherwise, records
+    are compared one at a time, using the given per-field comparators (see
+    `CompiledLinkagePass.field_comparators`) if there are any.
+    """
+    if matching_rule in (eval_perfect_match, eval_log_odds_cutoff):
+        # Format is patient_id, person_id, alphabetical list of FHIR keys
+        # Don't use the first two ID cols when linking
+        record_features = record[2:]
+        feature_comps = []
+        for feature_col, feature_func in feature_funcs.items():
+            idx = col_to_idx[feature_col]
+            mpi_values = [mpi_patient[2 + idx] for mpi_patient in mpi_patients]
+            if feature_col == "first_name":
+                comps = _compare_feature_columns(
+                    feature_func,
+                    feature_col,
+                    [" ".join(record_features[idx])],
+                    mpi_values,
+                    **kwargs,
+                )
+            elif feature_col in ["address", "city", "state", "zip"]:
+                # Any one of the record's elements matching is enough, and
+                # the comparison from the first one that does is kept
+                comps = np.zeros((1, len(mpi_patients)), dtype=bool)
+                found = np.zeros((1, len(mpi_patients)), dtype=bool)
+                for element in record_features[idx]:
+                    element_comps = _compare_feature_columns(
+                        feature_func, feature_col, [element], mpi_values, **kwargs
+                    )
+                    if element_comps is None:
+                        comps = None
+                        break
+                    comps = np.where(found, comps, element_comps)
+                    found |= element_comps.astype(bool)
+            else:
+                comps = _compare_feature_columns(
+                    feature_func,
+                    feature_col,
+                    [record_features[idx]],
+                    mpi_values,
+                    **kwargs,
+                )
+            if comps is None:
+                break
+            feature_comps.append(comps)
+        else:
+            return _evaluate_match_matrix(
+                matching_rule, feature_comps, (1, len(mpi_patients)), **kwargs
+            )[0].tolist()
+
+    if field_comparators is None:
+        return [
+            _compare_records(
+                record, mpi_patient, feature_funcs, col_to_idx, matching_rule, **kwargs
+            )
+            for mpi_patient in mpi_patients
+        ]
+
+    # Format is patient_id, person_id, alphabetical list of FHIR keys
+    # Don't use the first two ID cols when linking
+    record_features = record[2:]
+    return [
+        matching_rule(
+            [
+                compare(record_features, mpi_patient[2:])
+                for compare in field_comparators
+            ],
+            **kwargs,
+        )
+        for mpi_patient in mpi_patients
+    ]
+
+
+def _encode_for_equality(
+    values_i: List, values_j: List
+) -> Union[tuple[np.ndarray, np.ndarray], None]:
+    """
+    Helper method that maps two lists of values onto integer codes, such that
+    two values share a code exactly when they compare equal. Returns None if
+    any value can't be encoded this way (e.g. it's unhashable).
+    """
+    codes = {}
+    encoded = []
+    try:
+        for offset, values in [(0, values_i), (len(values_i), values_j)]:
+            column = np.empty(len(values), dtype=np.int64)
+            for k, value in enumerate(values):
+                if value == value:
+                    column[k] = codes.setdefault(value, len(codes))
+                else:
+                    # Values that aren't equal to themselves (e.g. NaN) never
+                    # match anything, so each gets a code of its own
+                    column[k] = -1 - offset - k
+            encoded.append(column)
+    except (TypeError, ValueError):
+        return None
+    return encoded[0], encoded[1]
+
+
+def _evaluate_match_matrix(
+    match_eval: Callable,
+    feature_comparisons: List[np.ndarray],
+    shape: tuple[int, int],
+    **kwargs,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that applies one of the built-in match evaluation rules to
+    matrices of feature comparisons, giving a boolean matrix of which pairs
+    of records match. Returns None if the rule has no vectorized form.
+    """
+    if match_eval not in (eval_perfect_match, eval_log_odds_cutoff):
+        return None
+    if match_eval is eval_log_odds_cutoff and "true_match_threshold" not in kwargs:
+        raise KeyError("Cutoff threshold for true matches must be passed.")
+
+    # Accumulate in feature order so totals are summed exactly as `sum` would
+    total = np.zeros(shape, dtype=np.int64)
+    for comps in feature_comparisons:
+        total = total + comps
+    if match_eval is eval_perfect_match:
+        return total == len(feature_comparisons)
+    return total >= kwargs["true_match_threshold"]
+
+
+def _match_matrix(
+    records_i: List[List],
+    records_j: List[List],
+    feature_funcs: dict[str, Callable],
+    col_to_idx: dict[str, int],
+    match_eval: Callable,
+    eval_kwargs: dict,
+    **kwargs,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that determines whether each record in `records_i` matches
+    each record in `records_j`, scoring every feature column for all pairs at
+    once. Returns None if any of the feature functions or the match evaluation
+    rule has no vectorized form, in which case callers should fall back to
+    comparing one pair of records at a time.
+    """
+    if match_eval not in (eval_perfect_match, eval_log_odds_cutoff):
+        return None
+    feature_comps = []
+    for feature_col, feature_func in feature_funcs.items():
+        idx = col_to_idx[feature_col]
+        comps = _compare_feature_columns(
+            feature_func,
+            feature_col,
+            [record[idx] for record in records_i],
+            [record[idx] for record in records_j],
+            **kwargs,
+        )
+        if comps is None:
+            return None
+        feature_comps.append(comps)
+    return _evaluate_match_matrix(
+        match_eval, feature_comps, (len(records_i), len(records_j)), **eval_kwargs
+    )
+
+
+def _similarity_matrix(
+    values_i: List[Union[str, None]],
+    values_j: List[Union[str, None]],
+    similarity_measure: str,
+    threshold: float,
+) -> Union[np.ndarray, None]:
+    """
+    Helper method that computes the string similarity between every pair of
+    values drawn from two lists. The batched scorers can differ from the
+    single-pair ones used by `compare_strings` in the last bit of precision,
+    so any score close enough to the threshold to be affected is recomputed
+    with `compare_strings`.
+    """
+    scores = compare_strings_pairwise(values_i, values_j, similarity_measure)
+    if scores is None:
+        return None
+    for i, j in np.argwhere(np.abs(scores - threshold) < 1e-9):
+        scores[i, j] = compare_strings(values_i[i], values_j[j], similarity_measure)
+    return scores
+
+
 def _condense_extract_address_from_resource(resource: dict, field: str) -> List[str]:
     """
     Formatting function to account for patient resources that have multiple
@@ -1392,6 +2165,123 @@ def _group_patient_block_by_person(data_block: List[list]) -> dict[str, List]:
     return clusters
 
 
+def _iter_blocked_data(data: pd.DataFrame, blocks: List) -> Iterator[tuple]:
+    """
+    Splits a dataframe of records into blocks, one block at a time, so that
+    the blocks don't all need to be held in memory as lists at once.
+
+    :param data: A pandas dataframe of records to be linked.
+    :param blocks: List of columns to be used in blocks.
+    :return: A generator of (block, records) tuples, where block is the key
+      of the block and records are the data within it, stored as a list of
+      lists.
+    """
+    for block, df in data.groupby(blocks):
+        yield block, df.values.tolist()
+
+
+def _shard_blocked_data(
+    blocked_data: Iterator[tuple], shard_size: int
+) -> Iterator[List[tuple]]:
+    """
+    Groups blocks of data into shards of at least `shard_size` records, apart
+    from the last, without splitting any block between shards.
+
+    :param blocked_data: A generator of (block, records) tuples, as returned
+      by `_iter_blocked_data`.
+    :param shard_size: The number of records to group into each shard.
+    :return: A generator of lists of (block, records) tuples.
+    """
+    shard = []
+    num_records = 0
+    for block, records in blocked_data:
+        shard.append((block, records))
+        num_records += len(records)
+        if num_records >= shard_size:
+            yield shard
+            shard = []
+            num_records = 0
+    if shard:
+        yield shard
+
+
+def _match_within_shard(
+    shard: List[tuple],
+    cluster_ratio: Union[float, None],
+    feature_funcs: dict[str, Callable],
+    col_to_idx: dict[str, int],
+    match_eval: Callable,
+    kwargs: dict,
+) -> List[tuple]:
+    """
+    Finds the matches within each block of a shard of blocked data, using
+    `match_within_block`, or `_match_within_block_cluster_ratio` in cluster
+    mode.
+
+    :param shard: A list of (block, records) tuples.
+    :param cluster_ratio: The required membership percentage a record must
+      score with an existing cluster in order to join, or None if not using
+      the algorithm in cluster mode.
+    :param feature_funcs: A dictionary mapping feature indices to functions
+      used to evaluate those features for a match.
+    :param col_to_idx: A dictionary mapping column names to the numeric index
+      in which they occur in order in the data.
+    :param match_eval: A function for determining whether a given set of
+      feature comparisons constitutes a match for linkage.
+    :param kwargs: Keyword arguments to pass to the feature functions and
+      matching rule.
+    :return: A list of (block, matches) tuples, in the same order as the
+      blocks in the shard, where matches are given by record ID.
+    """
+    matches = []
+    for block, records in shard:
+        if cluster_ratio:
+            matches_in_block = _match_within_block_cluster_ratio(
+                records,
+                cluster_ratio,
+                feature_funcs,
+                col_to_idx,
+                match_eval,
+                **kwargs,
+            )
+        else:
+            matches_in_block = match_within_block(
+                records, feature_funcs, col_to_idx, match_eval, **kwargs
+            )
+        matches_in_block = _map_matches_to_record_ids(
+            matches_in_block, records, cluster_ratio is not None
+        )
+        matches.append((block, matches_in_block))
+    return matches
+
+
+def _match_shards_in_processes(
+    shards: Iterator[List[tuple]], n_workers: int, match_args: tuple
+) -> Iterator[List[tuple]]:
+    """
+    Finds the matches within shards of blocked data in a pool of worker
+    processes. Only a couple of shards per worker are split from the data
+    ahead of the results being used, so that memory use is bounded however
+    much data there is, and results are returned in the order of the shards.
+
+    :param shards: A generator of shards, as returned by
+      `_shard_blocked_data`.
+    :param n_workers: The number of worker processes to use.
+    :param match_args: The arguments to pass to `_match_within_shard` after
+      each shard.
+    :return: A generator of the matches within each shard, as returned by
+      `_match_within_shard`.
+    """
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = deque()
+        for shard in shards:
+            pending.append(executor.submit(_match_within_shard, shard, *match_args))
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def _map_matches_to_record_ids(
     match_list: Union[List[tuple], List[set]], data_block, cluster_mode: bool = False
 ) -> List[tuple]:
@@ -1452,6 +2342,8 @@ def _match_within_block_cluster_ratio(
       in the block of data of records deemed to match.
     """
     clusters = []
+    chunk_start = 0
+    matches = None
     for i in range(len(block)):
         # Base case
         if len(clusters) == 0:
@@ -1459,18 +2351,38 @@ def _match_within_block_cluster_ratio(
             continue
         found_master_cluster = False
 
-        # Iterate through clusters to find one that we match with
-        for cluster in clusters:
-            belongs = _eval_record_in_cluster(
-                block,
-                i,
-                cluster,
-                cluster_ratio,
+        # Score the next chunk of records against every record before them
+        # in one go, since any of those may be in a cluster by then
+        if (i - 1) % COMPARISON_CHUNK_SIZE == 0:
+            chunk_start = i
+            matches = _match_matrix(
+                block[i : i + COMPARISON_CHUNK_SIZE],
+                block[: i + COMPARISON_CHUNK_SIZE],
                 feature_funcs,
                 col_to_idx,
                 match_eval,
+                {},
                 **kwargs,
             )
+
+        # Iterate through clusters to find one that we match with
+        for cluster in clusters:
+            if matches is not None:
+                num_matched = float(
+                    np.count_nonzero(matches[i - chunk_start][list(cluster)])
+                )
+                belongs = (num_matched / len(cluster)) >= cluster_ratio
+            else:
+                belongs = _eval_record_in_cluster(
+                    block,
+                    i,
+                    cluster,
+                    cluster_ratio,
+                    feature_funcs,
+                    col_to_idx,
+                    match_eval,
+                    **kwargs,
+                )
             if belongs:
                 found_master_cluster = True
                 cluster.add(i)
@@ -1482,6 +2394,68 @@ def _match_within_block_cluster_ratio(
     return clusters
 
 
+def _score_record_against_block(
+    record: dict,
+    data_block: List[list],
+    linkage_pass: CompiledLinkagePass,
+    linkage_scores: dict,
+) -> None:
+    """
+    Helper method that scores an incoming record against each of the person
+    clusters found in a block of MPI data during a single linkage pass. Any
+    cluster the record qualifies to join has its belongingness ratio stored
+    in `linkage_scores`, keeping the strongest score seen across passes.
+
+    :param record: The FHIR-formatted patient resource being linked.
+    :param data_block: The block of MPI data to compare against, whose first
+      row holds the column headers.
+    :param linkage_pass: The compiled linkage pass being run.
+    :param linkage_scores: A dictionary mapping person IDs to the best
+      belongingness ratio found so far; updated in place.
+    """
+    # First row of returned block is column headers
+    # Map column name to idx, not including patient/person IDs
+    header = data_block[0]
+    col_to_idx = linkage_pass.col_to_idx(header)
+    if len(data_block[1:]) > 0:  # Check if data_block is empty
+        data_block = data_block[1:]
+        with LINKAGE_TIMER.time("flatten"):
+            flattened_record = _flatten_patient_resource(record, col_to_idx)
+
+        clusters = _group_patient_block_by_person(data_block)
+
+        # Compare the incoming record to every record in the block at once
+        with LINKAGE_TIMER.time("compare"):
+            matches = _compare_record_to_block(
+                flattened_record,
+                data_block,
+                linkage_pass.funcs,
+                col_to_idx,
+                linkage_pass.matching_rule,
+                field_comparators=linkage_pass.field_comparators(header),
+                **linkage_pass.kwargs,
+            )
+        num_matched_by_person = dict.fromkeys(clusters, 0.0)
+        for linked_patient, is_match in zip(data_block, matches):
+            if is_match:
+                num_matched_by_person[linked_patient[1]] += 1.0
+
+        # Check if incoming record should belong to one of the person clusters
+        for person in clusters:
+            num_matched_in_cluster = num_matched_by_person[person]
+
+            # Update membership score for this person cluster so that we can
+            # track best possible link across multiple passes
+            belongingness_ratio = num_matched_in_cluster / len(clusters[person])
+            if belongingness_ratio >= linkage_pass.cluster_ratio:
+                if person in linkage_scores:
+                    linkage_scores[person] = max(
+                        [linkage_scores[person], belongingness_ratio]
+                    )
+                else:
+                    linkage_scores[person] = belongingness_ratio
+
+
 def _is_empty_extraction_field(block_vals: dict, field: str):
     """
     Helper method that determines when a field extracted from an incoming
@@ -1505,6 +2479,105 @@ def _is_empty_extraction_field(block_vals: dict, field: str):
     return False
 
 
+def _sample_pairs_within_blocks(
+    block_ids: np.ndarray, n_samples: int, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Samples pairs of distinct records from within the same blocks, with
+    replacement, such that every pair of records in the same block is equally
+    likely to be chosen.
+
+    :param block_ids: An array giving the number of the block each record is
+      in, or -1 if the record isn't in a block.
+    :param n_samples: The number of pairs to sample.
+    :param rng: The random number generator to sample pairs with.
+    :return: An array of shape (n, 2) of the indices of the records in each
+      pair, which is empty if no block has more than one record.
+    """
+    records = np.argsort(block_ids, kind="stable")
+    records = records[block_ids[records] >= 0]
+    _, starts, sizes = np.unique(
+        block_ids[records], return_index=True, return_counts=True
+    )
+    num_pairs = sizes * (sizes - 1) / 2
+    if num_pairs.sum() == 0:
+        return np.empty((0, 2), dtype=int)
+
+    blocks = rng.choice(len(sizes), size=n_samples, p=num_pairs / num_pairs.sum())
+    first = rng.integers(0, sizes[blocks])
+    second = rng.integers(0, sizes[blocks] - 1)
+    second += second >= first
+    return np.column_stack(
+        [records[starts[blocks] + first], records[starts[blocks] + second]]
+    )
+
+
+def _compare_pairs(codes: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """
+    Compares the fields of pairs of records for equality all at once, in the
+    same way as `calculate_m_probs`, except that missing values never agree.
+
+    :param codes: An array of shape (records, fields) of the values of each
+      field as integer codes, as returned by `pd.factorize`, with -1 for
+      missing values.
+    :param pairs: An array of shape (n, 2) of the indices of the records in
+      each pair.
+    :return: A boolean array of shape (n, fields) of whether each pair agrees
+      in each field.
+    """
+    first = codes[pairs[:, 0]]
+    return (first == codes[pairs[:, 1]]) & (first >= 0)
+
+
+def _fit_m_probs_em(
+    agreements: np.ndarray, u: np.ndarray, max_iterations: int, tolerance: float
+) -> np.ndarray:
+    """
+    Estimates the m-probabilities of the Fellegi-Sunter model from the
+    comparisons of a sample of record pairs, holding the u-probabilities
+    fixed. Pairs with the same pattern of agreements are weighted together,
+    so each iteration takes time in proportion to the number of distinct
+    patterns rather than pairs.
+
+    :param agreements: A boolean array of shape (pairs, fields) of whether
+      each pair agrees in each field.
+    :param u: The u-probability of each field.
+    :param max_iterations: The maximum number of iterations to run.
+    :param tolerance: The largest change in any probability between
+      iterations at which the estimates are deemed to have converged.
+    :return: The m-probability of each field, with Laplacian smoothing.
+    """
+    patterns, counts = np.unique(agreements, axis=0, return_counts=True)
+    patterns = patterns.astype(float)
+    u = np.clip(u, 1e-6, 1 - 1e-6)
+    log_u = patterns @ np.log(u) + (1 - patterns) @ np.log(1 - u)
+    m = np.maximum(u, 0.9)
+    match_rate = 0.1
+    for _ in range(max_iterations):
+        # E-step: the probability each pattern of agreements is from a match
+        clipped_m = np.clip(m, 1e-6, 1 - 1e-6)
+        log_m = (
+            np.log(match_rate)
+            + patterns @ np.log(clipped_m)
+            + (1 - patterns) @ np.log(1 - clipped_m)
+        )
+        log_non_m = np.log(1 - match_rate) + log_u
+        match_weights = counts * np.exp(log_m - np.logaddexp(log_m, log_non_m))
+
+        # M-step: the m-probabilities and match rate that best fit them
+        expected_matches = match_weights.sum()
+        new_m = (match_weights @ patterns + 1.0) / (expected_matches + 1.0)
+        new_match_rate = np.clip(expected_matches / counts.sum(), 1e-6, 1 - 1e-6)
+        converged = (
+            np.abs(new_m - m).max() < tolerance
+            and abs(new_match_rate - match_rate) < tolerance
+        )
+        m, match_rate = new_m, new_match_rate
+        if converged:
+            break
+    return m
+
+
 def _write_prob_file(prob_dict: dict, file_to_write: Union[pathlib.Path, None]):
     """
     Helper method to write a probability dictionary to a JSON file, if
@@ -1,12 +1,15 @@
-import datetime
+import asyncio
 import logging
 import uuid
 from functools import cache
+from itertools import product
 from typing import Dict
 from typing import List
 from typing import Literal
 
 from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy import func
 from sqlalchemy import Select
 from sqlalchemy import select
 from sqlalchemy import text
@@ -14,10 +17,51 @@ from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.dialects.postgresql import array_agg
 
 from phdi.fhir.utils import extract_value_with_resource_path
+from phdi.linkage.cache import BlockCache
 from phdi.linkage.core import BaseMPIConnectorClient
+from phdi.linkage.dal import AsyncDataAccessLayer
 from phdi.linkage.dal import DataAccessLayer
 from phdi.linkage.utils import load_mpi_env_vars_os
 
+# Name of the blocking table, whose records are also used to work out which
+# cached blocks a new patient belongs in
+BLOCKING_TABLE_NAME = "patient_blocking"
+
+# Columns of the blocking table holding the data returned for each patient in a
+# block, in the same order as the columns selected by `_get_base_query`
+BLOCKING_TABLE_DATA_COLUMNS = [
+    "patient_id",
+    "person_id",
+    "birthdate",
+    "sex",
+    "mrn",
+    "last_name",
+    "given_name",
+    "address",
+    "zip",
+    "city",
+    "state",
+]
+
+
+# Columns of the blocking table holding each field that can be blocked on,
+# including the names of the other MPI tables' columns for those fields
+BLOCKING_TABLE_COLUMNS_BY_FIELD = {
+    "first_name": "given_name",
+    "given_name": "given_name",
+    "last_name": "last_name",
+    "birthdate": "birthdate",
+    "dob": "birthdate",
+    "sex": "sex",
+    "mrn": "mrn",
+    "address": "address",
+    "line_1": "address",
+    "zip": "zip",
+    "zip_code": "zip",
+    "city": "city",
+    "state": "state",
+}
+
 
 class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
     """
@@ -29,26 +73,32 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
 
     """
 
-    def __init__(self, pool_size: int = 5, max_overflow: int = 10):
+    def __init__(
+        self,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        use_blocking_table: bool = False,
+        block_cache: BlockCache = None,
+    ):
         """
         Initialize the MPI connector client with the MPI database.
         :param pool_size: The number of connections to keep open to the database.
         :param max_overflow: The number of connections to allow in connection pool.
+        :param use_blocking_table: Whether to fetch blocks of data from the MPI's
+          `patient_blocking` table, which stores the values used for blocking in
+          indexed columns, rather than by joining the other MPI tables. The
+          blocking table is kept up to date whenever it exists, whether or not
+          it's used. Defaults to False.
+        :param block_cache: Optionally, a cache of blocks of data to check
+          before querying the MPI for a block. Cached blocks that a patient
+          belongs in are removed from the cache whenever the client inserts
+          the patient. Defaults to None.
+        :raises ValueError: If `use_blocking_table` is True but the MPI has no
+          blocking table.
         """
-        dbsettings = load_mpi_env_vars_os()
-        dbuser = dbsettings.get("user")
-        dbname = dbsettings.get("dbname")
-        dbpwd = dbsettings.get("password")
-        dbhost = dbsettings.get("host")
-        dbport = dbsettings.get("port")
-        self.dal = DataAccessLayer()
-        self.dal.get_connection(
-            engine_url=f"postgresql+psycopg2://{dbuser}:"
-            + f"{dbpwd}@{dbhost}:{dbport}/{dbname}",
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-        )
-        self.dal.initialize_schema()
+        self.use_blocking_table = use_blocking_table
+        self.block_cache = block_cache
+        self._connect(pool_size=pool_size, max_overflow=max_overflow)
         self.column_to_fhirpaths = {
             "patient": {
                 "root_path": "Patient",
@@ -116,6 +166,51 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
             },
         }
 
+    def _connect(self, pool_size: int, max_overflow: int) -> None:
+        """
+        Connects the client's data access layer to the MPI database and loads
+        the MPI's tables.
+
+        :param pool_size: The number of connections to keep open to the database.
+        :param max_overflow: The number of connections to allow in connection pool.
+        :raises ValueError: If the client should use the blocking table but the
+          MPI has no blocking table.
+        """
+        self.dal = DataAccessLayer()
+        self.dal.get_connection(
+            engine_url=self._get_engine_url("postgresql+psycopg2"),
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+        )
+        self.dal.initialize_schema()
+        self._check_blocking_table()
+
+    def _get_engine_url(self, dialect: str) -> str:
+        """
+        Builds the URL of the MPI database from the MPI environment variables.
+
+        :param dialect: The SQLAlchemy dialect and driver to connect with,
+          e.g. "postgresql+psycopg2".
+        :return: The URL of the MPI database.
+        """
+        dbsettings = load_mpi_env_vars_os()
+        dbuser = dbsettings.get("user")
+        dbname = dbsettings.get("dbname")
+        dbpwd = dbsettings.get("password")
+        dbhost = dbsettings.get("host")
+        dbport = dbsettings.get("port")
+        return f"{dialect}://{dbuser}:" + f"{dbpwd}@{dbhost}:{dbport}/{dbname}"
+
+    def _check_blocking_table(self) -> None:
+        """
+        Checks that the MPI has a blocking table if the client should use it.
+
+        :raises ValueError: If the client should use the blocking table but the
+          MPI has no blocking table.
+        """
+        if self.use_blocking_table and self.dal.BLOCKING_TABLE is None:
+            raise ValueError("The MPI has no `patient_blocking` table to block with.")
+
     def get_block_data(self, block_criteria: Dict) -> List[list]:
         """
         Returns a list of lists containing records from the MPI database that
@@ -133,54 +228,60 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
             records that all have 90210 as their ZIP.
         """
         logging.info("In get_block_data")
+        if self.block_cache is not None:
+            generation = self.block_cache.generation
+            blocked_data = self.block_cache.get(block_criteria)
+            if blocked_data is not None:
+                return blocked_data
+
+        query, query_params = self._get_block_query(block_criteria)
+        blocked_data = self.dal.select_results(
+            select_statement=query,
+            query_params=query_params,
+            include_col_header=True,
+        )
+
+        if self.block_cache is not None:
+            self.block_cache.put(block_criteria, blocked_data, generation)
+        return blocked_data
+
+    def _get_block_query(self, block_criteria: Dict) -> tuple[Select, dict]:
+        """
+        Generates the query for selecting the block of data from the MPI that
+        matches the blocking criteria, from either the blocking table or the
+        other MPI tables.
+
+        :param block_criteria: Dictionary containing key value pairs
+            for the column name for blocking and the data for the
+            incoming record as well as any transformations.
+        :raises ValueError: If the blocking criteria are empty.
+        :return: A tuple of a 'Select' statement selecting the block and a
+            dictionary of the query parameters.
+        """
         if len(block_criteria) == 0:
             raise ValueError("`block_vals` cannot be empty.")
 
+        # Blocks can be fetched from the blocking table unless they use
+        # criteria it doesn't hold, such as race
+        if self.use_blocking_table:
+            blocking_table_query = self._generate_blocking_table_query(block_criteria)
+            if blocking_table_query is not None:
+                return blocking_table_query, {}
+
         # Get the base query that will select all necessary
         # columns for linkage with some basic filtering
-        logging.info(
-            f"Starting _get_base_query at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
         query = self._get_base_query()
-        logging.info(
-            f"Done with _get_base_query at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
 
         # now get the criteria organized by table so the
         # CTE queries can be constructed and then added
         # to the base query
-        logging.info(
-            f"Starting _organize_block_criteria at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
         organized_block_vals = self._organize_block_criteria(block_criteria)
-        logging.info(
-            f"Done with _organize_block_criteria at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}",  # noqa
-        )
 
         # now tack on the where criteria using the block_vals
         # while ensuring they exist in the table structure ORM
-        logging.info(
-            f"Starting _generate_block_query at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
-        query_w_ctes, query_params = self._generate_block_query(
+        return self._generate_block_query(
             organized_block_criteria=organized_block_vals, query=query
         )
-        logging.info(
-            f"Done with _generate_block_query at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
-        logging.info(
-            f"Starting dal.select_results at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
-        blocked_data = self.dal.select_results(
-            select_statement=query_w_ctes,
-            query_params=query_params,
-            include_col_header=True,
-        )
-        logging.info(
-            f"Done with dal.select_results at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
-
-        return blocked_data
 
     def insert_matched_patient(
         self,
@@ -202,52 +303,278 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
         :param external_person_id: The external person id for the person that matches
           the patient record if a match has been found in the MPI, defaults to None.
         """
-        logging.info(
-            f"Starting insert_matched_patient at {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-        )
-
         try:
             if person_id is None:
-                logging.info(
-                    f"person_id was None; starting _insert_person at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                )
                 person_id = self._insert_person()
-                logging.info(
-                    f"person_id was None; done with _insert_person at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-                )
             patient_resource["person"] = person_id
-            logging.info(
-                f"Starting _get_mpi_records at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
             mpi_records = self._get_mpi_records(patient_resource)
-            logging.info(
-                f"Done with _get_mpi_records at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
-            logging.info(
-                f"Starting dal.bulk_insert_dict at: {datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
+            self._add_blocking_records(mpi_records)
             self.dal.bulk_insert_dict(
                 records_with_table=mpi_records, return_primary_keys=False
             )
-            logging.info(
-                f"Done with dal.bulk_insert_dict at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"  # noqa
-            )
+            self._invalidate_cached_blocks(mpi_records.get(BLOCKING_TABLE_NAME, []))
 
             if external_person_id is not None:
-                logging.info(
-                    f"""external_person_id was not None;
-                      starting _insert_external_person_id at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                )
                 self._insert_external_person_id(person_id, external_person_id)
-                logging.info(
-                    f"""external_person_id was not None;
-                      done with _insert_external_person_id at:{datetime.datetime.now().strftime('%m-%d-%yT%H:%M:%S.%f')}"""  # noqa
-                )
         except Exception as error:  # pragma: no cover
             raise ValueError(f"{error}")
 
         return person_id
 
+    def insert_matched_patients(
+        self,
+        patient_resources: List[Dict],
+        person_ids: List[str],
+        external_person_ids: List[str] = None,
+    ) -> List[str]:
+        """
+        Inserts a batch of new patients, each linked to the supplied person ID,
+        into the patient table and all other subsequent MPI tables in a single
+        transaction. Any person IDs that do not yet exist in the MPI are
+        inserted into the person table as part of the same transaction, which
+        allows callers to pre-assign new person IDs to records that should be
+        linked to one another.
+
+        :param patient_resources: A list of FHIR patient resources.
+        :param person_ids: A list of person IDs, one for each patient resource,
+          to link the patients to.
+        :param external_person_ids: Optionally, a list of external person IDs,
+          one for each patient resource (using `None` where a patient has no
+          external ID), defaults to None.
+        :raises ValueError: If the lists supplied are not all of the same length,
+          or if an error occurs during the insert.
+        :return: The list of person IDs the patients were linked to.
+        """
+        external_person_ids = self._check_batch(
+            patient_resources, person_ids, external_person_ids
+        )
+        if len(patient_resources) == 0:
+            return []
+
+        try:
+            existing_person_ids = self.dal.select_results(
+                self._get_existing_person_query(person_ids), include_col_header=False
+            )
+            records = self._get_batch_records(
+                patient_resources, person_ids, existing_person_ids
+            )
+            records["external_person"] = self._get_new_external_person_records(
+                person_ids, external_person_ids
+            )
+            self.dal.bulk_insert_dict(
+                records_with_table=records, return_primary_keys=False
+            )
+            self._invalidate_cached_blocks(records.get(BLOCKING_TABLE_NAME, []))
+        except Exception as error:  # pragma: no cover
+            raise ValueError(f"{error}")
+
+        return person_ids
+
+    def _check_batch(
+        self,
+        patient_resources: List[Dict],
+        person_ids: List[str],
+        external_person_ids: List[str],
+    ) -> List[str]:
+        """
+        Checks that a batch of patients to insert has a person ID and external
+        person ID for each patient.
+
+        :param patient_resources: A list of FHIR patient resources.
+        :param person_ids: A list of person IDs, one for each patient resource.
+        :param external_person_ids: A list of external person IDs, one for each
+          patient resource, or None.
+        :raises ValueError: If the lists supplied are not all of the same length.
+        :return: The list of external person IDs, with `None` for each patient
+          if none were supplied.
+        """
+        if external_person_ids is None:
+            external_person_ids = [None] * len(patient_resources)
+        if not len(patient_resources) == len(person_ids) == len(external_person_ids):
+            raise ValueError(
+                "A person ID and external person ID must be supplied for each patient."
+            )
+        return external_person_ids
+
+    def _get_existing_person_query(self, person_ids: List[str]) -> Select:
+        """
+        Generates a query for selecting which of the given person IDs already
+        exist in the MPI's person table.
+
+        :param person_ids: A list of person IDs.
+        :return: A 'Select' statement selecting the existing person IDs.
+        """
+        return select(self.dal.PERSON_TABLE.c.person_id).where(
+            self.dal.PERSON_TABLE.c.person_id.in_(list(set(person_ids)))
+        )
+
+    def _get_batch_records(
+        self,
+        patient_resources: List[Dict],
+        person_ids: List[str],
+        existing_person_ids: List[list],
+    ) -> dict:
+        """
+        Generates the records to insert into each MPI table for a batch of
+        patients, including the person records of any person IDs that don't
+        exist in the MPI yet.
+
+        :param patient_resources: A list of FHIR patient resources.
+        :param person_ids: A list of person IDs, one for each patient resource.
+        :param existing_person_ids: The rows of person IDs that already exist
+          in the MPI, as selected by `_get_existing_person_query`.
+        :return: A dictionary of MPI Table names and records.
+        """
+        existing_person_ids = {str(row[0]) for row in existing_person_ids}
+        new_person_ids = {
+            str(person_id): person_id
+            for person_id in person_ids
+            if str(person_id) not in existing_person_ids
+        }
+        records = {
+            "person": [
+                {"person_id": person_id} for person_id in new_person_ids.values()
+            ]
+        }
+
+        for patient_resource, person_id in zip(patient_resources, person_ids):
+            patient_resource["person"] = person_id
+            mpi_records = self._get_mpi_records(patient_resource)
+            self._add_blocking_records(mpi_records)
+            for table_name, table_records in mpi_records.items():
+                records.setdefault(table_name, []).extend(table_records)
+        return records
+
+    def refresh_blocking_table(self) -> None:
+        """
+        Rebuilds the MPI's blocking table from the other MPI tables, e.g. to
+        include patients inserted before the blocking table was created.
+
+        :raises ValueError: If the MPI has no blocking table, or if an error
+          occurs while rebuilding it.
+        """
+        with self.dal.transaction() as session:
+            for statement in self._get_refresh_blocking_table_statements():
+                session.execute(statement)
+
+    def _get_refresh_blocking_table_statements(self) -> list:
+        """
+        Generates the statements that rebuild the blocking table from the
+        other MPI tables, to be executed in order in a single transaction.
+
+        :raises ValueError: If the MPI has no blocking table.
+        :return: A list of SQLAlchemy statements.
+        """
+        blocking_table = self.dal.BLOCKING_TABLE
+        if blocking_table is None:
+            raise ValueError("The MPI has no `patient_blocking` table to refresh.")
+        query = self._get_base_query(include_blocking_keys=True)
+        return [
+            blocking_table.delete(),
+            blocking_table.insert().from_select(
+                [column.name for column in query.selected_columns], query
+            ),
+        ]
+
+    def _get_new_external_person_records(
+        self, person_ids: List[str], external_person_ids: List[str]
+    ) -> List[dict]:
+        """
+        Generates the external person records that need to be inserted into the
+        MPI for a batch of person IDs and their associated external person IDs,
+        skipping any pairs that already exist in the MPI or repeat within the
+        batch.
+
+        :param person_ids: A list of person IDs.
+        :param external_person_ids: A list of external person IDs, one for each
+          person ID (or `None` if there is no external ID).
+        :return: A list of external person records to insert.
+        """
+        pairs = self._get_external_person_pairs(person_ids, external_person_ids)
+        if len(pairs) == 0:
+            return []
+        external_source_id = self._get_external_source_id("IRIS")
+        if external_source_id is None:  # pragma: no cover
+            return []
+
+        existing_pairs = self.dal.select_results(
+            self._get_existing_external_person_query(external_source_id, pairs),
+            include_col_header=False,
+        )
+        return self._filter_new_external_person_records(
+            pairs, existing_pairs, external_source_id
+        )
+
+    def _get_external_person_pairs(
+        self, person_ids: List[str], external_person_ids: List[str]
+    ) -> dict:
+        """
+        Pairs up person IDs with their external person IDs, skipping any
+        without an external person ID and any repeated pairs.
+
+        :param person_ids: A list of person IDs.
+        :param external_person_ids: A list of external person IDs, one for each
+          person ID (or `None` if there is no external ID).
+        :return: A dictionary mapping each pair of a person ID, as a string, and
+          an external person ID to the person ID.
+        """
+        return {
+            (str(person_id), external_person_id): person_id
+            for person_id, external_person_id in zip(person_ids, external_person_ids)
+            if person_id is not None and external_person_id is not None
+        }
+
+    def _get_existing_external_person_query(
+        self, external_source_id: str, pairs: dict
+    ) -> Select:
+        """
+        Generates a query for selecting the external person records of the
+        given external source that have any of the paired external person IDs.
+
+        :param external_source_id: The ID of the external source.
+        :param pairs: The pairs of person IDs and external person IDs, as
+          returned by `_get_external_person_pairs`.
+        :return: A 'Select' statement selecting the person IDs and external
+          person IDs of the existing records.
+        """
+        return select(
+            self.dal.EXTERNAL_PERSON_TABLE.c.person_id,
+            self.dal.EXTERNAL_PERSON_TABLE.c.external_person_id,
+        ).where(
+            and_(
+                self.dal.EXTERNAL_PERSON_TABLE.c.external_source_id
+                == external_source_id,
+                self.dal.EXTERNAL_PERSON_TABLE.c.external_person_id.in_(
+                    list({external_person_id for _, external_person_id in pairs})
+                ),
+            )
+        )
+
+    def _filter_new_external_person_records(
+        self, pairs: dict, existing_pairs: List[list], external_source_id: str
+    ) -> List[dict]:
+        """
+        Generates the external person records for the pairs of person IDs and
+        external person IDs that don't already exist in the MPI.
+
+        :param pairs: The pairs of person IDs and external person IDs, as
+          returned by `_get_external_person_pairs`.
+        :param existing_pairs: The rows of existing pairs, as selected by
+          `_get_existing_external_person_query`.
+        :param external_source_id: The ID of the external source.
+        :return: A list of external person records to insert.
+        """
+        existing_pairs = {(str(row[0]), row[1]) for row in existing_pairs}
+        return [
+            {
+                "person_id": person_id,
+                "external_person_id": external_person_id,
+                "external_source_id": external_source_id,
+            }
+            for (pair_key, external_person_id), person_id in pairs.items()
+            if (pair_key, external_person_id) not in existing_pairs
+        ]
+
     def _generate_where_clause(
         self, block_criteria: dict, table_name: str
     ) -> tuple[str, list]:
@@ -351,6 +678,198 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
 
         return new_query, new_query_params
 
+    def _generate_blocking_table_query(self, block_criteria: dict) -> Select:
+        """
+        Generates a query for selecting a block of data from the blocking table,
+        returning the same columns as `_get_base_query`. Every row of any patient
+        with a row satisfying all of the blocking criteria is selected, just as
+        when blocking on the other MPI tables. Criteria on columns that aren't
+        in any MPI table are skipped, as they are there.
+
+        :param block_criteria: a dictionary that contains the blocking criteria.
+        :return: A 'Select' statement built by the sqlalchemy ORM utilizing
+            the blocking criteria, or None if any of the criteria are on
+            columns of the other MPI tables that aren't in the blocking table.
+        """
+        blocking_table = self.dal.BLOCKING_TABLE
+        conditions = []
+        for block_key, block_value in block_criteria.items():
+            column_name = BLOCKING_TABLE_COLUMNS_BY_FIELD.get(block_key)
+            if column_name is None:
+                if self.dal.get_table_by_column(block_key) is not None:
+                    return None
+                continue
+            criteria_value = block_value["value"]
+            criteria_transform = block_value.get("transformation", None)
+            key_column_name = column_name
+            if criteria_transform is not None:
+                key_column_name = f"{column_name}_{criteria_transform}"
+            if key_column_name in blocking_table.c:
+                column = blocking_table.c[key_column_name]
+            elif criteria_transform == "first4":
+                column = func.left(blocking_table.c[column_name], 4)
+            elif criteria_transform == "last4":
+                column = func.right(blocking_table.c[column_name], 4)
+            else:
+                continue
+
+            # Given names are stored as arrays, which a patient matches if
+            # any of their given names do
+            if column_name == "given_name":
+                conditions.append(column.contains([criteria_value]))
+            else:
+                # Bind the value as the column's type, e.g. so that a date
+                # string is sent as a date rather than compared as a string
+                conditions.append(
+                    column == bindparam(None, criteria_value, type_=column.type)
+                )
+
+        blocked_patients = select(blocking_table.c.patient_id).where(*conditions)
+        return select(
+            *[blocking_table.c[column] for column in BLOCKING_TABLE_DATA_COLUMNS]
+        ).where(blocking_table.c.patient_id.in_(blocked_patients))
+
+    def _add_blocking_records(self, mpi_records: dict) -> None:
+        """
+        Adds the blocking table records for a single patient to the records
+        generated for the other MPI tables by `_get_mpi_records`, if they're
+        needed to fill in the blocking table or to invalidate cached blocks.
+        They're only inserted if the MPI has a blocking table.
+
+        :param mpi_records: A dictionary of MPI Table names and records for a
+            single patient.
+        """
+        if self.dal.BLOCKING_TABLE is not None or self.block_cache is not None:
+            mpi_records[BLOCKING_TABLE_NAME] = self._get_blocking_records(mpi_records)
+
+    def _invalidate_cached_blocks(self, blocking_records: List[dict]) -> None:
+        """
+        Removes the cached blocks that any of the given blocking table records
+        belong in, so that the patients they were generated from are found
+        the next time those blocks are fetched.
+
+        :param blocking_records: A list of blocking table records, as generated
+            by `_get_blocking_records`.
+        """
+        if self.block_cache is None or len(blocking_records) == 0:
+            return
+        self.block_cache.invalidate(
+            lambda block_key: any(
+                self._is_blocking_record_in_block(blocking_record, block_key)
+                for blocking_record in blocking_records
+            )
+        )
+
+    def _is_blocking_record_in_block(
+        self, blocking_record: dict, block_key: tuple
+    ) -> bool:
+        """
+        Checks whether a blocking table record satisfies all the blocking
+        criteria of a block, and so whether its patient belongs in the block.
+        Criteria on fields the record doesn't hold, such as race, are assumed
+        to be satisfied.
+
+        :param blocking_record: A blocking table record, as generated by
+            `_get_blocking_records`.
+        :param block_key: The key of the block's criteria, as returned by
+            `blocking_criteria_to_key`.
+        :return: Whether the record's patient belongs in the block.
+        """
+        for field, value, transformation in block_key:
+            column_name = BLOCKING_TABLE_COLUMNS_BY_FIELD.get(field)
+            if column_name is None or transformation not in (None, "first4", "last4"):
+                continue
+            record_values = blocking_record[column_name]
+            if column_name != "given_name":
+                record_values = [record_values]
+            record_values = [str(v) for v in record_values if v is not None]
+            if transformation == "first4":
+                record_values = [v[:4] for v in record_values]
+            elif transformation == "last4":
+                record_values = [v[-4:] for v in record_values]
+            if str(value) not in record_values:
+                return False
+        return True
+
+    def _get_blocking_records(self, mpi_records: dict) -> List[dict]:
+        """
+        Generates the blocking table records for a single patient from the
+        records generated for the other MPI tables by `_get_mpi_records`. As
+        with the rows returned by `_get_base_query`, there is one record for
+        each combination of the patient's names, distinct MRNs and distinct
+        addresses.
+
+        :param mpi_records: A dictionary of MPI Table names and records for a
+            single patient.
+        :return: A list of blocking table records.
+        """
+        patient = mpi_records["patient"][0]
+
+        given_names = {}
+        for given_name in sorted(
+            mpi_records.get("given_name", []), key=lambda g: g["given_name_index"]
+        ):
+            given_names.setdefault(given_name["name_id"], []).append(
+                given_name["given_name"]
+            )
+        names = [
+            (name["last_name"], given_names.get(name["name_id"], [None]))
+            for name in mpi_records.get("name", [])
+        ] or [(None, [None])]
+        mrns = list(
+            dict.fromkeys(
+                identifier["patient_identifier"]
+                for identifier in mpi_records.get("identifier", [])
+                if identifier["type_code"] == "MR"
+            )
+        ) or [None]
+        addresses = list(
+            dict.fromkeys(
+                (
+                    address["line_1"],
+                    address["zip_code"],
+                    address["city"],
+                    address["state"],
+                )
+                for address in mpi_records.get("address", [])
+            )
+        ) or [(None, None, None, None)]
+
+        def first4(value):
+            return None if value is None else value[:4]
+
+        def last4(value):
+            return None if value is None else value[-4:]
+
+        records = []
+        for (last_name, given_name), mrn, (address, zip_code, city, state) in product(
+            names, mrns, addresses
+        ):
+            records.append(
+                {
+                    "patient_id": patient["patient_id"],
+                    "person_id": patient["person_id"],
+                    "birthdate": patient["dob"],
+                    "sex": patient["sex"],
+                    "mrn": mrn,
+                    "last_name": last_name,
+                    "given_name": given_name,
+                    "address": address,
+                    "zip": zip_code,
+                    "city": city,
+                    "state": state,
+                    "mrn_first4": first4(mrn),
+                    "mrn_last4": last4(mrn),
+                    "last_name_first4": first4(last_name),
+                    "last_name_last4": last4(last_name),
+                    "given_name_first4": [first4(g) for g in given_name],
+                    "given_name_last4": [last4(g) for g in given_name],
+                    "address_first4": first4(address),
+                    "address_last4": last4(address),
+                }
+            )
+        return records
+
     def _organize_block_criteria(self, block_fields: dict) -> dict:
         """
         Creates a dictionary with the MPI Table Names as keys
@@ -408,12 +927,15 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
                 continue
         return organized_block_vals
 
-    def _get_base_query(self) -> Select:
+    def _get_base_query(self, include_blocking_keys: bool = False) -> Select:
         """
         Generates a select query that pulls all the relevant
         MPI records from the MPI tables, using an ORM, for
         Patient Matching/Blocking.
 
+        :param include_blocking_keys: Whether to also select the first and
+            last 4 characters of the fields stored that way in the blocking
+            table, e.g. to fill it in. Defaults to False.
         :return: A single select statement queries all relevant
             blocking columns and tables from the MPI.
         """
@@ -492,6 +1014,23 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
                 self.dal.ADDRESS_TABLE.c.state,
             )
         )
+        if include_blocking_keys:
+            given_name = self.dal.GIVEN_NAME_TABLE.c.given_name
+            given_name_index = self.dal.GIVEN_NAME_TABLE.c.given_name_index.asc()
+            query = query.add_columns(
+                func.left(id_sub_query.c.mrn, 4).label("mrn_first4"),
+                func.right(id_sub_query.c.mrn, 4).label("mrn_last4"),
+                func.left(self.dal.NAME_TABLE.c.last_name, 4).label("last_name_first4"),
+                func.right(self.dal.NAME_TABLE.c.last_name, 4).label("last_name_last4"),
+                array_agg(
+                    aggregate_order_by(func.left(given_name, 4), given_name_index)
+                ).label("given_name_first4"),
+                array_agg(
+                    aggregate_order_by(func.right(given_name, 4), given_name_index)
+                ).label("given_name_last4"),
+                func.left(self.dal.ADDRESS_TABLE.c.line_1, 4).label("address_first4"),
+                func.right(self.dal.ADDRESS_TABLE.c.line_1, 4).label("address_last4"),
+            )
         return query
 
     def _get_mpi_records(self, patient_resource: dict) -> dict:
@@ -645,14 +1184,8 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
         :return: The external source id if found, otherwise None.
         """
 
-        external_source_id_query = select(self.dal.EXTERNAL_SOURCE_TABLE).where(
-            text(
-                f"{self.dal.EXTERNAL_SOURCE_TABLE.name}.external_source_name"
-                + f" = '{external_source_name}'"
-            )
-        )
         external_source_record = self.dal.select_results(
-            external_source_id_query, False
+            self._get_external_source_query(external_source_name), False
         )
 
         external_source_id = None
@@ -661,6 +1194,21 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
 
         return external_source_id
 
+    def _get_external_source_query(self, external_source_name: str) -> Select:
+        """
+        Generates a query for selecting the external source with the name
+        provided.
+
+        :param external_source_name: The external source name.
+        :return: A 'Select' statement selecting the external source.
+        """
+        return select(self.dal.EXTERNAL_SOURCE_TABLE).where(
+            text(
+                f"{self.dal.EXTERNAL_SOURCE_TABLE.name}.external_source_name"
+                + f" = '{external_source_name}'"
+            )
+        )
+
     def _generate_dict_record_from_results(
         self, results_list: List[list]
     ) -> List[dict]:
@@ -700,3 +1248,238 @@ class DIBBsMPIConnectorClient(BaseMPIConnectorClient):
             self.dal.PERSON_TABLE, [person_record], True
         )
         return person_id[0]
+
+
+class AsyncDIBBsMPIConnectorClient(DIBBsMPIConnectorClient):
+    """
+    Represents a Postgres-specific Master Patient Index (MPI) connector
+    client for the DIBBs implementation of the record linkage building
+    block, for use with asyncio. The client connects to the MPI with
+    SQLAlchemy's async engine and the asyncpg driver, and its
+    interface functions (e.g., get_block_data) are coroutines, so that
+    waiting on the MPI never blocks the event loop. Requires the asyncpg
+    package, which isn't installed with phdi.
+
+    The MPI's tables are loaded the first time the client is used, or when
+    `initialize_schema` is awaited. Pooled connections belong to the event
+    loop they were opened in, so a client is best used from a single event
+    loop; if it's used from a new one, the connections opened in the old
+    one are dropped.
+    """
+
+    def _connect(self, pool_size: int, max_overflow: int) -> None:
+        """
+        Creates the client's async data access layer for the MPI database.
+        No connection is opened until the client is first used.
+
+        :param pool_size: The number of connections to keep open to the database.
+        :param max_overflow: The number of connections to allow in connection pool.
+        """
+        self.dal = AsyncDataAccessLayer()
+        self.dal.get_connection(
+            engine_url=self._get_engine_url("postgresql+asyncpg"),
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+        )
+        self._schema_initialized = False
+        self._schema_lock = asyncio.Lock()
+        self._loop = None
+        self._external_source_ids = {}
+
+    async def initialize_schema(self) -> None:
+        """
+        Loads the MPI's tables, if they haven't been loaded yet, and drops any
+        connections opened in a different event loop.
+
+        :raises ValueError: If the client should use the blocking table but the
+          MPI has no blocking table.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            previous_loop = self._loop
+            self._loop = loop
+            if previous_loop is not None:
+                # Connections and locks can't be shared between event loops
+                self._schema_lock = asyncio.Lock()
+                await self.dal.engine.dispose(close=False)
+        if self._schema_initialized:
+            return
+        async with self._schema_lock:
+            if not self._schema_initialized:
+                await self.dal.initialize_schema()
+                self._check_blocking_table()
+                self._schema_initialized = True
+
+    async def dispose(self) -> None:
+        """
+        Closes the client's pooled connections to the MPI.
+        """
+        await self.dal.dispose()
+
+    async def get_block_data(self, block_criteria: Dict) -> List[list]:
+        """
+        Returns a list of lists containing records from the MPI database that
+        match on the incoming record's block criteria and values, as with
+        `DIBBsMPIConnectorClient.get_block_data`.
+
+        :param block_criteria: Dictionary containing key value pairs
+            for the column name for blocking and the data for the
+            incoming record as well as any transformations,
+          e.g., {"ZIP": {"value": "90210"}} or
+          {"ZIP": {"value": "90210",}, "transformation":"first4"}.
+        :return: A list of records that are within the block, e.g.,
+            records that all have 90210 as their ZIP.
+        """
+        await self.initialize_schema()
+        if self.block_cache is not None:
+            generation = self.block_cache.generation
+            blocked_data = self.block_cache.get(block_criteria)
+            if blocked_data is not None:
+                return blocked_data
+
+        query, query_params = self._get_block_query(block_criteria)
+        blocked_data = await self.dal.select_results(
+            select_statement=query,
+            query_params=query_params,
+            include_col_header=True,
+        )
+
+        if self.block_cache is not None:
+            self.block_cache.put(block_criteria, blocked_data, generation)
+        return blocked_data
+
+    async def insert_matched_patient(
+        self,
+        patient_resource: Dict,
+        person_id=None,
+        external_person_id=None,
+    ) -> str:
+        """
+        Inserts a new patient into the patient table and all other subsequent
+        MPI tables, linked to the matched person ID if a match has been found in
+        the MPI, or else to a new person, as with
+        `DIBBsMPIConnectorClient.insert_matched_patient`. The new person, if
+        any, is inserted in the same transaction as the patient.
+
+        :param patient_resource: A FHIR patient resource.
+        :param person_id: The person ID matching the patient record if a match has been
+          found in the MPI, defaults to None.
+        :param external_person_id: The external person id for the person that matches
+          the patient record if a match has been found in the MPI, defaults to None.
+        :return: The person ID the patient was linked to.
+        """
+        if person_id is None:
+            person_id = uuid.uuid4()
+        person_ids = await self.insert_matched_patients(
+            [patient_resource], [person_id], [external_person_id]
+        )
+        return person_ids[0]
+
+    async def insert_matched_patients(
+        self,
+        patient_resources: List[Dict],
+        person_ids: List[str],
+        external_person_ids: List[str] = None,
+    ) -> List[str]:
+        """
+        Inserts a batch of new patients, each linked to the supplied person ID,
+        into the patient table and all other subsequent MPI tables in a single
+        transaction, as with `DIBBsMPIConnectorClient.insert_matched_patients`.
+
+        :param patient_resources: A list of FHIR patient resources.
+        :param person_ids: A list of person IDs, one for each patient resource,
+          to link the patients to.
+        :param external_person_ids: Optionally, a list of external person IDs,
+          one for each patient resource (using `None` where a patient has no
+          external ID), defaults to None.
+        :raises ValueError: If the lists supplied are not all of the same length,
+          or if an error occurs during the insert.
+        :return: The list of person IDs the patients were linked to.
+        """
+        external_person_ids = self._check_batch(
+            patient_resources, person_ids, external_person_ids
+        )
+        if len(patient_resources) == 0:
+            return []
+        await self.initialize_schema()
+
+        try:
+            existing_person_ids = await self.dal.select_results(
+                self._get_existing_person_query(person_ids), include_col_header=False
+            )
+            records = self._get_batch_records(
+                patient_resources, person_ids, existing_person_ids
+            )
+            records["external_person"] = await self._get_new_external_person_records(
+                person_ids, external_person_ids
+            )
+            await self.dal.bulk_insert_dict(
+                records_with_table=records, return_primary_keys=False
+            )
+            self._invalidate_cached_blocks(records.get(BLOCKING_TABLE_NAME, []))
+        except Exception as error:  # pragma: no cover
+            raise ValueError(f"{error}")
+
+        return person_ids
+
+    async def refresh_blocking_table(self) -> None:
+        """
+        Rebuilds the MPI's blocking table from the other MPI tables, as with
+        `DIBBsMPIConnectorClient.refresh_blocking_table`.
+
+        :raises ValueError: If the MPI has no blocking table, or if an error
+          occurs while rebuilding it.
+        """
+        await self.initialize_schema()
+        async with self.dal.transaction() as session:
+            for statement in self._get_refresh_blocking_table_statements():
+                await session.execute(statement)
+
+    async def _get_new_external_person_records(
+        self, person_ids: List[str], external_person_ids: List[str]
+    ) -> List[dict]:
+        """
+        Generates the external person records that need to be inserted into the
+        MPI for a batch of person IDs and their associated external person IDs,
+        skipping any pairs that already exist in the MPI or repeat within the
+        batch.
+
+        :param person_ids: A list of person IDs.
+        :param external_person_ids: A list of external person IDs, one for each
+          person ID (or `None` if there is no external ID).
+        :return: A list of external person records to insert.
+        """
+        pairs = self._get_external_person_pairs(person_ids, external_person_ids)
+        if len(pairs) == 0:
+            return []
+        external_source_id = await self._get_external_source_id("IRIS")
+        if external_source_id is None:  # pragma: no cover
+            return []
+
+        existing_pairs = await self.dal.select_results(
+            self._get_existing_external_person_query(external_source_id, pairs),
+            include_col_header=False,
+        )
+        return self._filter_new_external_person_records(
+            pairs, existing_pairs, external_source_id
+        )
+
+    async def _get_external_source_id(
+        self, external_source_name: str
+    ) -> Literal[str, None]:
+        """
+        Gets the external source id for the external source name provided,
+        caching the IDs of the sources that exist.
+
+        :param external_source_name: The external source name.
+        :return: The external source id if found, otherwise None.
+        """
+        if external_source_name not in self._external_source_ids:
+            external_source_record = await self.dal.select_results(
+                self._get_external_source_query(external_source_name), False
+            )
+            if len(external_source_record) == 0:
+                return None
+            external_source_id = external_source_record[0][0]
+            self._external_source_ids[external_source_name] = external_source_id
+        return self._external_source_ids[external_source_name]
@@ -1,5 +1,6 @@
 from phdi.tabulation.tables import load_schema
+from phdi.tabulation.tables import SQLWriter
 from phdi.tabulation.tables import validate_schema
 from phdi.tabulation.tables import write_data
 
-__all__ = ("load_schema", "validate_schema", write_data)
+__all__ = ("load_schema", "validate_schema", write_data, "SQLWriter")
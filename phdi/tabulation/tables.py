@@ -76,7 +76,11 @@ def write_data(
     pq_writer: pq.ParquetWriter = None,
     schema: dict = None,
     table_name: str = None,
-) -> Union[None, pq.ParquetWriter]:
+    row_group_size: int = None,
+    dictionary_columns: List[str] = None,
+    sql_writer: "SQLWriter" = None,
+    index_columns: List[str] = None,
+) -> Union[pq.ParquetWriter, "SQLWriter"]:
     """
     Writes a set of tabulated data to a particular output format on disk
     (one of CSV, Parquet, or SQL). For CSV and Parquet writing, a filename
@@ -86,6 +90,12 @@ def write_data(
     if the given options specify a file that doesn't exist, and appends
     data to already-present files if they do.
 
+    Parquet data is built directly into one typed array per column, with the
+    column types resolved once per table from `schema` (or, when appending,
+    from the schema of `pq_writer`). SQL data is written to a SQLite database
+    through a `SQLWriter`, which keeps its connection open so that further
+    data can be appended without reconnecting.
+
     :param tabulated_data: A list of lists in which the first element
       is the headers for the table-to-write and subsequent elements
       are rows in the table.
@@ -105,7 +115,53 @@ def write_data(
       used to append data to a parquet format. Used in cases where
       incremental writing to a parquet destination is desired. Omit if
       `output_type` is not Parquet. Default: `None`.
+    :param schema: A user-defined schema describing the types of the table's
+      columns in Parquet and SQL output. Columns are written as strings if
+      omitted. Default: `None`.
+    :param table_name: The name of the table in `schema` being written.
+      Default: `None`.
+    :param row_group_size: The maximum number of rows in each Parquet row
+      group. Default: `None`, writing each page of data as one row group.
+    :param dictionary_columns: The names of the columns to dictionary-encode in
+      Parquet output, typically those with few distinct values. Only used when
+      creating a new `ParquetWriter`. Default: `None`, letting pyarrow
+      dictionary-encode every column.
+    :param sql_writer: A pre-existing `SQLWriter` object that can be used to
+      append data to a SQL table over an open connection. Used in cases where
+      incremental writing to a SQL destination is desired. Omit if
+      `output_type` is not SQL. Default: `None`.
+    :param index_columns: The names of the columns to index in SQL output. The
+      indexes are built when the `SQLWriter` is closed, after the data has been
+      loaded. Only used when creating a new `SQLWriter`. Default: `None`.
+    :raises ValueError: If `row_group_size` is less than 1.
+    :return: The `ParquetWriter` or `SQLWriter` to append further data with, if
+      `output_type` is Parquet or SQL, respectively. Callers should close it
+      once all of their data has been written.
     """
+    if output_type == "parquet":
+        if row_group_size is not None and row_group_size < 1:
+            raise ValueError("`row_group_size` must be at least 1.")
+        if not (schema and table_name):
+            pq_schema = None
+        elif pq_writer is not None:
+            # The writer's schema was resolved when writing the table's first page
+            pq_schema = pq_writer.schema
+        else:
+            # Create the parquet schema based on the config file
+            pq_schema = _create_pa_schema_from_table_schema(
+                schema, tabulated_data[0], table_name
+            )
+        table = _create_parquet_table(tabulated_data, pq_schema)
+        if pq_writer is None:
+            writer_options = {}
+            if dictionary_columns is not None:
+                writer_options["use_dictionary"] = dictionary_columns
+            pq_writer = pq.ParquetWriter(
+                os.path.join(directory, filename), table.schema, **writer_options
+            )
+        pq_writer.write_table(table=table, row_group_size=row_group_size)
+        return pq_writer
+
     # some elements may themselves contain lists, if selection_criteria = all is used
     for i in range(1, len(tabulated_data)):
         table_list = tabulated_data[i]
@@ -125,65 +181,131 @@ def write_data(
                 writer.writerow(tabulated_data[0])
             writer.writerows(tabulated_data[1:])
 
-    if output_type == "parquet":
-        if schema and table_name:
-            # Create the parquet schema based on the config file
-            pq_schema = _create_pa_schema_from_table_schema(
-                schema, tabulated_data[0], table_name
-            )
-        else:
-            pq_schema = None
-        # Rearrange data so that it is column, not row based as parquet needs
-        parquet_data = _create_parquet_data(tabulated_data, pq_schema)
-        if pq_schema:
-            table = pa.Table.from_arrays(
-                _create_from_arrays_data(parquet_data[1:]), schema=pq_schema
-            )
-        else:
-            # If no schema file is provided, use the names field
-            table = pa.Table.from_arrays(
-                _create_from_arrays_data(parquet_data[1:]), names=tabulated_data[0]
+    # @TODO: support username and passwords for database access
+    if output_type == "sql":
+        if sql_writer is None:
+            column_types = (
+                _create_sql_column_types(schema, tabulated_data[0], table_name)
+                if schema and table_name
+                else None
             )
-        if pq_writer is None:
-            pq_writer = pq.ParquetWriter(
-                os.path.join(directory, filename), table.schema
+            sql_writer = SQLWriter(
+                os.path.join(directory, db_file),
+                db_tablename,
+                tabulated_data[0],
+                column_types=column_types,
+                index_columns=index_columns,
             )
-        pq_writer.write_table(table=table)
-        return pq_writer
+        sql_writer.write_rows(tabulated_data[1:])
+        return sql_writer
 
-    # @TODO:
-    # 1. support username and passwords for database access
-    # 2. figure out a more intelligent way to serialize data that's being
-    # written to the SQL DB; there's the possibility that we need to write
-    # list data to the table if an anchor has multiple reverse references,
-    # but SQL can't write native python lists, so we need to either
-    # stringify them, json.dumps serialize them, or binarize them
-    if output_type == "sql":
-        # We need a file-space cursor to operate on a connected table
-        conn = sql.connect(os.path.join(directory, db_file))
-        cursor = conn.cursor()
-
-        # Create requested table if it's not already in the database
-        headers = tuple(tabulated_data[0])
-        cursor.execute(f"CREATE TABLE IF NOT EXISTS {db_tablename} {headers};")
-
-        # Format the programmatic values correctly by number of cols
-        # Need this ugly construction so that the binding placeholder qmarks
-        # don't have quotes around them individually when parsed by the SQL
-        # engine
-        hdr_placeholder = "({})".format(", ".join("?" * len(tabulated_data[0])))
-        tuple_data = [tuple([str(x) for x in row]) for row in tabulated_data[1:]]
-        # Have to do a format string this way to avoid an empty f-string error
-        print(tuple_data)
-        cursor.executemany(
-            "INSERT INTO {} {} VALUES {};".format(
-                db_tablename, headers, hdr_placeholder
-            ),
-            tuple_data,
+
+class SQLWriter:
+    """
+    Writes tabulated data to a table in a SQLite database, keeping one
+    connection open so that data can be appended page by page. The database is
+    put in write-ahead logging (WAL) mode, and each call to `write_rows` inserts
+    its rows in a single transaction. The writer must be closed once all of the
+    data has been written, which builds any requested indexes.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        table_name: str,
+        headers: List[str],
+        column_types: dict = None,
+        index_columns: List[str] = None,
+    ):
+        """
+        Creates a new SQLWriter, connecting to the database and creating the table
+        if it doesn't already exist.
+
+        :param db_path: The path to the database file to create or access.
+        :param table_name: The name of the table to create or write data to.
+        :param headers: The names of the table's columns.
+        :param column_types: A dictionary mapping column names to their SQLite
+          types (one of TEXT, REAL or INTEGER). If omitted, the table's columns
+          are untyped and every value is written as a string. Default: `None`.
+        :param index_columns: The names of the columns to index once the data
+          has been written. Default: `None`.
+        :raises ValueError: If a column to index isn't one of the table's
+          columns.
+        """
+        index_columns = index_columns or []
+        for column in index_columns:
+            if column not in headers:
+                raise ValueError(f"Cannot index unknown column `{column}`.")
+
+        self.table_name = table_name
+        self.headers = list(headers)
+        self.column_types = column_types
+        self.index_columns = index_columns
+        self.connection = sql.connect(db_path)
+        # Writers don't block readers in WAL mode, and only need to sync the WAL
+        # file at checkpoints rather than at every commit
+        self.connection.execute("PRAGMA journal_mode=WAL;")
+        self.connection.execute("PRAGMA synchronous=NORMAL;")
+
+        columns = ", ".join(
+            f"{_quote_sql_identifier(name)} {column_types.get(name, 'TEXT')}"
+            if column_types
+            else _quote_sql_identifier(name)
+            for name in self.headers
         )
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {_quote_sql_identifier(table_name)} "
+                f"({columns});"
+            )
+        placeholders = ", ".join("?" * len(self.headers))
+        column_names = ", ".join(_quote_sql_identifier(name) for name in self.headers)
+        self._insert_statement = (
+            f"INSERT INTO {_quote_sql_identifier(table_name)} ({column_names}) "
+            f"VALUES ({placeholders});"
+        )
+
+    def write_rows(self, rows: List[list]) -> None:
+        """
+        Inserts rows of tabulated data into the table in a single transaction.
+        Lists and dictionaries are serialized to strings, and other values are
+        converted to the types of their columns where they can be, and otherwise
+        stored as text.
+
+        :param rows: The rows to insert, with values in the order of the table's
+          headers.
+        """
+        if self.column_types:
+            converters = [
+                _SQL_CONVERTERS[self.column_types.get(name, "TEXT")]
+                for name in self.headers
+            ]
+            rows = (
+                tuple(convert(value) for convert, value in zip(converters, row))
+                for row in rows
+            )
+        else:
+            rows = (tuple(_convert_to_string(value) for value in row) for row in rows)
+        with self.connection:
+            self.connection.executemany(self._insert_statement, rows)
 
-        conn.commit()
-        conn.close()
+    def close(self) -> None:
+        """
+        Builds any requested indexes on the table, then closes the connection.
+        """
+        try:
+            with self.connection:
+                for column in self.index_columns:
+                    index_name = _quote_sql_identifier(
+                        f"idx_{self.table_name}_{column}".replace(" ", "_")
+                    )
+                    self.connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {index_name}"
+                        f" ON {_quote_sql_identifier(self.table_name)}"
+                        f" ({_quote_sql_identifier(column)});"
+                    )
+        finally:
+            self.connection.close()
 
 
 def _convert_list_to_string(val: list) -> str:
@@ -194,14 +316,7 @@ def _convert_list_to_string(val: list) -> str:
       for use in CSV, SQL, etc
     :return: A string representation of the list
     """
-    for i, v in enumerate(val):
-        if isinstance(v, list):
-            val[i] = _convert_list_to_string(v)
-        elif isinstance(v, dict):
-            val[i] = str(v)
-        elif not isinstance(v, str):
-            val[i] = str(v)
-    return (",").join(val)
+    return ",".join(_convert_to_string(v) for v in val)
 
 
 def _create_pa_schema_from_table_schema(
@@ -244,59 +359,158 @@ def _create_pa_schema_from_table_schema(
     return pa_schema
 
 
-def _create_from_arrays_data(row_data: List) -> List:
+def _create_sql_column_types(schema: dict, col_names: List, table_name: str) -> dict:
     """
-    Returns a list that is one array per column. Accepts list that is one
-      array per row.
-    :param row_data: A list that is made of multiple arrays
-    :return: A list of lists.
+    Returns the SQLite types of a table's columns based on the schema definition
+    file provided to the function. Defaults to TEXT.
+
+    :param schema: A dict value that is defined by the user which contains the structure
+      of the data.
+    :param col_names: A list of column names that the types are being generated for.
+    :param table_name: A string of the table name that the types are being generated
+      for.
+    :return: A dictionary mapping each column name to its SQLite type.
     """
-    if len(row_data) == 0:
-        return row_data
-    col_data = []
-    for row in row_data:
-        for i, data in enumerate(row):
-            if (len(col_data) - 1) < i:
-                col_data.append([])
-            col_data[i].append(data)
-    return col_data
-
-
-def _create_parquet_data(data: List[List], pq_schema: pa.Schema) -> List[List]:
+    table_columns = schema["tables"][table_name]["columns"]
+    column_types = {}
+    for name in col_names:
+        data_type = table_columns.get(name, {}).get("data_type")
+        column_types[name] = _SQL_TYPES.get(data_type, "TEXT")
+    return column_types
+
+
+def _create_parquet_table(tabulated_data: List[List], pq_schema: pa.Schema) -> pa.Table:
     """
-    Returns a list with the data being modified to the data types specified by the
-      pyarrow schema.
-    :param data: A list of lists with multiple objects.
-    :param pq_schema: A pyarrow schema file which references the data in the data file.
-    :return: A list of lists with data types specified in the pyarrow schema.
+    Returns a pyarrow table of tabulated data, built one typed array per column.
+    Values are converted to the types in the pyarrow schema, with lists and
+    dictionaries serialized to strings. Without a schema, every column is
+    written as strings, with missing values written as empty strings.
+
+    :param tabulated_data: A list of lists in which the first element is the
+      headers for the table and subsequent elements are rows in the table.
+    :param pq_schema: A pyarrow schema for the table's columns, or `None`.
+    :return: A pyarrow table of the rows in `tabulated_data`.
     """
+    headers = tabulated_data[0]
+    columns = list(zip(*tabulated_data[1:])) or [()] * len(headers)
+
     if pq_schema is None:
-        for row in data[1:]:
-            for i, elm in enumerate(row):
-                if elm is None:
-                    row[i] = ""
-                else:
-                    row[i] = str(elm)
-        return data
-    for row in data[1:]:
-        for i, elm in enumerate(row):
-            data_type_index = pq_schema.get_field_index(data[0][i])
-            data_type = pq_schema.types[data_type_index]
-            if data_type == "string":
-                if isinstance(elm, str):
-                    row[i] = elm
-                else:
-                    row[i] = str(elm)
-            elif data_type == "float":
-                if isinstance(elm, float):
-                    row[i] = elm
-                else:
-                    row[i] = float(elm)
-            elif data_type == "bool_":
-                if isinstance(elm, bool):
-                    row[i] = elm
-                else:
-                    row[i] = bool(elm)
-            else:
-                row[i] = elm
-    return data
+        arrays = [
+            pa.array(_convert_column(column, pa.string(), ""), type=pa.string())
+            for column in columns
+        ]
+        return pa.Table.from_arrays(arrays, names=headers)
+
+    types = [pq_schema.field(name).type for name in headers]
+    arrays = [
+        pa.array(_convert_column(column, data_type), type=data_type)
+        for column, data_type in zip(columns, types)
+    ]
+    return pa.Table.from_arrays(arrays, schema=pq_schema)
+
+
+def _convert_column(
+    column: tuple, data_type: pa.DataType, null_value: str = None
+) -> list:
+    """
+    Converts the values in a column of tabulated data for a pyarrow array of the
+    given type.
+
+    :param column: The values in the column.
+    :param data_type: The pyarrow type of the column.
+    :param null_value: The string to write missing values in string columns as.
+      Default: `None`, writing them as the string `"None"`.
+    :return: The converted values.
+    """
+    if data_type == pa.string():
+        if all(isinstance(value, str) for value in column):
+            return column
+        return [_convert_to_string(value, null_value) for value in column]
+    if pa.types.is_floating(data_type):
+        return [value if isinstance(value, float) else float(value) for value in column]
+    return column
+
+
+def _convert_to_string(value, null_value: str = None) -> str:
+    """
+    Converts a value in tabulated data to a string, serializing lists as
+    comma-separated values.
+
+    :param value: The value to convert.
+    :param null_value: The string to convert `None` to. Default: `None`, converting
+      it to the string `"None"`.
+    :return: The value as a string.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return _convert_list_to_string(value)
+    if value is None and null_value is not None:
+        return null_value
+    return str(value)
+
+
+def _quote_sql_identifier(name: str) -> str:
+    """
+    Quotes the name of a SQL table, column or index, so that it can contain spaces
+    and other special characters.
+
+    :param name: The name to quote.
+    :return: The quoted name.
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _convert_to_sql_text(value) -> Union[str, None]:
+    """
+    Converts a value in tabulated data for a TEXT column, keeping missing values.
+    """
+    return None if value is None else _convert_to_string(value)
+
+
+def _convert_to_sql_real(value) -> Union[float, str, None]:
+    """
+    Converts a value in tabulated data for a REAL column, keeping missing values.
+    Values that aren't numbers, such as the values of multi-valued columns, are
+    kept as text.
+    """
+    return _convert_to_sql_number(value, float)
+
+
+def _convert_to_sql_integer(value) -> Union[int, str, None]:
+    """
+    Converts a value in tabulated data for an INTEGER column, keeping missing
+    values. Values that aren't integers, such as the values of multi-valued
+    columns, are kept as text.
+    """
+    return _convert_to_sql_number(value, int)
+
+
+def _convert_to_sql_number(value, convert) -> Union[int, float, str, None]:
+    """
+    Converts a value in tabulated data with the given numeric type, falling back
+    to text, since SQLite stores values that can't be converted as they are.
+
+    :param value: The value to convert.
+    :param convert: The numeric type to convert the value to.
+    :return: The converted value, its text if it can't be converted, or `None`
+      if it's missing.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        return _convert_to_string(value)
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return _convert_to_string(value)
+
+
+# The SQLite types of the data types in user-defined schemas
+_SQL_TYPES = {"string": "TEXT", "number": "REAL", "boolean": "INTEGER"}
+
+_SQL_CONVERTERS = {
+    "TEXT": _convert_to_sql_text,
+    "REAL": _convert_to_sql_real,
+    "INTEGER": _convert_to_sql_integer,
+}
@@ -1,3 +1,11 @@
+from .http import close_http_sessions
+from .http import configure_http_sessions
+from .http import get_http_session
 from .http import http_request_with_retry
 
-__all__ = ["http_request_with_retry"]
+__all__ = [
+    "close_http_sessions",
+    "configure_http_sessions",
+    "get_http_session",
+    "http_request_with_retry",
+]
@@ -1,10 +1,124 @@
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
 from typing import List
 from typing import Literal
+from typing import Tuple
+from urllib.parse import urlsplit
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3 import Retry
 
+# Settings used to build pooled sessions; see `configure_http_sessions`
+_SESSION_SETTINGS = {
+    "pool_connections": 10,
+    "pool_maxsize": 10,
+    "pool_block": False,
+    "keep_alive": True,
+    "status_forcelist": (429, 500, 502, 503, 504),
+    "backoff_factor": 0,
+}
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+_SESSIONS_PID = os.getpid()
+
+
+def configure_http_sessions(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    pool_block: bool = False,
+    keep_alive: bool = True,
+    status_forcelist: Tuple[int, ...] = (429, 500, 502, 503, 504),
+    backoff_factor: float = 0,
+) -> None:
+    """
+    Configures the pooled sessions used by
+    :func:`phdi.transport.http.http_request_with_retry`. Any open sessions are
+    closed, so the new settings apply to every later request.
+
+    :param pool_connections: The number of connection pools to cache per
+      session. Default: 10.
+    :param pool_maxsize: The maximum number of connections to keep open to a
+      single host. Default: 10.
+    :param pool_block: Whether requests should wait for a free connection
+      when all `pool_maxsize` connections to a host are in use, rather than
+      opening a connection that isn't kept. Default: `False`
+    :param keep_alive: Whether connections should be kept open between
+      requests. Default: `True`
+    :param status_forcelist: The HTTP status codes on which requests are
+      retried. Default: (429, 500, 502, 503, 504).
+    :param backoff_factor: The factor by which to back off between retries,
+      as accepted by `urllib3.Retry`. Default: 0.
+    :raises ValueError: If `pool_connections` or `pool_maxsize` is less than 1,
+      or `backoff_factor` is negative.
+    """
+    if pool_connections < 1 or pool_maxsize < 1:
+        raise ValueError("`pool_connections` and `pool_maxsize` must be at least 1.")
+    if backoff_factor < 0:
+        raise ValueError("`backoff_factor` cannot be negative.")
+
+    with _SESSIONS_LOCK:
+        _SESSION_SETTINGS.update(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            keep_alive=keep_alive,
+            status_forcelist=tuple(status_forcelist),
+            backoff_factor=backoff_factor,
+        )
+        _close_sessions()
+
+
+def get_http_session(
+    url: str, retry_count: int, allowed_methods: List[str]
+) -> requests.Session:
+    """
+    Gets the pooled session used to make requests to a URL's host, creating it
+    if there isn't one yet. Sessions are shared between threads and keyed by
+    scheme, host and retry policy, so that repeated requests to the same host
+    reuse open connections instead of opening a new one for every request.
+    Since requests made with different credentials share a session, pooled
+    sessions don't keep cookies between requests.
+
+    :param url: The url at which the request will be made.
+    :param retry_count: The number of times to retry the request, if the
+      first attempt fails.
+    :param allowed_methods: The list of allowed HTTP request methods (i.e.,
+      POST, PUT) for the specific URL and query.
+    :return: A `requests.Session` for the URL's host.
+    """
+    global _SESSIONS_PID
+
+    url_parts = urlsplit(url)
+    key = (
+        url_parts.scheme.lower(),
+        url_parts.netloc.lower(),
+        retry_count,
+        tuple(method.upper() for method in allowed_methods),
+    )
+    with _SESSIONS_LOCK:
+        # Connections can't be shared with a forked process, so a child
+        # process starts with its own sessions
+        if _SESSIONS_PID != os.getpid():
+            _SESSIONS.clear()
+            _SESSIONS_PID = os.getpid()
+
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = _create_session(retry_count, allowed_methods)
+            _SESSIONS[key] = session
+    return session
+
+
+def close_http_sessions() -> None:
+    """
+    Closes every pooled session, and the connections they hold open. Later
+    requests open new sessions as needed.
+    """
+    with _SESSIONS_LOCK:
+        _close_sessions()
+
 
 def http_request_with_retry(
     url: str,
@@ -13,10 +127,13 @@ def http_request_with_retry(
     allowed_methods: List[str],
     headers: dict,
     data: dict = None,
+    files: dict = None,
 ) -> requests.Response:
     """
     Executes an HTTP request, retrying the request if the returned HTTP status code
-    is one of a specified list of codes.
+    is one of a specified list of codes. Requests are made with a pooled session
+    per host (see :func:`phdi.transport.http.get_http_session`), so connections
+    are reused between requests.
 
     :param url: The url at which to make the HTTP request.
     :param retry_count: The number of times to retry the request, if the
@@ -29,6 +146,8 @@ def http_request_with_retry(
       including Authorization and content-type.
     :param data: The data as a JSON-formatted dictionary, used when the request
       requires data to be posted. Default: `None`
+    :param files: Files and form fields to post as a multipart form, as accepted
+      by `requests.post`, if the request requires them. Default: `None`
     :raises ValueError: An unsupported HTTP method (e.g., PATCH, DELETE) was passed
       to the request_type parameter.
     :return: A HTTP request response.
@@ -40,26 +159,19 @@ def http_request_with_retry(
             f"The HTTP '{request_type}' method is not currently supported."
         )
 
-    # Configure the settings of the 'requests' session we'll make
-    # the API call with
-    retry_strategy = Retry(
-        total=retry_count,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=allowed_methods,
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    http = requests.Session()
-    http.mount("http://", adapter)
-    http.mount("https://", adapter)
+    http = get_http_session(url, retry_count, allowed_methods)
 
     # Now, actually try to complete the API request
     # TODO: Condense this down to make a single call using
     # http.request(method=request_type, url=url, headers=headers, json=data)
     if request_type == "POST":
+        # Only multipart requests pass files, so other requests are unchanged
+        file_kwargs = {"files": files} if files is not None else {}
         response = http.post(
             url=url,
             headers=headers,
             json=data,
+            **file_kwargs,
         )
     elif request_type == "GET":
         response = http.get(
@@ -68,3 +180,45 @@ def http_request_with_retry(
         )
 
     return response
+
+
+def _create_session(retry_count: int, allowed_methods: List[str]) -> requests.Session:
+    """
+    Creates a session whose connections are pooled and retried according to
+    the configured settings, and which doesn't keep cookies between requests.
+
+    :param retry_count: The number of times to retry a request, if the
+      first attempt fails.
+    :param allowed_methods: The list of allowed HTTP request methods.
+    :return: A new `requests.Session`.
+    """
+    retry_strategy = Retry(
+        total=retry_count,
+        status_forcelist=list(_SESSION_SETTINGS["status_forcelist"]),
+        allowed_methods=allowed_methods,
+        backoff_factor=_SESSION_SETTINGS["backoff_factor"],
+    )
+    adapter = HTTPAdapter(
+        pool_connections=_SESSION_SETTINGS["pool_connections"],
+        pool_maxsize=_SESSION_SETTINGS["pool_maxsize"],
+        pool_block=_SESSION_SETTINGS["pool_block"],
+        max_retries=retry_strategy,
+    )
+    http = requests.Session()
+    # Cookies set by a response mustn't be sent with later requests, which
+    # may be made with other credentials
+    http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    if not _SESSION_SETTINGS["keep_alive"]:
+        http.headers["Connection"] = "close"
+    return http
+
+
+def _close_sessions() -> None:
+    """
+    Closes and forgets every pooled session. Callers must hold `_SESSIONS_LOCK`.
+    """
+    for session in _SESSIONS.values():
+        session.close()
+    _SESSIONS.clear()
@@ -3,6 +3,7 @@ from phdi.validation.validation import _append_error_message
 from phdi.validation.validation import _clear_all_errors_and_ids
 from phdi.validation.validation import _organize_error_messages
 from phdi.validation.validation import _response_builder
+from phdi.validation.validation import EcrValidator
 from phdi.validation.validation import validate_ecr
 from phdi.validation.xml_utils import _check_xml_names_and_attribs_exist
 from phdi.validation.xml_utils import _get_ecr_custom_message
@@ -12,6 +13,7 @@ from phdi.validation.xml_utils import _get_xml_relative_iterator
 from phdi.validation.xml_utils import _get_xml_relatives_details
 from phdi.validation.xml_utils import _validate_xml_related_element
 from phdi.validation.xml_utils import _validate_xml_relatives
+from phdi.validation.xml_utils import CompiledField
 from phdi.validation.xml_utils import ECR_NAMESPACES
 from phdi.validation.xml_utils import get_ecr_message_ids
 from phdi.validation.xml_utils import get_xml_element_details
@@ -21,6 +23,8 @@ from phdi.validation.xml_utils import validate_xml_value
 
 __all__ = [
     "validate_ecr",
+    "EcrValidator",
+    "CompiledField",
     "_organize_error_messages",
     "_response_builder",
     "_append_error_message",
@@ -0,0 +1,14 @@
+import pytest
+
+from phdi.transport import close_http_sessions
+
+
+@pytest.fixture(autouse=True)
+def reset_http_sessions():
+    """
+    Closes pooled HTTP sessions around every test, so that sessions created
+    while `requests.Session` is mocked don't leak into other tests.
+    """
+    close_http_sessions()
+    yield
+    close_http_sessions()
@@ -1,6 +1,7 @@
 import copy
 import json
 import pathlib
+from unittest import mock
 
 import pytest
 
@@ -172,3 +173,25 @@ def test_geocode_bundle_census(patient_bundle_census, geocoded_response, census_
     )
     assert standardized_bundle == returned_bundle
     assert patient_bundle_census != standardized_bundle
+
+
+def test_geocode_bundles_census(patient_bundle_census, geocoded_response):
+    census_client = CensusFhirGeocodeClient()
+    geocode_batch = mock.Mock(return_value=[geocoded_response])
+    census_client._CensusFhirGeocodeClient__client.geocode_batch = geocode_batch
+
+    standardized_bundle = copy.deepcopy(patient_bundle_census)
+    _extract_address(_get_patient_from_bundle(standardized_bundle), geocoded_response)
+
+    returned_bundles = census_client.geocode_bundles(
+        [patient_bundle_census], overwrite=False
+    )
+    assert returned_bundles == [standardized_bundle]
+    assert patient_bundle_census != standardized_bundle
+    geocode_batch.assert_called_once_with(
+        [{"street": "239 Greene St Apt 4L", "city": "New York", "state": "NY"}]
+    )
+
+    returned_bundle = census_client.geocode_bundle(patient_bundle_census, batch=True)
+    assert returned_bundle is patient_bundle_census
+    assert returned_bundle == standardized_bundle
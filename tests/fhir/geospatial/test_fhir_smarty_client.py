@@ -117,3 +117,62 @@ def test_geocode_bundle():
     assert standardized_bundle == returned_bundle
     assert bundle != standardized_bundle
     smarty_client.geocode_client.geocode_from_str.assert_called()
+
+
+def test_geocode_bundles():
+    smarty_client = SmartyFhirGeocodeClient(mock.Mock(), mock.Mock())
+    geocoded_response = GeocodeResult(
+        line=["123 FAKE ST"],
+        city="New York",
+        state="NY",
+        lat=45.123,
+        lng=-70.234,
+        county_fips="36061",
+        county_name="New York",
+        postal_code="10001",
+    )
+    bundle = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent.parent
+            / "assets"
+            / "general"
+            / "patient_bundle.json"
+        )
+    )
+    # A second patient, who has an address without a street, and one that
+    # couldn't be geocoded
+    patient = copy.deepcopy(bundle["entry"][1])
+    patient["resource"]["address"] = [
+        {"city": "Faketon", "state": "NY"},
+        {"line": ["1 Nowhere Rd"], "city": "Faketon", "state": "NY"},
+    ]
+    bundle["entry"].append(patient)
+
+    smarty_client.geocode_client.geocode_batch = mock.Mock(
+        return_value=[geocoded_response, None]
+    )
+    returned_bundles = smarty_client.geocode_bundles(
+        [bundle, {"resourceType": "Bundle"}], overwrite=False
+    )
+
+    # Addresses in all the bundles are geocoded together
+    smarty_client.geocode_client.geocode_batch.assert_called_once_with(
+        ["123 Fake St Unit #F Faketon, NY 10001-0001", "1 Nowhere Rd Faketon, NY"]
+    )
+    assert returned_bundles[1] == {"resourceType": "Bundle"}
+    returned_addresses = [
+        address
+        for entry in returned_bundles[0]["entry"][1:]
+        for address in entry["resource"]["address"]
+    ]
+    assert returned_addresses[0]["line"] == ["123 FAKE ST"]
+    assert returned_addresses[0]["extension"][0]["extension"][0]["valueDecimal"] == (
+        45.123
+    )
+    assert returned_addresses[1:] == patient["resource"]["address"]
+    assert bundle["entry"][1]["resource"]["address"][0]["line"][0] == "123 Fake St"
+
+    # A single bundle can be geocoded in batch mode too
+    smarty_client.geocode_client.geocode_batch.return_value = [None, None]
+    assert smarty_client.geocode_bundle(bundle, batch=True) is bundle
+    assert smarty_client.geocode_client.geocode_batch.call_count == 2
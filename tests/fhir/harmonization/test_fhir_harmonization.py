@@ -2,8 +2,11 @@ import copy
 import json
 import pathlib
 
+import pytest
+
 from phdi.fhir.harmonization import double_metaphone_bundle
 from phdi.fhir.harmonization import double_metaphone_patient
+from phdi.fhir.harmonization import standardize_bundle
 from phdi.fhir.harmonization import standardize_dob
 from phdi.fhir.harmonization import standardize_names
 from phdi.fhir.harmonization import standardize_phones
@@ -270,3 +273,54 @@ def test_standardize_dob():
     assert (
         standardize_dob(patient_updated, "%m/%Y/%d", overwrite=False) == patient_updated
     )
+
+
+def test_standardize_bundle():
+    raw_bundle = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent.parent
+            / "assets"
+            / "general"
+            / "patient_bundle.json"
+        )
+    )
+    raw_bundle["entry"][1]["resource"]["birthDate"] = "02/1983/01"
+
+    # Case where we apply every standardizer, which should match applying
+    # each standardizer to the whole bundle in turn
+    standardized_bundle = standardize_names(copy.deepcopy(raw_bundle), case="title")
+    standardized_bundle = standardize_phones(standardized_bundle)
+    standardized_bundle = standardize_dob(standardized_bundle, "%m/%Y/%d")
+    standardized_bundle = double_metaphone_bundle(standardized_bundle)
+    assert (
+        standardize_bundle(
+            raw_bundle,
+            ["double_metaphone", "dob", "phones", "names"],
+            case="title",
+            dob_format="%m/%Y/%d",
+            overwrite=False,
+        )
+        == standardized_bundle
+    )
+
+    # Case where we apply the default standardizers in place
+    bundle = copy.deepcopy(raw_bundle)
+    standardized_bundle = standardize_names(copy.deepcopy(raw_bundle))
+    standardized_bundle = standardize_phones(standardized_bundle)
+    standardized_bundle = standardize_dob(standardized_bundle, "%m/%Y/%d")
+    assert standardize_bundle(bundle, dob_format="%m/%Y/%d") is bundle
+    assert bundle == standardized_bundle
+
+    # Case where we provide only a single resource
+    patient_resource = copy.deepcopy(raw_bundle["entry"][1]["resource"])
+    standardized_patient = standardize_phones(
+        standardize_names(copy.deepcopy(patient_resource))
+    )
+    assert (
+        standardize_bundle(patient_resource, ["names", "phones"])
+        == standardized_patient
+    )
+
+    # Case where an unknown standardizer is requested
+    with pytest.raises(ValueError):
+        standardize_bundle(raw_bundle, ["names", "addresses"])
@@ -2,10 +2,14 @@ import csv
 import json
 import os.path
 import pathlib
+import sqlite3
+import threading
+import time
 import urllib.parse
 from unittest import mock
 
 import pytest
+import requests
 import yaml
 from requests.models import Response
 
@@ -882,3 +886,231 @@ def test_generate_tables(patch_search_incremental):
     # Remove file after testing is complete
     if os.path.isfile(physical_exams_path):  # pragma: no cover
         os.remove(physical_exams_path)
+
+
+def _paged_search(entries, pages=3, delay=0.0, in_flight=None):
+    """
+    Builds a fake `extract_data_from_fhir_search_incremental` that returns each
+    search's results over several pages, optionally tracking how many searches are
+    in flight at once.
+    """
+    lock = threading.Lock()
+
+    def search(search_url, cred_manager=None):
+        if in_flight is not None:
+            with lock:
+                in_flight["current"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["current"])
+        time.sleep(delay)
+        if in_flight is not None:
+            with lock:
+                in_flight["current"] -= 1
+
+        page = int(urllib.parse.parse_qs(search_url).get("page", ["1"])[0])
+        next_url = f"{search_url.split('&page=')[0]}&page={page + 1}"
+        return entries, next_url if page < pages else None
+
+    return search
+
+
+def _generate_tables_to(tmp_path, **kwargs) -> dict:
+    """
+    Generates the test schema's tables as CSV files in `tmp_path`, and returns the
+    rows written to each table.
+    """
+    schema_path = (
+        pathlib.Path(__file__).parent.parent.parent
+        / "assets"
+        / "tabulation"
+        / "tabulation_schema.yaml"
+    )
+    tmp_path.mkdir(exist_ok=True)
+    output_params = {
+        "Patients": {
+            "directory": str(tmp_path),
+            "filename": "patients.csv",
+            "output_type": "csv",
+        },
+        "Physical Exams": {
+            "directory": str(tmp_path),
+            "filename": "physical_exam.csv",
+            "output_type": "csv",
+        },
+    }
+    generate_tables(
+        schema_path=schema_path,
+        output_params=output_params,
+        fhir_url="https://some_fhir_server_url",
+        **kwargs,
+    )
+
+    rows = {}
+    for table_name, params in output_params.items():
+        with open(tmp_path / params["filename"], newline="") as csv_file:
+            rows[table_name] = list(csv.reader(csv_file, dialect="excel"))
+    return rows
+
+
+def test_generate_tables_pipelined(tmp_path):
+    entries = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent.parent
+            / "assets"
+            / "general"
+            / "FHIR_server_extracted_data.json"
+        )
+    )["entry"]
+
+    with mock.patch(
+        "phdi.fhir.tabulation.tables.extract_data_from_fhir_search_incremental",
+        side_effect=_paged_search(entries),
+    ):
+        expected = _generate_tables_to(tmp_path / "sequential")
+        for kwargs in [
+            {"prefetch_pages": 2},
+            {"max_concurrent_tables": 2},
+            {"prefetch_pages": 1, "max_concurrent_tables": 2, "max_requests": 2},
+        ]:
+            directory = tmp_path / "_".join(f"{k}{v}" for k, v in kwargs.items())
+            # Pipelined exports write the same rows, in the same order
+            assert _generate_tables_to(directory, **kwargs) == expected
+
+    # Each table's header, then three pages of rows
+    assert len(expected["Patients"]) == 1 + 3 * 3
+
+
+def test_generate_tables_pipelined_max_requests(tmp_path):
+    entries = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent.parent
+            / "assets"
+            / "general"
+            / "FHIR_server_extracted_data.json"
+        )
+    )["entry"]
+    in_flight = {"current": 0, "max": 0}
+
+    with mock.patch(
+        "phdi.fhir.tabulation.tables.extract_data_from_fhir_search_incremental",
+        side_effect=_paged_search(entries, delay=0.02, in_flight=in_flight),
+    ):
+        _generate_tables_to(
+            tmp_path, prefetch_pages=2, max_concurrent_tables=2, max_requests=1
+        )
+    assert in_flight["max"] == 1
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"max_concurrent_tables": 2}])
+def test_generate_tables_sql(tmp_path, kwargs):
+    entries = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent.parent
+            / "assets"
+            / "general"
+            / "FHIR_server_extracted_data.json"
+        )
+    )["entry"]
+    schema_path = (
+        pathlib.Path(__file__).parent.parent.parent
+        / "assets"
+        / "tabulation"
+        / "tabulation_schema.yaml"
+    )
+    output_params = {
+        "Patients": {
+            "directory": str(tmp_path),
+            "output_type": "sql",
+            "db_file": "tables.db",
+            "db_tablename": "PATIENTS",
+            "index_columns": ["Patient ID"],
+        },
+        "Physical Exams": {
+            "directory": str(tmp_path),
+            "output_type": "sql",
+            "db_file": "tables.db",
+            "db_tablename": "PHYSICAL_EXAMS",
+        },
+    }
+
+    with (
+        mock.patch(
+            "phdi.fhir.tabulation.tables.extract_data_from_fhir_search_incremental",
+            side_effect=_paged_search(entries),
+        ),
+        mock.patch(
+            "phdi.tabulation.tables.sql.connect", wraps=sqlite3.connect
+        ) as patched_connect,
+    ):
+        generate_tables(
+            schema_path=schema_path,
+            output_params=output_params,
+            fhir_url="https://some_fhir_server_url",
+            **kwargs,
+        )
+
+    # Each table's pages are written over one connection
+    assert patched_connect.call_count == 2
+    conn = sqlite3.connect(tmp_path / "tables.db")
+    cursor = conn.cursor()
+    assert cursor.execute("SELECT COUNT(*) FROM PATIENTS").fetchone() == (9,)
+    assert cursor.execute("SELECT COUNT(*) FROM PHYSICAL_EXAMS").fetchone() == (9,)
+    assert cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    ).fetchall() == [("idx_PATIENTS_Patient_ID",)]
+
+    # Columns are typed as in the schema
+    assert [
+        (column[1], column[2])
+        for column in cursor.execute("PRAGMA table_info(PATIENTS)").fetchall()
+    ] == [
+        ("Patient ID", "TEXT"),
+        ("First Name", "TEXT"),
+        ("Last Name", "TEXT"),
+        ("Phone Number", "TEXT"),
+        ("Building Number", "REAL"),
+    ]
+    assert (
+        cursor.execute(
+            'SELECT typeof("Building Number") FROM PATIENTS '
+            'WHERE "Building Number" IS NOT NULL'
+        ).fetchall()
+        == [("real",)] * 9
+    )
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"prefetch_pages": 2}, {"max_concurrent_tables": 2}]
+)
+def test_generate_tables_pipelined_failure(tmp_path, kwargs):
+    search = mock.Mock(
+        side_effect=[
+            ([], "Patient?page=2"),
+            requests.HTTPError("Server error"),
+        ]
+        + [([], None)] * 10
+    )
+    with mock.patch(
+        "phdi.fhir.tabulation.tables.extract_data_from_fhir_search_incremental",
+        search,
+    ):
+        with pytest.raises(requests.HTTPError):
+            _generate_tables_to(tmp_path, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"prefetch_pages": -1},
+        {"max_concurrent_tables": 0},
+        {"max_requests": 0},
+    ],
+)
+def test_generate_tables_invalid_pipeline_options(kwargs):
+    with pytest.raises(ValueError):
+        generate_tables(
+            schema_path="schema.yaml",
+            output_params={},
+            fhir_url="https://some_fhir_server_url",
+            **kwargs,
+        )
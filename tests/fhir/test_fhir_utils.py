@@ -1,10 +1,15 @@
 import json
 import pathlib
+from decimal import Decimal
 
+import fhirpathpy
 import pytest
 
+from phdi.fhir.utils import _compile_simple_fhirpath
 from phdi.fhir.utils import apply_selection_criteria
+from phdi.fhir.utils import extract_value_with_resource_path
 from phdi.fhir.utils import find_entries_by_resource_type
+from phdi.fhir.utils import get_fhirpathpy_parser
 from phdi.fhir.utils import get_field
 from phdi.fhir.utils import get_one_line_address
 
@@ -155,3 +160,94 @@ def test_get_one_line_address():
         get_one_line_address(address)
         == "1234 Silversun Strip Boston, Massachusetts 99999"
     )
+
+
+def test_get_fhirpathpy_parser_is_cached():
+    assert get_fhirpathpy_parser("Patient.name.given") is get_fhirpathpy_parser(
+        "Patient.name.given"
+    )
+    assert get_fhirpathpy_parser(
+        "Patient.name.where(use='official').given"
+    ) is get_fhirpathpy_parser("Patient.name.where(use='official').given")
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "Patient.name.given",
+        "Patient.name[0].given[1]",
+        "name.family",
+        "Patient.address.line[0]",
+        "Patient.address.postalCode",
+        "Patient.birthDate",
+        "Patient.extension.valueCoding.code",
+        "Patient.telecom[1].value",
+        "Observation.valueQuantity.value",
+        "Patient.name[3].given",
+        "Patient.missing.element",
+        "Observation.code.coding.code",
+    ],
+)
+def test_get_fhirpathpy_parser_simple_paths(path):
+    # Simple paths are evaluated without fhirpathpy, with the same results
+    assert _compile_simple_fhirpath(path) is not None
+    for bundle_name in [
+        "patient_bundle.json",
+        "patient_bundle_w_floats.json",
+        "patient_bundle_w_labs.json",
+        "patient_resource_w_extensions.json",
+    ]:
+        data = json.load(
+            open(
+                pathlib.Path(__file__).parent.parent
+                / "assets"
+                / "general"
+                / bundle_name
+            )
+        )
+        resources = [entry["resource"] for entry in data.get("entry", [])] or [data]
+        for resource in resources + [resources]:
+            assert get_fhirpathpy_parser(path)(resource) == fhirpathpy.evaluate(
+                resource, path
+            )
+
+
+def test_get_fhirpathpy_parser_falls_back():
+    # Expressions other than simple paths are compiled by fhirpathpy
+    for path in ["name.where(use='official').given", "name.given.length()", "true"]:
+        assert _compile_simple_fhirpath(path) is None
+    patient = {
+        "resourceType": "Patient",
+        "name": [{"use": "official", "given": ["John"]}, {"given": ["Johnny"]}],
+        "weight": 1.5,
+        "birthDate": "2000-01-01",
+        "_birthDate": {"id": "dob", "extension": [{"url": "http://example.com"}]},
+    }
+    assert get_fhirpathpy_parser("name.where(use='official').given")(patient) == [
+        "John"
+    ]
+
+    # Elements fhirpathpy treats specially are handled as it would
+    assert get_fhirpathpy_parser("Patient.weight")(patient) == [Decimal("1.5")]
+    assert get_fhirpathpy_parser("Patient.birthDate")(patient) == fhirpathpy.evaluate(
+        patient, "Patient.birthDate"
+    )
+    assert get_fhirpathpy_parser("Observation.name")(patient) == []
+    assert get_fhirpathpy_parser("name.given")(None) == []
+
+
+def test_extract_value_with_resource_path():
+    patient = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "general"
+            / "patient_bundle.json"
+        )
+    )["entry"][1]["resource"]
+    assert extract_value_with_resource_path(patient, "Patient.name.given") == "John "
+    assert extract_value_with_resource_path(patient, "Patient.name.given", "all") == [
+        "John ",
+        " Danger ",
+    ]
+    assert extract_value_with_resource_path(patient, "Patient.missing") is None
@@ -1,9 +1,16 @@
+import csv
+import io
 import json
 import pathlib
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 
 import pytest
 import requests
 
+from phdi.geospatial.cache import GeocodeCache
 from phdi.geospatial.census import CensusGeocodeClient
 from phdi.geospatial.core import GeocodeResult
 
@@ -15,6 +22,72 @@ CENSUS_RESPONSE_FILE = (
 )
 
 
+@pytest.fixture
+def census_batch_server(monkeypatch):
+    """
+    A local stub of the Census batch geocoder, which matches addresses on
+    Greene St and records the address files uploaded to it.
+    """
+    address_files = []
+
+    class CensusBatchHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            form = BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+            )
+            fields = {
+                part.get_param("name", header="content-disposition"): part.get_payload(
+                    decode=True
+                ).decode()
+                for part in form.get_payload()
+            }
+            assert fields["benchmark"] == "Public_AR_Census2020"
+            address_file = fields["addressFile"]
+            address_files.append(address_file)
+
+            rows = []
+            for row in csv.reader(io.StringIO(address_file)):
+                if "greene" in row[1].lower():
+                    rows.append(
+                        [
+                            row[0],
+                            ", ".join(row[1:]),
+                            "Match",
+                            "Exact",
+                            "239 GREENE ST, NEW YORK, NY, 10003",
+                            "-73.9954428687588,40.72962831414409",
+                            "59653655",
+                            "L",
+                            "36",
+                            "061",
+                            "005900",
+                            "3005",
+                        ]
+                    )
+                else:
+                    rows.append([row[0], ", ".join(row[1:]), "No_Match"])
+            response = io.StringIO()
+            csv.writer(response, quoting=csv.QUOTE_ALL).writerows(rows)
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(response.getvalue().encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CensusBatchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        CensusGeocodeClient,
+        "_get_batch_url",
+        staticmethod(lambda: f"http://127.0.0.1:{server.server_port}/addressbatch"),
+    )
+    yield address_files
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture
 def census_response_data():
     with open(CENSUS_RESPONSE_FILE) as file:
@@ -176,3 +249,108 @@ def test_geocode_from_dict(monkeypatch, census_response_data, geocoded_response)
         "zip": "00000",
     }
     assert census_client.geocode_from_dict(malformed_input_dict) is None
+
+
+def test_geocode_with_cache(monkeypatch, census_response_data, geocoded_response):
+    census_client = CensusGeocodeClient(cache=GeocodeCache())
+    calls = []
+
+    def call_census_api(url):
+        calls.append(url)
+        if "Centre" in url:
+            return mock_ambiguous_address()
+        return census_response_data
+
+    monkeypatch.setattr(census_client, "_call_census_api", call_census_api)
+
+    # Addresses are only sent to the Census API once, whatever their case
+    address = "239 Greene Street, New York, NY, 10003"
+    assert census_client.geocode_from_str(address) == geocoded_response
+    assert census_client.geocode_from_str(address.upper()) == geocoded_response
+    assert census_client.geocode_from_dict({"street": "659 Centre St"}) is None
+    assert census_client.geocode_from_str("659 Centre St") is None
+    assert len(calls) == 2
+    assert census_client.cache.stats()["hits"] == 2
+
+
+def test_geocode_batch(monkeypatch, census_batch_server):
+    monkeypatch.setattr("phdi.geospatial.census.CENSUS_BATCH_SIZE", 2)
+    census_client = CensusGeocodeClient(cache=GeocodeCache())
+    addresses = [
+        "239 Greene Street, New York, NY, 10003",
+        {"street": "659 Centre St", "city": "Brooklyn", "state": "NY"},
+        {"street": "239 Greene St", "city": "New York", "state": "NY"},
+        "239 GREENE STREET,  New York, NY, 10003",
+    ]
+
+    results = census_client.geocode_batch(addresses)
+    assert results[1] is None
+    assert results[0] == results[2] == results[3]
+    assert results[0] is not results[3]
+    assert results[0] == GeocodeResult(
+        line=["239 GREENE ST"],
+        city="NEW YORK",
+        state="NY",
+        postal_code="10003",
+        county_fips="36061",
+        county_name="",
+        lat=40.72962831414409,
+        lng=-73.9954428687588,
+        geoid="360610059003005",
+        census_tract="59",
+        census_block="3005",
+    )
+
+    # Distinct addresses are uploaded once, in files of up to the batch size
+    assert len(census_batch_server) == 2
+    assert census_batch_server[0].splitlines() == [
+        '0,"239 Greene Street, New York, NY, 10003",,,',
+        "1,659 Centre St,Brooklyn,NY,",
+    ]
+    assert census_batch_server[1].splitlines() == ["0,239 Greene St,New York,NY,"]
+
+    # Results are cached
+    assert census_client.geocode_batch(addresses[:2]) == results[:2]
+    assert len(census_batch_server) == 2
+
+    with pytest.raises(ValueError):
+        census_client.geocode_batch(["239 Greene St", {"city": "New York"}])
+
+
+def test_geocode_batch_then_single_lookup(
+    monkeypatch, census_batch_server, census_response_data, geocoded_response
+):
+    census_client = CensusGeocodeClient(cache=GeocodeCache())
+    calls = []
+
+    def call_census_api(url):
+        calls.append(url)
+        return census_response_data
+
+    monkeypatch.setattr(census_client, "_call_census_api", call_census_api)
+    address = "239 Greene Street, New York, NY, 10003"
+
+    # Batch results, without county names, aren't returned for single lookups
+    assert census_client.geocode_batch([address])[0].county_name == ""
+    assert census_client.geocode_from_str(address) == geocoded_response
+    assert geocoded_response.county_name != ""
+    assert len(calls) == 1
+
+    # Nor are single lookup results returned for batches
+    assert census_client.geocode_batch([address])[0].county_name == ""
+    assert census_client.geocode_from_str(address) == geocoded_response
+    assert len(census_batch_server) == 1
+    assert len(calls) == 1
+
+
+def test_parse_census_batch_result():
+    response = (
+        '"1","1 Main St, Springfield, IL","Tie"\n'
+        '"0","2 Main St","Match","Exact","2 MAIN ST, SPRINGFIELD, IL, 62701",'
+        '"-89.6,39.8","1","R","17","167","001201","1001"\n'
+    )
+    results = CensusGeocodeClient._parse_census_batch_result(response, 3)
+    assert results[1] is None and results[2] is None
+    assert results[0].census_tract == "12.01"
+    assert results[0].geoid == "171670012011001"
+    assert (results[0].lat, results[0].lng) == (39.8, -89.6)
@@ -0,0 +1,116 @@
+import pytest
+
+from phdi.geospatial import GeocodeCache
+from phdi.geospatial.cache import normalize_address_key
+from phdi.geospatial.core import GeocodeResult
+
+RESULT = GeocodeResult(
+    line=["239 GREENE ST"],
+    city="NEW YORK",
+    state="NY",
+    postal_code="10003",
+    county_fips="36061",
+    lat=40.72962831414409,
+    lng=-73.9954428687588,
+    county_name="New York",
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_address_key():
+    assert normalize_address_key("census", " 239  Greene St\n", None) == (
+        "census|239 greene st|"
+    )
+    assert normalize_address_key("smarty", "239 GREENE ST") == normalize_address_key(
+        "smarty", "239 greene  st"
+    )
+
+
+def test_geocode_cache_init():
+    with pytest.raises(ValueError):
+        GeocodeCache(max_size=0)
+    with pytest.raises(ValueError):
+        GeocodeCache(ttl=-1)
+    with pytest.raises(ValueError):
+        GeocodeCache(negative_ttl=-1)
+
+
+def test_geocode_cache_get_and_put():
+    cache = GeocodeCache(max_size=2)
+    assert cache.get("a") is None
+    assert cache.get("a", "missing") == "missing"
+
+    cache.put("a", RESULT)
+    cached = cache.get("a")
+    assert cached == RESULT
+    # Callers can't change the cached result
+    cached.line.append("APT 1")
+    assert cache.get("a") == RESULT
+
+    # Addresses that couldn't be geocoded are cached as None
+    cache.put("b", None)
+    assert cache.get("b", "missing") is None
+
+    # The least recently used result is evicted when the cache is full
+    cache.get("a")
+    cache.put("c", RESULT)
+    assert len(cache) == 2
+    assert cache.get("b", "missing") == "missing"
+    assert cache.get("a") == RESULT
+
+    assert cache.stats() == {
+        "hits": 5,
+        "misses": 3,
+        "hit_rate": 5 / 8,
+        "size": 2,
+        "max_size": 2,
+    }
+    cache.clear()
+    assert cache.get("a", "missing") == "missing"
+
+
+def test_geocode_cache_ttl():
+    clock = FakeClock()
+    cache = GeocodeCache(ttl=100, negative_ttl=10, clock=clock)
+    cache.put("a", RESULT)
+    cache.put("b", None)
+    clock.now += 10
+    assert cache.get("a") == RESULT
+    assert cache.get("b", "missing") == "missing"
+    clock.now += 90
+    assert cache.get("a", "missing") == "missing"
+
+    # Negative caching can be turned off
+    cache = GeocodeCache(negative_ttl=0, clock=clock)
+    cache.put("b", None)
+    assert cache.get("b", "missing") == "missing"
+
+
+def test_geocode_cache_on_disk(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "geocode_cache.db"
+    cache = GeocodeCache(ttl=100, negative_ttl=None, path=path, clock=clock)
+    cache.put("a", RESULT)
+    cache.put("b", None)
+    cache.close()
+
+    # Results are shared with caches using the same database
+    cache = GeocodeCache(max_size=1, path=path, clock=clock)
+    assert cache.get("a") == RESULT
+    assert cache.get("b", "missing") is None
+    # Results evicted from memory are still found on disk
+    assert len(cache) == 1
+    assert cache.get("a") == RESULT
+    clock.now += 100
+    assert cache.get("a", "missing") == "missing"
+
+    cache.clear()
+    cache.close()
+    assert GeocodeCache(path=path).get("b", "missing") == "missing"
@@ -1,14 +1,68 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 from unittest import mock
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
 
 import pytest
 from smartystreets_python_sdk.us_street.candidate import Candidate
 from smartystreets_python_sdk.us_street.components import Components
 from smartystreets_python_sdk.us_street.metadata import Metadata
 
+from phdi.geospatial.cache import GeocodeCache
 from phdi.geospatial.core import GeocodeResult
 from phdi.geospatial.smarty import SmartyGeocodeClient
 
 
+@pytest.fixture
+def smarty_server():
+    """
+    A local stub of the Smarty US Street API, which geocodes addresses on
+    Fake St and records the streets of the lookups in each request made to it.
+    """
+    requests = []
+
+    class SmartyHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            self._respond([{"street": query["street"][0]}])
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            self._respond(json.loads(body))
+
+        def _respond(self, lookups):
+            requests.append([lookup["street"] for lookup in lookups])
+            candidates = [
+                {
+                    "input_index": i,
+                    "candidate_index": 0,
+                    "delivery_line_1": lookup["street"].upper(),
+                    "components": {"zipcode": "10001", "city_name": "New York"},
+                    "metadata": {"latitude": 45.123, "longitude": -70.234},
+                }
+                for i, lookup in enumerate(lookups)
+                if "fake st" in lookup["street"].lower()
+            ]
+            body = json.dumps(candidates).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SmartyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/street-address", requests
+    server.shutdown()
+    server.server_close()
+
+
 def test_parse_smarty_result_success():
     candidate = Candidate({})
     candidate.delivery_line_1 = "123 FAKE ST"
@@ -172,3 +226,64 @@ def test_blank_geocode_inputs():
         geocoded_response = smarty_client.geocode_from_dict({})
     assert "Address must include street number and name at a minimum" in str(e.value)
     assert geocoded_response is None
+
+
+def test_geocode_with_cache():
+    smarty_client = SmartyGeocodeClient(mock.Mock(), mock.Mock(), cache=GeocodeCache())
+    candidate = Candidate({})
+    candidate.delivery_line_1 = "123 FAKE ST"
+    candidate.metadata = Metadata({"latitude": 45.123, "longitude": -70.234})
+    candidate.components = Components({"zipcode": "10001"})
+
+    def fill_in_result(lookup):
+        if lookup.street.upper().startswith("123"):
+            lookup.result = [candidate]
+
+    smarty_client.client.send_lookup = mock.Mock(side_effect=fill_in_result)
+
+    # Lookups are only sent to Smarty once, whatever their case
+    geocoded_response = smarty_client.geocode_from_str("123 FAKE ST New York NY")
+    assert geocoded_response.lat == 45.123
+    assert smarty_client.geocode_from_str("123 Fake St  New York NY") == (
+        geocoded_response
+    )
+    assert smarty_client.geocode_from_str("456 NOWHERE RD") is None
+    assert smarty_client.geocode_from_str("456 NOWHERE RD") is None
+    assert smarty_client.client.send_lookup.call_count == 2
+
+    # Lookups of the same street with other fields are sent separately
+    assert smarty_client.geocode_from_dict({"street": "123 FAKE ST New York NY"})
+    assert smarty_client.client.send_lookup.call_count == 3
+
+
+def test_geocode_batch(smarty_server):
+    base_url, requests = smarty_server
+    smarty_client = SmartyGeocodeClient(
+        "test_id", "test_token", cache=GeocodeCache(), base_url=base_url
+    )
+    addresses = [f"{i} Fake St New York NY" for i in range(150)]
+    addresses += ["1 Nowhere Rd", {"street": "0 Fake St", "city": "New York"}]
+    addresses.append("0 FAKE ST  New York NY")
+
+    results = smarty_client.geocode_batch(addresses)
+    assert [result.line for result in results[:3]] == [
+        ["0 FAKE ST NEW YORK NY"],
+        ["1 FAKE ST NEW YORK NY"],
+        ["2 FAKE ST NEW YORK NY"],
+    ]
+    assert results[150] is None
+    assert results[151].line == ["0 FAKE ST"]
+    assert results[152] == results[0]
+
+    # Distinct lookups are sent once, in batches of up to 100
+    assert [len(request) for request in requests] == [100, 52]
+
+    # Results are cached
+    assert smarty_client.geocode_batch(addresses[:1]) == results[:1]
+    assert smarty_client.geocode_from_str("1 Nowhere Rd") is None
+    assert len(requests) == 2
+    assert smarty_client.geocode_from_str("151 Fake St New York NY").lat == 45.123
+    assert requests[-1] == ["151 Fake St New York NY"]
+
+    with pytest.raises(ValueError):
+        smarty_client.geocode_batch(["1 Fake St", ""])
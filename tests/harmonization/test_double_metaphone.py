@@ -1,4 +1,6 @@
 from phdi.harmonization import DoubleMetaphone
+from phdi.harmonization.double_metaphone import ENCODING_CACHE_SIZE
+from phdi.harmonization.double_metaphone import normalize_word
 
 
 def test_single_result():
@@ -296,3 +298,55 @@ def test_th_words():
     assert result == ["TMS", ""]
     result = dmeta("Thames")
     assert result == ["TMS", ""]
+
+
+def test_normalize_word():
+    assert normalize_word("McDonald") == "MCDONALD"
+    assert normalize_word("José Müller") == "JOSE MULLER"
+    assert normalize_word("Çelik") == "SELIK"
+    assert normalize_word(b"Jos\xc3\xa9") == "JOSE"
+
+
+def test_encode_matches_parse():
+    dmeta = DoubleMetaphone()
+    for name in ["Jose", "José", "richard", "Çelik", "Wagner", "", b"Jos\xc3\xa9"]:
+        assert dmeta.encode(name) == DoubleMetaphone().parse(name)
+
+
+def test_encodings_are_cached():
+    DoubleMetaphone.clear_cache()
+    dmeta = DoubleMetaphone()
+
+    assert dmeta("richard") == ["RXRT", "RKRT"]
+    # Strings with the same normalized form share a cached encoding
+    assert DoubleMetaphone()("RICHARD") == ["RXRT", "RKRT"]
+    assert DoubleMetaphone.cache_stats() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "size": 1,
+        "max_size": ENCODING_CACHE_SIZE,
+    }
+
+    # Callers can't change cached encodings
+    dmeta("richard").append("RXRT")
+    assert dmeta("richard") == ["RXRT", "RKRT"]
+
+    DoubleMetaphone.clear_cache()
+    assert DoubleMetaphone.cache_stats()["hit_rate"] is None
+
+
+def test_encode_many():
+    DoubleMetaphone.clear_cache()
+    dmeta = DoubleMetaphone()
+
+    assert dmeta.encode_many(["Jose", "richard", "Jose", "José"]) == [
+        ["HS", ""],
+        ["RXRT", "RKRT"],
+        ["HS", ""],
+        ["HS", ""],
+    ]
+    # Each distinct string is only looked up once
+    assert DoubleMetaphone.cache_stats()["hits"] == 1
+    assert DoubleMetaphone.cache_stats()["misses"] == 2
+    assert dmeta.encode_many(iter([])) == []
@@ -9,12 +9,14 @@ from phdi.harmonization import double_metaphone_string
 from phdi.harmonization import DoubleMetaphone
 from phdi.harmonization import normalize_hl7_datetime
 from phdi.harmonization import normalize_hl7_datetime_segment
+from phdi.harmonization import standardization
 from phdi.harmonization import standardize_birth_date
 from phdi.harmonization import standardize_country_code
 from phdi.harmonization import standardize_hl7_datetimes
 from phdi.harmonization import standardize_name
 from phdi.harmonization import standardize_phone
 from phdi.harmonization.utils import compare_strings
+from phdi.harmonization.utils import compare_strings_pairwise
 
 
 def test_double_metaphone_string():
@@ -374,6 +376,56 @@ def test_standardize_name():
         "PAUL BUNYAN",
         "JRRTOLKIE87N 999",
     ]
+    # Non-ASCII letters are kept, non-ASCII punctuation and numbers are not
+    assert (
+        standardize_name(" José Núñez-Ortíz² «Jr.» ", remove_numbers=True)
+        == "JOSÉ NÚÑEZORTÍZ JR"
+    )
+    assert (
+        standardize_name("Nguyễn Văn 3", case="title", remove_numbers=False)
+        == "Nguyễn Văn 3"
+    )
+
+
+def test_standardize_name_matches_character_cleaning():
+    # Every ASCII character is cleaned as if it were checked individually
+    ascii_text = "".join(chr(code) for code in range(128))
+    for remove_numbers in [False, True]:
+        expected = "".join(
+            [
+                ltr
+                for ltr in ascii_text
+                if (ltr.isalnum() or ltr == " ")
+                and not (remove_numbers and ltr.isnumeric())
+            ]
+        )
+        assert (
+            standardize_name(
+                ascii_text, trim=False, case="upper", remove_numbers=remove_numbers
+            )
+            == expected.upper()
+        )
+
+
+def test_standardize_name_and_phone_are_memoized():
+    standardization._standardize_name.cache_clear()
+    standardization._standardize_phone.cache_clear()
+
+    assert standardize_name(["Paul Bunyan", "Paul Bunyan"]) == [
+        "PAUL BUNYAN",
+        "PAUL BUNYAN",
+    ]
+    # The same name with different options is standardized separately
+    assert standardize_name("Paul Bunyan", case="lower") == "paul bunyan"
+    name_cache = standardization._standardize_name.cache_info()
+    assert (name_cache.hits, name_cache.misses) == (1, 2)
+
+    assert standardize_phone(["555-654-1234", "555-654-1234"]) == [
+        "+15556541234",
+        "+15556541234",
+    ]
+    phone_cache = standardization._standardize_phone.cache_info()
+    assert (phone_cache.hits, phone_cache.misses) == (1, 1)
 
 
 def test_compare_strings():
@@ -417,6 +469,23 @@ def test_compare_strings():
     )
 
 
+def test_compare_strings_pairwise():
+    strings1 = ["Jose", "Jsoe", "", None]
+    strings2 = ["Jose", "abcd", "", None, "Josie"]
+
+    for similarity_measure in ["JaroWinkler", "Levenshtein", "DamerauLevenshtein"]:
+        scores = compare_strings_pairwise(strings1, strings2, similarity_measure)
+        assert scores.shape == (4, 5)
+        for i, string1 in enumerate(strings1):
+            for j, string2 in enumerate(strings2):
+                assert scores[i, j] == pytest.approx(
+                    compare_strings(string1, string2, similarity_measure)
+                )
+
+    assert compare_strings_pairwise([], strings2).shape == (0, 5)
+    assert compare_strings_pairwise(strings1, strings2, "Hamming") is None
+
+
 def test_standardize_birth_date_success():
     # Working examples of "real" birth dates
     assert standardize_birth_date("1977-11-21") == "1977-11-21"
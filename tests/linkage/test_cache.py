@@ -0,0 +1,126 @@
+import pytest
+
+from phdi.linkage import BlockCache
+from phdi.linkage.cache import blocking_criteria_to_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_blocking_criteria_to_key():
+    criteria = {
+        "zip": {"value": "90210", "transformation": "first4"},
+        "birthdate": {"value": "1983-02-01"},
+    }
+    reordered = {
+        "birthdate": {"value": "1983-02-01"},
+        "zip": {"value": "90210", "transformation": "first4"},
+    }
+    key = blocking_criteria_to_key(criteria)
+    assert key == (("birthdate", "1983-02-01", None), ("zip", "90210", "first4"))
+    assert blocking_criteria_to_key(reordered) == key
+    assert blocking_criteria_to_key({}) == ()
+
+
+def test_block_cache_init():
+    with pytest.raises(ValueError):
+        BlockCache(max_size=0)
+    with pytest.raises(ValueError):
+        BlockCache(ttl=-1)
+    cache = BlockCache(ttl=None)
+    assert len(cache) == 0
+    assert cache.stats() == {
+        "hits": 0,
+        "misses": 0,
+        "hit_rate": None,
+        "evictions": 0,
+        "expirations": 0,
+        "invalidations": 0,
+        "size": 0,
+        "max_size": 1024,
+    }
+
+
+def test_block_cache_get_and_put():
+    cache = BlockCache(max_size=2)
+    block = [["patient_id", "dob"], ["1", "1983-02-01"]]
+    criteria = {"birthdate": {"value": "1983-02-01"}}
+    assert cache.get(criteria) is None
+
+    cache.put(criteria, block)
+    cached = cache.get(criteria)
+    assert cached == block
+    # Callers can't change the cached block
+    cached.append(["2", "1983-02-01"])
+    assert cache.get(criteria) == block
+
+    # The least recently used block is evicted when the cache is full
+    cache.put({"zip": {"value": "90210"}}, [["patient_id"]])
+    cache.get(criteria)
+    cache.put({"sex": {"value": "female"}}, [["patient_id"]])
+    assert len(cache) == 2
+    assert cache.get({"zip": {"value": "90210"}}) is None
+    assert cache.get(criteria) == block
+
+    stats = cache.stats()
+    assert stats["hits"] == 4
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == 4 / 6
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+    cache.reset_stats()
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["size"] == 2
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["invalidations"] == 0
+
+
+def test_block_cache_ttl():
+    clock = FakeClock()
+    cache = BlockCache(ttl=10, clock=clock)
+    criteria = {"birthdate": {"value": "1983-02-01"}}
+    cache.put(criteria, [["patient_id"]])
+    clock.now = 9.9
+    assert cache.get(criteria) == [["patient_id"]]
+    clock.now = 10
+    assert cache.get(criteria) is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+    # Blocks never expire without a time to live
+    cache = BlockCache(ttl=None, clock=clock)
+    cache.put(criteria, [["patient_id"]])
+    clock.now = 1e9
+    assert cache.get(criteria) == [["patient_id"]]
+
+
+def test_block_cache_invalidate():
+    cache = BlockCache()
+    birthdate = {"birthdate": {"value": "1983-02-01"}}
+    zip_code = {"zip": {"value": "90210", "transformation": "first4"}}
+    cache.put(birthdate, [["patient_id"]])
+    cache.put(zip_code, [["patient_id"]])
+
+    generation = cache.generation
+    removed = cache.invalidate(lambda key: key[0][0] == "zip")
+    assert removed == 1
+    assert cache.get(zip_code) is None
+    assert cache.get(birthdate) == [["patient_id"]]
+    assert cache.generation == generation + 1
+
+    # Blocks fetched before an invalidation aren't cached
+    cache.put(zip_code, [["patient_id"]], generation=generation)
+    assert cache.get(zip_code) is None
+    cache.put(zip_code, [["patient_id"]], generation=cache.generation)
+    assert cache.get(zip_code) == [["patient_id"]]
+
+    assert cache.invalidate() == 2
+    assert len(cache) == 0
+    assert cache.stats()["invalidations"] == 3
@@ -1,9 +1,15 @@
 import datetime
 import os
 import pathlib
+import uuid
+from unittest import mock
 
+from sqlalchemy import Column
 from sqlalchemy import Engine
+from sqlalchemy import Integer
+from sqlalchemy import MetaData
 from sqlalchemy import select
+from sqlalchemy import String
 from sqlalchemy import Table
 from sqlalchemy import text
 
@@ -41,6 +47,7 @@ def _init_db() -> DataAccessLayer:
 
 def _clean_up(dal):
     with dal.engine.connect() as pg_connection:
+        pg_connection.execute(text("""DROP TABLE IF EXISTS patient_blocking;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS external_person CASCADE;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS external_source CASCADE;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS address CASCADE;"""))
@@ -186,6 +193,49 @@ def test_bulk_insert_dict():
     _clean_up(dal)
 
 
+def test_bulk_insert_dict_multiple_tables():
+    dal = _init_db()
+    person_id = "028b16d9-3055-40a8-a87f-f2bcf8c21a56"
+    patients = [
+        {"person_id": person_id, "dob": "1977-11-11", "sex": "male"},
+        {"person_id": person_id, "dob": "1985-11-11"},
+        {"person_id": person_id, "dob": "1988-01-01", "sex": "female"},
+    ]
+    results = dal.bulk_insert_dict(
+        {"person": [{"person_id": person_id}], "patient": patients, "address": []},
+        True,
+    )
+    assert [str(pk) for pk in results["person"]["primary_keys"]] == [person_id]
+    assert results["address"] == {"primary_keys": []}
+
+    # Records setting different columns are inserted separately, but their
+    # primary keys still come back in the order the records were given
+    patient_ids = results["patient"]["primary_keys"]
+    assert len(set(patient_ids)) == 3
+    rows = dal.select_results(select(dal.PATIENT_TABLE), include_col_header=False)
+    dob_by_id = {row[0]: row[2] for row in rows}
+    assert [dob_by_id[patient_id] for patient_id in patient_ids] == [
+        datetime.date(1977, 11, 11),
+        datetime.date(1985, 11, 11),
+        datetime.date(1988, 1, 1),
+    ]
+
+    # Nothing is inserted if any record can't be
+    try:
+        dal.bulk_insert_dict(
+            {
+                "person": [{"person_id": "9f6b5b4e-2d1c-4a2b-8f4a-3b0d6e7c8a91"}],
+                "patient": [{"MY ADDR": "BLAH"}],
+            }
+        )
+        assert False
+    except ValueError as error:
+        assert "MY ADDR" in str(error)
+    assert len(dal.select_results(select(dal.PERSON_TABLE))) == 2
+
+    _clean_up(dal)
+
+
 def test_get_table_by_name():
     dal = _init_db()
     table = dal.get_table_by_name("patient")
@@ -355,3 +405,58 @@ def test_bulk_insert_list():
     assert len(pk_list2) == 0
 
     _clean_up(dal)
+
+
+def test_bulk_insert_list_primary_keys_match_records():
+    dal = _init_db()
+    patient_id = uuid.uuid4()
+    pat_data = [
+        {"dob": f"19{i:02d}-01-01", "sex": f"sex {i}", "race": "UNK"} for i in range(20)
+    ]
+    # Records setting other columns, or their own key, are inserted separately
+    pat_data[3] = {"dob": "1903-01-01", "sex": "sex 3"}
+    pat_data[8] = {"patient_id": patient_id, "dob": "1908-01-01", "sex": "sex 8"}
+
+    with mock.patch("phdi.linkage.dal.INSERT_BATCH_SIZE", 6):
+        pk_list = dal.bulk_insert_list(dal.PATIENT_TABLE, pat_data, True)
+
+    # Every record gets its own key, and each key is for the row made from it
+    assert len(set(pk_list)) == len(pat_data)
+    assert pk_list[8] == patient_id
+    results = dal.select_results(
+        select(
+            dal.PATIENT_TABLE.c.patient_id,
+            dal.PATIENT_TABLE.c.dob,
+            dal.PATIENT_TABLE.c.sex,
+        ),
+        include_col_header=False,
+    )
+    rows_by_key = {row[0]: row for row in results}
+    for primary_key, record in zip(pk_list, pat_data):
+        _, dob, sex = rows_by_key[primary_key]
+        assert str(dob) == record["dob"]
+        assert sex == record["sex"]
+
+    _clean_up(dal)
+
+
+def test_bulk_insert_list_integer_primary_keys_match_records():
+    dal = _init_db()
+    serial_table = Table(
+        "serial_test",
+        MetaData(),
+        Column("serial_id", Integer, primary_key=True, autoincrement=True),
+        Column("name", String(32)),
+    )
+    serial_table.create(dal.engine)
+    try:
+        records = [{"name": f"name {i}"} for i in range(20)]
+        with mock.patch("phdi.linkage.dal.INSERT_BATCH_SIZE", 6):
+            pk_list = dal.bulk_insert_list(serial_table, records, True)
+
+        results = dal.select_results(select(serial_table), include_col_header=False)
+        names_by_key = {row[0]: row[1] for row in results}
+        assert [names_by_key[pk] for pk in pk_list] == [r["name"] for r in records]
+    finally:
+        serial_table.drop(dal.engine)
+        _clean_up(dal)
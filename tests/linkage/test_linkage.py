@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import json
 import os
@@ -9,16 +10,20 @@ from json.decoder import JSONDecodeError
 from math import log
 from random import seed
 
+import numpy as np
 import pandas as pd
 import pytest
 from sqlalchemy import select
 from sqlalchemy import text
 
 from phdi.linkage import add_person_resource
+from phdi.linkage import AsyncDIBBsMPIConnectorClient
+from phdi.linkage import calculate_em_probs
 from phdi.linkage import calculate_log_odds
 from phdi.linkage import calculate_m_probs
 from phdi.linkage import calculate_u_probs
 from phdi.linkage import compile_match_lists
+from phdi.linkage import CompiledLinkagePlan
 from phdi.linkage import DIBBS_BASIC
 from phdi.linkage import DIBBS_ENHANCED
 from phdi.linkage import eval_log_odds_cutoff
@@ -31,6 +36,9 @@ from phdi.linkage import feature_match_log_odds_exact
 from phdi.linkage import feature_match_log_odds_fuzzy_compare
 from phdi.linkage import generate_hash_str
 from phdi.linkage import link_record_against_mpi
+from phdi.linkage import link_record_against_mpi_async
+from phdi.linkage import link_records_against_mpi
+from phdi.linkage import LINKAGE_TIMER
 from phdi.linkage import load_json_probs
 from phdi.linkage import match_within_block
 from phdi.linkage import perform_linkage_pass
@@ -40,6 +48,8 @@ from phdi.linkage import write_linkage_config
 from phdi.linkage.dal import DataAccessLayer
 from phdi.linkage.link import _compare_address_elements
 from phdi.linkage.link import _compare_name_elements
+from phdi.linkage.link import _compare_record_to_block
+from phdi.linkage.link import _compare_records
 from phdi.linkage.link import _condense_extract_address_from_resource
 from phdi.linkage.link import _convert_given_name_to_first_name
 from phdi.linkage.link import _flatten_patient_resource
@@ -87,6 +97,7 @@ def _init_db() -> DataAccessLayer:
 
 def _clean_up(dal):
     with dal.engine.connect() as pg_connection:
+        pg_connection.execute(text("""DROP TABLE IF EXISTS patient_blocking;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS external_person CASCADE;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS external_source CASCADE;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS address CASCADE;"""))
@@ -322,6 +333,211 @@ def test_match_within_block():
     assert match_pairs == [(5, 6), (5, 8), (6, 8)]
 
 
+def test_match_within_block_custom_funcs():
+    # Custom feature functions are compared one pair at a time, and should
+    # find exactly the same matches as the vectorized built-in functions
+    data = [
+        [1, "John", "Shepard", "11-7-2153", "90909"],
+        [5, "Jhon", "Sheperd", "11-7-2153", "90909"],
+        [11, "Jon", "Shepherd", "11-7-2153", "90909"],
+        [14, "Jane", "Smith", "01-10-1986", "12345"],
+        [18, "Daphne", "Walker", "12-12-1992", "23456"],
+        [23, "Alejandro", "Villanueve", "1-1-1980", "15935"],
+        [24, "Alejandro", "Villanueva", "1-1-1980", "15935"],
+        [27, "Philip", "", "2-2-1990", "64873"],
+        [31, "Alejandr", "Villanueve", "1-1-1980", "15935"],
+        [32, "", None, "2-2-1990", "64873"],
+    ]
+    col_to_idx = {"first_name": 1, "last_name": 2, "birthdate": 3, "zip": 4}
+    log_odds = {"first_name": 4.0, "last_name": 6.5, "birthdate": 9.8, "zip": 3.7}
+
+    def as_custom(funcs):
+        return {
+            col: (lambda func: lambda *args, **kwargs: func(*args, **kwargs))(func)
+            for col, func in funcs.items()
+        }
+
+    for funcs, eval_rule, kwargs in [
+        (
+            {
+                "first_name": feature_match_fuzzy_string,
+                "last_name": feature_match_fuzzy_string,
+                "birthdate": feature_match_exact,
+                "zip": feature_match_four_char,
+            },
+            eval_perfect_match,
+            {"similarity_measure": "Levenshtein", "threshold": 0.8},
+        ),
+        (
+            {
+                "first_name": feature_match_log_odds_fuzzy_compare,
+                "last_name": feature_match_log_odds_fuzzy_compare,
+                "birthdate": feature_match_log_odds_exact,
+                "zip": feature_match_log_odds_exact,
+            },
+            eval_log_odds_cutoff,
+            {"log_odds": log_odds, "true_match_threshold": 20.0},
+        ),
+    ]:
+        vectorized = match_within_block(data, funcs, col_to_idx, eval_rule, **kwargs)
+        pairwise = match_within_block(
+            data, as_custom(funcs), col_to_idx, eval_rule, **kwargs
+        )
+        assert len(vectorized) > 0
+        assert vectorized == pairwise
+
+    funcs = {
+        "first_name": feature_match_fuzzy_string,
+        "last_name": feature_match_fuzzy_string,
+        "birthdate": feature_match_exact,
+    }
+    for cluster_ratio in [0.5, 0.75, 1.0]:
+        assert _match_within_block_cluster_ratio(
+            data, cluster_ratio, funcs, col_to_idx, eval_perfect_match
+        ) == _match_within_block_cluster_ratio(
+            data, cluster_ratio, as_custom(funcs), col_to_idx, eval_perfect_match
+        )
+
+
+def test_compare_record_to_block():
+    # Format is patient_id, person_id, then the MPI's columns
+    col_to_idx = {
+        "birthdate": 0,
+        "sex": 1,
+        "last_name": 2,
+        "first_name": 3,
+        "address": 4,
+    }
+    record = [
+        "new-patient",
+        None,
+        "1980-01-01",
+        "female",
+        "Smith",
+        ["Jane", "Q"],
+        ["10 Main Street", "PO Box 1"],
+    ]
+    mpi_patients = [
+        ["p1", "a", date(1980, 1, 1), "female", "Smith", "Jane Q", "10 Main St"],
+        ["p2", "a", "1980-01-01", "female", "Smith", "Jane", "PO Box 1"],
+        ["p3", "b", "1980-01-01", "male", "Smith", "Jane Q", "10 Main Street"],
+        ["p4", "c", None, "female", "Smyth", "Janet", "99 Elm Road"],
+    ]
+    funcs = {
+        "first_name": feature_match_fuzzy_string,
+        "last_name": feature_match_exact,
+        "birthdate": feature_match_fuzzy_string,
+        "address": feature_match_fuzzy_string,
+    }
+    expected = [
+        _compare_records(
+            record, mpi_patient, funcs, col_to_idx, eval_perfect_match, threshold=0.9
+        )
+        for mpi_patient in mpi_patients
+    ]
+    assert expected == [True, True, True, False]
+    assert (
+        _compare_record_to_block(
+            record, mpi_patients, funcs, col_to_idx, eval_perfect_match, threshold=0.9
+        )
+        == expected
+    )
+
+
+def test_compiled_linkage_plan():
+    original = copy.deepcopy(DIBBS_BASIC)
+    plan = CompiledLinkagePlan(DIBBS_BASIC)
+
+    # Compiling binds names to callables without touching the config itself
+    assert DIBBS_BASIC == original
+    assert len(plan.passes) == len(DIBBS_BASIC)
+    for linkage_pass, config_pass in zip(plan.passes, DIBBS_BASIC):
+        assert linkage_pass.blocks == config_pass["blocks"]
+        assert linkage_pass.matching_rule == eval_perfect_match
+        assert linkage_pass.funcs == {
+            col: feature_match_fuzzy_string for col in config_pass["funcs"]
+        }
+        assert linkage_pass.cluster_ratio == config_pass["cluster_ratio"]
+        assert linkage_pass.kwargs == config_pass.get("kwargs", {})
+
+    header = [
+        "patient_id",
+        "person_id",
+        "birthdate",
+        "sex",
+        "mrn",
+        "last_name",
+        "first_name",
+        "address",
+        "zip",
+        "city",
+        "state",
+    ]
+    linkage_pass = plan.passes[0]
+    col_to_idx = linkage_pass.col_to_idx(header)
+    assert col_to_idx == {col: idx for idx, col in enumerate(header[2:])}
+    assert linkage_pass.col_to_idx(list(header)) is col_to_idx
+    comparators = linkage_pass.field_comparators(header)
+    assert len(comparators) == len(linkage_pass.funcs)
+    assert linkage_pass.field_comparators(header) is comparators
+
+    # Per-field comparators give the same results as comparing whole records
+    record = ["new-patient", None, "1980-01-01", ["Jane", "Q"], ["1 Main", "2 Elm"]]
+    mpi_patients = [
+        ["p1", "a", "1980-01-01", "Jane Q", "2 Elm"],
+        ["p2", "a", "1980-01-01", "John", "1 Main"],
+    ]
+    funcs = {
+        "first_name": feature_match_fuzzy_string,
+        "address": lambda *args, **kwargs: feature_match_exact(*args, **kwargs),
+    }
+    linkage_pass = CompiledLinkagePlan(
+        [
+            {
+                "funcs": funcs,
+                "blocks": [],
+                "matching_rule": eval_perfect_match,
+                "cluster_ratio": 0.9,
+            }
+        ]
+    ).passes[0]
+    header = ["patient_id", "person_id", "birthdate", "first_name", "address"]
+    col_to_idx = linkage_pass.col_to_idx(header)
+    expected = [
+        _compare_records(record, mpi_patient, funcs, col_to_idx, eval_perfect_match)
+        for mpi_patient in mpi_patients
+    ]
+    assert expected == [True, False]
+    assert (
+        _compare_record_to_block(
+            record,
+            mpi_patients,
+            funcs,
+            col_to_idx,
+            eval_perfect_match,
+            field_comparators=linkage_pass.field_comparators(header),
+        )
+        == expected
+    )
+
+    plan = CompiledLinkagePlan.from_config_file(
+        pathlib.Path(__file__).parent.parent
+        / "assets"
+        / "linkage"
+        / "dibbs_basic_algorithm.json"
+    )
+    assert [p.blocks for p in plan.passes] == [
+        p["blocks"]
+        for p in read_linkage_config(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "linkage"
+            / "dibbs_basic_algorithm.json"
+        )
+    ]
+    assert plan.passes[0].funcs[1] == feature_match_fuzzy_string
+
+
 def test_compile_match_lists():
     data = generate_list_patients_contact()
     data = pd.DataFrame(
@@ -432,6 +648,53 @@ def test_perform_linkage_pass():
     }
 
 
+def test_perform_linkage_pass_in_parallel():
+    data = pd.DataFrame(
+        [
+            ["John", "Shepard", "90909", 1],
+            ["Jhon", "Sheperd", "90909", 5],
+            ["Johnathan", "Shepard", "90909", 12],
+            ["Jane", "Smith", "12345", 14],
+            ["Alejandro", "Villanueve", "15935", 23],
+            ["Alejandro", "Villanueva", "15935", 24],
+            ["Alejandr", "Villanueve", "15935", 31],
+            ["Philip", "", "64873", 27],
+        ],
+        columns=["FIRST", "LAST", "ZIP", "ID"],
+    )
+    funcs = {"FIRST": feature_match_four_char, "LAST": feature_match_four_char}
+
+    # Matches are the same however the blocks are sharded across processes
+    for cluster_ratio in [None, 0.75]:
+        matches = perform_linkage_pass(
+            data, ["ZIP"], funcs, eval_perfect_match, cluster_ratio
+        )
+        for shard_size in [1, 3, 100]:
+            parallel_matches = perform_linkage_pass(
+                data,
+                ["ZIP"],
+                funcs,
+                eval_perfect_match,
+                cluster_ratio,
+                n_workers=2,
+                shard_size=shard_size,
+            )
+            assert parallel_matches == matches
+            assert list(parallel_matches) == list(matches)
+    assert compile_match_lists([parallel_matches], True) == {
+        1: {12},
+        5: set(),
+        14: set(),
+        23: {24, 31},
+        27: set(),
+    }
+
+    with pytest.raises(ValueError):
+        perform_linkage_pass(data, ["ZIP"], funcs, eval_perfect_match, n_workers=0)
+    with pytest.raises(ValueError):
+        perform_linkage_pass(data, ["ZIP"], funcs, eval_perfect_match, shard_size=0)
+
+
 def test_score_linkage_vs_truth():
     num_records = 12
     matches = {
@@ -548,6 +811,57 @@ def test_read_write_u_probs():
     os.remove("./u.json")
 
 
+def test_calculate_em_probs():
+    # Each person has up to three records, in which names are sometimes
+    # misspelled and everything else is recorded the same way
+    rng = np.random.default_rng(0)
+    records = []
+    for person in range(2000):
+        first = "".join(rng.choice(list("abcdefghij"), 6))
+        last = "".join(rng.choice(list("abcdefghij"), 6))
+        birthdate = f"19{rng.integers(30, 99)}-{rng.integers(1, 12):02}-01"
+        zip_code = str(rng.integers(10000, 10200))
+        for _ in range(rng.integers(1, 4)):
+            misspelled_first = first[:-1] + "z" if rng.random() < 0.5 else first
+            records.append([misspelled_first, last, birthdate, zip_code])
+    data = pd.DataFrame(records, columns=["FIRST", "LAST", "BIRTHDATE", "ZIP"])
+
+    for path in ["m.json", "u.json"]:
+        if os.path.isfile(path):
+            os.remove(path)
+    m_probs, u_probs = calculate_em_probs(
+        data,
+        blocking_passes=[["ZIP"], ["BIRTHDATE"]],
+        seed=0,
+        m_file_to_write="m.json",
+        u_file_to_write="u.json",
+    )
+    assert m_probs["FIRST"] == pytest.approx(0.5, abs=0.05)
+    for col in ["LAST", "BIRTHDATE", "ZIP"]:
+        assert m_probs[col] > 0.95
+        assert u_probs[col] < 0.01
+    assert load_json_probs("m.json") == m_probs
+    assert load_json_probs("u.json") == u_probs
+    log_odds = calculate_log_odds(m_probs, u_probs)
+    assert all(score > 0 for score in log_odds.values())
+
+    # Sampling is reproducible
+    assert calculate_em_probs(data, ["FIRST", "ZIP"], [["LAST"]], seed=0) == (
+        calculate_em_probs(data, ["FIRST", "ZIP"], [["LAST"]], seed=0)
+    )
+
+    with pytest.raises(ValueError) as e:
+        calculate_em_probs(data, blocking_passes=[["ZIP"], ["ZIP", "LAST"]])
+    assert "columns used in every blocking pass: ['ZIP']" in str(e.value)
+    with pytest.raises(ValueError):
+        calculate_em_probs(data[:1])
+    with pytest.raises(ValueError):
+        calculate_em_probs(data.drop_duplicates("ZIP"), blocking_passes=[["ZIP"]])
+
+    os.remove("m.json")
+    os.remove("u.json")
+
+
 def test_read_write_log_odds():
     if os.path.isfile("./log_odds.json"):
         os.remove("./log_odds.json")
@@ -1027,6 +1341,139 @@ def test_link_record_against_mpi_enhanced_algo():
     _clean_up(MPI.dal)
 
 
+def test_link_record_against_mpi_async():
+    pytest.importorskip("asyncpg")
+    algorithm = CompiledLinkagePlan(DIBBS_BASIC)
+    MPI = _init_db()
+    patients = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "linkage"
+            / "patient_bundle_to_link_with_mpi.json"
+        )
+    )
+    patients = [
+        p["resource"]
+        for p in patients["entry"]
+        if p.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+
+    async def link_patients():
+        async_MPI = AsyncDIBBsMPIConnectorClient()
+        try:
+            results = []
+            for patient in patients:
+                results.append(
+                    await link_record_against_mpi_async(
+                        patient, algorithm, "EXT-1", mpi_client=async_MPI
+                    )
+                )
+            return results
+        finally:
+            await async_MPI.dispose()
+
+    # Linking asynchronously gives the same results as linking synchronously
+    LINKAGE_TIMER.enable()
+    try:
+        results = asyncio.run(link_patients())
+        timings = LINKAGE_TIMER.summary()
+    finally:
+        LINKAGE_TIMER.disable()
+        LINKAGE_TIMER.reset()
+    assert timings["block_fetch"]["count"] == len(patients) * len(DIBBS_BASIC)
+    assert timings["insert"]["count"] == len(patients)
+    matches = [matched for matched, _ in results]
+    mapped_patients = {}
+    for _, pid in results:
+        mapped_patients[str(pid)] = mapped_patients.get(str(pid), 0) + 1
+
+    assert matches == [False, True, False, True, False, True]
+    assert sorted(list(mapped_patients.values())) == [1, 1, 4]
+
+    patient_records = MPI.dal.select_results(select(MPI.dal.PATIENT_TABLE))
+    person_id_count = {}
+    for patient in patient_records[1:]:
+        person_id_count[str(patient[1])] = person_id_count.get(str(patient[1]), 0) + 1
+    assert person_id_count == mapped_patients
+
+    # Each person is linked to the external ID once
+    external_person_records = MPI.dal.select_results(
+        select(MPI.dal.EXTERNAL_PERSON_TABLE)
+    )
+    assert sorted(str(record[1]) for record in external_person_records[1:]) == (
+        sorted(mapped_patients)
+    )
+
+    _clean_up(MPI.dal)
+
+
+def test_link_records_against_mpi():
+    algorithm = DIBBS_BASIC
+    MPI = _init_db()
+    patients = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "linkage"
+            / "patient_bundle_to_link_with_mpi.json"
+        )
+    )
+    patients = [
+        p.get("resource")
+        for p in patients["entry"]
+        if p.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+
+    # Linking the whole batch at once should give the same results as linking
+    # the records one at a time, since records can link to earlier ones in
+    # the same batch
+    LINKAGE_TIMER.enable()
+    try:
+        results = link_records_against_mpi(patients, algorithm, mpi_client=MPI)
+        timings = LINKAGE_TIMER.summary()
+    finally:
+        LINKAGE_TIMER.disable()
+        LINKAGE_TIMER.reset()
+    assert set(timings) == {"block_fetch", "flatten", "compare", "insert"}
+    assert timings["insert"]["count"] == 1
+    matches = [matched for matched, _ in results]
+    mapped_patients = {}
+    for _, pid in results:
+        mapped_patients[str(pid)] = mapped_patients.get(str(pid), 0) + 1
+
+    assert matches == [False, True, False, True, False, True]
+    assert sorted(list(mapped_patients.values())) == [1, 1, 4]
+
+    # All inserts were committed, and each record is linked to its person
+    patient_records = MPI.dal.select_results(select(MPI.dal.PATIENT_TABLE))
+    assert len(patient_records[1:]) == len(patients)
+    person_id_count = {}
+    for patient in patient_records[1:]:
+        person_id_count[str(patient[1])] = person_id_count.get(str(patient[1]), 0) + 1
+    assert person_id_count == mapped_patients
+    person_records = MPI.dal.select_results(select(MPI.dal.PERSON_TABLE))
+    assert len(person_records[1:]) == 3
+
+    # A second batch links against the records committed by the first, and
+    # a compiled plan can be used in place of the algorithm
+    new_patient = copy.deepcopy(patients[0])
+    new_patient["id"] = str(uuid.uuid4())
+    results = link_records_against_mpi(
+        [new_patient], CompiledLinkagePlan(algorithm), mpi_client=MPI
+    )
+    assert results[0][0]
+    assert str(results[0][1]) == str(
+        [pid for pid, count in mapped_patients.items() if count == 4][0]
+    )
+
+    with pytest.raises(ValueError):
+        link_records_against_mpi(patients, algorithm, ["EXT-1"], mpi_client=MPI)
+    assert link_records_against_mpi([], algorithm, mpi_client=MPI) == []
+
+    _clean_up(MPI.dal)
+
+
 def test_add_person_resource():
     bundle = json.load(
         open(
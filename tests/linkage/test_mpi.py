@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import datetime
 import json
 import os
@@ -10,7 +12,12 @@ from sqlalchemy import Select
 from sqlalchemy import select
 from sqlalchemy import text
 
+from phdi.linkage import BlockCache
+from phdi.linkage import DIBBS_BASIC
+from phdi.linkage import DIBBS_ENHANCED
+from phdi.linkage import extract_blocking_values_from_record
 from phdi.linkage.dal import DataAccessLayer
+from phdi.linkage.mpi import AsyncDIBBsMPIConnectorClient
 from phdi.linkage.mpi import DIBBsMPIConnectorClient
 
 patient_resource = json.load(
@@ -63,6 +70,7 @@ def _init_db() -> DataAccessLayer:
 
 def _clean_up(dal):
     with dal.engine.connect() as pg_connection:
+        pg_connection.execute(text("""DROP TABLE IF EXISTS patient_blocking;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS external_person CASCADE;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS external_source CASCADE;"""))
         pg_connection.execute(text("""DROP TABLE IF EXISTS address CASCADE;"""))
@@ -456,6 +464,326 @@ def test_insert_matched_patient():
     _clean_up(MPI.dal)
 
 
+def test_insert_matched_patients():
+    MPI = _init_db()
+
+    patient_resources = []
+    for _ in range(3):
+        new_patient = copy.deepcopy(patient_resource)
+        new_patient["id"] = str(uuid.uuid4())
+        patient_resources.append(new_patient)
+    person_id = uuid.uuid4()
+    person_ids = [person_id, person_id, uuid.uuid4()]
+    external_person_ids = ["EXT-1233456", "EXT-1233456", None]
+
+    result = MPI.insert_matched_patients(
+        patient_resources, person_ids, external_person_ids
+    )
+    assert result == person_ids
+
+    EXTERNAL_PERSON_rec = MPI.dal.select_results(select(MPI.dal.EXTERNAL_PERSON_TABLE))
+    person_rec = MPI.dal.select_results(select(MPI.dal.PERSON_TABLE))
+    patient_rec = MPI.dal.select_results(select(MPI.dal.PATIENT_TABLE))
+    name_rec = MPI.dal.select_results(select(MPI.dal.NAME_TABLE))
+    given_name_rec = MPI.dal.select_results(select(MPI.dal.GIVEN_NAME_TABLE))
+    address_rec = MPI.dal.select_results(select(MPI.dal.ADDRESS_TABLE))
+    phone_rec = MPI.dal.select_results(select(MPI.dal.PHONE_TABLE))
+    id_rec = MPI.dal.select_results(select(MPI.dal.ID_TABLE))
+
+    assert len(person_rec) == 3
+    assert len(EXTERNAL_PERSON_rec) == 2
+    assert EXTERNAL_PERSON_rec[1][1] == person_id
+    assert EXTERNAL_PERSON_rec[1][2] == "EXT-1233456"
+    assert len(patient_rec) == 4
+    assert len(name_rec) == 4
+    assert len(given_name_rec) == 7
+    assert len(address_rec) == 4
+    assert len(phone_rec) == 4
+    assert len(id_rec) == 4
+
+    # Linking to a person that already exists doesn't create a new person
+    new_patient = copy.deepcopy(patient_resource)
+    new_patient["id"] = str(uuid.uuid4())
+    MPI.insert_matched_patients([new_patient], [person_id])
+    person_rec = MPI.dal.select_results(select(MPI.dal.PERSON_TABLE))
+    patient_rec = MPI.dal.select_results(select(MPI.dal.PATIENT_TABLE))
+    EXTERNAL_PERSON_rec = MPI.dal.select_results(select(MPI.dal.EXTERNAL_PERSON_TABLE))
+    assert len(person_rec) == 3
+    assert len(patient_rec) == 5
+    assert len(EXTERNAL_PERSON_rec) == 2
+
+    assert MPI.insert_matched_patients([], []) == []
+    with pytest.raises(ValueError):
+        MPI.insert_matched_patients(patient_resources, [person_id])
+
+    _clean_up(MPI.dal)
+
+
+def test_blocking_table():
+    MPI = _init_db()
+    patients = [
+        entry["resource"]
+        for entry in json.load(
+            open(
+                pathlib.Path(__file__).parent.parent
+                / "assets"
+                / "linkage"
+                / "patient_bundle_to_link_with_mpi.json"
+            )
+        )["entry"]
+        if entry.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+    patients.append(copy.deepcopy(patient_resource))
+    # A patient with no names or identifiers
+    sparse_patient = copy.deepcopy(patients[0])
+    sparse_patient["id"] = str(uuid.uuid4())
+    del sparse_patient["name"]
+    del sparse_patient["identifier"]
+    patients.append(sparse_patient)
+
+    # The blocking table is maintained by both single and batch inserts
+    person_id = MPI.insert_matched_patient(copy.deepcopy(patients[0]))
+    MPI.insert_matched_patients(
+        copy.deepcopy(patients[1:]),
+        [person_id] + [str(uuid.uuid4()) for _ in patients[2:]],
+    )
+    blocking_MPI = DIBBsMPIConnectorClient(use_blocking_table=True)
+
+    def sorted_block(block):
+        return [block[0]] + sorted(block[1:], key=str)
+
+    # Blocks from the blocking table are the same as from the other tables
+    criteria = [
+        extract_blocking_values_from_record(patient, linkage_pass["blocks"])
+        for patient in patients
+        for linkage_pass in DIBBS_BASIC + DIBBS_ENHANCED
+    ]
+    criteria += [
+        {"birthdate": {"value": patients[0]["birthDate"]}, "MYADDR": {"value": "X"}},
+        {"zip": {"value": "9021", "transformation": "first4"}},
+        {"first_name": {"value": "ohn", "transformation": "last4"}},
+        {"race": {"value": "UNK"}},
+    ]
+    for block_criteria in filter(None, criteria):
+        block = MPI.get_block_data(block_criteria)
+        assert sorted_block(blocking_MPI.get_block_data(block_criteria)) == (
+            sorted_block(block)
+        )
+    assert blocking_MPI._generate_blocking_table_query({"race": {"value": "UNK"}}) is (
+        None
+    )
+    assert len(blocking_MPI.get_block_data(criteria[0])) > 1
+
+    # Rebuilding the table from the other tables gives the same rows
+    blocking_columns = [
+        c for c in MPI.dal.BLOCKING_TABLE.c if c.name != "patient_blocking_id"
+    ]
+    blocking_rows = MPI.dal.select_results(select(*blocking_columns))
+    MPI.refresh_blocking_table()
+    assert sorted_block(MPI.dal.select_results(select(*blocking_columns))) == (
+        sorted_block(blocking_rows)
+    )
+
+    with MPI.dal.engine.connect() as pg_connection:
+        pg_connection.execute(text("""DROP TABLE patient_blocking;"""))
+        pg_connection.commit()
+    with pytest.raises(ValueError):
+        DIBBsMPIConnectorClient(use_blocking_table=True)
+    unblocked_MPI = DIBBsMPIConnectorClient()
+    assert unblocked_MPI.dal.BLOCKING_TABLE is None
+    with pytest.raises(ValueError):
+        unblocked_MPI.refresh_blocking_table()
+
+    _clean_up(MPI.dal)
+
+
+def test_block_cache():
+    MPI = _init_db()
+    patients = [
+        entry["resource"]
+        for entry in json.load(
+            open(
+                pathlib.Path(__file__).parent.parent
+                / "assets"
+                / "linkage"
+                / "patient_bundle_to_link_with_mpi.json"
+            )
+        )["entry"]
+        if entry.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+    MPI.insert_matched_patients(
+        copy.deepcopy(patients[1:]), [str(uuid.uuid4()) for _ in patients[1:]]
+    )
+    block_cache = BlockCache()
+    cached_MPI = DIBBsMPIConnectorClient(block_cache=block_cache)
+    criteria = [
+        extract_blocking_values_from_record(patients[0], linkage_pass["blocks"])
+        for linkage_pass in DIBBS_BASIC
+    ]
+    other_criteria = {"birthdate": {"value": "1900-01-01"}}
+
+    # Cached blocks are the same as those fetched from the MPI
+    for block_criteria in criteria + [other_criteria]:
+        block = cached_MPI.get_block_data(block_criteria)
+        assert block == MPI.get_block_data(block_criteria)
+        assert cached_MPI.get_block_data(block_criteria) == block
+    assert block_cache.stats()["hits"] == len(criteria) + 1
+    assert block_cache.stats()["misses"] == len(criteria) + 1
+
+    # Inserting a patient invalidates only the blocks it belongs in
+    cached_MPI.insert_matched_patient(copy.deepcopy(patients[0]))
+    assert len(block_cache) == 1
+    assert block_cache.get(other_criteria) is not None
+    for block_criteria in criteria:
+        block = cached_MPI.get_block_data(block_criteria)
+        assert block == MPI.get_block_data(block_criteria)
+        assert patients[0]["id"] in [str(row[0]) for row in block[1:]]
+
+    # A new patient in no cached block leaves the cache alone
+    new_patient = copy.deepcopy(patient_resource)
+    new_patient["id"] = str(uuid.uuid4())
+    cached_MPI.insert_matched_patients([new_patient], [str(uuid.uuid4())])
+    assert len(block_cache) == len(criteria) + 1
+    assert block_cache.stats()["invalidations"] == len(criteria)
+
+    # The asynchronous client shares the cache
+    async def use_async_client():
+        async_MPI = AsyncDIBBsMPIConnectorClient(block_cache=block_cache)
+        try:
+            hits = block_cache.stats()["hits"]
+            assert await async_MPI.get_block_data(criteria[0]) == (
+                MPI.get_block_data(criteria[0])
+            )
+            assert block_cache.stats()["hits"] == hits + 1
+            sparse_patient = copy.deepcopy(patients[0])
+            sparse_patient["id"] = str(uuid.uuid4())
+            del sparse_patient["name"]
+            await async_MPI.insert_matched_patient(sparse_patient)
+        finally:
+            await async_MPI.dispose()
+
+    try:
+        pytest.importorskip("asyncpg")
+        asyncio.run(use_async_client())
+        assert block_cache.get(criteria[0]) is None
+    finally:
+        _clean_up(MPI.dal)
+
+
+def test_async_mpi_client():
+    pytest.importorskip("asyncpg")
+    MPI = _init_db()
+    patients = [
+        entry["resource"]
+        for entry in json.load(
+            open(
+                pathlib.Path(__file__).parent.parent
+                / "assets"
+                / "linkage"
+                / "patient_bundle_to_link_with_mpi.json"
+            )
+        )["entry"]
+        if entry.get("resource", {}).get("resourceType", "") == "Patient"
+    ]
+    criteria = [
+        extract_blocking_values_from_record(patient, linkage_pass["blocks"])
+        for patient in patients
+        for linkage_pass in DIBBS_BASIC
+    ]
+    criteria = [block_criteria for block_criteria in criteria if block_criteria]
+    criteria.append(
+        {"birthdate": {"value": patients[0]["birthDate"]}, "sex": {"value": "male"}}
+    )
+
+    async def use_async_clients():
+        async_MPI = AsyncDIBBsMPIConnectorClient()
+        blocking_MPI = AsyncDIBBsMPIConnectorClient(use_blocking_table=True)
+        try:
+            # Dates and coordinates are stored from the resource as they are
+            # by the synchronous client
+            person_id = await async_MPI.insert_matched_patient(
+                copy.deepcopy(patient_resource), external_person_id="EXT-1"
+            )
+            new_person_id = str(uuid.uuid4())
+            person_ids = await async_MPI.insert_matched_patients(
+                copy.deepcopy(patients),
+                [person_id] + [new_person_id] * (len(patients) - 1),
+                ["EXT-1"] + [None] * (len(patients) - 1),
+            )
+            assert person_ids[0] == person_id
+            assert list(async_MPI._external_source_ids) == ["IRIS"]
+
+            # Many blocks can be fetched at once
+            blocks = await asyncio.gather(
+                *[async_MPI.get_block_data(c) for c in criteria]
+            )
+            blocking_table_blocks = await asyncio.gather(
+                *[blocking_MPI.get_block_data(c) for c in criteria]
+            )
+            await blocking_MPI.refresh_blocking_table()
+            return person_id, new_person_id, blocks, blocking_table_blocks
+        finally:
+            await async_MPI.dispose()
+            await blocking_MPI.dispose()
+
+    person_id, new_person_id, blocks, blocking_table_blocks = asyncio.run(
+        use_async_clients()
+    )
+
+    def sorted_block(block):
+        return [block[0]] + sorted(block[1:], key=str)
+
+    # Blocks are the same as those fetched by the synchronous client
+    for block_criteria, block, blocking_table_block in zip(
+        criteria, blocks, blocking_table_blocks
+    ):
+        sync_block = sorted_block(MPI.get_block_data(block_criteria))
+        assert len(sync_block) > 1
+        assert sorted_block(block) == sync_block
+        assert sorted_block(blocking_table_block) == sync_block
+
+    patient_records = MPI.dal.select_results(
+        select(MPI.dal.PATIENT_TABLE.c.person_id, MPI.dal.PATIENT_TABLE.c.dob)
+    )
+    assert len(patient_records) == len(patients) + 2
+    assert [person_id, datetime.date(1983, 2, 1)] in patient_records
+    assert sorted(map(str, {row[0] for row in patient_records[1:]})) == sorted(
+        [str(person_id), new_person_id]
+    )
+    address_records = MPI.dal.select_results(
+        select(MPI.dal.ADDRESS_TABLE.c.latitude).where(
+            MPI.dal.ADDRESS_TABLE.c.latitude.is_not(None)
+        ),
+        include_col_header=False,
+    )
+    assert len(address_records) == 1
+    external_person_records = MPI.dal.select_results(
+        select(
+            MPI.dal.EXTERNAL_PERSON_TABLE.c.person_id,
+            MPI.dal.EXTERNAL_PERSON_TABLE.c.external_person_id,
+        ),
+        include_col_header=False,
+    )
+    assert external_person_records == [[person_id, "EXT-1"]]
+
+    # The blocking table is checked for when the client is first used
+    with MPI.dal.engine.connect() as pg_connection:
+        pg_connection.execute(text("""DROP TABLE patient_blocking;"""))
+        pg_connection.commit()
+
+    async def use_missing_blocking_table():
+        blocking_MPI = AsyncDIBBsMPIConnectorClient(use_blocking_table=True)
+        try:
+            with pytest.raises(ValueError):
+                await blocking_MPI.get_block_data(criteria[0])
+        finally:
+            await blocking_MPI.dispose()
+
+    asyncio.run(use_missing_blocking_table())
+
+    _clean_up(MPI.dal)
+
+
 def test_block_data_with_transform():
     MPI = _init_db()
     data_requested = {
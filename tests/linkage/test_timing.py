@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from phdi.linkage import LINKAGE_TIMER
+from phdi.linkage import StageTimer
+from phdi.linkage.timing import LINKAGE_STAGES
+
+
+def test_stage_timer_disabled():
+    timer = StageTimer()
+    assert not timer.enabled
+
+    # Disabled timers share a single no-op context and record nothing
+    assert timer.time("compare") is timer.time("flatten")
+    with timer.time("compare"):
+        pass
+
+    @timer.timed("insert")
+    def insert(x, y=1):
+        return x + y
+
+    assert insert(1, y=2) == 3
+    assert timer.summary() == {}
+
+
+def test_stage_timer_records_durations():
+    timer = StageTimer(enabled=True, buckets=(0.5, 0.001))
+    assert timer.buckets == (0.001, 0.5)
+
+    with timer.time("compare"):
+        time.sleep(0.002)
+    timer.record("compare", 0.0001)
+    timer.record("compare", 2.0)
+
+    @timer.timed("insert")
+    def insert():
+        raise ValueError("insert failed")
+
+    # Durations are recorded even when the timed code raises
+    with pytest.raises(ValueError):
+        insert()
+    with pytest.raises(ValueError):
+        with timer.time("flatten"):
+            raise ValueError("flatten failed")
+
+    summary = timer.summary()
+    assert set(summary) == {"compare", "insert", "flatten"}
+    compare = summary["compare"]
+    assert compare["count"] == 3
+    assert compare["buckets"] == {"0.001": 1, "0.5": 1, "+Inf": 1}
+    assert compare["min_seconds"] == 0.0001
+    assert compare["max_seconds"] == 2.0
+    assert compare["total_seconds"] > 2.002
+    assert compare["mean_seconds"] == compare["total_seconds"] / 3
+    assert summary["insert"]["count"] == 1
+
+    timer.disable()
+    timer.record("compare", 1.0)
+    assert timer.summary()["compare"]["count"] == 4
+    with timer.time("compare"):
+        pass
+    assert timer.summary()["compare"]["count"] == 4
+
+    timer.reset()
+    assert timer.summary() == {}
+
+
+def test_linkage_timer():
+    assert not LINKAGE_TIMER.enabled
+    assert LINKAGE_STAGES == ("block_fetch", "flatten", "compare", "insert")
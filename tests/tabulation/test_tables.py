@@ -14,12 +14,12 @@ import yaml
 
 from phdi.fhir.tabulation import tabulate_data
 from phdi.tabulation import load_schema
+from phdi.tabulation import SQLWriter
 from phdi.tabulation import validate_schema
 from phdi.tabulation import write_data
 from phdi.tabulation.tables import _convert_list_to_string
-from phdi.tabulation.tables import _create_from_arrays_data
 from phdi.tabulation.tables import _create_pa_schema_from_table_schema
-from phdi.tabulation.tables import _create_parquet_data
+from phdi.tabulation.tables import _create_parquet_table
 
 
 def test_load_schema():
@@ -133,8 +133,7 @@ def test_write_data_csv():
 
 
 @mock.patch("phdi.tabulation.tables.pq.ParquetWriter")
-@mock.patch("phdi.tabulation.tables.pa.Table")
-def test_write_data_parquet(patched_pa_table, patched_writer):
+def test_write_data_parquet(patched_writer):
     schema = yaml.safe_load(
         open(
             pathlib.Path(__file__).parent.parent
@@ -159,6 +158,10 @@ def test_write_data_parquet(patched_pa_table, patched_writer):
     file_location = "./"
     output_file_name = "new_parquet"
     file_format = "parquet"
+    pq_schema = _create_pa_schema_from_table_schema(
+        schema, batch_1[0], "Physical Exams"
+    )
+    patched_writer.return_value.schema = pq_schema
 
     # Batch 1 tests creating a new parquet file and returning a writer
     pq_writer = write_data(
@@ -169,19 +172,11 @@ def test_write_data_parquet(patched_pa_table, patched_writer):
         schema=schema,
         table_name="Physical Exams",
     )
-    assert pq_writer is not None
+    assert pq_writer is patched_writer.return_value
 
-    pq_schema = _create_pa_schema_from_table_schema(
-        schema, batch_1[0], "Physical Exams"
-    )
-    patched_pa_table.from_arrays.assert_called_with(
-        _create_from_arrays_data(batch_1[1:]), schema=pq_schema
-    )
-    table = patched_pa_table.from_arrays(table_to_use[1:], table_to_use[0])
+    table = _create_parquet_table(batch_1, pq_schema)
     patched_writer.assert_called_with(file_location + output_file_name, table.schema)
-    patched_writer(
-        file_location + output_file_name, table.schema
-    ).write_table.assert_called_with(table=table)
+    pq_writer.write_table.assert_called_with(table=table, row_group_size=None)
 
     # Batch 2 tests appending to existing parquet using previous writer
     write_data(
@@ -193,16 +188,59 @@ def test_write_data_parquet(patched_pa_table, patched_writer):
         schema=schema,
         table_name="Physical Exams",
     )
-    patched_pa_table.from_arrays.assert_called_with(
-        _create_from_arrays_data(batch_2[1:]), schema=pq_schema
+    table = _create_parquet_table(batch_2, pq_schema)
+    pq_writer.write_table.assert_called_with(table=table, row_group_size=None)
+
+    # Should NOT create a second writer for batch 2
+    assert patched_writer.call_count == 1
+
+
+def test_write_data_parquet_row_groups_and_dictionary(tmp_path):
+    headers = ["Patient ID", "State"]
+    rows = [[f"patient-{i}", ["MA", "VT", "NH"][i % 3]] for i in range(10)]
+    output_file_name = "row_groups.parquet"
+
+    pq_writer = write_data(
+        [headers] + rows[:7],
+        str(tmp_path),
+        "parquet",
+        output_file_name,
+        row_group_size=3,
+        dictionary_columns=["State"],
+    )
+    write_data(
+        [headers] + rows[7:],
+        str(tmp_path),
+        "parquet",
+        output_file_name,
+        pq_writer=pq_writer,
+        row_group_size=3,
     )
-    table = patched_pa_table.from_arrays(batch_2[1:], batch_2[0])
-    pq_writer.write_table.assert_called_with(table=table)
+    pq_writer.close()
 
-    # One from initial test of creating new pq file, and one
-    # from calling it on a mocked table in this test, line 105;
-    # Should NOT be called a third time with batch 2
-    assert patched_writer.call_count == 2
+    parquet_file = pq.ParquetFile(tmp_path / output_file_name)
+    row_groups = [
+        parquet_file.metadata.row_group(i) for i in range(parquet_file.num_row_groups)
+    ]
+    assert [row_group.num_rows for row_group in row_groups] == [3, 3, 1, 3]
+    for row_group in row_groups:
+        patient_id_encodings = row_group.column(0).encodings
+        state_encodings = row_group.column(1).encodings
+        assert "RLE_DICTIONARY" not in patient_id_encodings
+        assert "RLE_DICTIONARY" in state_encodings
+    assert parquet_file.read().to_pylist() == [
+        {"Patient ID": patient_id, "State": state} for patient_id, state in rows
+    ]
+
+    with pytest.raises(ValueError) as e:
+        write_data(
+            [headers] + rows,
+            str(tmp_path),
+            "parquet",
+            output_file_name,
+            row_group_size=0,
+        )
+    assert "`row_group_size` must be at least 1." in str(e.value)
 
 
 def test_write_data_parquet_with_schema():
@@ -484,9 +522,10 @@ def test_write_data_sql():
     if os.path.isfile(file_location + db_file):  # pragma: no cover
         os.remove(file_location + db_file)
 
-    write_data(
+    sql_writer = write_data(
         batch_1, file_location, file_format, db_file=db_file, db_tablename="PATIENT"
     )
+    sql_writer.close()
 
     # Check that table was created and row was properly inserted
     conn = sql.connect(file_location + db_file)
@@ -504,9 +543,10 @@ def test_write_data_sql():
     ]
     conn.close()
 
-    write_data(
+    sql_writer = write_data(
         batch_2, file_location, file_format, db_file=db_file, db_tablename="PATIENT"
     )
+    sql_writer.close()
 
     # Check that only new rows were added and data was correctly
     # stored (including empty strings)
@@ -529,6 +569,135 @@ def test_write_data_sql():
     os.remove(file_location + db_file)
 
 
+def test_write_data_sql_writer(tmp_path):
+    schema = yaml.safe_load(
+        open(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "tabulation"
+            / "tabulation_schema.yaml"
+        )
+    )
+    extracted_data = json.load(
+        open(
+            pathlib.Path(__file__).parent.parent
+            / "assets"
+            / "general"
+            / "FHIR_server_extracted_data.json"
+        )
+    )
+    extracted_data = extracted_data.get("entry", {})
+    table_to_use = tabulate_data(extracted_data, schema, "Patients")
+    db_file = "new_db.db"
+
+    # Batch 1 creates the table and returns a writer
+    sql_writer = write_data(
+        table_to_use[:2],
+        str(tmp_path),
+        "sql",
+        db_file=db_file,
+        db_tablename="PATIENT",
+        schema=schema,
+        table_name="Patients",
+        index_columns=["Patient ID", "Last Name"],
+    )
+    assert isinstance(sql_writer, SQLWriter)
+
+    # Later batches append over the same connection
+    connection = sql_writer.connection
+    returned_writer = write_data(
+        [table_to_use[0]] + table_to_use[2:],
+        str(tmp_path),
+        "sql",
+        db_file=db_file,
+        db_tablename="PATIENT",
+        sql_writer=sql_writer,
+    )
+    assert returned_writer is sql_writer
+    assert sql_writer.connection is connection
+    sql_writer.close()
+
+    conn = sql.connect(tmp_path / db_file)
+    cursor = conn.cursor()
+    assert cursor.execute("PRAGMA journal_mode;").fetchone() == ("wal",)
+    columns = cursor.execute("PRAGMA table_info(PATIENT);").fetchall()
+    assert [(column[1], column[2]) for column in columns] == [
+        ("Patient ID", "TEXT"),
+        ("First Name", "TEXT"),
+        ("Last Name", "TEXT"),
+        ("Phone Number", "TEXT"),
+        ("Building Number", "REAL"),
+    ]
+    # Missing values are written as nulls and numbers as numbers
+    res = cursor.execute("SELECT * FROM PATIENT").fetchall()
+    assert res == [
+        (
+            "907844f6-7c99-eabc-f68e-d92189729a55",
+            "Kimberley248",
+            "Price929",
+            "555-690-3898",
+            165.0,
+        ),
+        ("65489-asdf5-6d8w2-zz5g8", "John", "Shepard", None, 1234.0),
+        ("some-uuid", "John ", None, "123-456-7890", 123.0),
+    ]
+    # Indexes are built when the writer is closed
+    res = cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name"
+    ).fetchall()
+    assert res == [("idx_PATIENT_Last_Name",), ("idx_PATIENT_Patient_ID",)]
+    conn.close()
+
+    with pytest.raises(ValueError) as e:
+        SQLWriter(
+            str(tmp_path / db_file), "PATIENT", ["Patient ID"], index_columns=["foo"]
+        )
+    assert "Cannot index unknown column `foo`." in str(e.value)
+
+
+def test_write_data_sql_unconvertible_values(tmp_path):
+    schema = {
+        "tables": {
+            "Vitals": {
+                "columns": {
+                    "Patient ID": {"data_type": "string"},
+                    "Weights": {"data_type": "number", "selection_criteria": "all"},
+                    "Height": {"data_type": "number"},
+                    "Deceased": {"data_type": "boolean"},
+                }
+            }
+        }
+    }
+    tabulated_data = [
+        ["Patient ID", "Weights", "Height", "Deceased"],
+        ["1", [1.5, 2.5], "180", True],
+        ["2", [3.5], "", "false"],
+        ["3", None, 170, None],
+    ]
+    sql_writer = write_data(
+        tabulated_data,
+        str(tmp_path),
+        "sql",
+        db_file="vitals.db",
+        db_tablename="VITALS",
+        schema=schema,
+        table_name="Vitals",
+    )
+    sql_writer.close()
+
+    # Values that can't be converted to their column's type are kept as text
+    conn = sql.connect(tmp_path / "vitals.db")
+    res = conn.execute(
+        "SELECT *, typeof(Weights), typeof(Height) FROM VITALS"
+    ).fetchall()
+    conn.close()
+    assert res == [
+        ("1", "1.5,2.5", 180.0, 1, "text", "real"),
+        ("2", 3.5, "", "false", "real", "text"),
+        ("3", None, 170.0, None, "null", "real"),
+    ]
+
+
 def test_validate_schema():
     valid_schema = yaml.safe_load(
         open(
@@ -638,12 +807,7 @@ def test_create_pa_schema_from_table_schema():
     )
 
 
-def test_create_from_arrays_data():
-    result = _create_from_arrays_data([["foo", "bar", "baz"], ["biz", "taz", "laz"]])
-    assert result == [["foo", "biz"], ["bar", "taz"], ["baz", "laz"]]
-
-
-def test_create_parquet_data():
+def test_create_parquet_table():
     schema = yaml.safe_load(
         open(
             pathlib.Path(__file__).parent.parent
@@ -663,10 +827,39 @@ def test_create_parquet_data():
     extracted_data = extracted_data.get("entry", {})
     table_to_use = tabulate_data(extracted_data, schema, "Patients")
     batch_1 = [table_to_use[0]] + table_to_use[3:]
+    original_batch_1 = copy.deepcopy(batch_1)
 
     pq_schema = _create_pa_schema_from_table_schema(schema, table_to_use[0], "Patients")
-    result = _create_parquet_data(batch_1, pq_schema)
-    assert result == [
-        ["Patient ID", "First Name", "Last Name", "Phone Number", "Building Number"],
-        ["some-uuid", "John ", "None", "123-456-7890", 123.0],
+    result = _create_parquet_table(batch_1, pq_schema)
+    assert result.schema == pq_schema
+    assert result.to_pylist() == [
+        {
+            "Patient ID": "some-uuid",
+            "First Name": "John ",
+            "Last Name": "None",
+            "Phone Number": "123-456-7890",
+            "Building Number": 123.0,
+        }
     ]
+
+    # Without a schema, every column is a string and missing values are empty
+    result = _create_parquet_table(batch_1, None)
+    assert result.schema == pa.schema([(name, pa.string()) for name in batch_1[0]])
+    assert result.to_pylist()[0]["Last Name"] == ""
+    assert result.to_pylist()[0]["Building Number"] == "123"
+
+    # Tabulated data isn't modified
+    assert batch_1 == original_batch_1
+
+    # Lists and dictionaries are serialized
+    result = _create_parquet_table(
+        [["Names", "Telecom"], [["John", ["Jacob", 2]], {"system": "phone"}]], None
+    )
+    assert result.to_pylist() == [
+        {"Names": "John,Jacob,2", "Telecom": "{'system': 'phone'}"}
+    ]
+
+    # A page without rows makes an empty table
+    result = _create_parquet_table([table_to_use[0]], pq_schema)
+    assert result.num_rows == 0
+    assert result.schema == pq_schema
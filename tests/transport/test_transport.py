@@ -1,8 +1,14 @@
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 from unittest import mock
 
 import pytest
 from requests import Session
 
+from phdi.transport import close_http_sessions
+from phdi.transport import configure_http_sessions
+from phdi.transport import get_http_session
 from phdi.transport import http_request_with_retry
 
 
@@ -27,6 +33,7 @@ def test_http_request_with_retry_post(mock_retry_strategy, mock_post):
         total=http_retry_count,
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=[http_action],
+        backoff_factor=0,
     )
 
     mock_post.assert_called_with(
@@ -37,6 +44,23 @@ def test_http_request_with_retry_post(mock_retry_strategy, mock_post):
 
     assert response == return_value
 
+    # Files are posted as a multipart form
+    http_files = {"some-file": ("some-file.csv", "some,file,contents")}
+    http_request_with_retry(
+        http_url,
+        http_retry_count,
+        http_action,
+        [http_action],
+        http_header,
+        files=http_files,
+    )
+    mock_post.assert_called_with(
+        url=http_url,
+        headers=http_header,
+        json=None,
+        files=http_files,
+    )
+
 
 @mock.patch.object(Session, "get")
 @mock.patch("phdi.transport.http.Retry")
@@ -58,6 +82,7 @@ def test_http_request_with_retry_get(mock_retry_strategy, mock_get):
         total=http_retry_count,
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=[http_action],
+        backoff_factor=0,
     )
 
     mock_get.assert_called_with(
@@ -78,3 +103,102 @@ def test_http_request_with_retry_unsupported_action():
         http_request_with_retry(
             http_url, http_retry_count, http_action, [http_action], http_header
         )
+
+
+def test_get_http_session():
+    session = get_http_session("https://some-url/some-path", 3, ["GET"])
+
+    # Requests to the same host with the same retry policy share a session
+    assert get_http_session("https://SOME-URL/other-path?q=1", 3, ["get"]) is session
+    assert get_http_session("http://some-url/some-path", 3, ["GET"]) is not session
+    assert get_http_session("https://other-url/some-path", 3, ["GET"]) is not session
+    assert get_http_session("https://some-url/some-path", 5, ["GET"]) is not session
+    assert get_http_session("https://some-url/some-path", 3, ["POST"]) is not session
+
+    adapter = session.get_adapter("https://some-url")
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.allowed_methods == ["GET"]
+    assert adapter._pool_maxsize == 10
+
+    # Closing the sessions means new ones are created
+    with mock.patch.object(Session, "close") as mock_close:
+        close_http_sessions()
+    assert mock_close.call_count == 5
+    assert get_http_session("https://some-url/some-path", 3, ["GET"]) is not session
+
+
+@mock.patch.object(Session, "get", autospec=True)
+def test_http_request_with_retry_reuses_session(mock_get):
+    http_request_with_retry("https://some-url/1", 2, "GET", ["GET"], {})
+    http_request_with_retry("https://some-url/2", 2, "GET", ["GET"], {})
+
+    assert mock_get.call_count == 2
+    assert mock_get.call_args_list[0][0][0] is mock_get.call_args_list[1][0][0]
+
+
+def test_configure_http_sessions():
+    session = get_http_session("https://some-url", 3, ["GET"])
+
+    try:
+        configure_http_sessions(
+            pool_maxsize=20,
+            pool_block=True,
+            keep_alive=False,
+            status_forcelist=[503],
+            backoff_factor=0.5,
+        )
+        configured_session = get_http_session("https://some-url", 3, ["GET"])
+        assert configured_session is not session
+
+        adapter = configured_session.get_adapter("https://some-url")
+        assert adapter._pool_maxsize == 20
+        assert adapter._pool_block
+        assert adapter.max_retries.status_forcelist == [503]
+        assert adapter.max_retries.backoff_factor == 0.5
+        assert configured_session.headers["Connection"] == "close"
+    finally:
+        configure_http_sessions()
+
+    session = get_http_session("https://some-url", 3, ["GET"])
+    assert session.headers["Connection"] == "keep-alive"
+
+    with pytest.raises(ValueError):
+        configure_http_sessions(pool_maxsize=0)
+    with pytest.raises(ValueError):
+        configure_http_sessions(backoff_factor=-1)
+
+
+def test_http_request_with_retry_does_not_keep_cookies():
+    cookie_headers = []
+
+    class CookieHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            cookie_headers.append(self.headers.get("Cookie"))
+            self.send_response(200)
+            self.send_header("Set-Cookie", "affinity=token-1; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CookieHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/Patient"
+    try:
+        for token in ["token-1", "token-2"]:
+            response = http_request_with_retry(
+                url=url,
+                retry_count=0,
+                request_type="GET",
+                allowed_methods=["GET"],
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+        close_http_sessions()
+
+    # The cookie set by the first response isn't sent with the second request
+    assert cookie_headers == [None, None]
@@ -1,7 +1,10 @@
+import copy
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
 import yaml
 
+from phdi.validation.validation import EcrValidator
 from phdi.validation.validation import validate_ecr
 from tests.test_data_generator import generate_eicr_results
 
@@ -262,3 +265,69 @@ def test_validate_with_rr_data_missing_rr():
         include_error_types=test_include_errors,
     )
     assert result == expected_response
+
+
+def test_ecr_validator_in_parallel():
+    validator = EcrValidator(config)
+    messages = [sample_file_good, sample_file_bad, sample_file_error, " BLAH "] * 25
+    expected_results = [
+        validate_ecr(
+            ecr_message=message,
+            config=config,
+            include_error_types=test_include_errors,
+        )
+        for message in messages
+    ]
+
+    # One validator can validate many messages at once without their results
+    # getting mixed up
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(
+                lambda message: validator.validate(
+                    ecr_message=message, include_error_types=test_include_errors
+                ),
+                messages,
+            )
+        )
+    assert results == expected_results
+    assert results[0]["message_valid"]
+    assert not results[1]["message_valid"]
+
+    # Earlier results aren't changed by later validations
+    first_result = validator.validate(
+        ecr_message=sample_file_bad, include_error_types=test_include_errors
+    )
+    expected_first_result = copy.deepcopy(first_result)
+    validator.validate(
+        ecr_message=sample_file_good, include_error_types=test_include_errors
+    )
+    assert first_result == expected_first_result
+
+
+def test_ecr_validator_relatives_with_comments():
+    relatives_config = {
+        "fields": [
+            {
+                "fieldName": "City",
+                "cdaPath": "//hl7:ClinicalDocument/hl7:addr/hl7:city",
+                "errorType": "errors",
+                "relatives": [
+                    {
+                        "name": "state",
+                        "cdaPath": "//hl7:ClinicalDocument/hl7:addr/hl7:state",
+                    }
+                ],
+            }
+        ]
+    }
+    message = (
+        '<ClinicalDocument xmlns="urn:hl7-org:v3"><addr>'
+        "<!-- the state follows the city --><city>Boston</city><state>MA</state>"
+        "</addr></ClinicalDocument>"
+    )
+    result = EcrValidator(relatives_config).validate(
+        ecr_message=message, include_error_types=test_include_errors
+    )
+    assert result["validation_results"]["errors"] == []
+    assert result["message_valid"]
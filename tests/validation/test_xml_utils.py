@@ -10,6 +10,7 @@ from phdi.validation.xml_utils import _get_xml_relative_iterator
 from phdi.validation.xml_utils import _get_xml_relatives_details
 from phdi.validation.xml_utils import _validate_xml_related_element
 from phdi.validation.xml_utils import _validate_xml_relatives
+from phdi.validation.xml_utils import CompiledField
 from phdi.validation.xml_utils import ECR_NAMESPACES
 from phdi.validation.xml_utils import EICR_MSG_ID_XPATH
 from phdi.validation.xml_utils import get_ecr_message_ids
@@ -728,6 +729,48 @@ def test_validate_xml_relatives():
     assert _validate_xml_relatives(xml_elements[0], config_no_relatives) is True
 
 
+def test_compiled_field():
+    namespace = {"test": "test"}
+    xml = (
+        "<foo xmlns='test' use='L'><bar test='hello'>Blah<baz foo='bar'/></bar>"
+        + "<bar test='bye'/><chaz/></foo>"
+    )
+    root = etree.fromstring(xml)
+    config = {
+        "fieldName": "bar",
+        "cdaPath": "//test:foo/test:bar",
+        "attributes": [{"attributeName": "test", "regEx": "hello"}],
+        "textRequired": "True",
+        "relatives": [
+            {
+                "name": "foo",
+                "cdaPath": "//test:foo",
+                "attributes": [{"attributeName": "use", "regEx": "L"}],
+            },
+            {"name": "chaz", "cdaPath": "//test:foo/test:chaz"},
+        ],
+    }
+    field = CompiledField(config)
+    assert field.tag_name == "bar"
+    assert [relative.depth_difference for relative in field.relatives] == [1, 0]
+
+    # The validation helpers give the same results for a compiled field
+    # as for its configuration
+    xml_elements = root.xpath(config["cdaPath"], namespaces=namespace)
+    assert validate_xml_elements(xml_elements, field) == xml_elements
+    assert validate_xml_elements(xml_elements, config) == xml_elements
+    for xml_element in xml_elements:
+        assert validate_xml_attributes(xml_element, field) == (
+            validate_xml_attributes(xml_element, config)
+        )
+        assert validate_xml_value(xml_element, field) == (
+            validate_xml_value(xml_element, config)
+        )
+    assert validate_xml_attributes(xml_elements[0], field) == []
+    assert len(validate_xml_attributes(xml_elements[1], field)) == 1
+    assert len(validate_xml_value(xml_elements[1], field)) == 1
+
+
 def test_get_xml_relatives_details():
     config_correct = {
         "fieldName": "bar",
@@ -0,0 +1,92 @@
+"""
+This is a micro-benchmark of extracting values from FHIR resources with
+`phdi.fhir.utils.extract_value_with_resource_path`. Each of a set of paths, like
+those used to tabulate data and link records, is extracted from every resource
+in the test bundles: first by compiling the path with fhirpathpy for every
+extraction, as used to happen ("uncached"), then with the path compiled once by
+fhirpathpy ("fhirpathpy"), and finally as `extract_value_with_resource_path`
+does now ("current").
+
+Usage: python utils/benchmark_fhirpath.py [--repeat N]
+"""
+
+import argparse
+import json
+import pathlib
+import timeit
+
+import fhirpathpy
+
+from phdi.fhir.utils import extract_value_with_resource_path
+
+ASSETS = pathlib.Path(__file__).parent.parent / "tests" / "assets" / "general"
+BUNDLES = ["patient_bundle.json", "patient_bundle_w_floats.json"]
+PATHS = [
+    "Patient.name.given",
+    "Patient.name[0].family",
+    "Patient.birthDate",
+    "Patient.gender",
+    "Patient.address.line",
+    "Patient.address[0].postalCode",
+    "Patient.telecom.value",
+    "Patient.identifier.where(type.coding.code='MR').value",
+]
+COMPILED = {path: fhirpathpy.compile(path) for path in PATHS}
+
+
+def load_resources() -> list:
+    """
+    Loads every resource in the test bundles.
+    """
+    resources = []
+    for bundle_name in BUNDLES:
+        with open(ASSETS / bundle_name) as file:
+            bundle = json.load(file)
+        resources.extend(entry["resource"] for entry in bundle.get("entry", []))
+    return resources
+
+
+def extract_uncached(resource: dict, path: str):
+    """
+    Extracts a value, compiling the path for every extraction.
+    """
+    return fhirpathpy.compile(path)(resource)
+
+
+def extract_with_fhirpathpy(resource: dict, path: str):
+    """
+    Extracts a value with fhirpathpy, compiling each path once.
+    """
+    return COMPILED[path](resource)
+
+
+def main():
+    """
+    Times each way of extracting values and prints the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    resources = load_resources()
+    extractions = args.number * len(resources)
+    print(f"{extractions} extractions per path from {len(resources)} resources")
+    for path in PATHS:
+        for label, extract in [
+            ("uncached", extract_uncached),
+            ("fhirpathpy", extract_with_fhirpathpy),
+            ("current", extract_value_with_resource_path),
+        ]:
+
+            def run():
+                for resource in resources:
+                    extract(resource, path)
+
+            seconds = min(timeit.repeat(run, number=args.number, repeat=args.repeat))
+            per_extraction = seconds / extractions * 1e6
+            print(f"{path:<56} {label:<11} {per_extraction:8.2f} us/extraction")
+
+
+if __name__ == "__main__":
+    main()